@@ -1,14 +1,16 @@
 """
 Configuração do Django Admin para o sistema de gerenciamento de horários escolares.
 """
-from django.contrib import admin
-from .models import Disciplina, Sala, Professor, Turma, PreferenciaProfessor, Horario
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from .models import Disciplina, Sala, Professor, Turma, PreferenciaProfessor, Horario, PeriodoLetivo
 
 
 @admin.register(Disciplina)
 class DisciplinaAdmin(admin.ModelAdmin):
     """Configuração do admin para o modelo Disciplina."""
-    list_display = ['nome', 'curso_area', 'periodo_serie', 'carga_horaria_semanal', 'ativa']
+    list_display = ['nome', 'curso_area', 'periodo_serie', 'carga_horaria_semanal', 'padrao_blocos', 'ativa']
     list_filter = ['curso_area', 'periodo_serie', 'ativa']
     search_fields = ['nome', 'curso_area']
     list_editable = ['ativa']
@@ -52,10 +54,73 @@ class PreferenciaProfessorAdmin(admin.ModelAdmin):
     raw_id_fields = ['professor', 'disciplina']
 
 
+class HorarioActionForm(ActionForm):
+    """Barra de ações do admin de horários, com o novo valor das trocas em massa."""
+    professor = forms.ModelChoiceField(Professor.objects.filter(ativo=True), required=False, label='Professor')
+    sala = forms.ModelChoiceField(Sala.objects.filter(ativa=True), required=False, label='Sala')
+    periodo_letivo = forms.ModelChoiceField(PeriodoLetivo.objects.all(), required=False, label='Período')
+
+
 @admin.register(Horario)
 class HorarioAdmin(admin.ModelAdmin):
-    """Configuração do admin para o modelo Horario."""
-    list_display = ['turma', 'disciplina', 'professor', 'sala', 'dia_semana', 'turno', 'horario_inicio', 'horario_fim', 'ativo']
-    list_filter = ['dia_semana', 'turno', 'ativo', 'disciplina', 'professor']
+    """
+    Configuração do admin para o modelo Horario.
+
+    As ações em massa usam AlteracaoEmLote (validação conjunta e
+    bulk_update) em vez de salvar cada horário.
+    """
+    list_display = ['turma', 'disciplina', 'professor', 'sala', 'dia_semana', 'turno', 'horario_inicio', 'horario_fim', 'periodo_letivo', 'ativo']
+    list_filter = ['periodo_letivo', 'dia_semana', 'turno', 'ativo', 'disciplina', 'professor']
+    list_select_related = ['turma', 'disciplina', 'professor', 'sala', 'periodo_letivo']
     search_fields = ['turma__nome_codigo', 'disciplina__nome', 'professor__nome_completo']
     list_editable = ['ativo']
+    action_form = HorarioActionForm
+    actions = ['ativar_horarios', 'desativar_horarios', 'trocar_professor', 'trocar_sala', 'mover_para_periodo']
+
+    def _alterar_em_lote(self, request, queryset, campo, valor):
+        from .movimentacao import AlteracaoEmLote
+
+        resultado = AlteracaoEmLote(usuario=request.user).aplicar(queryset, campo, valor)
+        if resultado['sucesso']:
+            self.message_user(request, f"{resultado['alterados']} horário(s) alterado(s).", messages.SUCCESS)
+            return
+        erros = resultado['erros']
+        resumo = '; '.join(erros[:5]) + (f" (e mais {len(erros) - 5})" if len(erros) > 5 else '')
+        self.message_user(request, f"Nenhum horário foi alterado: {resumo}", messages.ERROR)
+
+    def _valor_escolhido(self, request, campo):
+        """Valor escolhido na barra de ações; avisa e retorna None se faltar."""
+        form = self.action_form(request.POST)
+        form.fields['action'].choices = self.get_action_choices(request)
+        valor = form.cleaned_data.get(campo) if form.is_valid() else None
+        if valor is None:
+            self.message_user(
+                request, f"Escolha o campo '{form.fields[campo].label}' ao lado da ação.", messages.WARNING
+            )
+        return valor
+
+    @admin.action(description='Ativar horários selecionados')
+    def ativar_horarios(self, request, queryset):
+        self._alterar_em_lote(request, queryset, 'ativo', True)
+
+    @admin.action(description='Desativar horários selecionados')
+    def desativar_horarios(self, request, queryset):
+        self._alterar_em_lote(request, queryset, 'ativo', False)
+
+    @admin.action(description='Trocar professor dos horários selecionados')
+    def trocar_professor(self, request, queryset):
+        professor = self._valor_escolhido(request, 'professor')
+        if professor:
+            self._alterar_em_lote(request, queryset, 'professor', professor)
+
+    @admin.action(description='Trocar sala dos horários selecionados')
+    def trocar_sala(self, request, queryset):
+        sala = self._valor_escolhido(request, 'sala')
+        if sala:
+            self._alterar_em_lote(request, queryset, 'sala', sala)
+
+    @admin.action(description='Mover horários selecionados para o período')
+    def mover_para_periodo(self, request, queryset):
+        periodo = self._valor_escolhido(request, 'periodo_letivo')
+        if periodo:
+            self._alterar_em_lote(request, queryset, 'periodo_letivo', periodo)
@@ -6,16 +6,21 @@ que considera restrições de professores, salas, turmas e preferências.
 """
 
 import random
-from datetime import time, datetime, date
+from datetime import time
 from typing import List, Dict, Any, Optional, Tuple
 from django.db import transaction
 from django.db.models import Q
 from collections import defaultdict
 
-from .models import (
-    Turma, Disciplina, Professor, Sala, Horario, 
-    PreferenciaProfessor, BloqueioTemporario
-)
+from .models import Turma, Professor, Sala, Horario, PeriodoLetivo
+from .alocacao_salas import AlocadorSalas, IndiceSalas
+from .blocos import blocos_para, janelas_contiguas
+from .candidatos import criar_candidato
+from .carga_horaria import MatrizCargaHoraria
+from .explicacao import ExplicadorInviabilidade
+from .quadro_compacto import TURNOS, QuadroCompacto, codigo_turno, minutos
+from .restricoes import ConjuntoRestricoes
+from .viabilidade import AnaliseViabilidade
 
 
 class GeradorHorariosRobusto:
@@ -56,12 +61,30 @@ class GeradorHorariosRobusto:
         (4, 'sexta')
     ]
     
-    def __init__(self):
+    # Janelas de slots contíguos por turno e tamanho, para os blocos de aulas
+    JANELAS = janelas_contiguas(TURNOS_HORARIOS)
+    
+    def __init__(self, restricoes=None):
+        """
+        Args:
+            restricoes: Restrições (core/restricoes.py) usadas na busca; por
+                padrão, as da configuração RESTRICOES_HORARIOS ou as do módulo
+        """
+        self.restricoes = restricoes
         self.reset_stats()
+        self.semente = None
+        self.periodo = None
+        self._random = random.Random()
+        self._como_candidato = False
+        self._ignorar_existentes_das_turmas = False
     
     def reset_stats(self):
         """Reset das estatísticas de geração."""
         self.conflitos = []
+        self.restricoes_conflitantes = []
+        self.quadro = None
+        self.objetivo = None
+        self.candidato = None
         self.horarios_criados = 0
         self.turmas_processadas = 0
         self.tentativas = 0
@@ -73,18 +96,38 @@ class GeradorHorariosRobusto:
         evitar_janelas: bool = True,
         distribuir_dias: bool = True,
         limpar_anteriores: bool = False,
-        max_tentativas: int = 100
+        max_tentativas: int = 100,
+        como_candidato: bool = False,
+        semente: Optional[int] = None,
+        usuario=None,
+        nome_candidato: str = '',
+        periodo_letivo: Optional[PeriodoLetivo] = None
     ) -> Dict[str, Any]:
         """
         Método principal para geração de horários.
+        
+        A geração fica restrita a `periodo_letivo` (padrão: o período ativo):
+        só os horários desse período contam como ocupação, são apagados por
+        `limpar_anteriores` ou recebem as novas aulas. Períodos diferentes
+        podem ser gerados ao mesmo tempo.
+        
+        Com `como_candidato`, o resultado é guardado como HorarioCandidato e
+        os horários atuais não são alterados; `limpar_anteriores` passa a
+        significar "gerar as turmas selecionadas do zero", sem apagar nada.
+        A `semente` torna a execução reproduzível.
         """
         try:
             self.reset_stats()
+            self.semente = semente if semente is not None else random.randrange(2 ** 31)
+            self._random = random.Random(self.semente)
+            self.periodo = periodo_letivo or PeriodoLetivo.get_periodo_ativo()
+            self._como_candidato = como_candidato
+            self._ignorar_existentes_das_turmas = como_candidato and limpar_anteriores
             
             with transaction.atomic():
                 # Limpar horários anteriores se solicitado
-                if limpar_anteriores:
-                    Horario.objects.all().delete()
+                if limpar_anteriores and not como_candidato:
+                    Horario.objects.do_periodo(self.periodo).delete()
                 
                 # Buscar turmas se não fornecidas
                 if turmas is None:
@@ -110,14 +153,40 @@ class GeradorHorariosRobusto:
                     distribuir_dias,
                     max_tentativas
                 )
-                
-                return {
-                    'sucesso': sucesso,
-                    'horarios_criados': self.horarios_criados,
-                    'turmas_processadas': self.turmas_processadas,
-                    'conflitos': self.conflitos,
-                    'tentativas': self.tentativas
-                }
+            
+            # Fora da transação da geração (que só lê no modo candidato), para
+            # que execuções paralelas não disputem o bloqueio de escrita
+            if sucesso and como_candidato and self.quadro is not None:
+                self.candidato = criar_candidato(
+                    self.quadro,
+                    self.periodo,
+                    turmas,
+                    self.semente,
+                    parametros={
+                        'respeitar_preferencias': respeitar_preferencias,
+                        'evitar_janelas': evitar_janelas,
+                        'distribuir_dias': distribuir_dias,
+                        'do_zero': limpar_anteriores,
+                        'tentativas': self.tentativas,
+                        'objetivo': self.objetivo,
+                    },
+                    usuario=usuario,
+                    nome=nome_candidato,
+                    avaliacao=self.objetivo
+                )
+            
+            return {
+                'sucesso': sucesso,
+                'horarios_criados': self.horarios_criados,
+                'turmas_processadas': self.turmas_processadas,
+                'conflitos': self.conflitos,
+                'restricoes_conflitantes': self.restricoes_conflitantes,
+                'tentativas': self.tentativas,
+                'objetivo': self.objetivo,
+                'semente': self.semente,
+                'periodo_letivo_id': self.periodo.pk if self.periodo else None,
+                'candidato_id': self.candidato.pk if self.candidato else None
+            }
                 
         except Exception as e:
             return {
@@ -160,36 +229,232 @@ class GeradorHorariosRobusto:
         """
         Algoritmo robusto de geração de horários.
         """
-        # Criar lista de todas as aulas necessárias
-        aulas_necessarias = self._preparar_aulas(turmas)
+        # Horários já existentes no período contam para a carga e ocupam professor, turma e sala
+        horarios_existentes = self._horarios_existentes()
+        if self._ignorar_existentes_das_turmas:
+            horarios_existentes = horarios_existentes.exclude(turma__in=turmas)
+        
+        # Criar lista das aulas que ainda faltam
+        aulas_necessarias = self._preparar_aulas(turmas, horarios_existentes)
         
         if not aulas_necessarias:
+            if self.turmas_processadas and not self.conflitos:
+                self.conflitos.append("Carga horária já completa para as turmas selecionadas")
+                return True
             self.conflitos.append("Nenhuma aula para ser programada")
             return False
         
-        # Algoritmo de tentativa e erro com flexibilidade crescente
+        # Salas são indexadas uma única vez; cada tentativa monta seu próprio emparelhamento
+        self._indice_salas = IndiceSalas(Sala.objects.filter(ativa=True))
+        self._aulas_fixas = self._carregar_aulas_fixas(horarios_existentes)
+        
+        if not self._verificar_salas_compativeis(aulas_necessarias):
+            return False
+        
+        if not self._verificar_blocos(aulas_necessarias):
+            return False
+        
+        # Limites de contagem: recusa de imediato entradas sem solução possível
+        if not self._verificar_viabilidade(aulas_necessarias):
+            self._explicar_inviabilidade(aulas_necessarias, respeitar_preferencias)
+            return False
+        
+        # Representação compacta: cada tentativa parte de um clone do quadro base
+        self._quadro_base = self._montar_quadro(aulas_necessarias)
+        
+        # Restrições carregam do banco o que precisam uma única vez
+        self._restricoes = ConjuntoRestricoes(self.restricoes)
+        self._restricoes.preparar(self._quadro_base, self.periodo)
+        
+        # Algoritmo de tentativa e erro com flexibilidade crescente; cada
+        # restrição declara a partir de que flexibilidade deixa de valer
         for tentativa in range(max_tentativas):
             self.tentativas = tentativa + 1
             
             # Tentar gerar horários com nível de flexibilidade baseado na tentativa
             flexibilidade = min(0.1 + (tentativa * 0.01), 0.8)  # 10% a 80% de flexibilidade
             
+            quadro = self._quadro_base.clonar()
             if self._tentar_gerar_completo(
-                aulas_necessarias.copy(),
-                respeitar_preferencias and flexibilidade < 0.5,  # Após 50 tentativas, relaxa preferências
-                evitar_janelas and flexibilidade < 0.3,  # Após 30 tentativas, permite janelas
+                quadro,
+                respeitar_preferencias,
+                evitar_janelas,
                 distribuir_dias,
                 flexibilidade
             ):
+                self.quadro = quadro
+                self.objetivo = self._restricoes.avaliar(quadro)
                 return True
                 
         # Se chegou aqui, não conseguiu gerar
         self.conflitos.append(f"Não foi possível gerar horário completo após {max_tentativas} tentativas")
+        self._explicar_inviabilidade(aulas_necessarias, respeitar_preferencias)
         return False
     
-    def _preparar_aulas(self, turmas: List[Turma]) -> List[Dict]:
-        """Prepara lista de todas as aulas que precisam ser agendadas."""
+    def _verificar_salas_compativeis(self, aulas: List[Dict]) -> bool:
+        """Falha de imediato se alguma turma não cabe em nenhuma sala ativa do tipo exigido."""
+        alocador = AlocadorSalas(indice=self._indice_salas)
+        sem_sala = {}
+        
+        for aula in aulas:
+            turma, disciplina = aula['turma'], aula['disciplina']
+            if not alocador.salas_compativeis(turma, disciplina.tipo_sala):
+                sem_sala[(turma.pk, disciplina.tipo_sala)] = (turma, disciplina)
+        
+        for turma, disciplina in sem_sala.values():
+            if disciplina.tipo_sala:
+                self.conflitos.append(
+                    f"Nenhuma sala ativa do tipo {disciplina.get_tipo_sala_display()} comporta a turma "
+                    f"{turma.nome_codigo} ({turma.numero_alunos} alunos) para {disciplina.nome}"
+                )
+            else:
+                self.conflitos.append(
+                    f"Nenhuma sala ativa comporta a turma {turma.nome_codigo} ({turma.numero_alunos} alunos)"
+                )
+        
+        return not sem_sala
+    
+    def _verificar_blocos(self, aulas: List[Dict]) -> bool:
+        """Falha de imediato se algum bloco de aulas não cabe em nenhuma janela contígua dos turnos da turma."""
+        tamanhos = defaultdict(int)
+        primeira = {}
+        for aula in aulas:
+            tamanhos[aula['bloco']] += 1
+            primeira.setdefault(aula['bloco'], aula)
+        
+        sem_janela = {}
+        for bloco, tamanho in tamanhos.items():
+            turma, disciplina = primeira[bloco]['turma'], primeira[bloco]['disciplina']
+            if not any(self.JANELAS[turno].get(tamanho) for turno in self._get_turnos_permitidos(turma)):
+                sem_janela[(turma.pk, disciplina.pk, tamanho)] = (turma, disciplina, tamanho)
+        
+        for turma, disciplina, tamanho in sem_janela.values():
+            self.conflitos.append(
+                f"Os turnos da turma {turma.nome_codigo} não têm {tamanho} aulas seguidas sem intervalo "
+                f"para o bloco de {disciplina.nome} ({disciplina.padrao_blocos})"
+            )
+        
+        return not sem_janela
+    
+    def _verificar_viabilidade(self, aulas: List[Dict]) -> bool:
+        """Registra em conflitos os motivos pelos quais nenhuma tentativa teria sucesso."""
+        turmas = {aula['turma'].pk: aula['turma'] for aula in aulas}
+        motivos = AnaliseViabilidade(
+            aulas,
+            {turma_id: self._gerar_slots_possiveis(turma) for turma_id, turma in turmas.items()},
+            self._aulas_fixas,
+            self._indice_salas
+        ).verificar()
+        
+        self.conflitos.extend(motivos)
+        return not motivos
+    
+    def _explicar_inviabilidade(self, aulas: List[Dict], respeitar_preferencias: bool) -> None:
+        """Registra em restricoes_conflitantes os conjuntos mínimos de restrições que impedem a geração."""
+        turmas = {aula['turma'].pk: aula['turma'] for aula in aulas}
+        todos_slots = [
+            (dia_num, turno, horario_inicio, horario_fim)
+            for dia_num, _ in self.DIAS_SEMANA
+            for turno, horarios in self.TURNOS_HORARIOS.items()
+            for horario_inicio, horario_fim in horarios
+        ]
+        explicador = ExplicadorInviabilidade(
+            aulas,
+            {turma_id: self._gerar_slots_possiveis(turma) for turma_id, turma in turmas.items()},
+            todos_slots,
+            self._aulas_fixas,
+            self._indice_salas.salas,
+            respeitar_preferencias,
+            self.periodo
+        )
+        
+        self.restricoes_conflitantes = [
+            {
+                'restricoes': [restricao.descricao for restricao in conflito['restricoes']],
+                'motivos': conflito['motivos']
+            }
+            for conflito in explicador.explicar()
+        ]
+    
+    def _horarios_existentes(self):
+        """Horários ativos do período letivo em que os novos horários serão salvos."""
+        return Horario.objects.do_periodo(self.periodo).ativos()
+    
+    def _carregar_aulas_fixas(self, horarios_existentes) -> List[Dict]:
+        """Converte os horários já salvos em aulas fixas, no mesmo formato das aulas geradas."""
+        aulas_fixas = []
+        
+        for horario in horarios_existentes.select_related('turma', 'disciplina', 'professor', 'sala'):
+            aulas_fixas.append({
+                'id': ('fixa', horario.pk),
+                'fixa': True,
+                'turma': horario.turma,
+                'disciplina': horario.disciplina,
+                'professor': horario.professor,
+                'dia': horario.dia_semana,
+                'turno': horario.turno,
+                'horario_inicio': horario.horario_inicio.strftime('%H:%M'),
+                'horario_fim': horario.horario_fim.strftime('%H:%M'),
+                'sala': horario.sala
+            })
+        
+        return aulas_fixas
+    
+    def _montar_quadro(self, aulas: List[Dict]) -> QuadroCompacto:
+        """Converte aulas fixas e aulas a alocar para a representação compacta."""
+        quadro = QuadroCompacto()
+        
+        for aula in self._aulas_fixas:
+            quadro.adicionar(
+                aula['turma'],
+                aula['disciplina'],
+                professor=aula['professor'],
+                dia=aula['dia'],
+                inicio=minutos(aula['horario_inicio']),
+                fim=minutos(aula['horario_fim']),
+                turno=aula['turno'],
+                sala=aula['sala'],
+                fixa=True
+            )
+        blocos = {}
+        for aula in aulas:
+            indice = quadro.adicionar(aula['turma'], aula['disciplina'], aula['professores_possiveis'])
+            blocos.setdefault(aula['bloco'], []).append(indice)
+        
+        # Variáveis da busca: cada bloco (aula avulsa ou aulas seguidas) recebe uma janela
+        self._blocos = [tuple(indices) for indices in blocos.values()]
+        
+        # Janelas permitidas por (índice de turma, tamanho), em minutos
+        self._janelas_turma = {}
+        
+        return quadro
+    
+    def _reservar_salas_fixas(self, quadro: QuadroCompacto) -> None:
+        """Ocupa, no emparelhamento de cada slot, as salas das aulas fixas que o sobrepõem."""
+        posicao_sala = {sala.pk: indice for indice, sala in enumerate(self._alocador.salas)}
+        slots_grade = [
+            (minutos(horario_inicio), minutos(horario_fim))
+            for horarios in self.TURNOS_HORARIOS.values()
+            for horario_inicio, horario_fim in horarios
+        ]
+        
+        for aula in range(len(quadro)):
+            if not quadro.fixa[aula]:
+                continue
+            _, dia, inicio, fim, _, sala = quadro.posicao(aula)
+            indice = posicao_sala.get(quadro.catalogo.pk('sala', sala))
+            if indice is None:
+                continue  # Sala inativa: não disputa vaga com as aulas novas
+            
+            self._alocador.registrar_aula(aula, [indice])
+            for inicio_slot, fim_slot in slots_grade:
+                if inicio < fim_slot and fim > inicio_slot:
+                    self._alocador.alocar((dia, inicio_slot, fim_slot), aula)
+    
+    def _preparar_aulas(self, turmas: List[Turma], horarios_existentes=None) -> List[Dict]:
+        """Prepara lista das aulas que ainda faltam para completar a carga horária."""
         aulas = []
+        matriz = MatrizCargaHoraria(turmas=turmas, horarios=horarios_existentes)
         
         for turma in turmas:
             self.turmas_processadas += 1
@@ -208,284 +473,183 @@ class GeradorHorariosRobusto:
                         self.conflitos.append(f"Nenhum professor disponível para {disciplina.nome}")
                         continue
                 
-                # Calcular quantas aulas por semana
-                aulas_por_semana = getattr(disciplina, 'carga_horaria_semanal', None) or getattr(disciplina, 'aulas_por_semana', None) or 2
+                # Apenas as aulas que faltam em relação à carga horária semanal
+                aulas_faltantes = matriz.aulas_faltantes(turma.id, disciplina.id)
+                
+                # Aulas de um mesmo bloco ocupam slots consecutivos, com o mesmo professor
+                try:
+                    padrao = disciplina.blocos()
+                except ValueError as erro:
+                    self.conflitos.append(f"{disciplina.nome}: {erro}; aulas tratadas como avulsas")
+                    padrao = []
                 
-                for i in range(aulas_por_semana):
-                    aulas.append({
-                        'turma': turma,
-                        'disciplina': disciplina,
-                        'professores_possiveis': list(professores),
-                        'professor': None,  # Será escolhido durante a geração
-                        'dia': None,
-                        'turno': None,
-                        'horario_inicio': None,
-                        'horario_fim': None,
-                        'sala': None
-                    })
+                professores_possiveis = list(professores)
+                for tamanho in blocos_para(padrao, aulas_faltantes):
+                    bloco = (turma.pk, disciplina.pk, len(aulas))
+                    for _ in range(tamanho):
+                        aulas.append({
+                            'id': len(aulas),
+                            'turma': turma,
+                            'disciplina': disciplina,
+                            'professores_possiveis': professores_possiveis,
+                            'professor': None,  # Será escolhido durante a geração
+                            'dia': None,
+                            'turno': None,
+                            'horario_inicio': None,
+                            'horario_fim': None,
+                            'sala': None,
+                            'bloco': bloco
+                        })
         
         return aulas
     
     def _tentar_gerar_completo(
         self, 
-        aulas: List[Dict],
+        quadro: QuadroCompacto,
         respeitar_preferencias: bool,
         evitar_janelas: bool,
         distribuir_dias: bool,
         flexibilidade: float
     ) -> bool:
         """
-        Tenta gerar um horário completo para todas as aulas.
+        Tenta gerar um horário completo para todas as aulas do quadro.
         """
-        # Embaralhar aulas para variar a ordem de tentativa
-        random.shuffle(aulas)
-        
-        aulas_alocadas = []
+        catalogo = quadro.catalogo
+        self._restricoes.configurar(
+            flexibilidade,
+            respeitar_preferencias=respeitar_preferencias,
+            evitar_janelas=evitar_janelas,
+            distribuir_dias=distribuir_dias
+        )
         
-        for aula in aulas:
-            slot_encontrado = self._encontrar_slot_para_aula(
+        # Embaralhar blocos para variar a ordem de tentativa; os maiores, com
+        # menos janelas possíveis, são posicionados primeiro
+        ordem = self._blocos[:]
+        self._random.shuffle(ordem)
+        ordem.sort(key=len, reverse=True)
+        aulas_livres = [aula for bloco in ordem for aula in bloco]
+        
+        # Salas ficam fora da busca: cada slot mantém um emparelhamento aulas × salas
+        self._alocador = AlocadorSalas(indice=self._indice_salas)
+        self._reservar_salas_fixas(quadro)
+        for aula in aulas_livres:
+            tipo_sala = catalogo.objeto('disciplina', quadro.disciplina[aula]).tipo_sala
+            self._alocador.registrar_aula(
                 aula,
-                aulas_alocadas,
-                respeitar_preferencias,
-                evitar_janelas,
-                distribuir_dias,
-                flexibilidade
+                self._alocador.salas_compativeis(catalogo.objeto('turma', quadro.turma[aula]), tipo_sala),
+                tipo_sala
             )
-            
-            if slot_encontrado:
-                aulas_alocadas.append(aula)
-            else:
-                # Não conseguiu alocar esta aula, falhar
+        
+        # Intervalos já ocupados por (professor, dia), (turma, dia) e (turma, disciplina, dia)
+        ocupacao = defaultdict(list)
+        for aula in range(len(quadro)):
+            if quadro.fixa[aula]:
+                self._registrar_ocupacao(quadro, aula, ocupacao)
+        
+        for bloco in ordem:
+            if not self._encontrar_janela_para_bloco(quadro, bloco, ocupacao):
+                # Não conseguiu alocar este bloco, falhar
                 return False
+            for aula in bloco:
+                self._registrar_ocupacao(quadro, aula, ocupacao)
+        
+        # Com todos os horários fixados, cada aula recebe a sala do emparelhamento do
+        # seu slot (as restrições sobre salas podem trocá-la por outra livre no slot)
+        slots = []
+        for aula in aulas_livres:
+            _, dia, inicio, fim, _, _ = quadro.posicao(aula)
+            slots.append((aula, quadro.turma[aula], (dia, inicio, fim)))
+        self._restricoes.ajustar_salas(self._alocador, slots)
+        for aula, _, slot in slots:
+            sala = self._alocador.sala_da_aula(slot, aula)
+            quadro.definir_sala(aula, catalogo.indice('sala', sala))
         
         # Se chegou aqui, conseguiu alocar todas as aulas
-        self._salvar_horarios(aulas_alocadas)
+        if not self._como_candidato:
+            self._salvar_horarios(quadro)
         return True
     
-    def _encontrar_slot_para_aula(
-        self,
-        aula: Dict,
-        aulas_alocadas: List[Dict],
-        respeitar_preferencias: bool,
-        evitar_janelas: bool,
-        distribuir_dias: bool,
-        flexibilidade: float
-    ) -> bool:
+    def _registrar_ocupacao(self, quadro: QuadroCompacto, aula: int, ocupacao: Dict) -> None:
+        """Acrescenta o intervalo da aula às ocupações do professor, da turma e da disciplina da turma no dia."""
+        professor, dia, inicio, fim, turno, _ = quadro.posicao(aula)
+        ocupacao[('professor', professor, dia)].append((inicio, fim, turno))
+        ocupacao[('turma', quadro.turma[aula], dia)].append((inicio, fim, turno))
+        ocupacao[('disciplina', quadro.turma[aula], quadro.disciplina[aula], dia)].append((inicio, fim, turno))
+    
+    def _encontrar_janela_para_bloco(self, quadro: QuadroCompacto, bloco: Tuple[int, ...], ocupacao: Dict) -> bool:
         """
-        Encontra um slot válido para uma aula específica.
-        Prioriza agrupamento de aulas do mesmo professor/turma.
+        Encontra uma janela de slots contíguos para um bloco de aulas.
+        
+        O bloco (uma aula avulsa ou aulas seguidas da mesma turma e
+        disciplina) é uma única variável: todas as aulas recebem o mesmo
+        professor e slots consecutivos do mesmo dia e turno. As janelas que
+        as restrições rígidas permitem são tentadas em ordem de custo das
+        flexíveis (core/restricoes.py).
         """
-        # Gerar todos os slots possíveis
-        slots_possiveis = self._gerar_slots_possiveis(aula['turma'])
+        turma = quadro.turma[bloco[0]]
+        disciplina = quadro.disciplina[bloco[0]]
+        restricoes = self._restricoes
+        
+        # Janelas possíveis da turma para o tamanho do bloco (dia, turno, slots)
+        janelas = self._janelas_da_turma(turma, len(bloco))
         
         # Tentar cada professor possível
-        professores = aula['professores_possiveis'].copy()
-        random.shuffle(professores)
+        professores = list(quadro.candidatos_da_aula(bloco[0]))
+        self._random.shuffle(professores)
         
         for professor in professores:
-            # Avaliar e ordenar slots por score de agrupamento
-            slots_com_score = []
+            janelas_com_custo = []
             
-            for slot in slots_possiveis:
-                dia, turno, horario_inicio, horario_fim = slot
+            for janela in janelas:
+                dia, turno, slots = janela
                 
-                # Verificar se o slot é válido para este professor e configuração
-                if self._slot_valido(
-                    professor,
-                    aula['turma'],
-                    aula['disciplina'],
-                    dia,
-                    turno,
-                    horario_inicio,
-                    horario_fim,
-                    aulas_alocadas,
-                    respeitar_preferencias,
-                    evitar_janelas,
-                    flexibilidade
+                # Descartar janelas com algum slot sem sala livre do tipo exigido
+                if not all(
+                    self._alocador.tem_sala_livre((dia, inicio, fim), aula)
+                    for (inicio, fim), aula in zip(slots, bloco)
                 ):
-                    # Calcular score de agrupamento
-                    score = self._calcular_score_agrupamento(
-                        professor,
-                        aula['turma'],
-                        dia,
-                        turno,
-                        horario_inicio,
-                        horario_fim,
-                        aulas_alocadas
-                    )
-                    
-                    slots_com_score.append((slot, score))
+                    continue
+                
+                if restricoes.permite_janela(ocupacao, professor, turma, disciplina, dia, turno, slots):
+                    janelas_com_custo.append((
+                        janela,
+                        restricoes.custo_janela(ocupacao, professor, turma, disciplina, dia, turno, slots)
+                    ))
             
-            # Ordenar por score (maior score = melhor agrupamento)
-            slots_com_score.sort(key=lambda x: x[1], reverse=True)
+            # Menor custo primeiro
+            janelas_com_custo.sort(key=lambda x: x[1])
             
-            # Tentar slots em ordem de score
-            for slot, score in slots_com_score:
-                dia, turno, horario_inicio, horario_fim = slot
-                
-                # Encontrar sala disponível
-                sala = self._encontrar_sala_disponivel(
-                    aula['turma'],
-                    dia,
-                    horario_inicio,
-                    horario_fim,
-                    aulas_alocadas
-                )
-                
-                if sala:
-                    # Alocar a aula
-                    aula['professor'] = professor
-                    aula['dia'] = dia
-                    aula['turno'] = turno
-                    aula['horario_inicio'] = horario_inicio
-                    aula['horario_fim'] = horario_fim
-                    aula['sala'] = sala
+            # Tentar janelas em ordem de custo
+            for (dia, turno, slots), custo in janelas_com_custo:
+                # Reservar vaga no emparelhamento de salas de cada slot; a sala
+                # definitiva só é escolhida quando todas as aulas estiverem alocadas
+                alocadas = []
+                for (inicio, fim), aula in zip(slots, bloco):
+                    if not self._alocador.alocar((dia, inicio, fim), aula):
+                        break
+                    alocadas.append(((dia, inicio, fim), aula))
+                else:
+                    for (inicio, fim), aula in zip(slots, bloco):
+                        quadro.definir(aula, professor, dia, inicio, fim, turno)
                     return True
-        
-        return False
-    
-    def _calcular_score_agrupamento(
-        self,
-        professor: Professor,
-        turma: Turma,
-        dia: int,
-        turno: str,
-        horario_inicio: str,
-        horario_fim: str,
-        aulas_alocadas: List[Dict]
-    ) -> float:
-        """
-        Calcula score de agrupamento para favorecer aulas consecutivas.
-        """
-        score = 0.0
-        
-        # Bonus por aulas consecutivas do mesmo professor no mesmo dia
-        for aula_alocada in aulas_alocadas:
-            if (aula_alocada['professor'] == professor and 
-                aula_alocada['dia'] == dia):
-                
-                # Verificar se são horários consecutivos
-                if self._horarios_consecutivos(
-                    aula_alocada['horario_inicio'], aula_alocada['horario_fim'],
-                    horario_inicio, horario_fim
-                ):
-                    score += 10.0  # Bonus alto para consecutividade
-                
-                # Bonus menor para aulas no mesmo turno
-                if aula_alocada['turno'] == turno:
-                    score += 5.0
-        
-        # Bonus por aulas consecutivas da mesma turma
-        for aula_alocada in aulas_alocadas:
-            if (aula_alocada['turma'] == turma and 
-                aula_alocada['dia'] == dia):
                 
-                # Verificar se são horários consecutivos
-                if self._horarios_consecutivos(
-                    aula_alocada['horario_inicio'], aula_alocada['horario_fim'],
-                    horario_inicio, horario_fim
-                ):
-                    score += 8.0  # Bonus para consecutividade da turma
-                
-                # Bonus menor para aulas no mesmo turno
-                if aula_alocada['turno'] == turno:
-                    score += 3.0
+                for slot, aula in alocadas:
+                    self._alocador.remover(slot, aula)
         
-        # Penalidade por criar janelas (gaps entre aulas)
-        score -= self._calcular_penalidade_janelas(
-            professor, turma, dia, turno, horario_inicio, horario_fim, aulas_alocadas
-        )
-        
-        # Bonus por preferências do professor
-        if hasattr(professor, 'get_preferencia_score'):
-            pref_score = professor.get_preferencia_score(dia_semana=dia, turno=turno)
-            score += (pref_score - 3) * 2  # Normalizar e amplificar
-        
-        return score
-    
-    def _horarios_consecutivos(self, inicio1: str, fim1: str, inicio2: str, fim2: str) -> bool:
-        """
-        Verifica se dois horários são consecutivos (um termina quando o outro começa).
-        """
-        try:
-            h1_fim = datetime.strptime(fim1, '%H:%M').time()
-            h2_inicio = datetime.strptime(inicio2, '%H:%M').time()
-            h2_fim = datetime.strptime(fim2, '%H:%M').time()
-            h1_inicio = datetime.strptime(inicio1, '%H:%M').time()
-            
-            # Verificar se h1 termina quando h2 começa, ou vice-versa
-            return h1_fim == h2_inicio or h2_fim == h1_inicio
-        except:
-            return False
+        return False
     
-    def _calcular_penalidade_janelas(
-        self,
-        professor: Professor,
-        turma: Turma,
-        dia: int,
-        turno: str,
-        horario_inicio: str,
-        horario_fim: str,
-        aulas_alocadas: List[Dict]
-    ) -> float:
-        """
-        Calcula penalidade por criar janelas (gaps) entre aulas.
-        """
-        penalidade = 0.0
-        
-        # Buscar aulas do professor no mesmo dia
-        aulas_professor_dia = [
-            aula for aula in aulas_alocadas
-            if aula['professor'] == professor and aula['dia'] == dia
-        ]
-        
-        # Buscar aulas da turma no mesmo dia
-        aulas_turma_dia = [
-            aula for aula in aulas_alocadas
-            if aula['turma'] == turma and aula['dia'] == dia
-        ]
-        
-        try:
-            inicio_novo = datetime.strptime(horario_inicio, '%H:%M').time()
-            fim_novo = datetime.strptime(horario_fim, '%H:%M').time()
-            
-            # Verificar janelas com aulas do professor
-            for aula in aulas_professor_dia:
-                inicio_existente = datetime.strptime(aula['horario_inicio'], '%H:%M').time()
-                fim_existente = datetime.strptime(aula['horario_fim'], '%H:%M').time()
-                
-                # Calcular gap entre aulas
-                if fim_existente < inicio_novo:
-                    gap_minutes = (datetime.combine(date.today(), inicio_novo) - 
-                                 datetime.combine(date.today(), fim_existente)).seconds / 60
-                    if 0 < gap_minutes <= 120:  # Gap de até 2 horas
-                        penalidade += gap_minutes / 10  # Penalidade proporcional
-                elif fim_novo < inicio_existente:
-                    gap_minutes = (datetime.combine(date.today(), inicio_existente) - 
-                                 datetime.combine(date.today(), fim_novo)).seconds / 60
-                    if 0 < gap_minutes <= 120:
-                        penalidade += gap_minutes / 10
-            
-            # Verificar janelas com aulas da turma (penalidade menor)
-            for aula in aulas_turma_dia:
-                inicio_existente = datetime.strptime(aula['horario_inicio'], '%H:%M').time()
-                fim_existente = datetime.strptime(aula['horario_fim'], '%H:%M').time()
-                
-                if fim_existente < inicio_novo:
-                    gap_minutes = (datetime.combine(date.today(), inicio_novo) - 
-                                 datetime.combine(date.today(), fim_existente)).seconds / 60
-                    if 0 < gap_minutes <= 120:
-                        penalidade += gap_minutes / 20  # Penalidade menor para turma
-                elif fim_novo < inicio_existente:
-                    gap_minutes = (datetime.combine(date.today(), inicio_existente) - 
-                                 datetime.combine(date.today(), fim_novo)).seconds / 60
-                    if 0 < gap_minutes <= 120:
-                        penalidade += gap_minutes / 20
-        
-        except:
-            pass  # Em caso de erro, não aplicar penalidade
-        
-        return penalidade
+    def _janelas_da_turma(self, turma: int, tamanho: int) -> List[Tuple]:
+        """Janelas (dia, turno, slots) de `tamanho` aulas seguidas nos turnos da turma, em minutos."""
+        chave = (turma, tamanho)
+        if chave not in self._janelas_turma:
+            turnos = self._get_turnos_permitidos(self._quadro_base.catalogo.objeto('turma', turma))
+            self._janelas_turma[chave] = [
+                (dia, codigo_turno(turno), janela)
+                for dia, _ in self.DIAS_SEMANA
+                for turno in turnos
+                for janela in self.JANELAS[turno].get(tamanho, ())
+            ]
+        return self._janelas_turma[chave]
     
     def _gerar_slots_possiveis(self, turma: Turma) -> List[Tuple]:
         """Gera todos os slots possíveis baseado no turno da turma."""
@@ -516,167 +680,29 @@ class GeradorHorariosRobusto:
         else:  # flexivel
             return ['manha', 'tarde', 'noite']
     
-    def _slot_valido(
-        self,
-        professor: Professor,
-        turma: Turma,
-        disciplina: Disciplina,
-        dia: int,
-        turno: str,
-        horario_inicio: str,
-        horario_fim: str,
-        aulas_alocadas: List[Dict],
-        respeitar_preferencias: bool,
-        evitar_janelas: bool,
-        flexibilidade: float
-    ) -> bool:
-        """
-        Verifica se um slot é válido para o professor, turma e configurações.
-        """
-        # Verificar disponibilidade do professor
-        if respeitar_preferencias:
-            if not self._professor_disponivel(professor, dia, turno, disciplina):
-                return False
-        
-        # Verificar conflitos com aulas já alocadas
-        for aula_alocada in aulas_alocadas:
-            # Conflito de professor
-            if (aula_alocada['professor'] == professor and 
-                aula_alocada['dia'] == dia and
-                self._horarios_sobrepoem(
-                    aula_alocada['horario_inicio'], aula_alocada['horario_fim'],
-                    horario_inicio, horario_fim
-                )):
-                return False
-            
-            # Conflito de turma
-            if (aula_alocada['turma'] == turma and 
-                aula_alocada['dia'] == dia and
-                self._horarios_sobrepoem(
-                    aula_alocada['horario_inicio'], aula_alocada['horario_fim'],
-                    horario_inicio, horario_fim
-                )):
-                return False
+    def _salvar_horarios(self, quadro: QuadroCompacto) -> None:
+        """Salva no banco de dados as aulas geradas do quadro."""
+        catalogo = quadro.catalogo
         
-        return True
-    
-    def _professor_disponivel(
-        self, 
-        professor: Professor, 
-        dia: int, 
-        turno: str, 
-        disciplina: Disciplina
-    ) -> bool:
-        """
-        Verifica se o professor está disponível no dia/turno específico.
-        """
-        # Verificar bloqueios temporários
-        hoje = date.today()
-        bloqueios = BloqueioTemporario.objects.filter(
-            professor=professor,
-            ativo=True,
-            data_inicio__lte=hoje,
-            data_fim__gte=hoje
-        )
-        
-        for bloqueio in bloqueios:
-            if bloqueio.turno is None or bloqueio.turno == turno:
-                if bloqueio.recorrente:
-                    # Verificar se o dia da semana coincide
-                    if dia == hoje.weekday():  # Simplificado
-                        return False
-                else:
-                    return False
-        
-        # Verificar preferências - LÓGICA CORRIGIDA
-        preferencias = PreferenciaProfessor.objects.filter(
-            professor=professor,
-            dia_semana=dia
-        )
-        
-        # Se há preferências específicas para este dia, verificar disponibilidade
-        if preferencias.exists():
-            for pref in preferencias:
-                # Se o turno não está especificado na preferência (None ou string vazia), se aplica a todos os turnos
-                # Se o turno está especificado, só se aplica a esse turno
-                if pref.turno is None or pref.turno == '' or pref.turno == turno:
-                    # Se a disciplina não está especificada, se aplica a todas as disciplinas
-                    # Se a disciplina está especificada, só se aplica a essa disciplina
-                    if pref.disciplina is None or pref.disciplina == disciplina:
-                        if not pref.disponivel:  # Se marcado como INDISPONÍVEL
-                            return False
-        
-        # Se não há preferências específicas OU todas as preferências permitiram, assume disponível
-        return True
-    
-    def _horarios_sobrepoem(self, inicio1: str, fim1: str, inicio2: str, fim2: str) -> bool:
-        """Verifica se dois horários se sobrepõem."""
-        try:
-            h1_inicio = datetime.strptime(inicio1, '%H:%M').time()
-            h1_fim = datetime.strptime(fim1, '%H:%M').time()
-            h2_inicio = datetime.strptime(inicio2, '%H:%M').time()
-            h2_fim = datetime.strptime(fim2, '%H:%M').time()
-            
-            return not (h1_fim <= h2_inicio or h2_fim <= h1_inicio)
-        except:
-            return True  # Em caso de erro, assume sobreposição
-    
-    def _encontrar_sala_disponivel(
-        self,
-        turma: Turma,
-        dia: int,
-        horario_inicio: str,
-        horario_fim: str,
-        aulas_alocadas: List[Dict]
-    ) -> Optional[Sala]:
-        """
-        Encontra uma sala disponível para o horário.
-        """
-        salas = Sala.objects.filter(ativa=True).order_by('capacidade')
-        
-        for sala in salas:
-            # Verificar capacidade
-            capacidade_turma = getattr(turma, 'numero_alunos', None) or getattr(turma, 'capacidade', 30)
-            if sala.capacidade < capacidade_turma:
-                continue
-            
-            # Verificar disponibilidade
-            sala_ocupada = False
-            for aula_alocada in aulas_alocadas:
-                if (aula_alocada['sala'] == sala and 
-                    aula_alocada['dia'] == dia and
-                    self._horarios_sobrepoem(
-                        aula_alocada['horario_inicio'], aula_alocada['horario_fim'],
-                        horario_inicio, horario_fim
-                    )):
-                    sala_ocupada = True
-                    break
-            
-            if not sala_ocupada:
-                return sala
-        
-        return None
-    
-    def _salvar_horarios(self, aulas_alocadas: List[Dict]) -> None:
-        """Salva os horários no banco de dados."""
-        for aula in aulas_alocadas:
+        for aula in quadro.aulas_livres():
+            professor, dia, inicio, fim, turno, sala = quadro.posicao(aula)
             try:
                 horario = Horario.objects.create(
-                    turma=aula['turma'],
-                    disciplina=aula['disciplina'],
-                    professor=aula['professor'],
-                    sala=aula['sala'],
-                    dia_semana=aula['dia'],
-                    turno=aula['turno'],
-                    horario_inicio=datetime.strptime(aula['horario_inicio'], '%H:%M').time(),
-                    horario_fim=datetime.strptime(aula['horario_fim'], '%H:%M').time(),
+                    turma=catalogo.objeto('turma', quadro.turma[aula]),
+                    disciplina=catalogo.objeto('disciplina', quadro.disciplina[aula]),
+                    professor=catalogo.objeto('professor', professor),
+                    sala=catalogo.objeto('sala', sala),
+                    periodo_letivo=self.periodo,
+                    dia_semana=dia,
+                    turno=TURNOS[turno],
+                    horario_inicio=time(inicio // 60, inicio % 60),
+                    horario_fim=time(fim // 60, fim % 60),
                     ativo=True
                 )
                 self.horarios_criados += 1
             except Exception as e:
                 self.conflitos.append(f"Erro ao salvar horário: {str(e)}")
 
-
 # Mantém compatibilidade com a classe anterior
 GeradorHorarios = GeradorHorariosRobusto
 
@@ -687,7 +713,10 @@ def gerar_horarios_automaticamente(
     respeitar_preferencias=True,
     evitar_janelas=True,
     distribuir_dias=True,
-    limpar_anteriores=False
+    limpar_anteriores=False,
+    como_candidato=False,
+    usuario=None,
+    periodo_letivo=None
 ):
     """
     Função principal para geração de horários (compatibilidade).
@@ -699,5 +728,8 @@ def gerar_horarios_automaticamente(
         evitar_janelas=evitar_janelas,
         distribuir_dias=distribuir_dias,
         limpar_anteriores=limpar_anteriores,
-        max_tentativas=50  # Reduzido para ser mais rápido
+        max_tentativas=50,  # Reduzido para ser mais rápido
+        como_candidato=como_candidato,
+        usuario=usuario,
+        periodo_letivo=periodo_letivo
     )
@@ -0,0 +1,218 @@
+"""
+Alocação de salas para o sistema de horários escolares.
+
+Este módulo separa a escolha de salas da busca de horários: o gerador decide
+apenas professor, dia e horário de cada aula, e as salas são distribuídas por
+emparelhamento bipartido entre aulas e salas em cada slot de tempo.
+"""
+
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+from .models import Sala, Turma
+
+
+class IndiceSalas:
+    """
+    Índice das salas ativas agrupadas por tipo e ordenadas por capacidade.
+
+    Cada tipo de sala mantém um vetor ordenado de capacidades; a busca das
+    salas que comportam uma turma é uma bissecção nesse vetor, sem varrer
+    todas as salas a cada consulta.
+    """
+
+    # Ordem de preferência quando a disciplina aceita qualquer sala
+    ORDEM_TIPOS = [tipo for tipo, _ in Sala.TIPOS_SALA]
+
+    def __init__(self, salas: Iterable[Sala]):
+        # Salas normais primeiro e, dentro do tipo, as menores: laboratórios,
+        # auditórios e salas grandes ficam livres para quem realmente precisa.
+        self.salas: List[Sala] = sorted(
+            salas,
+            key=lambda sala: (self._ordem_tipo(sala.tipo), sala.capacidade)
+        )
+        self.tipos: List[str] = [sala.tipo for sala in self.salas]
+        self.total_por_tipo: Counter = Counter(self.tipos)
+        self._capacidades: Dict[str, List[int]] = defaultdict(list)
+        self._indices: Dict[str, List[int]] = defaultdict(list)
+        self._cache: Dict[Tuple[str, int], List[int]] = {}
+
+        for indice, sala in enumerate(self.salas):
+            self._capacidades[sala.tipo].append(sala.capacidade)
+            self._indices[sala.tipo].append(indice)
+
+    def _ordem_tipo(self, tipo: str) -> int:
+        return self.ORDEM_TIPOS.index(tipo) if tipo in self.ORDEM_TIPOS else len(self.ORDEM_TIPOS)
+
+    def buscar(self, capacidade_minima: int, tipo: str = '') -> List[int]:
+        """
+        Retorna os índices das salas com capacidade suficiente.
+
+        Args:
+            capacidade_minima: Número de alunos que a sala deve comportar
+            tipo: Tipo de sala exigido (vazio = qualquer tipo)
+
+        Returns:
+            list: Índices em self.salas, das salas preferenciais para as demais
+        """
+        chave = (tipo, capacidade_minima)
+        if chave not in self._cache:
+            tipos = [tipo] if tipo else sorted(self._capacidades, key=self._ordem_tipo)
+            resultado = []
+            for tipo_sala in tipos:
+                inicio = bisect_left(self._capacidades[tipo_sala], capacidade_minima)
+                resultado.extend(self._indices[tipo_sala][inicio:])
+            self._cache[chave] = resultado
+        return self._cache[chave]
+
+
+class AlocadorSalas:
+    """
+    Mantém um emparelhamento máximo aulas × salas para cada slot (dia, horário).
+
+    Cada nova aula entra no emparelhamento por caminho aumentante (algoritmo
+    de Kuhn): aulas já posicionadas podem trocar de sala para abrir espaço, de
+    modo que uma aula só é recusada quando nenhuma distribuição de salas do
+    slot comporta todas as aulas. A inviabilidade é detectada na hora, sem
+    depender da ordem em que as aulas foram alocadas.
+
+    Os slots são tratados como chaves opacas; o gerador usa
+    (dia, horario_inicio, horario_fim), que não se sobrepõem entre si.
+    Contadores de vagas por slot (total de salas livres e, por tipo, salas
+    ainda não reservadas por aulas que exigem aquele tipo) descartam de
+    imediato os slots onde a aula certamente não cabe.
+    """
+
+    def __init__(self, salas: Optional[Iterable[Sala]] = None, indice: Optional[IndiceSalas] = None):
+        if indice is None:
+            if salas is None:
+                salas = Sala.objects.filter(ativa=True)
+            indice = IndiceSalas(salas)
+        self.indice = indice
+        self.salas: List[Sala] = indice.salas
+        self._candidatas: Dict[Hashable, List[int]] = {}
+        self._tipo_exigido: Dict[Hashable, str] = {}
+        self._sala_da_aula: Dict[Hashable, Dict[Hashable, int]] = defaultdict(dict)
+        self._aula_da_sala: Dict[Hashable, Dict[int, Hashable]] = defaultdict(dict)
+        vagas_iniciais = Counter(indice.total_por_tipo)
+        vagas_iniciais[''] = len(indice.salas)
+        self._vagas: Dict[Hashable, Counter] = defaultdict(lambda: Counter(vagas_iniciais))
+
+    def salas_compativeis(self, turma: Turma, tipo_sala: str = '') -> List[int]:
+        """Retorna os índices das salas do tipo exigido que comportam a turma."""
+        capacidade_turma = getattr(turma, 'numero_alunos', None) or getattr(turma, 'capacidade', 30)
+        return self.indice.buscar(capacidade_turma, tipo_sala or '')
+
+    def registrar_aula(self, aula_id: Hashable, candidatas: List[int], tipo_sala: str = '') -> None:
+        """Informa as salas candidatas de uma aula antes de alocá-la."""
+        self._candidatas[aula_id] = candidatas
+        self._tipo_exigido[aula_id] = tipo_sala or ''
+
+    def tem_sala_livre(self, slot: Hashable, aula_id: Hashable) -> bool:
+        """
+        Teste rápido (condição necessária) de que a aula pode caber no slot.
+
+        Consulta apenas os contadores do slot, em tempo constante.
+        """
+        vagas = self._vagas[slot]
+        tipo = self._tipo_exigido.get(aula_id, '')
+        return vagas[''] > 0 and (not tipo or vagas[tipo] > 0)
+
+    def pode_alocar(self, slot: Hashable, aula_id: Hashable) -> bool:
+        """Verifica, sem alterar o estado, se a aula cabe no slot."""
+        return self._buscar_caminho(slot, aula_id) is not None
+
+    def alocar(self, slot: Hashable, aula_id: Hashable) -> bool:
+        """
+        Insere a aula no emparelhamento do slot.
+
+        Returns:
+            bool: False se nenhuma redistribuição de salas comporta a aula
+        """
+        caminho = self._buscar_caminho(slot, aula_id)
+        if caminho is None:
+            return False
+
+        sala_da_aula = self._sala_da_aula[slot]
+        aula_da_sala = self._aula_da_sala[slot]
+        for aula, sala in caminho:
+            sala_da_aula[aula] = sala
+            aula_da_sala[sala] = aula
+
+        self._atualizar_vagas(slot, aula_id, -1)
+        return True
+
+    def remover(self, slot: Hashable, aula_id: Hashable) -> None:
+        """Retira a aula do slot, liberando sua sala."""
+        sala = self._sala_da_aula[slot].pop(aula_id, None)
+        if sala is not None:
+            del self._aula_da_sala[slot][sala]
+            self._atualizar_vagas(slot, aula_id, 1)
+
+    def _atualizar_vagas(self, slot: Hashable, aula_id: Hashable, delta: int) -> None:
+        vagas = self._vagas[slot]
+        vagas[''] += delta
+        tipo = self._tipo_exigido.get(aula_id, '')
+        if tipo:
+            vagas[tipo] += delta
+
+    def sala_da_aula(self, slot: Hashable, aula_id: Hashable) -> Optional[Sala]:
+        """Retorna a sala atribuída à aula no slot, se houver."""
+        indice = self._sala_da_aula[slot].get(aula_id)
+        return self.salas[indice] if indice is not None else None
+
+    def indice_sala(self, slot: Hashable, aula_id: Hashable) -> Optional[int]:
+        """Índice (em `salas`) da sala atribuída à aula no slot, se houver."""
+        return self._sala_da_aula[slot].get(aula_id)
+
+    def mover(self, slot: Hashable, aula_id: Hashable, sala: int) -> bool:
+        """
+        Passa a aula para outra sala livre do slot, entre as suas candidatas.
+
+        Returns:
+            bool: False se a sala está ocupada no slot ou não serve para a aula
+        """
+        atual = self._sala_da_aula[slot].get(aula_id)
+        if atual is None or sala in self._aula_da_sala[slot] or sala not in self._candidatas.get(aula_id, ()):
+            return False
+
+        del self._aula_da_sala[slot][atual]
+        self._sala_da_aula[slot][aula_id] = sala
+        self._aula_da_sala[slot][sala] = aula_id
+        return True
+
+    def _buscar_caminho(self, slot: Hashable, aula_id: Hashable) -> Optional[List[Tuple[Hashable, int]]]:
+        """
+        Procura um caminho aumentante a partir da aula.
+
+        Returns:
+            list: Pares (aula, sala) a aplicar, ou None se não há caminho
+        """
+        if not self.tem_sala_livre(slot, aula_id):
+            return None
+
+        aula_da_sala = self._aula_da_sala[slot]
+        candidatas = self._candidatas.get(aula_id, [])
+
+        # Caminho curto: alguma sala candidata ainda está livre
+        for sala in candidatas:
+            if sala not in aula_da_sala:
+                return [(aula_id, sala)]
+
+        visitadas = set()
+
+        def dfs(aula):
+            for sala in self._candidatas.get(aula, []):
+                if sala in visitadas:
+                    continue
+                visitadas.add(sala)
+                ocupante = aula_da_sala.get(sala)
+                if ocupante is None:
+                    return [(aula, sala)]
+                resto = dfs(ocupante)
+                if resto is not None:
+                    return [(aula, sala)] + resto
+            return None
+
+        return dfs(aula_id)
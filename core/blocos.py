@@ -0,0 +1,90 @@
+"""
+Blocos de aulas consecutivas (aulas duplas, triplas...) das disciplinas.
+
+Uma disciplina pode declarar em `padrao_blocos` como suas aulas semanais se
+agrupam, ex: "2+2+1" = duas aulas duplas e uma avulsa. O gerador trata
+cada bloco como uma única variável, posicionada numa janela de slots
+contíguos (o fim de um é o início do seguinte) do mesmo turno, calculada a
+partir de GeradorHorariosRobusto.TURNOS_HORARIOS. Intervalos (ex: 08:40 às
+09:00) separam janelas: um bloco nunca atravessa o recreio.
+"""
+
+from typing import Dict, List, Sequence, Tuple
+
+from .quadro_compacto import minutos
+
+# Janela: slots consecutivos (início, fim), em minutos
+Janela = Tuple[Tuple[int, int], ...]
+
+
+def interpretar_padrao(texto: str) -> List[int]:
+    """
+    '2+2+1' → [2, 2, 1]; texto vazio → [] (aulas avulsas).
+
+    Raises:
+        ValueError: Se alguma parte não for um inteiro positivo
+    """
+    texto = (texto or '').replace(' ', '')
+    if not texto:
+        return []
+    partes = texto.split('+')
+    if not all(parte.isdigit() and int(parte) > 0 for parte in partes):
+        raise ValueError(f"Padrão de blocos inválido: '{texto}' (use, por exemplo, 2+2+1)")
+    return [int(parte) for parte in partes]
+
+
+def blocos_para(padrao: Sequence[int], quantidade: int) -> List[int]:
+    """
+    Tamanhos dos blocos para posicionar `quantidade` aulas.
+
+    Com a carga completa, é o próprio padrão. Quando parte das aulas já
+    está no quadro, usa os maiores blocos do padrão que ainda cabem e
+    completa com aulas avulsas.
+    """
+    if not padrao:
+        return [1] * quantidade
+    if sum(padrao) == quantidade:
+        return list(padrao)
+
+    tamanhos, restante = [], quantidade
+    for tamanho in sorted(padrao, reverse=True):
+        if tamanho <= restante:
+            tamanhos.append(tamanho)
+            restante -= tamanho
+    return tamanhos + [1] * restante
+
+
+def janelas_contiguas(turnos_horarios: Dict[str, List[Tuple[str, str]]]) -> Dict[str, Dict[int, List[Janela]]]:
+    """
+    Janelas de slots contíguos por turno e tamanho.
+
+    Args:
+        turnos_horarios: Turno → [(início, fim)] em HH:MM, em ordem
+
+    Returns:
+        dict: turno → {tamanho: [janela, ...]}; tamanho 1 = cada slot
+    """
+    resultado = {}
+    for turno, horarios in turnos_horarios.items():
+        slots = [(minutos(inicio), minutos(fim)) for inicio, fim in horarios]
+
+        # Trechos sem intervalo entre um slot e o seguinte
+        trechos, atual = [], []
+        for slot in slots:
+            if atual and atual[-1][1] != slot[0]:
+                trechos.append(atual)
+                atual = []
+            atual.append(slot)
+        if atual:
+            trechos.append(atual)
+
+        por_tamanho = {}
+        for trecho in trechos:
+            for tamanho in range(1, len(trecho) + 1):
+                por_tamanho.setdefault(tamanho, []).extend(
+                    tuple(trecho[inicio:inicio + tamanho]) for inicio in range(len(trecho) - tamanho + 1)
+                )
+        for janelas in por_tamanho.values():
+            janelas.sort()
+        resultado[turno] = por_tamanho
+    return resultado
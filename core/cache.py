@@ -0,0 +1,134 @@
+"""
+Cache versionado para o sistema de horários escolares.
+
+Resultados caros (dashboard, relatórios) são guardados sob chaves que
+incluem a versão atual dos dados. Qualquer escrita nos modelos relevantes
+incrementa a versão (ver core/signals.py), tornando as entradas antigas
+inalcançáveis sem precisar apagá-las uma a uma.
+
+As notificações têm versão própria: gravá-las ou marcá-las como lidas não
+invalida grades, ocupação e exportações, só os resultados que as contam.
+
+As versões ficam no cache padrão, que precisa ser compartilhado entre os
+processos (FileBasedCache nas configurações): escritas feitas por comandos
+do manage.py ou por outro worker invalidam o que o servidor web lê.
+"""
+
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.utils import timezone
+
+
+CHAVE_VERSAO_DADOS = 'core:versao_dados'
+CHAVE_VERSAO_NOTIFICACOES = 'core:versao_notificacoes'
+
+# Entradas versionadas expiram mesmo sem mudança de versão, para não
+# ocupar o cache indefinidamente.
+TIMEOUT_VERSIONADO = 60 * 60
+
+
+def _versao(chave):
+    versao = cache.get(chave)
+    if versao is None:
+        cache.add(chave, _versao_inicial(), None)
+        versao = cache.get(chave, 1)
+    return versao
+
+
+def _incrementar(chave):
+    try:
+        return cache.incr(chave)
+    except ValueError:
+        # Chave ausente (cache reiniciado ou expurgado)
+        versao = _versao_inicial()
+        cache.set(chave, versao, None)
+        return versao
+
+
+def _versao_inicial():
+    """
+    Versão para uma chave ausente.
+
+    Crescente no tempo (microssegundos), para não repetir uma versão cujas
+    entradas ainda estejam no cache quando a chave some antes delas.
+    """
+    return time.time_ns() // 1000
+
+
+def get_versao_dados():
+    """Retorna a versão atual dos dados, inicializando-a se necessário."""
+    return _versao(CHAVE_VERSAO_DADOS)
+
+
+def incrementar_versao_dados():
+    """Invalida todos os resultados versionados incrementando a versão."""
+    return _incrementar(CHAVE_VERSAO_DADOS)
+
+
+def get_versao_notificacoes():
+    """Retorna a versão atual das notificações."""
+    return _versao(CHAVE_VERSAO_NOTIFICACOES)
+
+
+def incrementar_versao_notificacoes():
+    """Invalida os resultados que dependem das notificações."""
+    return _incrementar(CHAVE_VERSAO_NOTIFICACOES)
+
+
+def chave_versionada(prefixo, *partes, versao=None):
+    """
+    Monta uma chave de cache atrelada à versão atual dos dados.
+
+    Args:
+        prefixo: Namespace da chave (ex: 'dashboard')
+        *partes: Componentes adicionais (ids, nomes de método, datas...)
+        versao: Versão já lida pelo chamador (padrão: a atual)
+
+    Returns:
+        str: Chave no formato 'prefixo:v<versao>:parte1:parte2...'
+    """
+    sufixo = ':'.join(str(parte) for parte in partes)
+    if versao is None:
+        versao = get_versao_dados()
+    return f'{prefixo}:v{versao}:{sufixo}'
+
+
+def obter_ou_calcular(chave, calcular, timeout=TIMEOUT_VERSIONADO):
+    """Retorna o valor em cache ou calcula, armazena e retorna."""
+    resultado = cache.get(chave)
+    if resultado is None:
+        resultado = calcular()
+        cache.set(chave, resultado, timeout)
+    return resultado
+
+
+def cache_versionado(prefixo, timeout=TIMEOUT_VERSIONADO, por_data=False, notificacoes=False):
+    """
+    Decorador para métodos cujo resultado depende apenas dos dados do banco.
+
+    A chave inclui o nome do método, o valor de `self.chave_cache()` (se o
+    objeto definir esse método) e os argumentos da chamada.
+
+    Args:
+        prefixo: Namespace da chave
+        timeout: Tempo de vida da entrada em segundos
+        por_data: Incluir a data atual na chave, para resultados que usam
+            janelas relativas a hoje ("últimos 7 dias")
+        notificacoes: Incluir a versão das notificações na chave, para
+            resultados que contam notificações
+    """
+    def decorador(metodo):
+        @wraps(metodo)
+        def wrapper(self, *args, **kwargs):
+            contexto = self.chave_cache() if hasattr(self, 'chave_cache') else ''
+            data = timezone.localdate().isoformat() if por_data else ''
+            versao_notificacoes = f'n{get_versao_notificacoes()}' if notificacoes else ''
+            chave = chave_versionada(
+                prefixo, metodo.__name__, contexto, data, versao_notificacoes,
+                *args, *(f'{nome}={valor}' for nome, valor in sorted(kwargs.items()))
+            )
+            return obter_ou_calcular(chave, lambda: metodo(self, *args, **kwargs), timeout)
+        return wrapper
+    return decorador
@@ -0,0 +1,266 @@
+"""
+Quadros de horários candidatos: gravação, comparação e promoção.
+
+O gerador pode guardar o resultado como HorarioCandidato (QuadroCompacto
+serializado) em vez de gravar em Horario. Vários candidatos do mesmo
+período convivem sem tocar nos horários em uso; qualquer um deles pode ser
+comparado com o quadro atual e promovido numa única transação, depois de
+validado com as mesmas regras da movimentação de horários.
+"""
+
+from datetime import datetime
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .cache import incrementar_versao_dados
+from .eventos import publicar_apos_commit, serializar_horario
+from .models import AuditoriaHorario, Horario, HorarioCandidato
+from .restricoes import ConjuntoRestricoes
+
+
+def criar_candidato(quadro, periodo_letivo, turmas, semente, parametros=None, usuario=None, nome='', avaliacao=None):
+    """
+    Grava o quadro gerado como candidato.
+
+    Args:
+        quadro: QuadroCompacto com todas as aulas posicionadas
+        periodo_letivo: Período para o qual o quadro foi gerado
+        turmas: Turmas geradas (escopo da promoção)
+        semente: Semente usada pelo gerador
+        parametros: Opções da geração, guardadas para referência
+        avaliacao: ConjuntoRestricoes.avaliar do quadro, já calculada pelo
+            gerador (padrão: avaliada aqui com as restrições padrão)
+
+    Returns:
+        HorarioCandidato: Registro criado
+    """
+    if avaliacao is None:
+        restricoes = ConjuntoRestricoes()
+        restricoes.preparar(quadro, periodo_letivo)
+        avaliacao = restricoes.avaliar(quadro)
+
+    pks_turmas = sorted(turma.pk for turma in turmas)
+    escopo = {quadro.catalogo.indice('turma', turma) for turma in turmas}
+
+    return HorarioCandidato.objects.create(
+        nome=nome,
+        periodo_letivo=periodo_letivo,
+        turmas=pks_turmas,
+        semente=semente,
+        pontuacao=-avaliacao['objetivo'],
+        total_aulas=sum(1 for indice in quadro.turma if indice in escopo),
+        dados=quadro.serializar(),
+        parametros=parametros or {},
+        criado_por=usuario,
+    )
+
+
+def _chave(turma_id, disciplina_id, professor_id, sala_id, dia, inicio, fim):
+    return (turma_id, disciplina_id, professor_id, sala_id, dia, inicio, fim)
+
+
+class ComparacaoCandidato:
+    """
+    Diferença entre um candidato e os horários ativos das mesmas turmas.
+
+    Uma aula é a mesma nos dois lados quando coincidem turma, disciplina,
+    professor, sala, dia e horário; as demais aparecem como removidas
+    (só no quadro atual) ou adicionadas (só no candidato).
+    """
+
+    def __init__(self, candidato):
+        self.candidato = candidato
+        self.quadro = candidato.quadro()
+        catalogo = self.quadro.catalogo
+
+        self.atuais = {
+            _chave(
+                horario.turma_id, horario.disciplina_id, horario.professor_id, horario.sala_id,
+                horario.dia_semana, horario.horario_inicio.strftime('%H:%M'), horario.horario_fim.strftime('%H:%M')
+            ): horario
+            for horario in Horario.objects.filter(
+                periodo_letivo=candidato.periodo_letivo,
+                turma_id__in=candidato.turmas,
+                ativo=True
+            ).select_related('turma', 'disciplina', 'professor', 'sala')
+        }
+
+        escopo = set(candidato.turmas)
+        self.propostas = {}
+        for aula, linha in enumerate(self.quadro.linhas(incluir_fixas=True)):
+            if linha['turma_id'] not in escopo:
+                continue
+            chave = _chave(
+                linha['turma_id'], linha['disciplina_id'], linha['professor_id'], linha['sala_id'],
+                linha['dia_semana'], linha['horario_inicio'], linha['horario_fim']
+            )
+            linha.update({
+                'turma': catalogo.objeto('turma', self.quadro.turma[aula]),
+                'disciplina': catalogo.objeto('disciplina', self.quadro.disciplina[aula]),
+                'professor': catalogo.objeto('professor', self.quadro.valor(aula, self.quadro.PROFESSOR)),
+                'sala': catalogo.objeto('sala', self.quadro.valor(aula, self.quadro.SALA)),
+            })
+            self.propostas[chave] = linha
+
+        self.mantidas = [chave for chave in self.propostas if chave in self.atuais]
+        self.removidas = [horario for chave, horario in self.atuais.items() if chave not in self.propostas]
+        self.adicionadas = [linha for chave, linha in self.propostas.items() if chave not in self.atuais]
+
+    @property
+    def resumo(self):
+        return {
+            'mantidas': len(self.mantidas),
+            'removidas': len(self.removidas),
+            'adicionadas': len(self.adicionadas),
+        }
+
+    def por_turma(self):
+        """
+        Linhas lado a lado, agrupadas por turma e ordenadas por dia e horário.
+
+        Returns:
+            list: (turma, linhas), cada linha com 'dia', 'inicio', 'fim',
+                'atual' (Horario ou None), 'proposta' (dict ou None) e 'situacao'
+        """
+        grupos = {}
+        for chave, horario in self.atuais.items():
+            posicao = (horario.dia_semana, chave[5], chave[6])
+            grupos.setdefault(horario.turma, {}).setdefault(posicao, {})['atual'] = horario
+        for chave, linha in self.propostas.items():
+            posicao = (linha['dia_semana'], linha['horario_inicio'], linha['horario_fim'])
+            grupos.setdefault(linha['turma'], {}).setdefault(posicao, {})['proposta'] = linha
+            grupos[linha['turma']][posicao].setdefault('mantida', chave in self.atuais)
+
+        dias = dict(Horario.DIAS_SEMANA)
+        resultado = []
+        for turma in sorted(grupos, key=lambda turma: turma.nome_codigo):
+            linhas = []
+            for (dia, inicio, fim), lados in sorted(grupos[turma].items()):
+                atual, proposta = lados.get('atual'), lados.get('proposta')
+                if atual and proposta:
+                    situacao = 'igual' if lados.get('mantida') else 'alterada'
+                else:
+                    situacao = 'adicionada' if proposta else 'removida'
+                linhas.append({
+                    'dia': dias.get(dia, dia),
+                    'inicio': inicio,
+                    'fim': fim,
+                    'atual': atual,
+                    'proposta': proposta,
+                    'situacao': situacao,
+                })
+            resultado.append((turma, linhas))
+        return resultado
+
+    def conflitos_externos(self):
+        """
+        Choques das aulas adicionadas com horários de turmas fora do candidato.
+
+        Professores e salas podem ter ganho aulas de outras turmas depois
+        que o candidato foi gerado.
+        """
+        if not self.adicionadas:
+            return []
+
+        outros = Horario.objects.filter(
+            periodo_letivo=self.candidato.periodo_letivo,
+            ativo=True,
+            dia_semana__in={linha['dia_semana'] for linha in self.adicionadas}
+        ).exclude(turma_id__in=self.candidato.turmas).select_related('turma', 'disciplina', 'professor', 'sala')
+
+        ocupacao = {}
+        for horario in outros:
+            intervalo = (horario.horario_inicio.strftime('%H:%M'), horario.horario_fim.strftime('%H:%M'), horario)
+            ocupacao.setdefault(('professor', horario.professor_id, horario.dia_semana), []).append(intervalo)
+            ocupacao.setdefault(('sala', horario.sala_id, horario.dia_semana), []).append(intervalo)
+
+        conflitos = []
+        for linha in self.adicionadas:
+            for recurso in ('professor', 'sala'):
+                chave = (recurso, linha[f'{recurso}_id'], linha['dia_semana'])
+                for inicio, fim, horario in ocupacao.get(chave, []):
+                    if linha['horario_inicio'] < fim and linha['horario_fim'] > inicio:
+                        conflitos.append(
+                            f"{linha['turma'].nome_codigo} - {linha['disciplina'].nome}: "
+                            f"{'professor já ocupado' if recurso == 'professor' else 'sala já ocupada'} por {horario}"
+                        )
+        return conflitos
+
+
+def promover_candidato(candidato, usuario=None):
+    """
+    Aplica o candidato aos horários das suas turmas numa única transação.
+
+    Aulas iguais nos dois lados são mantidas (com id e versão); as demais
+    são removidas ou criadas em lote. Antes de gravar, as aulas criadas são
+    validadas juntas por MovimentacaoHorarios.validar (regras de
+    Horario.clean), contra as mantidas e os horários das demais turmas; o
+    candidato é recusado se alguma falhar.
+
+    Returns:
+        dict: 'sucesso', 'erros' e o resumo da comparação
+    """
+    from .movimentacao import MovimentacaoHorarios
+
+    with transaction.atomic():
+        comparacao = ComparacaoCandidato(candidato)
+
+        agora = timezone.now()
+        auditorias = []
+        for horario in comparacao.removidas:
+            auditorias.append(AuditoriaHorario(
+                acao='deletado',
+                usuario=usuario,
+                dados_anteriores=serializar_horario(horario),
+                observacoes=f"Removido na promoção de {candidato}"
+            ))
+        Horario.objects.filter(pk__in=[horario.pk for horario in comparacao.removidas]).delete()
+
+        novos = [
+            Horario(
+                turma=linha['turma'],
+                disciplina=linha['disciplina'],
+                professor=linha['professor'],
+                sala=linha['sala'],
+                periodo_letivo=candidato.periodo_letivo,
+                dia_semana=linha['dia_semana'],
+                turno=linha['turno'],
+                horario_inicio=datetime.strptime(linha['horario_inicio'], '%H:%M').time(),
+                horario_fim=datetime.strptime(linha['horario_fim'], '%H:%M').time(),
+                ativo=True
+            )
+            for linha in comparacao.adicionadas
+        ]
+        # Com as removidas já apagadas, a validação vê o quadro final
+        erros = MovimentacaoHorarios(usuario=usuario).validar(novos)
+        if erros:
+            transaction.set_rollback(True)
+            return {'sucesso': False, 'erros': erros, **comparacao.resumo}
+
+        try:
+            with transaction.atomic():
+                Horario.objects.bulk_create(novos)
+        except IntegrityError as e:
+            transaction.set_rollback(True)
+            return {'sucesso': False, 'erros': [f"Conflito ao gravar os horários: {e}"], **comparacao.resumo}
+
+        for horario in novos:
+            auditorias.append(AuditoriaHorario(
+                horario=horario,
+                acao='criado',
+                usuario=usuario,
+                dados_novos=serializar_horario(horario),
+                observacoes=f"Criado na promoção de {candidato}"
+            ))
+        AuditoriaHorario.objects.bulk_create(auditorias)
+
+        candidato.promovido_em = agora
+        candidato.save(update_fields=['promovido_em'])
+
+        # bulk_create não dispara sinais: invalidar cache e publicar eventos explicitamente
+        transaction.on_commit(incrementar_versao_dados)
+        for horario in novos:
+            publicar_apos_commit('horario', {'acao': 'criado', 'horario': serializar_horario(horario)})
+
+    return {'sucesso': True, 'erros': [], **comparacao.resumo}
@@ -0,0 +1,151 @@
+"""
+Matriz de carga horária turma × disciplina.
+
+Reúne, com um número fixo de consultas, quantas aulas de cada disciplina
+já estão alocadas para cada turma e quantas a disciplina exige. É a base
+comum do relatório de carga horária do dashboard, da validação de carga
+de um horário e do cálculo das aulas faltantes no gerador.
+"""
+
+from collections import defaultdict
+
+from django.db.models import Count
+
+from .models import Disciplina, Horario, Turma
+
+
+class MatrizCargaHoraria:
+    """
+    Matriz de aulas alocadas por (turma, disciplina).
+
+    Consultas realizadas, independentemente do número de turmas:
+
+    * vínculos turma → disciplina (tabela intermediária do M2M);
+    * disciplinas envolvidas (em lote);
+    * contagem agrupada de horários por (turma_id, disciplina_id).
+
+    Turmas fora da matriz e disciplinas sem vínculo com a turma (horários
+    antigos, vínculo removido depois) são carregadas sob demanda em
+    `situacao`, com uma contagem só da turma.
+    """
+
+    def __init__(self, turmas=None, horarios=None):
+        """
+        Monta a matriz.
+
+        Args:
+            turmas: Turmas consideradas (padrão: turmas ativas)
+            horarios: QuerySet base de horários a contar
+                (padrão: todos os horários ativos)
+        """
+        if turmas is None:
+            turmas = Turma.objects.filter(ativa=True)
+        if horarios is None:
+            horarios = Horario.objects.filter(ativo=True)
+
+        self.turmas = {turma.id: turma for turma in turmas}
+        self._horarios = horarios
+        self._avulsas = {'turma': {}, 'disciplina': {}}
+
+        # Mapa turma → disciplinas pré-carregado a partir da tabela do M2M
+        self.disciplinas_por_turma = defaultdict(list)
+        vinculos = Turma.disciplinas.through.objects.filter(
+            turma_id__in=list(self.turmas)
+        ).values_list('turma_id', 'disciplina_id')
+        for turma_id, disciplina_id in vinculos:
+            self.disciplinas_por_turma[turma_id].append(disciplina_id)
+
+        ids_disciplinas = {
+            disciplina_id
+            for disciplinas in self.disciplinas_por_turma.values()
+            for disciplina_id in disciplinas
+        }
+        self.disciplinas = Disciplina.objects.in_bulk(ids_disciplinas)
+        for disciplinas in self.disciplinas_por_turma.values():
+            disciplinas.sort(key=lambda disciplina_id: self.disciplinas[disciplina_id].nome)
+
+        # Uma única contagem agrupada para todos os pares
+        self._alocadas = {
+            (linha['turma_id'], linha['disciplina_id']): linha['total']
+            for linha in horarios.filter(turma_id__in=list(self.turmas)).values(
+                'turma_id', 'disciplina_id'
+            ).annotate(total=Count('id'))
+        }
+
+    @classmethod
+    def do_periodo(cls, periodo_letivo=None, turmas=None):
+        """Matriz dos horários ativos de um período (todos se None)."""
+        filtro_periodo = {'periodo_letivo': periodo_letivo} if periodo_letivo else {}
+        return cls(turmas=turmas, horarios=Horario.objects.filter(ativo=True, **filtro_periodo))
+
+    def aulas_alocadas(self, turma_id, disciplina_id):
+        """Número de aulas já alocadas da disciplina para a turma."""
+        return self._alocadas.get((turma_id, disciplina_id), 0)
+
+    def carga_necessaria(self, disciplina_id):
+        """Carga horária semanal exigida pela disciplina."""
+        return self._disciplina(disciplina_id).carga_horaria_semanal
+
+    def aulas_faltantes(self, turma_id, disciplina_id):
+        """Aulas que ainda precisam ser alocadas (nunca negativo)."""
+        return max(0, self.carga_necessaria(disciplina_id) - self.aulas_alocadas(turma_id, disciplina_id))
+
+    def situacao(self, turma_id, disciplina_id):
+        """
+        Verifica se a carga horária da disciplina está completa para a turma.
+
+        Returns:
+            tuple: (bool, str) - (está_completa, mensagem)
+        """
+        turma = self._turma(turma_id)
+        disciplina = self._disciplina(disciplina_id)
+        if turma is None:
+            return False, f"Turma {turma_id} não encontrada"
+        if disciplina is None:
+            return False, f"Disciplina {disciplina_id} não encontrada"
+        carga_atual = self.aulas_alocadas(turma_id, disciplina_id)
+        carga_necessaria = disciplina.carga_horaria_semanal
+
+        if carga_atual < carga_necessaria:
+            return False, f"Faltam {carga_necessaria - carga_atual} aulas de {disciplina.nome} para a turma {turma.nome_codigo}"
+        elif carga_atual > carga_necessaria:
+            return False, f"Excesso de {carga_atual - carga_necessaria} aulas de {disciplina.nome} para a turma {turma.nome_codigo}"
+        else:
+            return True, f"Carga horária completa para {disciplina.nome} na turma {turma.nome_codigo}"
+
+    def _turma(self, turma_id):
+        """Turma da matriz ou, fora dela, carregada e contada sob demanda."""
+        if turma_id in self.turmas:
+            return self.turmas[turma_id]
+        avulsas = self._avulsas['turma']
+        if turma_id not in avulsas:
+            avulsas[turma_id] = Turma.objects.filter(pk=turma_id).first()
+            for linha in self._horarios.filter(turma_id=turma_id).values('disciplina_id').annotate(total=Count('id')):
+                self._alocadas[(turma_id, linha['disciplina_id'])] = linha['total']
+        return avulsas[turma_id]
+
+    def _disciplina(self, disciplina_id):
+        """Disciplina vinculada a alguma turma da matriz ou carregada sob demanda."""
+        if disciplina_id in self.disciplinas:
+            return self.disciplinas[disciplina_id]
+        avulsas = self._avulsas['disciplina']
+        if disciplina_id not in avulsas:
+            avulsas[disciplina_id] = Disciplina.objects.filter(pk=disciplina_id).first()
+        return avulsas[disciplina_id]
+
+    def __iter__(self):
+        """
+        Percorre os pares da matriz.
+
+        Yields:
+            tuple: (turma, disciplina, aulas_alocadas, carga_necessaria)
+        """
+        for turma_id, turma in self.turmas.items():
+            for disciplina_id in self.disciplinas_por_turma[turma_id]:
+                disciplina = self.disciplinas[disciplina_id]
+                yield (
+                    turma,
+                    disciplina,
+                    self.aulas_alocadas(turma_id, disciplina_id),
+                    disciplina.carga_horaria_semanal,
+                )
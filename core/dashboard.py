@@ -9,8 +9,11 @@ from django.db.models import Count, Q, Avg, Max, Min
 from django.utils import timezone
 from datetime import datetime, timedelta
 from collections import defaultdict
+from .cache import cache_versionado
+from .carga_horaria import MatrizCargaHoraria
+from .estatisticas import EstatisticasSistema
 from .models import (
-    Horario, Professor, Sala, Turma, Disciplina, 
+    Horario, Professor, Sala, Turma, 
     PeriodoLetivo, EventoAcademico, NotificacaoSistema,
     AuditoriaHorario
 )
@@ -19,6 +22,11 @@ from .models import (
 class DashboardAnalytico:
     """
     Classe responsável por gerar análises e relatórios do dashboard.
+    
+    Os resultados que dependem só do banco ficam em cache sob a versão
+    atual dos dados (ver core/cache.py) e são recalculados apenas após
+    alguma escrita em horários, turmas, disciplinas, professores, salas
+    ou notificações.
     """
     
     def __init__(self, periodo_letivo=None):
@@ -30,6 +38,11 @@ class DashboardAnalytico:
         """
         self.periodo_letivo = periodo_letivo or PeriodoLetivo.get_periodo_ativo()
     
+    def chave_cache(self):
+        """Identifica o período analisado nas chaves de cache."""
+        return f'periodo={self.periodo_letivo.pk if self.periodo_letivo else None}'
+    
+    @cache_versionado('dashboard')
     def get_estatisticas_gerais(self):
         """
         Retorna estatísticas gerais do sistema.
@@ -37,58 +50,26 @@ class DashboardAnalytico:
         Returns:
             dict: Dicionário com estatísticas principais
         """
-        filtro_periodo = {'periodo_letivo': self.periodo_letivo} if self.periodo_letivo else {}
-        
-        total_horarios = Horario.objects.filter(ativo=True, **filtro_periodo).count()
-        total_professores = Professor.objects.filter(ativo=True).count()
-        total_salas = Sala.objects.filter(ativa=True).count()
-        total_turmas = Turma.objects.filter(ativa=True).count()
-        total_disciplinas = Disciplina.objects.filter(ativa=True).count()
-        
-        # Estatísticas de ocupação
-        horarios_manha = Horario.objects.filter(
-            ativo=True, turno='manha', **filtro_periodo
-        ).count()
-        horarios_tarde = Horario.objects.filter(
-            ativo=True, turno='tarde', **filtro_periodo
-        ).count()
-        horarios_noite = Horario.objects.filter(
-            ativo=True, turno='noite', **filtro_periodo
-        ).count()
-        
-        # Notificações não lidas
-        notificacoes_nao_lidas = NotificacaoSistema.objects.filter(
-            lida=False, ativa=True
-        ).count()
-        
-        # Conflitos críticos
-        conflitos_criticos = NotificacaoSistema.objects.filter(
-            tipo='conflito', prioridade='critica', ativa=True
-        ).count()
+        contadores = EstatisticasSistema(self.periodo_letivo).get_contadores()
+        totais = contadores['totais']
         
         return {
             'totais': {
-                'horarios': total_horarios,
-                'professores': total_professores,
-                'salas': total_salas,
-                'turmas': total_turmas,
-                'disciplinas': total_disciplinas,
-            },
-            'distribuicao_turnos': {
-                'manha': horarios_manha,
-                'tarde': horarios_tarde,
-                'noite': horarios_noite,
-            },
-            'alertas': {
-                'notificacoes_nao_lidas': notificacoes_nao_lidas,
-                'conflitos_criticos': conflitos_criticos,
+                'horarios': totais['horarios_ativos'],
+                'professores': totais['professores'],
+                'salas': totais['salas'],
+                'turmas': totais['turmas'],
+                'disciplinas': totais['disciplinas'],
             },
+            'distribuicao_turnos': contadores['distribuicao_turnos'],
+            'alertas': contadores['alertas'],
             'periodo_atual': {
                 'nome': self.periodo_letivo.nome if self.periodo_letivo else 'Nenhum período ativo',
                 'id': self.periodo_letivo.id if self.periodo_letivo else None,
             }
         }
     
+    @cache_versionado('dashboard')
     def get_ocupacao_salas(self):
         """
         Calcula a taxa de ocupação das salas.
@@ -133,6 +114,7 @@ class DashboardAnalytico:
         
         return sorted(salas_ocupacao, key=lambda x: x['taxa_ocupacao'], reverse=True)
     
+    @cache_versionado('dashboard')
     def get_distribuicao_professores(self):
         """
         Analisa a distribuição de carga horária dos professores.
@@ -149,13 +131,16 @@ class DashboardAnalytico:
             total_disciplinas=Count('horarios__disciplina', distinct=True, filter=Q(horarios__ativo=True, **filtro_periodo))
         )
         
+        # Distribuição por turnos de todos os professores em uma única consulta
+        filtro_horarios = {'periodo_letivo': self.periodo_letivo} if self.periodo_letivo else {}
+        turnos_por_professor = defaultdict(dict)
+        for linha in Horario.objects.filter(ativo=True, **filtro_horarios).values(
+            'professor_id', 'turno'
+        ).annotate(total=Count('id')):
+            turnos_por_professor[linha['professor_id']][linha['turno']] = linha['total']
+        
         for professor in professores:
-            # Calcular distribuição por turnos
-            turnos_prof = Horario.objects.filter(
-                professor=professor, ativo=True, **filtro_periodo
-            ).values('turno').annotate(total=Count('id'))
-            
-            turnos_dict = {turno['turno']: turno['total'] for turno in turnos_prof}
+            turnos_dict = turnos_por_professor[professor.id]
             
             # Definir status baseado na carga
             if professor.total_aulas >= 25:
@@ -187,6 +172,7 @@ class DashboardAnalytico:
         
         return sorted(professores_carga, key=lambda x: x['total_aulas'], reverse=True)
     
+    @cache_versionado('dashboard', por_data=True, notificacoes=True)
     def get_conflitos_frequentes(self):
         """
         Analisa os tipos de conflitos mais frequentes.
@@ -283,6 +269,7 @@ class DashboardAnalytico:
             'usuario', 'horario__turma', 'horario__disciplina', 'horario__professor'
         ).order_by('-timestamp')[:limite]
     
+    @cache_versionado('dashboard')
     def get_relatorio_carga_horaria(self):
         """
         Gera relatório de carga horária por turma e disciplina.
@@ -290,54 +277,43 @@ class DashboardAnalytico:
         Returns:
             dict: Relatório detalhado de carga horária
         """
-        filtro_periodo = {'periodo_letivo': self.periodo_letivo} if self.periodo_letivo else {}
+        matriz = MatrizCargaHoraria.do_periodo(self.periodo_letivo)
         
         relatorio = {}
-        turmas = Turma.objects.filter(ativa=True)
-        
-        for turma in turmas:
-            disciplinas_turma = turma.disciplinas.all()
-            turma_dados = {
+        for turma in matriz.turmas.values():
+            relatorio[turma.id] = {
                 'turma': turma,
                 'disciplinas': [],
                 'total_aulas': 0,
                 'status_geral': 'completo'
             }
+        
+        for turma, disciplina, aulas_alocadas, carga_necessaria in matriz:
+            turma_dados = relatorio[turma.id]
+            percentual_completo = (aulas_alocadas / carga_necessaria * 100) if carga_necessaria > 0 else 0
             
-            for disciplina in disciplinas_turma:
-                aulas_alocadas = Horario.objects.filter(
-                    turma=turma,
-                    disciplina=disciplina,
-                    ativo=True,
-                    **filtro_periodo
-                ).count()
-                
-                carga_necessaria = disciplina.carga_horaria_semanal
-                percentual_completo = (aulas_alocadas / carga_necessaria * 100) if carga_necessaria > 0 else 0
-                
-                # Definir status da disciplina
-                if aulas_alocadas == carga_necessaria:
-                    status = 'completo'
-                elif aulas_alocadas > carga_necessaria:
-                    status = 'excesso'
-                else:
-                    status = 'incompleto'
-                    turma_dados['status_geral'] = 'incompleto'
-                
-                turma_dados['disciplinas'].append({
-                    'disciplina': disciplina,
-                    'aulas_alocadas': aulas_alocadas,
-                    'carga_necessaria': carga_necessaria,
-                    'percentual_completo': round(percentual_completo, 1),
-                    'status': status,
-                })
-                
-                turma_dados['total_aulas'] += aulas_alocadas
+            # Definir status da disciplina
+            if aulas_alocadas == carga_necessaria:
+                status = 'completo'
+            elif aulas_alocadas > carga_necessaria:
+                status = 'excesso'
+            else:
+                status = 'incompleto'
+                turma_dados['status_geral'] = 'incompleto'
+            
+            turma_dados['disciplinas'].append({
+                'disciplina': disciplina,
+                'aulas_alocadas': aulas_alocadas,
+                'carga_necessaria': carga_necessaria,
+                'percentual_completo': round(percentual_completo, 1),
+                'status': status,
+            })
             
-            relatorio[turma.id] = turma_dados
+            turma_dados['total_aulas'] += aulas_alocadas
         
         return relatorio
     
+    @cache_versionado('dashboard', por_data=True, notificacoes=True)
     def get_metricas_performance(self):
         """
         Calcula métricas de performance do sistema.
@@ -360,10 +336,10 @@ class DashboardAnalytico:
         ).count()
         
         conflitos_resolvidos = NotificacaoSistema.objects.filter(
-            tipo='conflito',
-            lida=True,
-            data_leitura__date__gte=semana_passada
-        ).count()
+            Q(lida=True, data_leitura__date__gte=semana_passada) |
+            Q(leituras__data_leitura__date__gte=semana_passada),
+            tipo='conflito'
+        ).distinct().count()
         
         # Taxa de utilização geral
         filtro_periodo = {'periodo_letivo': self.periodo_letivo} if self.periodo_letivo else {}
@@ -0,0 +1,155 @@
+"""
+Estatísticas resumidas do sistema de horários escolares.
+
+Serviço compartilhado pela página inicial, pelo dashboard analítico e por
+DashboardAnalytico: os contadores principais e a carga por sala e por
+professor saem de poucas consultas agrupadas (Count com filter=), em vez
+de uma contagem por entidade. A contagem de notificações não lidas é a do
+usuário da requisição (estado de leitura por usuário, ver
+NotificacaoQuerySet).
+"""
+
+from django.db.models import CharField, Count, Q, Value
+
+from .cache import cache_versionado, chave_versionada, get_versao_notificacoes, obter_ou_calcular
+from .models import Disciplina, Horario, NotificacaoSistema, Professor, Sala, Turma
+
+
+# Contadores da página inicial mudam a todo momento; o cache é curto
+# mesmo com a invalidação por versão dos dados.
+TIMEOUT_ESTATISTICAS = 60
+
+
+class EstatisticasSistema:
+    """
+    Contadores e cargas por recurso, opcionalmente restritos a um período letivo.
+    """
+
+    def __init__(self, periodo_letivo=None):
+        """
+        Args:
+            periodo_letivo: PeriodoLetivo cujos horários serão contados
+                (None = todos os horários)
+        """
+        self.periodo_letivo = periodo_letivo
+
+    def chave_cache(self):
+        """Identifica o período analisado nas chaves de cache."""
+        return f'periodo={self.periodo_letivo.pk if self.periodo_letivo else None}'
+
+    def _filtro_horarios(self, prefixo=''):
+        """Filtro Q dos horários considerados, relativo ao modelo consultado."""
+        filtro = Q()
+        if self.periodo_letivo:
+            filtro &= Q(**{f'{prefixo}periodo_letivo': self.periodo_letivo})
+        return filtro
+
+    def get_contadores(self, usuario=None):
+        """
+        Retorna os contadores principais do sistema.
+
+        Args:
+            usuario: Usuário cujas notificações não lidas são contadas
+                (None ou anônimo = só as globais, sem leituras)
+
+        Returns:
+            dict: Totais de cadastros, distribuição por turno (horários
+                ativos) e alertas
+        """
+        contadores = self._contadores()
+        usuario_id = usuario.pk if usuario is not None and usuario.is_authenticated else None
+        chave = chave_versionada(
+            'estatisticas', 'notificacoes_nao_lidas', f'n{get_versao_notificacoes()}', usuario_id
+        )
+        nao_lidas = obter_ou_calcular(
+            chave,
+            lambda: NotificacaoSistema.objects.visiveis(usuario).filter(lida_pelo_usuario=False).count(),
+            TIMEOUT_ESTATISTICAS
+        )
+        contadores['alertas']['notificacoes_nao_lidas'] = nao_lidas
+        return contadores
+
+    @cache_versionado('estatisticas', timeout=TIMEOUT_ESTATISTICAS, notificacoes=True)
+    def _contadores(self):
+        """
+        Contadores que não dependem do usuário, em duas consultas: uma união
+        com o total de cada cadastro ativo e uma agregação condicional sobre
+        os horários.
+        """
+        def contagem(queryset, chave):
+            return queryset.order_by().values(
+                chave=Value(chave, output_field=CharField())
+            ).annotate(total=Count('id')).values_list('chave', 'total')
+
+        consultas = [
+            contagem(Disciplina.objects.filter(ativa=True), 'disciplinas'),
+            contagem(Sala.objects.filter(ativa=True), 'salas'),
+            contagem(Professor.objects.filter(ativo=True), 'professores'),
+            contagem(Turma.objects.filter(ativa=True), 'turmas'),
+            contagem(
+                NotificacaoSistema.objects.filter(tipo='conflito', prioridade='critica', ativa=True),
+                'conflitos_criticos'
+            ),
+        ]
+        totais = dict(consultas[0].union(*consultas[1:], all=True))
+
+        horarios = Horario.objects.filter(self._filtro_horarios()).aggregate(
+            total=Count('id'),
+            ativos=Count('id', filter=Q(ativo=True)),
+            manha=Count('id', filter=Q(ativo=True, turno='manha')),
+            tarde=Count('id', filter=Q(ativo=True, turno='tarde')),
+            noite=Count('id', filter=Q(ativo=True, turno='noite')),
+        )
+
+        return {
+            'totais': {
+                'horarios': horarios['total'],
+                'horarios_ativos': horarios['ativos'],
+                'disciplinas': totais.get('disciplinas', 0),
+                'salas': totais.get('salas', 0),
+                'professores': totais.get('professores', 0),
+                'turmas': totais.get('turmas', 0),
+            },
+            'distribuicao_turnos': {
+                'manha': horarios['manha'],
+                'tarde': horarios['tarde'],
+                'noite': horarios['noite'],
+            },
+            'alertas': {
+                'conflitos_criticos': totais.get('conflitos_criticos', 0),
+            },
+        }
+
+    @cache_versionado('estatisticas', timeout=TIMEOUT_ESTATISTICAS)
+    def get_carga_salas(self, limite=None):
+        """
+        Retorna as salas ativas com o número de horários de cada uma, mais ocupadas primeiro.
+
+        Args:
+            limite: Número máximo de salas (None = todas)
+
+        Returns:
+            list: Salas anotadas com total_horarios
+        """
+        salas = Sala.objects.filter(ativa=True).annotate(
+            total_horarios=Count('horarios', filter=self._filtro_horarios('horarios__'))
+        ).order_by('-total_horarios', 'nome_numero')
+        return list(salas[:limite] if limite else salas)
+
+    @cache_versionado('estatisticas', timeout=TIMEOUT_ESTATISTICAS)
+    def get_carga_professores(self, limite=None):
+        """
+        Retorna os professores ativos com total de aulas e de turmas, mais carregados primeiro.
+
+        Args:
+            limite: Número máximo de professores (None = todos)
+
+        Returns:
+            list: Professores anotados com total_aulas e total_turmas
+        """
+        filtro = self._filtro_horarios('horarios__')
+        professores = Professor.objects.filter(ativo=True).annotate(
+            total_aulas=Count('horarios', filter=filtro),
+            total_turmas=Count('horarios__turma', distinct=True, filter=filtro),
+        ).order_by('-total_aulas', 'nome_completo')
+        return list(professores[:limite] if limite else professores)
@@ -0,0 +1,158 @@
+"""
+Canal de eventos em processo para atualizações ao vivo (Server-Sent Events).
+
+Sinais do Django publicam eventos compactos quando um horário é criado,
+alterado ou removido e quando uma notificação é gerada; cada conexão SSE
+aberta (view `eventos_stream`) tem uma assinatura que recebe esses eventos.
+Não depende de Redis: os eventos só alcançam clientes conectados ao mesmo
+processo.
+
+Sob WSGI cada conexão aberta prende uma thread do servidor até a aba ser
+fechada; por isso só a grade e a página de notificações abrem o canal
+(bloco `canal_eventos` de base.html). As demais páginas consultam o
+contador de notificações periodicamente.
+"""
+
+import asyncio
+import itertools
+import json
+import queue
+import threading
+from collections import deque
+
+from django.db import transaction
+
+
+# Eventos recentes guardados para clientes que reconectam com Last-Event-ID
+TAMANHO_HISTORICO = 200
+
+# Intervalo entre comentários de keep-alive na conexão SSE (segundos)
+INTERVALO_KEEPALIVE = 15
+
+
+class Assinatura:
+    """
+    Fila de eventos de uma conexão.
+
+    Em views assíncronas a fila é um asyncio.Queue ligado ao event loop da
+    conexão; sob WSGI, um queue.Queue comum consumido por um gerador síncrono.
+    """
+
+    def __init__(self, loop=None):
+        self.loop = loop
+        self.fila = asyncio.Queue() if loop else queue.Queue()
+
+    def entregar(self, evento):
+        """Enfileira o evento; pode ser chamado de qualquer thread."""
+        if self.loop:
+            self.loop.call_soon_threadsafe(self.fila.put_nowait, evento)
+        else:
+            self.fila.put_nowait(evento)
+
+    async def aguardar(self, timeout):
+        """Próximo evento da fila assíncrona, ou None após o timeout."""
+        try:
+            return await asyncio.wait_for(self.fila.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def aguardar_sync(self, timeout):
+        """Próximo evento da fila síncrona, ou None após o timeout."""
+        try:
+            return self.fila.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class CanalEventos:
+    """Publicação/assinatura em memória, segura entre threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._assinaturas = set()
+        self._historico = deque(maxlen=TAMANHO_HISTORICO)
+        self._contador = itertools.count(1)
+
+    def assinar(self, loop=None, ultimo_id=None):
+        """
+        Cria uma assinatura.
+
+        Args:
+            loop: Event loop da conexão (None para consumo síncrono)
+            ultimo_id: Último evento recebido pelo cliente; os posteriores
+                ainda no histórico são reenviados
+
+        Returns:
+            Assinatura: Fila que passa a receber os eventos publicados
+        """
+        assinatura = Assinatura(loop)
+        with self._lock:
+            if ultimo_id is not None:
+                for evento in self._historico:
+                    if evento['id'] > ultimo_id:
+                        assinatura.fila.put_nowait(evento)
+            self._assinaturas.add(assinatura)
+        return assinatura
+
+    def cancelar(self, assinatura):
+        """Remove a assinatura (conexão encerrada)."""
+        with self._lock:
+            self._assinaturas.discard(assinatura)
+
+    def publicar(self, tipo, dados):
+        """
+        Publica um evento para todas as assinaturas.
+
+        Args:
+            tipo: Nome do evento SSE ('horario', 'notificacao')
+            dados: Conteúdo serializável em JSON
+        """
+        with self._lock:
+            evento = {'id': next(self._contador), 'tipo': tipo, 'dados': dados}
+            self._historico.append(evento)
+            assinaturas = list(self._assinaturas)
+        for assinatura in assinaturas:
+            assinatura.entregar(evento)
+        return evento
+
+
+canal = CanalEventos()
+
+
+def publicar_apos_commit(tipo, dados):
+    """Publica o evento só depois que a transação atual for confirmada."""
+    transaction.on_commit(lambda: canal.publicar(tipo, dados))
+
+
+def formatar_sse(evento):
+    """Serializa um evento no formato text/event-stream."""
+    return (
+        f"id: {evento['id']}\n"
+        f"event: {evento['tipo']}\n"
+        f"data: {json.dumps(evento['dados'], ensure_ascii=False)}\n\n"
+    )
+
+
+def serializar_horario(horario):
+    """Representação compacta de um horário, a mesma usada pela grade."""
+    return {
+        'id': horario.id,
+        'dia_semana': horario.dia_semana,
+        'horario_inicio': horario.horario_inicio.strftime('%H:%M'),
+        'horario_fim': horario.horario_fim.strftime('%H:%M'),
+        'professor': {
+            'id': horario.professor.id,
+            'nome': horario.professor.nome_completo
+        },
+        'disciplina': horario.disciplina.nome,
+        'turma': {
+            'id': horario.turma.id,
+            'codigo': horario.turma.nome_codigo
+        },
+        'sala': {
+            'id': horario.sala.id,
+            'numero': horario.sala.nome_numero
+        },
+        'periodo_letivo_id': horario.periodo_letivo_id,
+        'versao': horario.versao
+    }
@@ -0,0 +1,279 @@
+"""
+Explicação de inviabilidade por conjuntos mínimos de restrições conflitantes.
+
+Quando o quadro não pode ser completado, dizer apenas que as tentativas
+se esgotaram não ajuda a corrigir os dados. Aqui as restrições que a
+equipe pode ajustar (turno de cada turma, tipo de sala exigido, capacidade
+das salas, bloqueios, eventos acadêmicos, horários já existentes e
+preferências de indisponibilidade) são levantadas uma a uma, e o procedimento QuickXplain
+(Junker, 2004) extrai um subconjunto mínimo delas que, junto com a carga
+horária das turmas, já torna a instância inviável: relaxar qualquer uma
+das restrições do conjunto desfaz aquele conflito.
+
+O teste de consistência é a AnaliseViabilidade sobre o modelo em memória,
+que leva milissegundos; a busca inteira faz poucas dezenas de testes.
+"""
+
+import copy
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+from .alocacao_salas import IndiceSalas
+from .models import BloqueioTemporario, Horario, PeriodoLetivo, PreferenciaProfessor, Sala
+from .viabilidade import AnaliseViabilidade
+
+
+class Restricao:
+    """Restrição relaxável do modelo em memória."""
+
+    # Ordem de importância: QuickXplain prefere conflitos formados pelas
+    # primeiras, deixando de fora as mais fáceis de ajustar.
+    TIPOS = ['capacidade', 'tipo_sala', 'turno', 'evento', 'bloqueio', 'fixa', 'preferencia']
+
+    def __init__(self, tipo: str, objeto_id: Hashable, descricao: str):
+        self.tipo = tipo
+        self.objeto_id = objeto_id
+        self.descricao = descricao
+
+    @property
+    def chave(self) -> Tuple[str, Hashable]:
+        return (self.tipo, self.objeto_id)
+
+    def __repr__(self):
+        return f"Restricao({self.tipo!r}, {self.objeto_id!r})"
+
+
+class ExplicadorInviabilidade:
+    """
+    Procura conjuntos mínimos de restrições conflitantes para as aulas do gerador.
+
+    Uso:
+        explicador = ExplicadorInviabilidade(aulas, slots_por_turma, todos_slots, aulas_fixas, salas)
+        for conflito in explicador.explicar():
+            print([restricao.descricao for restricao in conflito['restricoes']])
+    """
+
+    def __init__(
+        self,
+        aulas: List[Dict],
+        slots_por_turma: Dict[Hashable, List[Tuple]],
+        todos_slots: List[Tuple],
+        aulas_fixas: Iterable[Dict],
+        salas: Iterable[Sala],
+        respeitar_preferencias: bool = True,
+        periodo_letivo: Optional[PeriodoLetivo] = None
+    ):
+        """
+        Args:
+            aulas: Aulas a alocar (formato de GeradorHorariosRobusto._preparar_aulas)
+            slots_por_turma: pk da turma → slots (dia, turno, início, fim) do seu turno
+            todos_slots: Slots da grade inteira, usados quando o turno é relaxado
+            aulas_fixas: Horários já existentes, no formato das aulas do gerador
+            salas: Salas ativas
+            respeitar_preferencias: Se preferências, bloqueios e eventos entram no modelo
+            periodo_letivo: Período cujos bloqueios e eventos semanais contam
+        """
+        self.aulas = aulas
+        self.slots_por_turma = slots_por_turma
+        self.todos_slots = todos_slots
+        self.aulas_fixas = list(aulas_fixas)
+        self.salas = list(salas)
+        self.periodo_letivo = periodo_letivo
+
+        self.turmas = {aula['turma'].pk: aula['turma'] for aula in aulas}
+        self.disciplinas = {aula['disciplina'].pk: aula['disciplina'] for aula in aulas}
+        self.professores = {
+            professor.pk: professor
+            for aula in aulas
+            for professor in aula['professores_possiveis']
+        }
+
+        # Chave da restrição → (pk do professor, entradas de indisponibilidade)
+        self._indisponibilidades = {}
+        # Versões relaxadas de salas e disciplinas
+        self._salas_sem_limite = {}
+        self._disciplinas_sem_tipo = {}
+
+        self.restricoes = self._levantar_restricoes(respeitar_preferencias)
+        self.testes = 0
+        self._resultados = {}
+
+    def _levantar_restricoes(self, respeitar_preferencias: bool) -> List[Restricao]:
+        """Lista as restrições que de fato afetam as aulas, na ordem de Restricao.TIPOS."""
+        restricoes = []
+        maior_turma = max(turma.numero_alunos for turma in self.turmas.values())
+
+        for sala in self.salas:
+            if sala.capacidade < maior_turma:
+                sem_limite = copy.copy(sala)
+                sem_limite.capacidade = maior_turma
+                self._salas_sem_limite[sala.pk] = sem_limite
+                restricoes.append(Restricao(
+                    'capacidade', sala.pk,
+                    f"Sala {sala.nome_numero} comporta apenas {sala.capacidade} alunos"
+                ))
+
+        for disciplina in self.disciplinas.values():
+            if disciplina.tipo_sala:
+                sem_tipo = copy.copy(disciplina)
+                sem_tipo.tipo_sala = ''
+                self._disciplinas_sem_tipo[disciplina.pk] = sem_tipo
+                restricoes.append(Restricao(
+                    'tipo_sala', disciplina.pk,
+                    f"{disciplina.nome} exige sala do tipo {disciplina.get_tipo_sala_display()}"
+                ))
+
+        for turma_id, turma in self.turmas.items():
+            if len(self.slots_por_turma[turma_id]) < len(self.todos_slots):
+                restricoes.append(Restricao(
+                    'turno', turma_id,
+                    f"Turma {turma.nome_codigo} tem aulas apenas no turno {turma.get_turno_turma_display()}"
+                ))
+
+        if respeitar_preferencias:
+            restricoes.extend(self._restricoes_bloqueios())
+
+        nomes_dias = dict(Horario.DIAS_SEMANA)
+        for aula in self.aulas_fixas:
+            restricoes.append(Restricao(
+                'fixa', aula['id'][1],
+                f"Horário já existente: {aula['disciplina'].nome} - {aula['turma'].nome_codigo} com "
+                f"{aula['professor'].nome_completo}, {nomes_dias.get(aula['dia'], aula['dia'])} "
+                f"{aula['horario_inicio']}-{aula['horario_fim']}"
+            ))
+
+        if respeitar_preferencias:
+            restricoes.extend(self._restricoes_preferencias())
+
+        return restricoes
+
+    def _restricoes_bloqueios(self) -> List[Restricao]:
+        """Eventos e bloqueios que valem em todas as semanas do período, com a mesma regra do gerador."""
+        # Import local: core.ocupacao depende do gerador, que importa este módulo
+        from .ocupacao import DisponibilidadePeriodo
+
+        restricoes = []
+        disponibilidade = DisponibilidadePeriodo.do_periodo(self.periodo_letivo)
+
+        for pk, (descricao, entradas) in disponibilidade.eventos_semanais.items():
+            restricao = Restricao('evento', pk, f"Evento: {descricao}")
+            # Sem professor: o evento vale para todos (ver _analise)
+            self._indisponibilidades[restricao.chave] = (
+                None, [(dia, turno, None) for dia, turno in entradas]
+            )
+            restricoes.append(restricao)
+
+        semanais = {
+            pk: entradas for pk, (professor_id, entradas) in disponibilidade.bloqueios_semanais.items()
+            if professor_id in self.professores
+        }
+        bloqueios = BloqueioTemporario.objects.filter(pk__in=list(semanais)).select_related('professor')
+        for bloqueio in bloqueios:
+            restricao = Restricao('bloqueio', bloqueio.pk, f"Bloqueio: {bloqueio}")
+            self._indisponibilidades[restricao.chave] = (
+                bloqueio.professor_id, [(dia, turno, None) for dia, turno in semanais[bloqueio.pk]]
+            )
+            restricoes.append(restricao)
+        return restricoes
+
+    def _restricoes_preferencias(self) -> List[Restricao]:
+        """Preferências de indisponibilidade em dias letivos dos professores envolvidos."""
+        restricoes = []
+        preferencias = PreferenciaProfessor.objects.filter(
+            professor_id__in=list(self.professores),
+            disponivel=False,
+            dia_semana__in=[dia for dia, _, _, _ in self.todos_slots]
+        ).select_related('professor', 'disciplina')
+
+        for preferencia in preferencias:
+            restricao = Restricao('preferencia', preferencia.pk, f"Preferência: {preferencia}")
+            self._indisponibilidades[restricao.chave] = (
+                preferencia.professor_id,
+                [(preferencia.dia_semana, preferencia.turno or None, preferencia.disciplina_id)]
+            )
+            restricoes.append(restricao)
+        return restricoes
+
+    def _analise(self, ativas: Iterable[Restricao]) -> AnaliseViabilidade:
+        """AnaliseViabilidade do modelo com apenas as restrições `ativas`."""
+        chaves = {restricao.chave for restricao in ativas}
+
+        slots_por_turma = {
+            turma_id: slots if ('turno', turma_id) in chaves else self.todos_slots
+            for turma_id, slots in self.slots_por_turma.items()
+        }
+        aulas_fixas = [aula for aula in self.aulas_fixas if ('fixa', aula['id'][1]) in chaves]
+        salas = [
+            sala if ('capacidade', sala.pk) in chaves else self._salas_sem_limite.get(sala.pk, sala)
+            for sala in self.salas
+        ]
+
+        relaxadas = {pk for pk in self._disciplinas_sem_tipo if ('tipo_sala', pk) not in chaves}
+        aulas = [
+            dict(aula, disciplina=self._disciplinas_sem_tipo[aula['disciplina'].pk])
+            if aula['disciplina'].pk in relaxadas else aula
+            for aula in self.aulas
+        ]
+
+        indisponibilidade = {}
+        for chave, (professor_id, entradas) in self._indisponibilidades.items():
+            if chave in chaves:
+                for professor in ([professor_id] if professor_id is not None else self.professores):
+                    indisponibilidade.setdefault(professor, []).extend(entradas)
+
+        return AnaliseViabilidade(aulas, slots_por_turma, aulas_fixas, IndiceSalas(salas), indisponibilidade)
+
+    def _consistente(self, ativas: List[Restricao]) -> bool:
+        chave = frozenset(restricao.chave for restricao in ativas)
+        if chave not in self._resultados:
+            self.testes += 1
+            self._resultados[chave] = not self._analise(ativas).verificar()
+        return self._resultados[chave]
+
+    def _quickxplain(self, base: List[Restricao], acrescimo: bool, restricoes: List[Restricao]) -> List[Restricao]:
+        """
+        Núcleo recursivo do QuickXplain.
+
+        Args:
+            base: Restrições já mantidas
+            acrescimo: Se a base ganhou restrições desde a última chamada
+            restricoes: Restrições entre as quais o conflito é procurado
+
+        Returns:
+            list: Subconjunto mínimo de `restricoes` inconsistente junto com `base`
+        """
+        if acrescimo and not self._consistente(base):
+            return []
+        if len(restricoes) == 1:
+            return list(restricoes)
+
+        meio = len(restricoes) // 2
+        primeiras, ultimas = restricoes[:meio], restricoes[meio:]
+        conflito_ultimas = self._quickxplain(base + primeiras, bool(primeiras), ultimas)
+        conflito_primeiras = self._quickxplain(base + conflito_ultimas, bool(conflito_ultimas), primeiras)
+        return conflito_primeiras + conflito_ultimas
+
+    def explicar(self, max_conflitos: int = 3) -> List[Dict]:
+        """
+        Extrai até `max_conflitos` conflitos mínimos disjuntos.
+
+        Depois de cada conflito, suas restrições saem do modelo e a busca
+        recomeça com as demais, de modo que conflitos independentes também
+        aparecem.
+
+        Returns:
+            list: Dicionários com 'restricoes' (conflito mínimo) e 'motivos'
+                (limites violados quando só essas restrições estão ativas).
+                Lista com um conflito vazio quando a carga horária sozinha
+                já é inviável; vazia quando nenhum conflito foi detectado.
+        """
+        if not self._consistente([]):
+            return [{'restricoes': [], 'motivos': self._analise([]).verificar()}]
+
+        conflitos = []
+        restantes = list(self.restricoes)
+        while len(conflitos) < max_conflitos and not self._consistente(restantes):
+            conflito = self._quickxplain([], False, restantes)
+            conflitos.append({'restricoes': conflito, 'motivos': self._analise(conflito).verificar()})
+            restantes = [restricao for restricao in restantes if restricao not in conflito]
+
+        return conflitos
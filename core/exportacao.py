@@ -0,0 +1,379 @@
+"""
+Exportação dos horários de todas as turmas, professores e salas.
+
+Cada recurso com aulas no período gera um artefato por formato:
+    ics   iCalendar com um evento semanal por aula (RRULE limitada às
+          datas do PeriodoLetivo e EXDATE nas datas em que a aula não
+          acontece, segundo a DisponibilidadePeriodo)
+    csv   uma linha por aula
+    xlsx  idem, em planilha (requer o pacote opcional openpyxl)
+
+Os horários do período são lidos em uma consulta e convertidos em dados
+simples; os artefatos que faltam são gerados em um pool de processos (sem
+acesso ao banco) e gravados em disco, em EXPORTACAO_DIR/<período>/v<versão
+dos dados>, com o nome dado pelo resumo (hash) do conteúdo. Artefatos que
+não mudaram de uma versão para a seguinte são reaproveitados por link. A
+lista de artefatos de cada versão fica no cache: enquanto nada muda,
+exportar tudo de novo só lê arquivos prontos. O zip é montado e enviado em
+partes, arquivo a arquivo.
+
+A limpeza só remove pastas de versões anteriores, e mantém a mais recente
+delas: uma exportação iniciada antes da última alteração pode ainda estar
+sendo enviada.
+"""
+
+import csv
+import hashlib
+import io
+import json
+import os
+import shutil
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .cache import chave_versionada, get_versao_dados, obter_ou_calcular
+from .models import Horario
+from .ocupacao import DisponibilidadePeriodo
+
+FORMATOS = ('ics', 'csv', 'xlsx')
+
+# Recurso → (pasta no zip, atributo do horário)
+RECURSOS = {
+    'turma': ('turmas', 'turma'),
+    'professor': ('professores', 'professor'),
+    'sala': ('salas', 'sala'),
+}
+
+COLUNAS_CSV = ['dia', 'inicio', 'fim', 'turno', 'disciplina', 'turma', 'professor', 'sala']
+
+# Abaixo deste número de artefatos a gerar, o pool custa mais do que economiza
+MINIMO_PARA_POOL = 20
+
+
+class ExportacaoError(Exception):
+    """Formato não suportado ou dependência opcional ausente."""
+
+
+def _diretorio_exportacao() -> Path:
+    return Path(getattr(settings, 'EXPORTACAO_DIR', Path(settings.BASE_DIR) / 'exportacoes'))
+
+
+# Geração dos artefatos (roda nos processos do pool: só dados simples, sem banco)
+
+def _escapar_ics(texto: str) -> str:
+    return texto.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def _dobrar_linha_ics(linha: str) -> str:
+    """Quebra linhas com mais de 75 octetos (RFC 5545, 3.1)."""
+    partes = []
+    atual = ''
+    for caractere in linha:
+        if len((atual + caractere).encode('utf-8')) > (75 if not partes else 74):
+            partes.append(atual)
+            atual = ''
+        atual += caractere
+    partes.append(atual)
+    return '\r\n '.join(partes)
+
+
+def _conteudo_ics(titulo: str, periodo: Dict, aulas: List[Dict]) -> bytes:
+    linhas = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Horarios Escolares//Exportacao//PT',
+        'CALSCALE:GREGORIAN',
+        f'X-WR-CALNAME:{_escapar_ics(titulo)}',
+    ]
+    for aula in aulas:
+        inicio, fim = aula['inicio'].replace(':', ''), aula['fim'].replace(':', '')
+        linhas += [
+            'BEGIN:VEVENT',
+            f"UID:horario-{aula['id']}-{periodo['id']}@horarios-escolares",
+            f"DTSTAMP:{periodo['gerado_em']}",
+            f"DTSTART:{aula['primeira_data']}T{inicio}00",
+            f"DTEND:{aula['primeira_data']}T{fim}00",
+        ]
+        if periodo['fim']:
+            linhas.append(f"RRULE:FREQ=WEEKLY;UNTIL={periodo['fim']}T235959")
+        else:
+            linhas.append('RRULE:FREQ=WEEKLY')
+        if aula['excecoes']:
+            linhas.append('EXDATE:' + ','.join(f'{data}T{inicio}00' for data in aula['excecoes']))
+        linhas += [
+            f"SUMMARY:{_escapar_ics(aula['disciplina'] + ' - ' + aula['turma'])}",
+            f"LOCATION:{_escapar_ics(aula['sala'])}",
+            f"DESCRIPTION:{_escapar_ics('Professor: ' + aula['professor'])}",
+            'END:VEVENT',
+        ]
+    linhas.append('END:VCALENDAR')
+    return ('\r\n'.join(_dobrar_linha_ics(linha) for linha in linhas) + '\r\n').encode('utf-8')
+
+
+def _conteudo_csv(aulas: List[Dict]) -> bytes:
+    saida = io.StringIO()
+    escritor = csv.writer(saida)
+    escritor.writerow(COLUNAS_CSV)
+    for aula in aulas:
+        escritor.writerow([aula['dia_nome'] if coluna == 'dia' else aula[coluna] for coluna in COLUNAS_CSV])
+    return saida.getvalue().encode('utf-8-sig')
+
+
+def _conteudo_xlsx(titulo: str, aulas: List[Dict]) -> bytes:
+    from openpyxl import Workbook
+
+    pasta = Workbook(write_only=True)
+    planilha = pasta.create_sheet(title=titulo[:31])
+    planilha.append(COLUNAS_CSV)
+    for aula in aulas:
+        planilha.append([aula['dia_nome'] if coluna == 'dia' else aula[coluna] for coluna in COLUNAS_CSV])
+    saida = io.BytesIO()
+    pasta.save(saida)
+    return saida.getvalue()
+
+
+def gerar_artefato(caminho: str, formato: str, titulo: str, periodo: Dict, aulas: List[Dict]) -> str:
+    """Grava um artefato (escrita atômica: arquivo temporário + rename)."""
+    if formato == 'ics':
+        conteudo = _conteudo_ics(titulo, periodo, aulas)
+    elif formato == 'csv':
+        conteudo = _conteudo_csv(aulas)
+    else:
+        conteudo = _conteudo_xlsx(titulo, aulas)
+
+    temporario = f'{caminho}.{os.getpid()}.tmp'
+    with open(temporario, 'wb') as arquivo:
+        arquivo.write(conteudo)
+    os.replace(temporario, caminho)
+    return caminho
+
+
+# Montagem no processo principal
+
+class ExportacaoHorarios:
+    """
+    Artefatos de exportação dos horários de um período letivo.
+
+    Uso:
+        exportacao = ExportacaoHorarios(periodo, formatos=['ics', 'csv'])
+        for parte in exportacao.zip_em_partes():
+            ...
+    """
+
+    def __init__(self, periodo_letivo=None, formatos: Iterable[str] = ('ics', 'csv'), processos: Optional[int] = None):
+        self.periodo_letivo = periodo_letivo
+        self.formatos = sorted(set(formatos))
+        invalidos = [formato for formato in self.formatos if formato not in FORMATOS]
+        if invalidos or not self.formatos:
+            raise ExportacaoError(f"Formatos válidos: {', '.join(FORMATOS)}")
+        if 'xlsx' in self.formatos:
+            try:
+                import openpyxl  # noqa: F401
+            except ImportError:
+                raise ExportacaoError('Para exportar .xlsx, instale o pacote openpyxl')
+        self.processos = processos or getattr(settings, 'EXPORTACAO_PROCESSOS', 1)
+        self.diretorio = _diretorio_exportacao() / str(periodo_letivo.pk if periodo_letivo else 'sem-periodo')
+
+    def arquivos(self) -> List[Tuple[str, str]]:
+        """(nome no zip, caminho em disco) de todos os artefatos, gerando os que faltam."""
+        versao = get_versao_dados()
+        arquivos = obter_ou_calcular(self._chave(versao), lambda: self._montar(versao))
+        if not all(os.path.exists(caminho) for _, caminho in arquivos):
+            # Diretório limpo por fora: monta de novo
+            arquivos = self._montar(versao)
+        return arquivos
+
+    def arquivo(self, recurso: str, recurso_id: int, formato: str) -> Optional[Tuple[str, str]]:
+        """
+        Artefato de um único recurso, ou None se ele não tem aulas no período.
+
+        Usa a lista da exportação completa se ela já está no cache; senão,
+        consulta e gera só o artefato pedido.
+        """
+        versao = get_versao_dados()
+        prefixo, sufixo = f"{RECURSOS[recurso][0]}/", f"-{recurso_id}.{formato}"
+        for nome, caminho in cache.get(self._chave(versao)) or ():
+            if nome.startswith(prefixo) and nome.endswith(sufixo) and os.path.exists(caminho):
+                return nome, caminho
+
+        periodo, por_recurso = self._dados(**{RECURSOS[recurso][1]: recurso_id})
+        if (recurso, recurso_id) not in por_recurso:
+            return None
+        nome_recurso, aulas = por_recurso[(recurso, recurso_id)]
+        ((nome, caminho, pendente),) = self._artefatos(
+            versao, periodo, recurso, recurso_id, nome_recurso, aulas, [formato]
+        )
+        self._gerar([pendente] if pendente else [])
+        return nome, caminho
+
+    def zip_em_partes(self) -> Iterator[bytes]:
+        """Conteúdo do zip com todos os artefatos, em partes, à medida que é montado."""
+        saida = _SaidaEmPartes()
+        with zipfile.ZipFile(saida, 'w', zipfile.ZIP_DEFLATED) as arquivo_zip:
+            for nome, caminho in self.arquivos():
+                arquivo_zip.write(caminho, nome)
+                yield saida.consumir()
+        yield saida.consumir()
+
+    def _chave(self, versao) -> str:
+        return chave_versionada(
+            'exportacao', self.periodo_letivo.pk if self.periodo_letivo else None, ','.join(self.formatos),
+            versao=versao
+        )
+
+    def _montar(self, versao) -> List[Tuple[str, str]]:
+        periodo, por_recurso = self._dados()
+
+        arquivos, pendentes = [], []
+        for (recurso, recurso_id), (nome_recurso, aulas) in sorted(por_recurso.items()):
+            for nome, caminho, pendente in self._artefatos(
+                versao, periodo, recurso, recurso_id, nome_recurso, aulas, self.formatos
+            ):
+                arquivos.append((nome, caminho))
+                if pendente:
+                    pendentes.append(pendente)
+
+        self._gerar(pendentes)
+        self._limpar(versao)
+        return arquivos
+
+    def _artefatos(self, versao, periodo, recurso, recurso_id, nome_recurso, aulas, formatos):
+        """
+        (nome no zip, caminho, pendente) do recurso em cada formato; pendente
+        traz os argumentos de gerar_artefato, ou None se o arquivo já existe.
+        """
+        diretorio = self.diretorio / f'v{versao}'
+        diretorio.mkdir(parents=True, exist_ok=True)
+
+        pasta = RECURSOS[recurso][0]
+        aulas.sort(key=lambda aula: (aula['dia'], aula['inicio'], aula['turma']))
+        titulo = f"{nome_recurso} - {periodo['nome']}" if periodo['nome'] else nome_recurso
+        resumo = hashlib.sha256(json.dumps(
+            [titulo, periodo['inicio'], periodo['fim'], aulas], sort_keys=True
+        ).encode('utf-8')).hexdigest()[:24]
+
+        artefatos = []
+        for formato in formatos:
+            caminho = diretorio / f'{resumo}.{formato}'
+            pendente = None
+            if not caminho.exists() and not self._reaproveitar(caminho):
+                pendente = (str(caminho), formato, titulo, periodo, aulas)
+            artefatos.append((
+                f"{pasta}/{slugify(nome_recurso) or recurso}-{recurso_id}.{formato}", str(caminho), pendente
+            ))
+        return artefatos
+
+    def _reaproveitar(self, caminho: Path) -> bool:
+        """Liga ao artefato de mesmo conteúdo de outra versão, se houver."""
+        for existente in self.diretorio.glob(f'v*/{caminho.name}'):
+            try:
+                os.link(existente, caminho)
+            except FileExistsError:
+                return True
+            except OSError:
+                continue
+            return True
+        return False
+
+    def _dados(self, **filtro):
+        """
+        Aulas do período por recurso, como dados simples (uma consulta).
+
+        Args:
+            **filtro: Restringe os horários, ex: turma=1 (só a entrada desse
+                recurso fica completa)
+        """
+        periodo_letivo = self.periodo_letivo
+        disponibilidade = DisponibilidadePeriodo.do_periodo(periodo_letivo)
+        if periodo_letivo:
+            inicio_periodo, fim_periodo = periodo_letivo.data_inicio, periodo_letivo.data_fim
+        else:
+            hoje = timezone.localdate()
+            inicio_periodo, fim_periodo = hoje - timedelta(days=hoje.weekday()), None
+
+        periodo = {
+            'id': periodo_letivo.pk if periodo_letivo else 0,
+            'nome': periodo_letivo.nome if periodo_letivo else '',
+            'inicio': inicio_periodo.strftime('%Y%m%d'),
+            'fim': fim_periodo.strftime('%Y%m%d') if fim_periodo else '',
+            'gerado_em': timezone.now().strftime('%Y%m%dT%H%M%SZ'),
+        }
+
+        dias = dict(Horario.DIAS_SEMANA)
+        por_recurso: Dict[Tuple[str, int], Tuple[str, List[Dict]]] = {}
+        horarios = Horario.objects.do_periodo(periodo_letivo).ativos().filter(**filtro).select_related(
+            'turma', 'disciplina', 'professor', 'sala'
+        )
+        for horario in horarios:
+            primeira = inicio_periodo + timedelta(days=(horario.dia_semana - inicio_periodo.weekday()) % 7)
+            aula = {
+                'id': horario.pk,
+                'dia': horario.dia_semana,
+                'dia_nome': dias[horario.dia_semana],
+                'inicio': horario.horario_inicio.strftime('%H:%M'),
+                'fim': horario.horario_fim.strftime('%H:%M'),
+                'turno': horario.turno,
+                'disciplina': horario.disciplina.nome,
+                'turma': horario.turma.nome_codigo,
+                'professor': horario.professor.nome_completo,
+                'sala': horario.sala.nome_numero,
+                'primeira_data': primeira.strftime('%Y%m%d'),
+                'excecoes': [
+                    data.strftime('%Y%m%d')
+                    for data in disponibilidade.datas_canceladas(horario.professor_id, horario.dia_semana, horario.turno)
+                ],
+            }
+            for recurso, (_, atributo) in RECURSOS.items():
+                objeto = getattr(horario, atributo)
+                por_recurso.setdefault((recurso, objeto.pk), (aula[atributo], []))[1].append(aula)
+        return periodo, por_recurso
+
+    def _gerar(self, pendentes):
+        if len(pendentes) >= MINIMO_PARA_POOL and self.processos > 1:
+            # Os processos não usam o banco; conexões fechadas não vão para os filhos
+            connections.close_all()
+            with ProcessPoolExecutor(self.processos) as executor:
+                list(executor.map(gerar_artefato, *zip(*pendentes), chunksize=16))
+        else:
+            for pendente in pendentes:
+                gerar_artefato(*pendente)
+
+    def _limpar(self, versao):
+        """
+        Remove os artefatos de versões anteriores dos dados deste período,
+        menos os da mais recente delas, que podem estar sendo enviados.
+        """
+        anteriores = sorted(
+            int(pasta.name[1:]) for pasta in self.diretorio.glob('v*')
+            if pasta.is_dir() and pasta.name[1:].isdigit() and int(pasta.name[1:]) < versao
+        )
+        for anterior in anteriores[:-1]:
+            shutil.rmtree(self.diretorio / f'v{anterior}', ignore_errors=True)
+
+
+class _SaidaEmPartes:
+    """Destino sem seek para o zipfile: guarda o que foi escrito até ser consumido."""
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def consumir(self) -> bytes:
+        dados = b''.join(self._partes)
+        self._partes = []
+        return dados
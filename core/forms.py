@@ -7,7 +7,9 @@ seguindo os princípios SOLID e boas práticas de desenvolvimento.
 
 from django import forms
 from django.core.exceptions import ValidationError
-from .models import Disciplina, Sala, Professor, Turma, PreferenciaProfessor, Horario, BloqueioTemporario
+from .models import (
+    Disciplina, Sala, Professor, Turma, PreferenciaProfessor, Horario, BloqueioTemporario, PeriodoLetivo
+)
 
 
 class DisciplinaForm(forms.ModelForm):
@@ -20,7 +22,7 @@ class DisciplinaForm(forms.ModelForm):
     
     class Meta:
         model = Disciplina
-        fields = ['nome', 'carga_horaria_semanal', 'curso_area', 'periodo_serie', 'ativa']
+        fields = ['nome', 'carga_horaria_semanal', 'curso_area', 'periodo_serie', 'tipo_sala', 'padrao_blocos', 'ativa']
         widgets = {
             'nome': forms.TextInput(attrs={
                 'class': 'form-control',
@@ -39,6 +41,13 @@ class DisciplinaForm(forms.ModelForm):
                 'class': 'form-control',
                 'placeholder': 'Ex: 1º Ano, 2º Período...'
             }),
+            'tipo_sala': forms.Select(attrs={
+                'class': 'form-select'
+            }),
+            'padrao_blocos': forms.TextInput(attrs={
+                'class': 'form-control',
+                'placeholder': 'Ex: 2+2+1'
+            }),
             'ativa': forms.CheckboxInput(attrs={
                 'class': 'form-check-input'
             })
@@ -48,6 +57,8 @@ class DisciplinaForm(forms.ModelForm):
             'carga_horaria_semanal': 'Número de aulas por semana (1-20)',
             'curso_area': 'Curso ou área de conhecimento da disciplina',
             'periodo_serie': 'Período ou série em que a disciplina é lecionada',
+            'tipo_sala': 'Aulas serão alocadas apenas em salas deste tipo (vazio = qualquer sala)',
+            'padrao_blocos': 'Aulas consecutivas por bloco, somando a carga semanal (vazio = aulas avulsas)',
             'ativa': 'Disciplinas inativas não aparecem na geração de horários'
         }
 
@@ -473,7 +484,26 @@ class GerarHorariosForm(forms.Form):
         widget=forms.CheckboxInput(attrs={
             'class': 'form-check-input'
         }),
-        help_text='Remover horários existentes antes de gerar novos'
+        help_text='Remover os horários existentes do período antes de gerar novos'
+    )
+    
+    periodo_letivo = forms.ModelChoiceField(
+        queryset=PeriodoLetivo.objects.all(),
+        required=False,
+        empty_label='Período ativo',
+        widget=forms.Select(attrs={
+            'class': 'form-select'
+        }),
+        help_text='Período letivo em que os horários serão gerados'
+    )
+    
+    como_candidato = forms.BooleanField(
+        required=False,
+        initial=False,
+        widget=forms.CheckboxInput(attrs={
+            'class': 'form-check-input'
+        }),
+        help_text='Guardar o resultado como candidato para comparar, sem alterar os horários atuais'
     )
     
     turmas_selecionadas = forms.ModelMultipleChoiceField(
@@ -612,3 +642,47 @@ class GerarHorariosAvancadoForm(GerarHorariosForm):
         help_text='Verificar bloqueios temporários dos professores'
     )
 
+
+
+class ImportacaoForm(forms.Form):
+    """
+    Formulário para importação em massa a partir de planilhas (CSV ou XLSX).
+    """
+    
+    TIPOS = [
+        ('disciplinas', 'Disciplinas'),
+        ('professores', 'Professores'),
+        ('turmas', 'Turmas'),
+        ('preferencias', 'Preferências de professores'),
+    ]
+    
+    tipo = forms.ChoiceField(
+        choices=TIPOS,
+        widget=forms.Select(attrs={
+            'class': 'form-select'
+        }),
+        help_text='Importe disciplinas antes de professores e turmas que as citam'
+    )
+    
+    arquivo = forms.FileField(
+        widget=forms.ClearableFileInput(attrs={
+            'class': 'form-control',
+            'accept': '.csv,.xlsx'
+        }),
+        help_text='Arquivo .csv (separado por vírgula ou ponto e vírgula) ou .xlsx, com cabeçalho na primeira linha'
+    )
+    
+    def clean_arquivo(self):
+        """
+        Aceita apenas arquivos .csv e .xlsx.
+        
+        Returns:
+            UploadedFile: Arquivo validado
+            
+        Raises:
+            ValidationError: Se a extensão não for suportada
+        """
+        arquivo = self.cleaned_data.get('arquivo')
+        if arquivo and not arquivo.name.lower().endswith(('.csv', '.xlsx')):
+            raise ValidationError('Envie um arquivo .csv ou .xlsx.')
+        return arquivo
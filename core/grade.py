@@ -0,0 +1,145 @@
+"""
+Montagem das grades semanais exibidas nas páginas de horários.
+
+As linhas vêm da tabela canônica de slots do gerador
+(GeradorHorariosRobusto.TURNOS_HORARIOS), a mesma usada para gerar e mover
+horários, e as colunas são os dias letivos (0=Segunda a 4=Sexta, como em
+Horario.dia_semana). Aulas cadastradas fora da tabela ganham linha própria.
+
+As páginas de turma, professor e sala guardam a grade renderizada em cache
+de fragmento; a chave inclui a versão dos dados, então qualquer alteração
+de horário invalida as grades sem apagar entradas.
+"""
+
+from datetime import datetime
+
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+from .algoritmo_horarios import GeradorHorariosRobusto
+from .cache import TIMEOUT_VERSIONADO, get_versao_dados
+from .models import Horario
+
+
+def _hora(texto):
+    return datetime.strptime(texto, '%H:%M').time()
+
+
+# Slots canônicos (turno, início, fim), em ordem de horário
+SLOTS_GRADE = [
+    (turno, _hora(inicio), _hora(fim))
+    for turno, horarios in GeradorHorariosRobusto.TURNOS_HORARIOS.items()
+    for inicio, fim in horarios
+]
+
+# Dias letivos exibidos nas grades
+DIAS_GRADE = [
+    (dia, dict(Horario.DIAS_SEMANA)[dia].split('-')[0])
+    for dia, _ in GeradorHorariosRobusto.DIAS_SEMANA
+]
+
+# Nome do fragmento usado por {% cache %} nos templates de grade
+FRAGMENTO_GRADE = 'grade_horarios'
+
+CORES_DISCIPLINAS = {
+    'Matemática': '#e3f2fd',
+    'Português': '#f3e5f5',
+    'História': '#e8f5e8',
+    'Geografia': '#fff3e0',
+    'Ciências': '#fce4ec',
+    'Física': '#e0f2f1',
+    'Química': '#f1f8e9',
+    'Biologia': '#e8eaf6',
+}
+COR_PADRAO = '#f8f9fa'
+
+
+def horarios_da_grade(periodo_letivo, **filtro):
+    """
+    Horários ativos do período para uma grade, em uma única consulta.
+
+    Args:
+        periodo_letivo: PeriodoLetivo (None = período ativo)
+        **filtro: Recurso exibido, ex: turma=turma
+
+    Returns:
+        QuerySet: Horários com turma, disciplina, professor e sala carregados
+    """
+    return Horario.objects.do_periodo(periodo_letivo).ativos().filter(**filtro).select_related(
+        'turma', 'disciplina', 'professor', 'sala'
+    ).order_by('dia_semana', 'horario_inicio')
+
+
+def montar_grade(horarios, turnos=None):
+    """
+    Organiza horários em linhas (slots) × colunas (dias letivos).
+
+    Args:
+        horarios: Horários já carregados (ver horarios_da_grade)
+        turnos: Turnos cujas linhas aparecem mesmo vazias; por padrão, os
+            turnos em que há alguma aula
+
+    Returns:
+        list: Linhas com 'turno', 'horario_inicio', 'horario_fim' e 'dias'
+            (uma célula por dia, com 'dia', 'horario' e 'cor')
+    """
+    por_posicao = {}
+    turnos_usados = set(turnos or ())
+    extras = set()
+    slots_canonicos = {(inicio, fim) for _, inicio, fim in SLOTS_GRADE}
+
+    for horario in horarios:
+        chave = (horario.horario_inicio, horario.horario_fim)
+        por_posicao[(horario.dia_semana,) + chave] = horario
+        if turnos is None:
+            turnos_usados.add(horario.turno)
+        if chave not in slots_canonicos:
+            extras.add((horario.turno, horario.horario_inicio, horario.horario_fim))
+
+    slots = sorted(
+        [slot for slot in SLOTS_GRADE if slot[0] in turnos_usados] + list(extras),
+        key=lambda slot: (slot[1], slot[2])
+    )
+
+    grade = []
+    for turno, inicio, fim in slots:
+        dias = []
+        for dia, _ in DIAS_GRADE:
+            horario = por_posicao.get((dia, inicio, fim))
+            dias.append({
+                'dia': dia,
+                'horario': horario,
+                'cor': CORES_DISCIPLINAS.get(horario.disciplina.nome, COR_PADRAO) if horario else COR_PADRAO,
+            })
+        grade.append({
+            'turno': turno,
+            'horario_inicio': inicio,
+            'horario_fim': fim,
+            'dias': dias,
+        })
+    return grade
+
+
+def chave_fragmento(tipo, objeto_id, periodo_letivo):
+    """
+    Valor que identifica a grade renderizada de um recurso na versão atual dos dados.
+
+    É o único argumento `vary_on` do {% cache %} dos templates de grade.
+    """
+    periodo_id = periodo_letivo.pk if periodo_letivo else None
+    return f'{tipo}:{objeto_id}:{periodo_id}:v{get_versao_dados()}'
+
+
+def fragmento_em_cache(chave):
+    """Se a grade com esta chave já foi renderizada (a view pode pular as consultas)."""
+    return cache.get(make_template_fragment_key(FRAGMENTO_GRADE, [chave])) is not None
+
+
+def contexto_fragmento(tipo, objeto_id, periodo_letivo):
+    """Variáveis usadas pelo {% cache %} dos templates de grade."""
+    chave = chave_fragmento(tipo, objeto_id, periodo_letivo)
+    return {
+        'chave_fragmento': chave,
+        'timeout_fragmento': TIMEOUT_VERSIONADO,
+        'fragmento_em_cache': fragmento_em_cache(chave),
+    }
@@ -0,0 +1,416 @@
+"""
+Importação em massa de disciplinas, professores, turmas e preferências.
+
+As linhas de um arquivo CSV ou XLSX são lidas como fluxo e processadas em
+lotes: cada linha vira uma instância validada em memória (full_clean, sem
+consultas) contra conjuntos de busca carregados uma única vez (disciplinas
+por nome, professores, chaves já cadastradas); as linhas válidas do lote
+são gravadas com bulk_create e os vínculos M2M com um bulk_create na
+tabela intermediária. Linhas inválidas entram no relatório com o número da
+linha e não interrompem o restante do arquivo.
+
+Colunas (cabeçalho na primeira linha, nomes dos campos do modelo):
+    disciplinas:  nome, carga_horaria_semanal, curso_area, periodo_serie, tipo_sala, padrao_blocos, ativa
+    professores:  nome_completo, email, telefone, especialidade, disciplinas, ativo
+    turmas:       nome_codigo, serie_periodo, turno_turma, numero_alunos, disciplinas, ativa
+    preferencias: professor, disciplina, dia_semana, turno, disponivel, preferencial,
+                  prioridade, observacoes
+
+Disciplinas são referenciadas pelo nome ou por "Nome (Série)" quando o nome
+se repete; listas de disciplinas são separadas por "|". Escolhas (tipo de
+sala, turno, dia da semana) aceitam o código ou o rótulo exibido.
+"""
+
+import csv
+import io
+import unicodedata
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
+from django.db import transaction
+
+from .cache import incrementar_versao_dados
+from .models import Disciplina, PreferenciaProfessor, Professor, Sala, Turma
+
+
+class ImportacaoError(Exception):
+    """Arquivo que não pode ser lido (formato, cabeçalho ou dependência ausente)."""
+
+
+def _normalizar(texto: str) -> str:
+    """Minúsculas e sem acentos, para comparar cabeçalhos e rótulos."""
+    texto = unicodedata.normalize('NFKD', str(texto).strip().lower())
+    return ''.join(caractere for caractere in texto if not unicodedata.combining(caractere))
+
+
+def _texto(valor) -> str:
+    """Valor de uma célula como texto (números inteiros do XLSX sem '.0')."""
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+
+def ler_linhas(arquivo, nome_arquivo: str) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """
+    Lê um arquivo CSV ou XLSX como fluxo de (número da linha, coluna → texto).
+
+    Args:
+        arquivo: Arquivo binário aberto (upload ou disco)
+        nome_arquivo: Nome usado para escolher o formato pela extensão
+
+    Raises:
+        ImportacaoError: Formato não suportado, arquivo vazio ou openpyxl ausente
+    """
+    if nome_arquivo.lower().endswith('.xlsx'):
+        linhas = _linhas_xlsx(arquivo)
+    elif nome_arquivo.lower().endswith('.csv'):
+        linhas = _linhas_csv(arquivo)
+    else:
+        raise ImportacaoError('Formato não suportado: use um arquivo .csv ou .xlsx')
+
+    cabecalho = next(linhas, None)
+    if not cabecalho or not any(cabecalho):
+        raise ImportacaoError('Arquivo vazio ou sem cabeçalho')
+    colunas = [_normalizar(coluna).replace(' ', '_') for coluna in cabecalho]
+
+    for numero, valores in enumerate(linhas, start=2):
+        if any(_texto(valor) for valor in valores):
+            yield numero, {coluna: _texto(valor) for coluna, valor in zip(colunas, valores) if coluna}
+
+
+def _linhas_csv(arquivo) -> Iterator[List[str]]:
+    texto = io.TextIOWrapper(arquivo, encoding='utf-8-sig', newline='')
+    amostra = texto.read(4096)
+    texto.seek(0)
+    try:
+        dialeto = csv.Sniffer().sniff(amostra, delimiters=',;\t')
+    except csv.Error:
+        dialeto = csv.excel
+    yield from csv.reader(texto, dialeto)
+
+
+def _linhas_xlsx(arquivo) -> Iterator[tuple]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportacaoError('Para importar arquivos .xlsx, instale o pacote openpyxl (ou envie um .csv)')
+
+    pasta = load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        yield from pasta.active.iter_rows(values_only=True)
+    finally:
+        pasta.close()
+
+
+class Importador:
+    """
+    Base dos importadores: lotes, validação por linha e gravação em massa.
+
+    Subclasses definem `modelo`, `colunas`, `chave` (identidade usada para
+    recusar duplicatas) e `converter`, que monta a instância de uma linha e
+    os ids de disciplinas a vincular.
+    """
+
+    modelo = None
+    colunas: List[str] = []
+    obrigatorias: List[str] = []
+    campo_m2m: Optional[str] = None
+    # Chaves estrangeiras já resolvidas pelos conjuntos de busca (full_clean
+    # faria uma consulta por linha para conferi-las)
+    estrangeiras: List[str] = []
+
+    def __init__(self, tamanho_lote: int = 500):
+        self.tamanho_lote = tamanho_lote
+        self.criados = 0
+        self.linhas = 0
+        self.erros: List[Dict] = []
+        self._carregar_buscas()
+
+    def _carregar_buscas(self):
+        """Conjuntos de busca usados na validação (uma consulta cada)."""
+        self.chaves = set(self.chave(instancia) for instancia in self.modelo.objects.all())
+
+        self.disciplinas = {}
+        nomes = {}
+        for disciplina in Disciplina.objects.all():
+            self.disciplinas[_normalizar(str(disciplina))] = disciplina.pk
+            nomes.setdefault(_normalizar(disciplina.nome), []).append(disciplina.pk)
+        for nome, ids in nomes.items():
+            # Nome repetido em séries diferentes é ambíguo: exige "Nome (Série)"
+            self.disciplinas.setdefault(nome, ids[0] if len(ids) == 1 else None)
+
+    def chave(self, instancia):
+        raise NotImplementedError
+
+    def converter(self, dados: Dict[str, str]):
+        """Instância (não salva) e ids das disciplinas a vincular; ValidationError se inválida."""
+        raise NotImplementedError
+
+    def importar(self, linhas: Iterable[Tuple[int, Dict[str, str]]]) -> Dict:
+        """
+        Importa as linhas em lotes.
+
+        Returns:
+            dict: 'criados', 'linhas' e 'erros' ([{'linha', 'mensagens'}])
+        """
+        linhas = iter(linhas)
+        while True:
+            lote = list(islice(linhas, self.tamanho_lote))
+            if not lote:
+                break
+            self._importar_lote(lote)
+
+        if self.criados:
+            # bulk_create não dispara sinais
+            transaction.on_commit(incrementar_versao_dados)
+        return self.resultado()
+
+    def resultado(self) -> Dict:
+        return {'criados': self.criados, 'linhas': self.linhas, 'erros': self.erros}
+
+    def _importar_lote(self, lote):
+        validos = []
+        for numero, dados in lote:
+            self.linhas += 1
+            try:
+                faltando = [coluna for coluna in self.obrigatorias if not dados.get(coluna)]
+                if faltando:
+                    raise ValidationError(f"Coluna(s) obrigatória(s) vazia(s): {', '.join(faltando)}")
+                instancia, vinculos = self.converter(dados)
+                instancia.full_clean(exclude=self.estrangeiras, validate_unique=False)
+                chave = self.chave(instancia)
+                if chave in self.chaves:
+                    raise ValidationError('Registro já cadastrado (ou repetido no arquivo)')
+            except ValidationError as erro:
+                self.erros.append({'linha': numero, 'mensagens': self._mensagens(erro)})
+                continue
+            self.chaves.add(chave)
+            validos.append((instancia, vinculos))
+
+        if not validos:
+            return
+
+        with transaction.atomic():
+            criados = self.modelo.objects.bulk_create([instancia for instancia, _ in validos])
+            if self.campo_m2m:
+                relacao = getattr(self.modelo, self.campo_m2m).through
+                origem = f'{self.modelo._meta.model_name}_id'
+                relacao.objects.bulk_create([
+                    relacao(**{origem: instancia.pk, 'disciplina_id': disciplina_id})
+                    for instancia, (_, vinculos) in zip(criados, validos)
+                    for disciplina_id in vinculos
+                ])
+        self.criados += len(criados)
+        for instancia in criados:
+            self._apos_criar(instancia)
+
+    def _apos_criar(self, instancia):
+        """Gancho para atualizar buscas com registros recém-criados."""
+
+    def _mensagens(self, erro: ValidationError) -> List[str]:
+        if hasattr(erro, 'error_dict'):
+            return [
+                mensagem if campo == NON_FIELD_ERRORS else f"{campo}: {mensagem}"
+                for campo, mensagens in erro.message_dict.items() for mensagem in mensagens
+            ]
+        return erro.messages
+
+    # Conversões de células
+
+    def _inteiro(self, dados, coluna, padrao=None):
+        valor = dados.get(coluna, '')
+        if not valor:
+            return padrao
+        try:
+            return int(valor)
+        except ValueError:
+            raise ValidationError(f"{coluna}: '{valor}' não é um número inteiro")
+
+    def _booleano(self, dados, coluna, padrao):
+        valor = _normalizar(dados.get(coluna, ''))
+        if not valor:
+            return padrao
+        if valor in ('1', 's', 'sim', 'true', 'verdadeiro', 'x'):
+            return True
+        if valor in ('0', 'n', 'nao', 'false', 'falso'):
+            return False
+        raise ValidationError(f"{coluna}: use sim ou não")
+
+    def _escolha(self, dados, coluna, escolhas, padrao=''):
+        valor = dados.get(coluna, '')
+        if not valor:
+            return padrao
+        for codigo, rotulo in escolhas:
+            if _normalizar(valor) in (_normalizar(codigo), _normalizar(rotulo)):
+                return codigo
+        raise ValidationError(f"{coluna}: '{valor}' não é uma opção válida")
+
+    def _disciplina(self, nome):
+        chave = _normalizar(nome)
+        if chave not in self.disciplinas:
+            raise ValidationError(f"Disciplina '{nome}' não encontrada")
+        if self.disciplinas[chave] is None:
+            raise ValidationError(f"Disciplina '{nome}' existe em mais de uma série: use 'Nome (Série)'")
+        return self.disciplinas[chave]
+
+    def _lista_disciplinas(self, dados):
+        nomes = [nome.strip() for nome in dados.get('disciplinas', '').split('|') if nome.strip()]
+        return list(dict.fromkeys(self._disciplina(nome) for nome in nomes))
+
+
+class ImportadorDisciplinas(Importador):
+    modelo = Disciplina
+    colunas = ['nome', 'carga_horaria_semanal', 'curso_area', 'periodo_serie', 'tipo_sala', 'padrao_blocos', 'ativa']
+    obrigatorias = ['nome', 'carga_horaria_semanal', 'curso_area', 'periodo_serie']
+
+    def chave(self, instancia):
+        return (_normalizar(instancia.nome), _normalizar(instancia.periodo_serie))
+
+    def converter(self, dados):
+        # Mesma normalização do DisciplinaForm
+        nome = dados['nome'].strip().title()
+        if len(nome) < 2:
+            raise ValidationError('nome: deve ter pelo menos 2 caracteres')
+        return Disciplina(
+            nome=nome,
+            carga_horaria_semanal=self._inteiro(dados, 'carga_horaria_semanal'),
+            curso_area=dados['curso_area'],
+            periodo_serie=dados['periodo_serie'],
+            tipo_sala=self._escolha(dados, 'tipo_sala', Sala.TIPOS_SALA),
+            padrao_blocos=dados.get('padrao_blocos', ''),
+            ativa=self._booleano(dados, 'ativa', True),
+        ), []
+
+    def _apos_criar(self, instancia):
+        # Disciplinas criadas podem ser citadas por importações seguintes
+        self.disciplinas[_normalizar(str(instancia))] = instancia.pk
+        nome = _normalizar(instancia.nome)
+        self.disciplinas[nome] = instancia.pk if self.disciplinas.get(nome, instancia.pk) == instancia.pk else None
+
+
+class ImportadorProfessores(Importador):
+    modelo = Professor
+    colunas = ['nome_completo', 'email', 'telefone', 'especialidade', 'disciplinas', 'ativo']
+    obrigatorias = ['nome_completo']
+    campo_m2m = 'disciplinas'
+
+    def chave(self, instancia):
+        return _normalizar(instancia.nome_completo)
+
+    def converter(self, dados):
+        # Mesma normalização do ProfessorForm
+        nome = dados['nome_completo'].strip().title()
+        if len(nome.split()) < 2:
+            raise ValidationError('nome_completo: informe o nome completo do professor')
+        return Professor(
+            nome_completo=nome,
+            email=dados.get('email', ''),
+            telefone=dados.get('telefone', ''),
+            especialidade=dados.get('especialidade', ''),
+            ativo=self._booleano(dados, 'ativo', True),
+        ), self._lista_disciplinas(dados)
+
+
+class ImportadorTurmas(Importador):
+    modelo = Turma
+    colunas = ['nome_codigo', 'serie_periodo', 'turno_turma', 'numero_alunos', 'disciplinas', 'ativa']
+    obrigatorias = ['nome_codigo', 'serie_periodo', 'numero_alunos']
+    campo_m2m = 'disciplinas'
+
+    def chave(self, instancia):
+        return _normalizar(instancia.nome_codigo)
+
+    def converter(self, dados):
+        return Turma(
+            nome_codigo=dados['nome_codigo'],
+            serie_periodo=dados['serie_periodo'],
+            turno_turma=self._escolha(dados, 'turno_turma', Turma.TURNOS_TURMA, 'flexivel'),
+            numero_alunos=self._inteiro(dados, 'numero_alunos'),
+            ativa=self._booleano(dados, 'ativa', True),
+        ), self._lista_disciplinas(dados)
+
+
+class ImportadorPreferencias(Importador):
+    modelo = PreferenciaProfessor
+    colunas = [
+        'professor', 'disciplina', 'dia_semana', 'turno', 'disponivel', 'preferencial', 'prioridade', 'observacoes'
+    ]
+    obrigatorias = ['professor']
+    estrangeiras = ['professor', 'disciplina']
+
+    def _carregar_buscas(self):
+        super()._carregar_buscas()
+        self.professores = {
+            _normalizar(nome): pk for pk, nome in Professor.objects.values_list('pk', 'nome_completo')
+        }
+
+    def chave(self, instancia):
+        return (instancia.professor_id, instancia.disciplina_id, instancia.dia_semana, instancia.turno)
+
+    def converter(self, dados):
+        professor_id = self.professores.get(_normalizar(dados['professor']))
+        if professor_id is None:
+            raise ValidationError(f"Professor '{dados['professor']}' não encontrado")
+
+        dia = dados.get('dia_semana', '')
+        if dia.isdigit():
+            dia_semana = int(dia)
+        else:
+            # Aceita "Segunda-feira" ou só "Segunda"
+            dia_semana = self._escolha(dados, 'dia_semana', PreferenciaProfessor.DIAS_SEMANA + [
+                (codigo, rotulo.split('-')[0]) for codigo, rotulo in PreferenciaProfessor.DIAS_SEMANA
+            ], None)
+
+        disponivel = self._booleano(dados, 'disponivel', True)
+        preferencial = self._booleano(dados, 'preferencial', False)
+        # PreferenciaProfessor.clean exige prioridade alta para horários
+        # preferenciais e baixa para indisponibilidades
+        if preferencial:
+            prioridade_padrao = 4
+        else:
+            prioridade_padrao = 3 if disponivel else 1
+        return PreferenciaProfessor(
+            professor_id=professor_id,
+            disciplina_id=self._disciplina(dados['disciplina']) if dados.get('disciplina') else None,
+            dia_semana=dia_semana,
+            turno=self._escolha(dados, 'turno', PreferenciaProfessor.TURNOS),
+            disponivel=disponivel,
+            preferencial=preferencial,
+            prioridade=self._inteiro(dados, 'prioridade', prioridade_padrao),
+            observacoes=dados.get('observacoes', ''),
+        ), []
+
+
+# Tipo de importação → importador, na ordem em que as dependências são resolvidas
+IMPORTADORES = {
+    'disciplinas': ImportadorDisciplinas,
+    'professores': ImportadorProfessores,
+    'turmas': ImportadorTurmas,
+    'preferencias': ImportadorPreferencias,
+}
+
+
+def importar_arquivo(tipo: str, arquivo, nome_arquivo: str, tamanho_lote: int = 500) -> Dict:
+    """
+    Importa um arquivo de um dos tipos de IMPORTADORES.
+
+    Raises:
+        ImportacaoError: Arquivo ilegível ou sem nenhuma coluna conhecida
+    """
+    importador = IMPORTADORES[tipo](tamanho_lote=tamanho_lote)
+    linhas = ler_linhas(arquivo, nome_arquivo)
+
+    primeira = next(linhas, None)
+    if primeira is None:
+        return importador.resultado()
+    if not set(primeira[1]) & set(importador.colunas):
+        raise ImportacaoError(f"Nenhuma coluna reconhecida. Colunas esperadas: {', '.join(importador.colunas)}")
+
+    def todas():
+        yield primeira
+        yield from linhas
+
+    return importador.importar(todas())
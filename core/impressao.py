@@ -0,0 +1,117 @@
+"""
+Documento para impressão com as grades de todas as turmas, professores e salas.
+
+Os horários do período são carregados em uma única consulta e distribuídos
+por recurso; cada grade vira uma página (core/impressao_pagina.html) e as
+páginas são renderizadas em um pool de processos, em blocos. O documento
+completo fica em cache sob a versão dos dados: só é montado de novo depois
+que algum horário muda.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+import django
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .cache import chave_versionada, obter_ou_calcular
+from .grade import DIAS_GRADE, horarios_da_grade, montar_grade
+from .models import Professor, Sala, Turma
+
+# Recurso → (título das páginas, informações exibidas em cada célula)
+RECURSOS_IMPRESSAO = {
+    'turma': ('Turma', 'professor sala'),
+    'professor': ('Professor', 'turma sala'),
+    'sala': ('Sala', 'turma professor'),
+}
+
+# Abaixo deste número de páginas, renderizar no processo atual é mais rápido que o pool
+MINIMO_PARA_POOL = 40
+
+
+def _inicializar_processo():
+    django.setup()
+
+
+def _renderizar_paginas(paginas: List[Dict]) -> str:
+    """Renderiza um bloco de páginas (roda em processo separado, sem acesso ao banco)."""
+    return ''.join(render_to_string('core/impressao_pagina.html', pagina) for pagina in paginas)
+
+
+class DocumentoGrades:
+    """
+    Grades semanais de vários recursos em um único HTML paginado.
+
+    Turmas ativas aparecem mesmo sem aulas (com as linhas dos seus turnos);
+    professores e salas aparecem quando têm aulas no período.
+
+    Uso:
+        html = DocumentoGrades(periodo, recursos=['turma']).renderizar()
+    """
+
+    def __init__(self, periodo_letivo=None, recursos: Iterable[str] = tuple(RECURSOS_IMPRESSAO),
+                 processos: Optional[int] = None):
+        self.periodo_letivo = periodo_letivo
+        self.recursos = [recurso for recurso in RECURSOS_IMPRESSAO if recurso in set(recursos)]
+        self.processos = processos or getattr(settings, 'IMPRESSAO_PROCESSOS', 1)
+
+    def renderizar(self) -> str:
+        """HTML completo, em cache até a próxima alteração dos dados."""
+        chave = chave_versionada(
+            'impressao', self.periodo_letivo.pk if self.periodo_letivo else None, ','.join(self.recursos)
+        )
+        return obter_ou_calcular(chave, self._montar)
+
+    def paginas(self) -> List[Dict]:
+        """Contexto de cada página, na ordem do documento."""
+        por_recurso = {recurso: {} for recurso in self.recursos}
+        for horario in horarios_da_grade(self.periodo_letivo):
+            for recurso in self.recursos:
+                por_recurso[recurso].setdefault(getattr(horario, f'{recurso}_id'), []).append(horario)
+
+        objetos = {
+            'turma': lambda: Turma.objects.filter(Q(ativa=True) | Q(pk__in=por_recurso['turma'])),
+            'professor': lambda: Professor.objects.filter(pk__in=por_recurso['professor']),
+            'sala': lambda: Sala.objects.filter(pk__in=por_recurso['sala']),
+        }
+
+        paginas = []
+        for recurso in self.recursos:
+            titulo, mostrar = RECURSOS_IMPRESSAO[recurso]
+            for objeto in objetos[recurso]():
+                horarios = por_recurso[recurso].get(objeto.pk, [])
+                turnos = None
+                if recurso == 'turma' and objeto.turno_turma != 'flexivel':
+                    turnos = objeto.get_turnos_permitidos()
+                paginas.append({
+                    'titulo': f'{titulo} {objeto}',
+                    'periodo_letivo': self.periodo_letivo,
+                    'mostrar': mostrar,
+                    'dias_semana_grade': DIAS_GRADE,
+                    'grade_horarios': montar_grade(horarios, turnos=turnos),
+                    'total_aulas': len(horarios),
+                })
+        return paginas
+
+    def _montar(self) -> str:
+        paginas = self.paginas()
+        if self.processos > 1 and len(paginas) >= MINIMO_PARA_POOL:
+            tamanho = -(-len(paginas) // self.processos)
+            blocos = [paginas[inicio:inicio + tamanho] for inicio in range(0, len(paginas), tamanho)]
+            # As páginas já trazem os horários carregados; os processos não usam o banco
+            connections.close_all()
+            with ProcessPoolExecutor(self.processos, initializer=_inicializar_processo) as executor:
+                corpo = ''.join(executor.map(_renderizar_paginas, blocos))
+        else:
+            corpo = _renderizar_paginas(paginas)
+
+        return render_to_string('core/impressao_grades.html', {
+            'corpo': corpo,
+            'total_paginas': len(paginas),
+            'periodo_letivo': self.periodo_letivo,
+            'gerado_em': timezone.localtime(),
+        })
@@ -0,0 +1,217 @@
+"""
+Índices de intervalos de datas para bloqueios e eventos acadêmicos.
+
+`ArvoreIntervalos` é uma árvore de intervalos centrada e estática:
+"quais intervalos contêm a data D" (consulta de ponto) custa
+O(log n + k) e "quais intervalos tocam [A, B]" combina uma consulta de
+ponto em A com uma bissecção nos inícios, também O(log n + k).
+
+`IndiceCalendario` monta essas árvores com os bloqueios e eventos de um
+PeriodoLetivo e fica em cache sob a versão dos dados; qualquer escrita em
+bloqueios, eventos ou períodos (core/signals.py) gera um índice novo.
+"""
+
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .cache import chave_versionada, obter_ou_calcular
+from .models import BloqueioTemporario, EventoAcademico, PeriodoLetivo
+
+
+class ArvoreIntervalos:
+    """
+    Intervalos fechados [início, fim] de inteiros, cada um com um valor associado.
+
+    Cada nó guarda o ponto central e os intervalos que o contêm, ordenados
+    por início (crescente) e por fim (decrescente); os demais descem para
+    a subárvore da esquerda ou da direita.
+    """
+
+    def __init__(self, intervalos: Iterable[Tuple[int, int, Any]]):
+        itens = [(inicio, fim, valor) for inicio, fim, valor in intervalos if inicio <= fim]
+        self._por_inicio = sorted(itens, key=lambda item: item[0])
+        self._inicios = [item[0] for item in self._por_inicio]
+        self._raiz = self._construir(itens)
+
+    def __len__(self) -> int:
+        return len(self._por_inicio)
+
+    def __iter__(self):
+        """(início, fim, valor) de todos os intervalos, em ordem de início."""
+        return iter(self._por_inicio)
+
+    def _construir(self, itens):
+        if not itens:
+            return None
+        pontos = sorted(ponto for inicio, fim, _ in itens for ponto in (inicio, fim))
+        centro = pontos[len(pontos) // 2]
+
+        esquerda, direita, no_centro = [], [], []
+        for item in itens:
+            if item[1] < centro:
+                esquerda.append(item)
+            elif item[0] > centro:
+                direita.append(item)
+            else:
+                no_centro.append(item)
+
+        return (
+            centro,
+            sorted(no_centro, key=lambda item: item[0]),
+            sorted(no_centro, key=lambda item: -item[1]),
+            self._construir(esquerda),
+            self._construir(direita),
+        )
+
+    def no_ponto(self, ponto: int) -> List[Any]:
+        """Valores dos intervalos que contêm `ponto`."""
+        resultado = []
+        no = self._raiz
+        while no is not None:
+            centro, por_inicio, por_fim, esquerda, direita = no
+            if ponto < centro:
+                for inicio, _, valor in por_inicio:
+                    if inicio > ponto:
+                        break
+                    resultado.append(valor)
+                no = esquerda
+            elif ponto > centro:
+                for _, fim, valor in por_fim:
+                    if fim < ponto:
+                        break
+                    resultado.append(valor)
+                no = direita
+            else:
+                resultado.extend(valor for _, _, valor in por_inicio)
+                no = None
+        return resultado
+
+    def sobrepostos(self, inicio: int, fim: int) -> List[Any]:
+        """Valores dos intervalos que têm algum ponto em [inicio, fim]."""
+        resultado = self.no_ponto(inicio)
+        primeiro = bisect_right(self._inicios, inicio)
+        ultimo = bisect_right(self._inicios, fim)
+        resultado.extend(item[2] for item in self._por_inicio[primeiro:ultimo])
+        return resultado
+
+
+def _turno_afetado(turno_intervalo: str, turno: Optional[str]) -> bool:
+    """Mesma regra de BloqueioTemporario.professor_disponivel_na_data."""
+    return not turno_intervalo or not turno or turno_intervalo == turno
+
+
+class IndiceCalendario:
+    """
+    Bloqueios de professores e eventos acadêmicos de um período letivo.
+
+    Bloqueios recorrentes valem toda semana no dia de `data_inicio` (como
+    em BloqueioTemporario) e ficam num índice por dia da semana; os demais
+    e os eventos que afetam aulas ficam em árvores de intervalos.
+    """
+
+    def __init__(self, periodo_letivo: Optional[PeriodoLetivo] = None):
+        self.periodo_letivo_id = periodo_letivo.pk if periodo_letivo else None
+
+        bloqueios = BloqueioTemporario.objects.filter(ativo=True)
+        eventos = EventoAcademico.objects.filter(ativo=True, afeta_aulas=True)
+        if periodo_letivo:
+            bloqueios = bloqueios.exclude(
+                recorrente=False, data_fim__lt=periodo_letivo.data_inicio
+            ).exclude(recorrente=False, data_inicio__gt=periodo_letivo.data_fim)
+            # Eventos do período e eventos avulsos (sem período) nas suas datas
+            eventos = eventos.filter(periodo_letivo=periodo_letivo) | eventos.filter(
+                periodo_letivo__isnull=True,
+                data_fim__gte=periodo_letivo.data_inicio,
+                data_inicio__lte=periodo_letivo.data_fim
+            )
+        else:
+            eventos = eventos.filter(periodo_letivo__isnull=True)
+
+        # Valor dos bloqueios: (professor_id, turno, pk)
+        self.recorrentes: Dict[int, List[Tuple[int, str, int]]] = defaultdict(list)
+        pontuais = []
+        for pk, professor_id, inicio, fim, turno, recorrente in bloqueios.values_list(
+            'pk', 'professor_id', 'data_inicio', 'data_fim', 'turno', 'recorrente'
+        ):
+            if recorrente:
+                self.recorrentes[inicio.weekday()].append((professor_id, turno, pk))
+            else:
+                pontuais.append((inicio.toordinal(), fim.toordinal(), (professor_id, turno, pk)))
+        self.bloqueios = ArvoreIntervalos(pontuais)
+
+        self.eventos = ArvoreIntervalos(
+            (evento.data_inicio.toordinal(), evento.data_fim.toordinal(), evento)
+            for evento in eventos
+        )
+
+    @classmethod
+    def do_periodo(cls, periodo_letivo: Optional[PeriodoLetivo] = None) -> 'IndiceCalendario':
+        """Índice em cache sob a versão atual dos dados."""
+        return obter_ou_calcular(
+            chave_versionada('calendario', periodo_letivo.pk if periodo_letivo else None),
+            lambda: cls(periodo_letivo)
+        )
+
+    @classmethod
+    def para_data(cls, data: date) -> 'IndiceCalendario':
+        """Índice do período letivo que contém a data (ou do período ativo)."""
+        periodo = PeriodoLetivo.objects.filter(
+            data_inicio__lte=data, data_fim__gte=data
+        ).first() or PeriodoLetivo.get_periodo_ativo()
+        return cls.do_periodo(periodo)
+
+    def bloqueios_em(self, data: date, turno: Optional[str] = None) -> List[Tuple[int, str, int]]:
+        """(professor_id, turno, pk) dos bloqueios que valem na data e no turno."""
+        candidatos = self.bloqueios.no_ponto(data.toordinal()) + self.recorrentes.get(data.weekday(), [])
+        return [bloqueio for bloqueio in candidatos if _turno_afetado(bloqueio[1], turno)]
+
+    def professores_bloqueados(self, data: date, turno: Optional[str] = None) -> Set[int]:
+        """Ids dos professores bloqueados na data (e turno, se informado)."""
+        return {professor_id for professor_id, _, _ in self.bloqueios_em(data, turno)}
+
+    def professor_bloqueado(self, professor_id: int, data: date, turno: Optional[str] = None) -> bool:
+        return any(bloqueio[0] == professor_id for bloqueio in self.bloqueios_em(data, turno))
+
+    def bloqueios_entre(self, inicio: date, fim: date) -> List[Tuple[int, str, int]]:
+        """Bloqueios pontuais que tocam [inicio, fim] mais os recorrentes dos dias da semana cobertos."""
+        resultado = self.bloqueios.sobrepostos(inicio.toordinal(), fim.toordinal())
+        dias = {(inicio + timedelta(days=deslocamento)).weekday() for deslocamento in range(min((fim - inicio).days + 1, 7))}
+        for dia in sorted(dias):
+            resultado.extend(self.recorrentes.get(dia, []))
+        return resultado
+
+    def eventos_em(self, data: date, turno: Optional[str] = None) -> List[EventoAcademico]:
+        """Eventos que impedem aulas na data (e turno, se informado)."""
+        return [evento for evento in self.eventos.no_ponto(data.toordinal()) if evento.conflita_com_data(data, turno)]
+
+    def eventos_entre(self, inicio: date, fim: date) -> List[EventoAcademico]:
+        """Eventos que impedem aulas em algum dia de [inicio, fim]."""
+        return sorted(self.eventos.sobrepostos(inicio.toordinal(), fim.toordinal()), key=lambda evento: evento.data_inicio)
+
+    def aulas_em_eventos(self, horarios: Iterable, inicio: date, fim: date) -> List[Tuple[date, Any, EventoAcademico]]:
+        """
+        Ocorrências de aulas semanais que caem em eventos.
+
+        Args:
+            horarios: Horários (dia_semana e turno) repetidos toda semana
+            inicio, fim: Datas consideradas (ex: as do período letivo)
+
+        Returns:
+            list: (data, horário, evento), em ordem de data
+        """
+        por_dia = defaultdict(list)
+        for horario in horarios:
+            por_dia[horario.dia_semana].append(horario)
+
+        resultado = []
+        for evento in self.eventos_entre(inicio, fim):
+            data = max(evento.data_inicio, inicio)
+            while data <= min(evento.data_fim, fim):
+                for horario in por_dia.get(data.weekday(), ()):
+                    if evento.conflita_com_data(data, horario.turno):
+                        resultado.append((data, horario, evento))
+                data += timedelta(days=1)
+        resultado.sort(key=lambda ocorrencia: ocorrencia[0])
+        return resultado
@@ -0,0 +1,44 @@
+"""
+Comando para exportar os horários de todas as turmas, professores e salas em um zip.
+
+Cada recurso gera um arquivo por formato (iCalendar, CSV, XLSX). Os
+artefatos ficam em EXPORTACAO_DIR e só são gerados de novo quando os
+dados mudam.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.exportacao import FORMATOS, ExportacaoError, ExportacaoHorarios
+from core.models import PeriodoLetivo
+
+
+class Command(BaseCommand):
+    help = 'Exporta os horários de turmas, professores e salas (iCalendar/CSV/XLSX) em um arquivo zip'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--saida', default='horarios.zip', help='Arquivo zip gerado')
+        parser.add_argument(
+            '--formatos', nargs='+', choices=FORMATOS, default=['ics', 'csv'], help='Formatos exportados'
+        )
+        parser.add_argument('--periodo', help='Nome do período letivo (padrão: o ativo)')
+        parser.add_argument('--processos', type=int, help='Processos usados para gerar os artefatos')
+
+    def handle(self, *args, **options):
+        if options['periodo']:
+            periodo = PeriodoLetivo.objects.filter(nome=options['periodo']).first()
+            if not periodo:
+                raise CommandError(f"Período letivo não encontrado: {options['periodo']}")
+        else:
+            periodo = PeriodoLetivo.get_periodo_ativo()
+
+        try:
+            exportacao = ExportacaoHorarios(periodo, formatos=options['formatos'], processos=options['processos'])
+            with open(options['saida'], 'wb') as saida:
+                for parte in exportacao.zip_em_partes():
+                    saida.write(parte)
+        except (OSError, ExportacaoError) as erro:
+            raise CommandError(str(erro))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(exportacao.arquivos())} arquivo(s) exportado(s) para {options['saida']}"
+        ))
@@ -0,0 +1,90 @@
+"""
+Comando para gerar vários quadros candidatos, em paralelo, sem alterar os horários.
+
+Cada execução usa uma semente diferente e grava um HorarioCandidato; os
+candidatos podem ser comparados e promovidos em /candidatos/.
+"""
+
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.models import PeriodoLetivo, Turma
+
+
+def _inicializar_processo():
+    django.setup()
+
+
+def _gerar_candidato(semente, turmas_ids, do_zero, max_tentativas, periodo_id=None):
+    """Executa o gerador em modo candidato (roda em processo separado)."""
+    from core.algoritmo_horarios import GeradorHorariosRobusto
+
+    try:
+        turmas = list(Turma.objects.filter(pk__in=turmas_ids)) if turmas_ids else None
+        periodo = PeriodoLetivo.objects.get(pk=periodo_id) if periodo_id else None
+        resultado = GeradorHorariosRobusto().gerar_horarios(
+            turmas=turmas,
+            limpar_anteriores=do_zero,
+            max_tentativas=max_tentativas,
+            como_candidato=True,
+            semente=semente,
+            nome_candidato=f"Semente {semente}",
+            periodo_letivo=periodo
+        )
+        return semente, resultado
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Gera quadros de horários candidatos com sementes diferentes, em paralelo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quantidade', type=int, default=4, help='Número de candidatos a gerar')
+        parser.add_argument('--processos', type=int, default=1, help='Execuções simultâneas')
+        parser.add_argument('--turmas', nargs='*', default=[], help='Códigos das turmas (padrão: todas as ativas)')
+        parser.add_argument('--do-zero', action='store_true', help='Ignorar os horários atuais das turmas geradas')
+        parser.add_argument('--tentativas', type=int, default=50, help='Máximo de tentativas por candidato')
+        parser.add_argument('--periodo', help='Nome do período letivo (padrão: o período ativo)')
+
+    def handle(self, *args, **options):
+        turmas_ids = []
+        if options['turmas']:
+            turmas_ids = list(Turma.objects.filter(nome_codigo__in=options['turmas']).values_list('pk', flat=True))
+            if len(turmas_ids) != len(set(options['turmas'])):
+                raise CommandError('Alguma das turmas informadas não existe')
+
+        periodo_id = None
+        if options['periodo']:
+            periodo = PeriodoLetivo.objects.filter(nome=options['periodo']).first()
+            if periodo is None:
+                raise CommandError(f"Período letivo '{options['periodo']}' não existe")
+            periodo_id = periodo.pk
+
+        sementes = random.sample(range(2 ** 31), options['quantidade'])
+        argumentos = [
+            (semente, turmas_ids, options['do_zero'], options['tentativas'], periodo_id)
+            for semente in sementes
+        ]
+
+        if options['processos'] > 1:
+            # Cada processo abre a própria conexão com o banco
+            connections.close_all()
+            with ProcessPoolExecutor(options['processos'], initializer=_inicializar_processo) as executor:
+                resultados = list(executor.map(_gerar_candidato, *zip(*argumentos)))
+        else:
+            resultados = [_gerar_candidato(*argumento) for argumento in argumentos]
+
+        for semente, resultado in resultados:
+            if resultado.get('candidato_id'):
+                self.stdout.write(self.style.SUCCESS(
+                    f"Semente {semente}: candidato #{resultado['candidato_id']} "
+                    f"({resultado['tentativas']} tentativas)"
+                ))
+            else:
+                motivo = (resultado.get('conflitos') or [resultado.get('erro', 'sem candidato')])[-1]
+                self.stdout.write(self.style.WARNING(f"Semente {semente}: {motivo}"))
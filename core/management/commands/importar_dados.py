@@ -0,0 +1,43 @@
+"""
+Comando para importar disciplinas, professores, turmas e preferências de arquivos CSV ou XLSX.
+
+Os arquivos são processados na ordem disciplinas → professores → turmas →
+preferências, para que cada um possa citar os registros dos anteriores.
+Linhas inválidas são listadas e não impedem a importação das demais.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importacao import IMPORTADORES, ImportacaoError, importar_arquivo
+
+
+class Command(BaseCommand):
+    help = 'Importa disciplinas, professores, turmas e preferências de arquivos CSV ou XLSX'
+
+    def add_arguments(self, parser):
+        for tipo in IMPORTADORES:
+            parser.add_argument(f'--{tipo}', metavar='ARQUIVO', help=f'Arquivo .csv ou .xlsx de {tipo}')
+        parser.add_argument('--lote', type=int, default=500, help='Linhas gravadas por bulk_create')
+        parser.add_argument('--max-erros', type=int, default=50, help='Erros exibidos por arquivo')
+
+    def handle(self, *args, **options):
+        arquivos = [(tipo, options[tipo]) for tipo in IMPORTADORES if options[tipo]]
+        if not arquivos:
+            raise CommandError(f"Informe ao menos um arquivo: {', '.join('--' + tipo for tipo in IMPORTADORES)}")
+
+        for tipo, caminho in arquivos:
+            try:
+                with open(caminho, 'rb') as arquivo:
+                    resultado = importar_arquivo(tipo, arquivo, caminho, tamanho_lote=options['lote'])
+            except (OSError, ImportacaoError) as erro:
+                raise CommandError(f"{caminho}: {erro}")
+
+            estilo = self.style.SUCCESS if not resultado['erros'] else self.style.WARNING
+            self.stdout.write(estilo(
+                f"{tipo}: {resultado['criados']} criado(s) de {resultado['linhas']} linha(s), "
+                f"{len(resultado['erros'])} com erro"
+            ))
+            for erro in resultado['erros'][:options['max_erros']]:
+                self.stdout.write(f"  linha {erro['linha']}: {'; '.join(erro['mensagens'])}")
+            if len(resultado['erros']) > options['max_erros']:
+                self.stdout.write(f"  ... e mais {len(resultado['erros']) - options['max_erros']} erro(s)")
@@ -0,0 +1,41 @@
+"""
+Comando para gerar o documento de impressão com as grades de todas as turmas, professores e salas.
+
+O HTML gerado tem uma grade por página (A4 paisagem) e pode ser impresso
+ou convertido em PDF pelo navegador.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.impressao import RECURSOS_IMPRESSAO, DocumentoGrades
+from core.models import PeriodoLetivo
+
+
+class Command(BaseCommand):
+    help = 'Gera um HTML paginado com as grades de turmas, professores e salas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--saida', default='grades.html', help='Arquivo HTML gerado')
+        parser.add_argument(
+            '--recursos', nargs='+', choices=list(RECURSOS_IMPRESSAO), default=list(RECURSOS_IMPRESSAO),
+            help='Grades incluídas'
+        )
+        parser.add_argument('--periodo', help='Nome do período letivo (padrão: o ativo)')
+        parser.add_argument('--processos', type=int, help='Processos usados para renderizar as páginas')
+
+    def handle(self, *args, **options):
+        if options['periodo']:
+            periodo = PeriodoLetivo.objects.filter(nome=options['periodo']).first()
+            if not periodo:
+                raise CommandError(f"Período letivo não encontrado: {options['periodo']}")
+        else:
+            periodo = PeriodoLetivo.get_periodo_ativo()
+
+        documento = DocumentoGrades(periodo, recursos=options['recursos'], processos=options['processos'])
+        try:
+            with open(options['saida'], 'w', encoding='utf-8') as saida:
+                saida.write(documento.renderizar())
+        except OSError as erro:
+            raise CommandError(str(erro))
+
+        self.stdout.write(self.style.SUCCESS(f"Grades gravadas em {options['saida']}"))
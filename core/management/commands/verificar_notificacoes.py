@@ -0,0 +1,22 @@
+"""
+Comando para verificar o quadro de horários e atualizar as notificações.
+
+Pode ser agendado (cron, systemd timer) para manter as notificações em
+dia sem depender de acessos à API.
+"""
+
+from django.core.management.base import BaseCommand
+
+from core.notificacoes import VerificadorNotificacoes
+
+
+class Command(BaseCommand):
+    help = 'Detecta conflitos e problemas nos horários e atualiza as notificações do sistema'
+
+    def handle(self, *args, **options):
+        resultado = VerificadorNotificacoes().sincronizar()
+        self.stdout.write(self.style.SUCCESS(
+            f"Notificações: {resultado['criadas']} criadas, "
+            f"{resultado['atualizadas']} atualizadas, "
+            f"{resultado['desativadas']} desativadas"
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_periodoletivo_horario_observacoes_auditoriahorario_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='disciplina',
+            name='tipo_sala',
+            field=models.CharField(blank=True, choices=[('normal', 'Sala Normal'), ('laboratorio', 'Laboratório'), ('auditorio', 'Auditório')], help_text='Tipo de sala exigido pelas aulas (deixe vazio para qualquer sala)', max_length=20, verbose_name='Tipo de Sala Exigido'),
+        ),
+    ]
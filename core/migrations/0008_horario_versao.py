@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_disciplina_tipo_sala'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='horario',
+            name='versao',
+            field=models.PositiveIntegerField(default=1, editable=False, help_text='Incrementada a cada alteração; usada para detectar edições concorrentes', verbose_name='Versão'),
+        ),
+    ]
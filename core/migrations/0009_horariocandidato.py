@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_horario_versao'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HorarioCandidato',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(blank=True, max_length=100, verbose_name='Nome')),
+                ('turmas', models.JSONField(default=list, help_text='Pks das turmas geradas neste candidato', verbose_name='Turmas')),
+                ('semente', models.BigIntegerField(verbose_name='Semente')),
+                ('pontuacao', models.FloatField(help_text='Penalidade de janelas de professores e turmas com sinal trocado (maior é melhor)', verbose_name='Pontuação')),
+                ('total_aulas', models.PositiveIntegerField(default=0, verbose_name='Total de Aulas')),
+                ('dados', models.BinaryField(verbose_name='Quadro Serializado')),
+                ('parametros', models.JSONField(blank=True, default=dict, verbose_name='Parâmetros')),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('promovido_em', models.DateTimeField(blank=True, null=True, verbose_name='Promovido em')),
+                ('criado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Criado por')),
+                ('periodo_letivo', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='candidatos', to='core.periodoletivo', verbose_name='Período Letivo')),
+            ],
+            options={
+                'verbose_name': 'Horário Candidato',
+                'verbose_name_plural': 'Horários Candidatos',
+                'ordering': ['-criado_em'],
+            },
+        ),
+    ]
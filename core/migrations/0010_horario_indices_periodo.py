@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_horariocandidato'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='horario',
+            index=models.Index(fields=['periodo_letivo', 'ativo', 'dia_semana', 'horario_inicio'], name='horario_periodo_grade_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='horario',
+            index=models.Index(fields=['periodo_letivo', 'turma', 'dia_semana'], name='horario_periodo_turma_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='horario',
+            index=models.Index(fields=['periodo_letivo', 'professor', 'dia_semana'], name='horario_periodo_prof_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='horario',
+            index=models.Index(fields=['periodo_letivo', 'sala', 'dia_semana'], name='horario_periodo_sala_idx'),
+        ),
+    ]
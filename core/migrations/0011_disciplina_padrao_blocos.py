@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_horario_indices_periodo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='disciplina',
+            name='padrao_blocos',
+            field=models.CharField(blank=True, help_text='Aulas consecutivas por bloco, somando a carga semanal (ex: 2+2+1); vazio = aulas avulsas', max_length=30, verbose_name='Padrão de Blocos'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_disciplina_padrao_blocos'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notificacaosistema',
+            name='lida',
+            field=models.BooleanField(default=False, help_text='Se a notificação foi lida pelo usuário (notificações pessoais)', verbose_name='Lida'),
+        ),
+        migrations.CreateModel(
+            name='LeituraNotificacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data_leitura', models.DateTimeField(auto_now_add=True, verbose_name='Data de Leitura')),
+                ('notificacao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leituras', to='core.notificacaosistema', verbose_name='Notificação')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leituras_notificacoes', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Leitura de Notificação',
+                'verbose_name_plural': 'Leituras de Notificações',
+                'unique_together': {('notificacao', 'usuario')},
+            },
+        ),
+        migrations.AddField(
+            model_name='notificacaosistema',
+            name='lida_por',
+            field=models.ManyToManyField(blank=True, help_text='Usuários que leram a notificação global', related_name='notificacoes_lidas', through='core.LeituraNotificacao', to=settings.AUTH_USER_MODEL, verbose_name='Lida por'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_leitura_notificacao'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='horariocandidato',
+            name='pontuacao',
+            field=models.FloatField(help_text='Objetivo das restrições flexíveis (core/restricoes.py) com sinal trocado (maior é melhor)', verbose_name='Pontuação'),
+        ),
+    ]
@@ -8,6 +8,13 @@ from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth.models import User
 
+# Tipos de sala, usados por Sala.tipo e Disciplina.tipo_sala
+TIPOS_SALA = [
+    ('normal', 'Sala Normal'),
+    ('laboratorio', 'Laboratório'),
+    ('auditorio', 'Auditório'),
+]
+
 
 class PeriodoLetivo(models.Model):
     """
@@ -300,6 +307,8 @@ class Disciplina(models.Model):
         carga_horaria_semanal: Número de aulas por semana
         curso_area: Curso ou área da disciplina
         periodo_serie: Período ou série da disciplina
+        tipo_sala: Tipo de sala exigido pelas aulas (vazio = qualquer sala)
+        padrao_blocos: Aulas consecutivas por bloco, ex: 2+2+1 (vazio = aulas avulsas)
         ativa: Se a disciplina está ativa no sistema
         criado_em: Data de criação do registro
         atualizado_em: Data da última atualização
@@ -324,6 +333,19 @@ class Disciplina(models.Model):
         verbose_name="Período/Série",
         help_text="Período ou série da disciplina"
     )
+    tipo_sala = models.CharField(
+        max_length=20,
+        choices=TIPOS_SALA,
+        blank=True,
+        verbose_name="Tipo de Sala Exigido",
+        help_text="Tipo de sala exigido pelas aulas (deixe vazio para qualquer sala)"
+    )
+    padrao_blocos = models.CharField(
+        max_length=30,
+        blank=True,
+        verbose_name="Padrão de Blocos",
+        help_text="Aulas consecutivas por bloco, somando a carga semanal (ex: 2+2+1); vazio = aulas avulsas"
+    )
     ativa = models.BooleanField(
         default=True,
         verbose_name="Ativa",
@@ -341,6 +363,27 @@ class Disciplina(models.Model):
         """Representação string do modelo."""
         return f"{self.nome} ({self.periodo_serie})"
 
+    def clean(self):
+        """Validação do padrão de blocos contra a carga horária semanal."""
+        from django.core.exceptions import ValidationError
+        from .blocos import interpretar_padrao
+        
+        try:
+            blocos = interpretar_padrao(self.padrao_blocos)
+        except ValueError as erro:
+            raise ValidationError({'padrao_blocos': str(erro)})
+        if blocos and self.carga_horaria_semanal and sum(blocos) != self.carga_horaria_semanal:
+            raise ValidationError({
+                'padrao_blocos': f"Os blocos somam {sum(blocos)} aulas, mas a carga semanal é "
+                                 f"{self.carga_horaria_semanal}."
+            })
+        self.padrao_blocos = '+'.join(str(bloco) for bloco in blocos)
+
+    def blocos(self):
+        """Tamanhos dos blocos declarados (lista vazia = aulas avulsas)."""
+        from .blocos import interpretar_padrao
+        return interpretar_padrao(self.padrao_blocos)
+
 
 class Sala(models.Model):
     """
@@ -354,11 +397,7 @@ class Sala(models.Model):
         criado_em: Data de criação do registro
         atualizado_em: Data da última atualização
     """
-    TIPOS_SALA = [
-        ('normal', 'Sala Normal'),
-        ('laboratorio', 'Laboratório'),
-        ('auditorio', 'Auditório'),
-    ]
+    TIPOS_SALA = TIPOS_SALA
     
     nome_numero = models.CharField(
         max_length=50,
@@ -470,9 +509,9 @@ class Professor(models.Model):
         """
         # Verificar bloqueios temporários primeiro
         if data_especifica:
-            for bloqueio in self.bloqueios.filter(ativo=True):
-                if not bloqueio.professor_disponivel_na_data(data_especifica, turno):
-                    return False
+            from .intervalos import IndiceCalendario
+            if IndiceCalendario.para_data(data_especifica).professor_bloqueado(self.pk, data_especifica, turno):
+                return False
         
         # Buscar preferências específicas
         preferencias = self.preferencias.all()
@@ -933,6 +972,26 @@ class BloqueioTemporario(models.Model):
         return True
 
 
+class HorarioQuerySet(models.QuerySet):
+    """Consultas de horários particionadas por período letivo."""
+
+    def do_periodo(self, periodo_letivo=None):
+        """
+        Horários de um período letivo (padrão: o período ativo).
+
+        Sem período ativo, retorna os horários sem período, que são os que
+        Horario.save() grava nessa situação.
+        """
+        if periodo_letivo is None:
+            periodo_letivo = PeriodoLetivo.get_periodo_ativo()
+        if periodo_letivo is None:
+            return self.filter(periodo_letivo__isnull=True)
+        return self.filter(periodo_letivo=periodo_letivo)
+
+    def ativos(self):
+        return self.filter(ativo=True)
+
+
 class Horario(models.Model):
     """
     Modelo para representar um horário de aula.
@@ -949,6 +1008,7 @@ class Horario(models.Model):
         periodo_letivo: Período letivo do horário
         ativo: Se o horário está ativo
         observacoes: Observações sobre o horário
+        versao: Contador de alterações (controle de concorrência otimista)
         criado_em: Data de criação do registro
         atualizado_em: Data da última atualização
     """
@@ -1026,13 +1086,28 @@ class Horario(models.Model):
         verbose_name="Ativo",
         help_text="Se o horário está ativo"
     )
+    versao = models.PositiveIntegerField(
+        default=1,
+        editable=False,
+        verbose_name="Versão",
+        help_text="Incrementada a cada alteração; usada para detectar edições concorrentes"
+    )
     criado_em = models.DateTimeField(auto_now_add=True)
     atualizado_em = models.DateTimeField(auto_now=True)
 
+    objects = HorarioQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Horário"
         verbose_name_plural = "Horários"
         ordering = ['dia_semana', 'horario_inicio']
+        # Consultas sempre começam pelo período: semestres antigos ficam fora da faixa lida
+        indexes = [
+            models.Index(fields=['periodo_letivo', 'ativo', 'dia_semana', 'horario_inicio'], name='horario_periodo_grade_idx'),
+            models.Index(fields=['periodo_letivo', 'turma', 'dia_semana'], name='horario_periodo_turma_idx'),
+            models.Index(fields=['periodo_letivo', 'professor', 'dia_semana'], name='horario_periodo_prof_idx'),
+            models.Index(fields=['periodo_letivo', 'sala', 'dia_semana'], name='horario_periodo_sala_idx'),
+        ]
         # Evitar duplicatas exatas
         unique_together = [
             ['turma', 'dia_semana', 'horario_inicio', 'horario_fim', 'periodo_letivo'],
@@ -1044,6 +1119,15 @@ class Horario(models.Model):
         """Representação string do modelo."""
         return f"{self.turma} - {self.disciplina} - {self.get_dia_semana_display()} {self.horario_inicio}-{self.horario_fim}"
 
+    @staticmethod
+    def turno_do_horario(horario_inicio):
+        """Turno ('manha', 'tarde' ou 'noite') em que começa uma aula."""
+        if horario_inicio.hour < 12:
+            return 'manha'
+        if horario_inicio.hour < 18:
+            return 'tarde'
+        return 'noite'
+
     def clean(self):
         """Validação customizada do modelo."""
         from django.core.exceptions import ValidationError
@@ -1058,6 +1142,13 @@ class Horario(models.Model):
                 f"mas a turma {self.turma.nome_codigo} possui {self.turma.numero_alunos} alunos."
             )
         
+        # Verificar se a sala é do tipo exigido pela disciplina
+        if self.disciplina.tipo_sala and self.sala.tipo != self.disciplina.tipo_sala:
+            raise ValidationError(
+                f"A disciplina {self.disciplina.nome} exige {self.disciplina.get_tipo_sala_display()}, "
+                f"mas a sala {self.sala.nome_numero} é do tipo {self.sala.get_tipo_display()}."
+            )
+        
         # Verificar se a turma pode ter aula neste turno
         if not self.turma.pode_ter_aula_no_turno(self.turno):
             raise ValidationError(
@@ -1072,23 +1163,18 @@ class Horario(models.Model):
                     f"Professor {self.professor.nome_completo} não está habilitado para lecionar {self.disciplina.nome}."
                 )
         
-        # Verificar eventos acadêmicos que impedem aulas
-        if self.periodo_letivo:
-            from datetime import date, timedelta
-            # Simulação de uma data para verificação (em um cenário real, seria baseado no período)
-            data_exemplo = self.periodo_letivo.data_inicio + timedelta(days=self.dia_semana)
-            eventos_conflitantes = EventoAcademico.objects.filter(
-                periodo_letivo=self.periodo_letivo,
-                ativo=True,
-                afeta_aulas=True
+        # Eventos e bloqueios que impedem a aula em todas as semanas do período;
+        # os que atingem só algumas datas não invalidam o horário semanal
+        from .ocupacao import DisponibilidadePeriodo
+        disponibilidade = DisponibilidadePeriodo.do_periodo(self.periodo_letivo)
+        
+        for evento in disponibilidade.eventos_no_slot(self.dia_semana, self.turno):
+            raise ValidationError(f"Conflito com evento acadêmico: {evento}")
+        
+        if not disponibilidade.disponivel(self.professor_id, self.dia_semana, self.turno):
+            raise ValidationError(
+                f"Professor {self.professor} tem bloqueio neste dia e turno em todas as semanas do período."
             )
-            
-            for evento in eventos_conflitantes:
-                if evento.conflita_com_data(data_exemplo, self.turno):
-                    raise ValidationError(
-                        f"Conflito com evento acadêmico: {evento.nome} "
-                        f"({evento.data_inicio.strftime('%d/%m/%Y')} a {evento.data_fim.strftime('%d/%m/%Y')})"
-                    )
         
         # Verificar se o professor está disponível neste horário
         if not self.professor.disponivel_para_horario(
@@ -1171,6 +1257,7 @@ class Horario(models.Model):
                     'ativo': obj_anterior.ativo,
                 }
                 acao = 'modificado'
+                self.versao = obj_anterior.versao + 1
             except Horario.DoesNotExist:
                 pass
         
@@ -1209,22 +1296,167 @@ class Horario(models.Model):
             ativo=True
         ).count()
     
-    def validar_carga_horaria_completa(self):
+    def validar_carga_horaria_completa(self, matriz=None):
         """
         Verifica se a carga horária da disciplina está completa para a turma.
         
+        Args:
+            matriz: MatrizCargaHoraria já carregada (opcional). Ao validar
+                vários horários, passe a mesma matriz para evitar uma
+                contagem por horário.
+        
         Returns:
             tuple: (bool, str) - (está_completa, mensagem)
         """
-        carga_atual = self.get_carga_horaria_semanal_turma_disciplina()
-        carga_necessaria = self.disciplina.carga_horaria_semanal
+        from .carga_horaria import MatrizCargaHoraria
         
-        if carga_atual < carga_necessaria:
-            return False, f"Faltam {carga_necessaria - carga_atual} aulas de {self.disciplina.nome} para a turma {self.turma.nome_codigo}"
-        elif carga_atual > carga_necessaria:
-            return False, f"Excesso de {carga_atual - carga_necessaria} aulas de {self.disciplina.nome} para a turma {self.turma.nome_codigo}"
+        if matriz is None:
+            matriz = MatrizCargaHoraria(
+                turmas=[self.turma],
+                horarios=Horario.objects.filter(periodo_letivo=self.periodo_letivo, ativo=True)
+            )
+        
+        return matriz.situacao(self.turma_id, self.disciplina_id)
+
+
+class HorarioCandidato(models.Model):
+    """
+    Quadro de horários gerado e guardado para avaliação, sem alterar Horario.
+    
+    Attributes:
+        nome: Identificação livre do candidato
+        periodo_letivo: Período letivo para o qual o quadro foi gerado
+        turmas: Pks das turmas geradas (as únicas alteradas na promoção)
+        semente: Semente do gerador (reproduz a mesma execução)
+        pontuacao: Objetivo das restrições com sinal trocado (maior é melhor)
+        total_aulas: Número de aulas das turmas geradas
+        dados: QuadroCompacto serializado (core/quadro_compacto.py)
+        parametros: Opções usadas na geração
+        criado_por: Usuário que disparou a geração
+        criado_em: Data de criação do registro
+        promovido_em: Quando o candidato foi aplicado aos horários
+    """
+    nome = models.CharField(
+        max_length=100,
+        verbose_name="Nome",
+        blank=True
+    )
+    periodo_letivo = models.ForeignKey(
+        PeriodoLetivo,
+        on_delete=models.CASCADE,
+        verbose_name="Período Letivo",
+        related_name="candidatos",
+        null=True,
+        blank=True
+    )
+    turmas = models.JSONField(
+        verbose_name="Turmas",
+        default=list,
+        help_text="Pks das turmas geradas neste candidato"
+    )
+    semente = models.BigIntegerField(
+        verbose_name="Semente"
+    )
+    pontuacao = models.FloatField(
+        verbose_name="Pontuação",
+        help_text="Objetivo das restrições flexíveis (core/restricoes.py) com sinal trocado (maior é melhor)"
+    )
+    total_aulas = models.PositiveIntegerField(
+        verbose_name="Total de Aulas",
+        default=0
+    )
+    dados = models.BinaryField(
+        verbose_name="Quadro Serializado"
+    )
+    parametros = models.JSONField(
+        verbose_name="Parâmetros",
+        default=dict,
+        blank=True
+    )
+    criado_por = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        verbose_name="Criado por",
+        null=True,
+        blank=True
+    )
+    criado_em = models.DateTimeField(auto_now_add=True)
+    promovido_em = models.DateTimeField(
+        verbose_name="Promovido em",
+        null=True,
+        blank=True
+    )
+    
+    class Meta:
+        verbose_name = "Horário Candidato"
+        verbose_name_plural = "Horários Candidatos"
+        ordering = ['-criado_em']
+    
+    def __str__(self):
+        """Representação string do modelo."""
+        return self.nome or f"Candidato #{self.pk}"
+    
+    def quadro(self):
+        """QuadroCompacto guardado, com os objetos do catálogo carregados."""
+        from .quadro_compacto import QuadroCompacto
+        
+        quadro = QuadroCompacto.desserializar(bytes(self.dados))
+        quadro.catalogo.carregar_objetos()
+        return quadro
+
+
+class NotificacaoQuerySet(models.QuerySet):
+    """Visibilidade e estado de leitura das notificações por usuário."""
+
+    def visiveis(self, usuario):
+        """
+        Notificações ativas e não expiradas que o usuário vê: as globais e,
+        se autenticado, as dele, anotadas com `lida_pelo_usuario`.
+        """
+        from django.utils import timezone
+        
+        visiveis = self.filter(
+            models.Q(data_expiracao__isnull=True) | models.Q(data_expiracao__gt=timezone.now()),
+            ativa=True,
+        )
+        if usuario is not None and usuario.is_authenticated:
+            visiveis = visiveis.filter(models.Q(usuario__isnull=True) | models.Q(usuario=usuario))
         else:
-            return True, f"Carga horária completa para {self.disciplina.nome} na turma {self.turma.nome_codigo}"
+            visiveis = visiveis.filter(usuario__isnull=True)
+        return visiveis.com_leitura(usuario)
+
+    def com_leitura(self, usuario):
+        """
+        Anota `lida_pelo_usuario`: o campo `lida` nas notificações pessoais
+        e a existência de uma LeituraNotificacao do usuário nas globais.
+        """
+        usuario_id = usuario.pk if usuario is not None and usuario.is_authenticated else None
+        leitura = LeituraNotificacao.objects.filter(notificacao=models.OuterRef('pk'), usuario_id=usuario_id)
+        return self.annotate(lida_pelo_usuario=models.Case(
+            models.When(usuario__isnull=False, then=models.F('lida')),
+            default=models.Exists(leitura),
+            output_field=models.BooleanField(),
+        ))
+
+    def marcar_como_lidas(self, usuario):
+        """
+        Marca as notificações como lidas para o usuário, sem afetar o que
+        os demais usuários veem nas globais.
+
+        Returns:
+            int: Quantidade de notificações que passaram a estar lidas
+        """
+        from django.utils import timezone
+        
+        agora = timezone.now()
+        nao_lidas = self.com_leitura(usuario).filter(lida_pelo_usuario=False)
+        pessoais = nao_lidas.filter(usuario=usuario).update(lida=True, data_leitura=agora)
+        globais = [
+            LeituraNotificacao(notificacao_id=pk, usuario=usuario)
+            for pk in nao_lidas.filter(usuario__isnull=True).values_list('pk', flat=True)
+        ]
+        LeituraNotificacao.objects.bulk_create(globais, ignore_conflicts=True)
+        return pessoais + len(globais)
 
 
 class NotificacaoSistema(models.Model):
@@ -1283,7 +1515,7 @@ class NotificacaoSistema(models.Model):
     lida = models.BooleanField(
         default=False,
         verbose_name="Lida",
-        help_text="Se a notificação foi lida pelo usuário"
+        help_text="Se a notificação foi lida pelo usuário (notificações pessoais)"
     )
     data_leitura = models.DateTimeField(
         verbose_name="Data de Leitura",
@@ -1313,6 +1545,16 @@ class NotificacaoSistema(models.Model):
         blank=True,
         help_text="Data em que a notificação expira (opcional)"
     )
+    lida_por = models.ManyToManyField(
+        User,
+        through='LeituraNotificacao',
+        related_name="notificacoes_lidas",
+        blank=True,
+        verbose_name="Lida por",
+        help_text="Usuários que leram a notificação global"
+    )
+    
+    objects = NotificacaoQuerySet.as_manager()
     
     class Meta:
         verbose_name = "Notificação do Sistema"
@@ -1328,9 +1570,17 @@ class NotificacaoSistema(models.Model):
         usuario_str = self.usuario.username if self.usuario else "Global"
         return f"{self.titulo} - {usuario_str} ({self.get_tipo_display()})"
     
-    def marcar_como_lida(self):
-        """Marca a notificação como lida."""
+    def marcar_como_lida(self, usuario=None):
+        """
+        Marca a notificação como lida.
+        
+        Notificações globais guardam a leitura por usuário (LeituraNotificacao);
+        continuam não lidas para os demais.
+        """
         from django.utils import timezone
+        if self.usuario_id is None and usuario is not None:
+            LeituraNotificacao.objects.get_or_create(notificacao=self, usuario=usuario)
+            return
         self.lida = True
         self.data_leitura = timezone.now()
         self.save(update_fields=['lida', 'data_leitura'])
@@ -1416,3 +1666,38 @@ class NotificacaoSistema(models.Model):
                 'alterado_por': usuario.username if usuario else 'Sistema',
             }
         )
+
+
+class LeituraNotificacao(models.Model):
+    """
+    Leitura de uma notificação global por um usuário.
+    
+    Attributes:
+        notificacao: Notificação global lida
+        usuario: Usuário que a leu
+        data_leitura: Quando foi lida
+    """
+    notificacao = models.ForeignKey(
+        NotificacaoSistema,
+        on_delete=models.CASCADE,
+        related_name="leituras",
+        verbose_name="Notificação"
+    )
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="leituras_notificacoes",
+        verbose_name="Usuário"
+    )
+    data_leitura = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Data de Leitura"
+    )
+    
+    class Meta:
+        verbose_name = "Leitura de Notificação"
+        verbose_name_plural = "Leituras de Notificações"
+        unique_together = ['notificacao', 'usuario']
+    
+    def __str__(self):
+        return f"{self.notificacao.titulo} - {self.usuario.username}"
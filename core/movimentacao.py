@@ -0,0 +1,417 @@
+"""
+Movimentação de horários em lote (arrastar e soltar na grade).
+
+Um lote de operações ('mover' e 'trocar') é validado de uma vez contra a
+ocupação dos dias afetados, montada em memória, e gravado atomicamente
+com bulk_update. Cada operação informa a versão do horário que o cliente
+viu; se alguém alterou o horário nesse meio tempo, o lote inteiro é
+recusado (compare-and-swap sobre Horario.versao).
+
+AlteracaoEmLote reaproveita a mesma validação para as ações em massa do
+admin (ativar, desativar, trocar professor, sala ou período).
+"""
+
+from datetime import datetime
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .cache import incrementar_versao_dados
+from .eventos import publicar_apos_commit, serializar_horario
+from .grade import SLOTS_GRADE
+from .models import AuditoriaHorario, Horario, PreferenciaProfessor, Professor, Sala
+from .ocupacao import DisponibilidadePeriodo, preferencia_aplicavel
+
+
+class MovimentacaoHorarios:
+    """
+    Aplica um lote de movimentações de horários.
+
+    Formato das operações:
+        {"tipo": "mover", "horario_id": 1, "versao": 3, "novo_dia": 0,
+         "novo_inicio": "07:00", "novo_fim": "07:50", "nova_sala_id": 2}
+        {"tipo": "trocar", "horario_id": 1, "versao": 3,
+         "outro_id": 2, "outra_versao": 5}
+
+    "nova_sala_id" é opcional. O destino precisa ser um dia de
+    Horario.DIAS_SEMANA e um slot da tabela canônica (core/grade.py), que
+    também define o turno. Na troca, os dois horários trocam de dia e
+    horário e cada um mantém sua sala. As operações são aplicadas em
+    ordem, de modo que um mesmo horário pode aparecer em mais de uma.
+    """
+
+    CAMPOS_POSICAO = ['dia_semana', 'horario_inicio', 'horario_fim', 'turno', 'sala']
+
+    # (início, fim) → turno dos slots aceitos como destino
+    TURNO_DO_SLOT = {(inicio, fim): turno for turno, inicio, fim in SLOTS_GRADE}
+
+    def __init__(self, usuario=None):
+        self.usuario = usuario
+        self.erros = []
+        self.desatualizados = []
+
+    def aplicar(self, operacoes):
+        """
+        Valida e aplica o lote.
+
+        Returns:
+            dict: 'sucesso', 'horarios' (estado final serializado), 'erros'
+                e 'desatualizados' (ids cuja versão não confere)
+        """
+        self.erros, self.desatualizados = [], []
+
+        versoes = self._versoes_informadas(operacoes)
+        if self.erros:
+            return self._resultado()
+
+        with transaction.atomic():
+            horarios = Horario.objects.select_for_update().select_related(
+                'turma', 'disciplina', 'professor', 'sala'
+            ).in_bulk(list(versoes))
+
+            for horario_id, versao in versoes.items():
+                if horario_id not in horarios:
+                    self.erros.append(f"Horário {horario_id} não encontrado")
+                elif horarios[horario_id].versao != versao:
+                    self.desatualizados.append(horario_id)
+            if self.erros or self.desatualizados:
+                return self._resultado()
+
+            anteriores = {pk: self._posicao(horario) for pk, horario in horarios.items()}
+            self._aplicar_em_memoria(operacoes, horarios)
+            if self.erros:
+                return self._resultado()
+
+            alterados = [
+                horario for pk, horario in horarios.items()
+                if self._posicao(horario) != anteriores[pk]
+            ]
+            self._validar(alterados)
+            if self.erros:
+                return self._resultado()
+
+            if alterados:
+                self._gravar(alterados, versoes, anteriores)
+                if self.desatualizados:
+                    return self._resultado()
+
+        return self._resultado(horarios.values())
+
+    def _resultado(self, horarios=()):
+        return {
+            'sucesso': not (self.erros or self.desatualizados),
+            'horarios': [serializar_horario(horario) for horario in horarios],
+            'erros': self.erros,
+            'desatualizados': self.desatualizados,
+        }
+
+    def _versoes_informadas(self, operacoes):
+        """Mapa horario_id → versão esperada, a partir das operações."""
+        versoes = {}
+        if not isinstance(operacoes, list):
+            self.erros.append("Informe as operações em uma lista")
+            return versoes
+        if not operacoes:
+            self.erros.append("Nenhuma operação informada")
+
+        for indice, operacao in enumerate(operacoes, start=1):
+            if not isinstance(operacao, dict):
+                self.erros.append(f"Operação {indice}: deve ser um objeto com tipo, horario_id e versao")
+                continue
+            pares = [('horario_id', 'versao')]
+            if operacao.get('tipo') == 'trocar':
+                pares.append(('outro_id', 'outra_versao'))
+            elif operacao.get('tipo') != 'mover':
+                self.erros.append(f"Operação {indice}: tipo deve ser 'mover' ou 'trocar'")
+                continue
+
+            for campo_id, campo_versao in pares:
+                try:
+                    horario_id = int(operacao[campo_id])
+                    versao = int(operacao[campo_versao])
+                except (KeyError, TypeError, ValueError):
+                    self.erros.append(f"Operação {indice}: informe {campo_id} e {campo_versao}")
+                    continue
+                if versoes.setdefault(horario_id, versao) != versao:
+                    self.erros.append(f"Operação {indice}: versões diferentes para o horário {horario_id}")
+
+        return versoes
+
+    def validar(self, horarios):
+        """
+        Erros de um conjunto de horários novos ou alterados, ainda não gravados.
+
+        Mesmas regras do lote de movimentação (as de Horario.clean), conferidas
+        de uma vez contra os demais horários ativos; usada na promoção de
+        candidatos.
+        """
+        self.erros = []
+        self._validar(horarios)
+        return self.erros
+
+    def _posicao(self, horario):
+        return tuple(getattr(horario, campo) for campo in self.CAMPOS_POSICAO)
+
+    def _aplicar_em_memoria(self, operacoes, horarios):
+        """Aplica as operações sobre os objetos carregados, sem gravar."""
+        ids_salas = {int(op['nova_sala_id']) for op in operacoes if op.get('nova_sala_id')}
+        salas = Sala.objects.filter(ativa=True).in_bulk(ids_salas) if ids_salas else {}
+
+        for indice, operacao in enumerate(operacoes, start=1):
+            horario = horarios[int(operacao['horario_id'])]
+
+            if operacao['tipo'] == 'trocar':
+                outro = horarios[int(operacao['outro_id'])]
+                for campo in ['dia_semana', 'horario_inicio', 'horario_fim', 'turno']:
+                    valor = getattr(horario, campo)
+                    setattr(horario, campo, getattr(outro, campo))
+                    setattr(outro, campo, valor)
+                continue
+
+            try:
+                dia = int(operacao['novo_dia'])
+                inicio = datetime.strptime(operacao['novo_inicio'], '%H:%M').time()
+                fim = datetime.strptime(operacao['novo_fim'], '%H:%M').time()
+            except (KeyError, TypeError, ValueError):
+                self.erros.append(f"Operação {indice}: informe novo_dia, novo_inicio e novo_fim (HH:MM)")
+                continue
+            if dia not in dict(Horario.DIAS_SEMANA):
+                self.erros.append(f"Operação {indice}: dia {dia} inválido")
+                continue
+            if (inicio, fim) not in self.TURNO_DO_SLOT:
+                self.erros.append(
+                    f"Operação {indice}: {inicio:%H:%M}-{fim:%H:%M} não é um horário da grade"
+                )
+                continue
+            horario.dia_semana, horario.horario_inicio, horario.horario_fim = dia, inicio, fim
+            horario.turno = self.TURNO_DO_SLOT[(inicio, fim)]
+
+            if operacao.get('nova_sala_id'):
+                sala = salas.get(int(operacao['nova_sala_id']))
+                if sala is None:
+                    self.erros.append(f"Operação {indice}: sala {operacao['nova_sala_id']} não encontrada ou inativa")
+                    continue
+                horario.sala = sala
+
+    def _validar(self, alterados):
+        """
+        Confere os horários alterados com as regras de Horario.clean.
+
+        Uma única consulta carrega os demais horários ativos dos dias de
+        destino; habilitações e preferências dos professores vêm em uma
+        consulta cada, e bloqueios e eventos da DisponibilidadePeriodo.
+        Professor, turma e sala são conferidos em memória.
+        """
+        ativos = [horario for horario in alterados if horario.ativo]
+        if not ativos:
+            return
+
+        professores = {horario.professor_id for horario in ativos}
+        habilitacoes = {}
+        for professor_id, disciplina_id in Professor.disciplinas.through.objects.filter(
+            professor_id__in=professores
+        ).values_list('professor_id', 'disciplina_id'):
+            habilitacoes.setdefault(professor_id, set()).add(disciplina_id)
+        preferencias = {}
+        for preferencia in PreferenciaProfessor.objects.filter(professor_id__in=professores):
+            preferencias.setdefault(preferencia.professor_id, []).append(preferencia)
+        calendarios = {}
+
+        for horario in ativos:
+            if horario.horario_inicio >= horario.horario_fim:
+                self.erros.append(f"{horario}: horário de início deve ser anterior ao horário de fim")
+            if horario.sala.capacidade < horario.turma.numero_alunos:
+                self.erros.append(
+                    f"{horario}: sala {horario.sala.nome_numero} comporta {horario.sala.capacidade} alunos, "
+                    f"a turma tem {horario.turma.numero_alunos}"
+                )
+            if horario.disciplina.tipo_sala and horario.sala.tipo != horario.disciplina.tipo_sala:
+                self.erros.append(
+                    f"{horario}: {horario.disciplina.nome} exige sala do tipo {horario.disciplina.get_tipo_sala_display()}"
+                )
+            if not horario.turma.pode_ter_aula_no_turno(horario.turno):
+                self.erros.append(f"{horario}: turma {horario.turma.nome_codigo} não tem aulas neste turno")
+            if habilitacoes.get(horario.professor_id) and horario.disciplina_id not in habilitacoes[horario.professor_id]:
+                self.erros.append(
+                    f"{horario}: professor {horario.professor} não está habilitado para {horario.disciplina.nome}"
+                )
+
+            if horario.periodo_letivo_id not in calendarios:
+                calendarios[horario.periodo_letivo_id] = DisponibilidadePeriodo.do_periodo(horario.periodo_letivo)
+            calendario = calendarios[horario.periodo_letivo_id]
+            eventos = calendario.eventos_no_slot(horario.dia_semana, horario.turno)
+            if eventos:
+                self.erros.append(f"{horario}: conflito com evento acadêmico {eventos[0]}")
+            disponivel = calendario.disponivel(horario.professor_id, horario.dia_semana, horario.turno) and (
+                preferencia_aplicavel(
+                    preferencias.get(horario.professor_id, []), horario.dia_semana, horario.turno, horario.disciplina_id
+                )
+            )
+            if not disponivel:
+                self.erros.append(f"Professor {horario.professor} não está disponível neste horário: {horario}")
+
+        # Ocupação: (período, dia, recurso, id do recurso) → [(início, fim, descrição)]
+        ocupacao = {}
+        outros = Horario.objects.filter(
+            ativo=True,
+            dia_semana__in={horario.dia_semana for horario in ativos},
+        ).exclude(pk__in=[horario.pk for horario in alterados]).values_list(
+            'periodo_letivo_id', 'dia_semana', 'horario_inicio', 'horario_fim',
+            'professor_id', 'turma_id', 'sala_id', 'disciplina__nome'
+        )
+        for periodo_id, dia, inicio, fim, professor_id, turma_id, sala_id, disciplina in outros:
+            for recurso in (('professor', professor_id), ('turma', turma_id), ('sala', sala_id)):
+                ocupacao.setdefault((periodo_id, dia) + recurso, []).append(
+                    (inicio, fim, f"{disciplina} ({inicio:%H:%M}-{fim:%H:%M})")
+                )
+
+        for horario in ativos:
+            recursos = (
+                ('professor', horario.professor_id, f"Professor {horario.professor}"),
+                ('turma', horario.turma_id, f"Turma {horario.turma}"),
+                ('sala', horario.sala_id, f"Sala {horario.sala}"),
+            )
+            for recurso, recurso_id, nome in recursos:
+                chave = (horario.periodo_letivo_id, horario.dia_semana, recurso, recurso_id)
+                ocupados = ocupacao.setdefault(chave, [])
+                for inicio, fim, descricao in ocupados:
+                    if horario.horario_inicio < fim and horario.horario_fim > inicio:
+                        self.erros.append(f"{nome} já possui aula neste horário: {descricao}")
+                        break
+                ocupados.append((
+                    horario.horario_inicio, horario.horario_fim,
+                    f"{horario.disciplina.nome} ({horario.horario_inicio:%H:%M}-{horario.horario_fim:%H:%M})"
+                ))
+
+    def _gravar(self, alterados, versoes, anteriores):
+        """Grava o lote; desfaz tudo se alguma versão mudou desde a leitura."""
+        # Passo 1 (compare-and-swap): reserva as linhas conferindo a versão e
+        # estaciona cada uma num dia inválido e único, para que trocas não
+        # esbarrem nas restrições unique_together durante a gravação.
+        condicao = reduce(or_, (Q(pk=horario.pk, versao=versoes[horario.pk]) for horario in alterados))
+        reservadas = Horario.objects.filter(condicao).update(dia_semana=-F('id'))
+        if reservadas != len(alterados):
+            atuais = dict(Horario.objects.filter(
+                pk__in=[horario.pk for horario in alterados]
+            ).values_list('pk', 'versao'))
+            self.desatualizados = [pk for pk in atuais if atuais[pk] != versoes[pk]]
+            transaction.set_rollback(True)
+            return
+
+        # Passo 2: posições finais
+        agora = timezone.now()
+        for horario in alterados:
+            horario.versao += 1
+            horario.atualizado_em = agora
+        Horario.objects.bulk_update(alterados, self.CAMPOS_POSICAO + ['versao', 'atualizado_em'])
+
+        AuditoriaHorario.objects.bulk_create([
+            AuditoriaHorario(
+                horario=horario,
+                acao='movido',
+                usuario=self.usuario,
+                dados_anteriores=self._dados_auditoria(anteriores[horario.pk]),
+                dados_novos=self._dados_auditoria(self._posicao(horario)),
+                observacoes="Horário movido em lote via grade"
+            )
+            for horario in alterados
+        ])
+
+        # bulk_update não dispara sinais: invalidar cache e publicar eventos explicitamente
+        transaction.on_commit(incrementar_versao_dados)
+        for horario in alterados:
+            publicar_apos_commit('horario', {'acao': 'alterado', 'horario': serializar_horario(horario)})
+
+    def _dados_auditoria(self, posicao):
+        dia, inicio, fim, turno, sala = posicao
+        return {
+            'dia_semana': dia,
+            'turno': turno,
+            'horario_inicio': inicio.strftime('%H:%M'),
+            'horario_fim': fim.strftime('%H:%M'),
+            'sala': str(sala),
+        }
+
+
+class AlteracaoEmLote(MovimentacaoHorarios):
+    """
+    Alterações em massa feitas pelo admin: ativar, desativar e trocar
+    professor, sala ou período letivo dos horários selecionados.
+
+    Os horários são alterados em memória, validados de uma vez com as mesmas
+    regras da movimentação e gravados com bulk_update, sem passar por
+    Horario.save (e por Horario.clean) linha a linha.
+    """
+
+    CAMPOS = ['ativo', 'professor', 'sala', 'periodo_letivo']
+
+    def aplicar(self, horarios, campo, valor):
+        """
+        Args:
+            horarios: QuerySet dos horários selecionados
+            campo: Um de CAMPOS
+            valor: Novo valor (bool para 'ativo', instância nos demais)
+
+        Returns:
+            dict: 'sucesso', 'alterados' (quantidade) e 'erros'
+        """
+        if campo not in self.CAMPOS:
+            raise ValueError(f"Campo não suportado: {campo}")
+        self.erros = []
+
+        with transaction.atomic():
+            selecionados = list(horarios.select_for_update().select_related('turma', 'disciplina', 'professor', 'sala'))
+            anteriores = {horario.pk: self._dados_horario(horario) for horario in selecionados}
+
+            for horario in selecionados:
+                setattr(horario, campo, valor)
+            alterados = [horario for horario in selecionados if self._dados_horario(horario) != anteriores[horario.pk]]
+
+            if campo != 'ativo' or valor:
+                self._validar(alterados)
+            if self.erros or not alterados:
+                return {'sucesso': not self.erros, 'alterados': 0, 'erros': self.erros}
+
+            agora = timezone.now()
+            for horario in alterados:
+                horario.versao += 1
+                horario.atualizado_em = agora
+            Horario.objects.bulk_update(alterados, [campo, 'versao', 'atualizado_em'], batch_size=500)
+
+            acao = ('ativado' if valor else 'desativado') if campo == 'ativo' else 'modificado'
+            AuditoriaHorario.objects.bulk_create([
+                AuditoriaHorario(
+                    horario=horario,
+                    acao=acao,
+                    usuario=self.usuario,
+                    dados_anteriores=anteriores[horario.pk],
+                    dados_novos=self._dados_horario(horario),
+                    observacoes="Horário alterado em massa via admin"
+                )
+                for horario in alterados
+            ], batch_size=500)
+
+            # bulk_update não dispara sinais: invalidar cache e publicar eventos explicitamente
+            transaction.on_commit(incrementar_versao_dados)
+            for horario in alterados:
+                publicar_apos_commit('horario', {'acao': 'alterado', 'horario': serializar_horario(horario)})
+
+        return {'sucesso': True, 'alterados': len(alterados), 'erros': []}
+
+    def _dados_horario(self, horario):
+        """Mesmos dados que Horario.save grava na auditoria, mais o período letivo."""
+        return {
+            'turma': str(horario.turma),
+            'disciplina': str(horario.disciplina),
+            'professor': str(horario.professor),
+            'sala': str(horario.sala),
+            'dia_semana': horario.dia_semana,
+            'turno': horario.turno,
+            'horario_inicio': horario.horario_inicio.strftime('%H:%M'),
+            'horario_fim': horario.horario_fim.strftime('%H:%M'),
+            'ativo': horario.ativo,
+            'periodo_letivo_id': horario.periodo_letivo_id,
+        }
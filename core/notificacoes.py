@@ -0,0 +1,226 @@
+"""
+Verificação periódica do estado do sistema para notificações.
+
+Os problemas detectados (conflitos de professor, salas sem capacidade,
+professores sem horários, salas subutilizadas) são gravados como
+NotificacaoSistema. A API de notificações apenas lê essa tabela; a
+verificação roda fora da requisição: pelo comando
+`manage.py verificar_notificacoes` ou em uma thread disparada quando os
+dados mudaram desde a última verificação.
+"""
+
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, F, Q
+from django.urls import reverse
+
+from .cache import get_versao_dados, incrementar_versao_notificacoes
+from .eventos import canal
+from .models import Horario, NotificacaoSistema, PeriodoLetivo, Professor, Sala
+
+
+# Marca, em dados_contexto, as notificações mantidas pelo verificador
+ORIGEM_VERIFICADOR = 'verificador'
+
+CHAVE_VERSAO_VERIFICADA = 'core:notificacoes:versao_verificada'
+CHAVE_VERIFICACAO_EM_ANDAMENTO = 'core:notificacoes:verificando'
+
+# Intervalo mínimo entre duas verificações disparadas pela API (segundos)
+INTERVALO_VERIFICACAO = 30
+
+# Salas com menos horários semanais que isso são consideradas subutilizadas
+MINIMO_HORARIOS_SALA = 5
+
+
+class VerificadorNotificacoes:
+    """
+    Detecta problemas no quadro de horários e sincroniza as notificações.
+
+    Cada problema tem uma chave estável (ex: 'capacidade:42'); notificações
+    já existentes são preservadas, inclusive o estado de leitura, e as
+    que deixaram de valer são desativadas. Só os horários do período
+    letivo ativo são verificados.
+    """
+
+    def __init__(self, periodo_letivo=None):
+        self.periodo_letivo = periodo_letivo or PeriodoLetivo.get_periodo_ativo()
+
+    def _horarios(self):
+        return Horario.objects.do_periodo(self.periodo_letivo).ativos()
+
+    def _filtro_horarios(self):
+        """Filtro das anotações sobre horarios__ (mesmo recorte de _horarios)."""
+        if self.periodo_letivo:
+            return Q(horarios__ativo=True, horarios__periodo_letivo=self.periodo_letivo)
+        return Q(horarios__ativo=True, horarios__periodo_letivo__isnull=True)
+
+    def detectar(self):
+        """
+        Executa todas as verificações.
+
+        Returns:
+            dict: chave do problema → campos da notificação
+        """
+        problemas = {}
+        for verificacao in (
+            self._conflitos_professor,
+            self._capacidade_salas,
+            self._professores_sem_horarios,
+            self._salas_subutilizadas,
+        ):
+            for chave, dados in verificacao():
+                problemas[chave] = dados
+        return problemas
+
+    def _conflitos_professor(self):
+        """Professores com mais de uma aula no mesmo dia e horário (uma consulta agrupada)."""
+        conflitos = self._horarios().values(
+            'professor_id', 'professor__nome_completo', 'dia_semana', 'horario_inicio'
+        ).annotate(total=Count('id')).filter(total__gt=1)
+
+        dias = dict(Horario.DIAS_SEMANA)
+        for conflito in conflitos:
+            chave = f"conflito_professor:{conflito['professor_id']}:{conflito['dia_semana']}:{conflito['horario_inicio']:%H%M}"
+            yield chave, {
+                'titulo': 'Conflito de Horário Detectado',
+                'mensagem': (
+                    f"Professor {conflito['professor__nome_completo']} tem {conflito['total']} aulas "
+                    f"na {dias.get(conflito['dia_semana'], conflito['dia_semana'])} às {conflito['horario_inicio']:%H:%M}"
+                ),
+                'tipo': 'conflito',
+                'prioridade': 'alta',
+                'link_acao': reverse('core:horario_list'),
+            }
+
+    def _capacidade_salas(self):
+        """Horários em salas menores que a turma (uma consulta)."""
+        horarios = self._horarios().filter(
+            sala__capacidade__lt=F('turma__numero_alunos')
+        ).values('id', 'sala__nome_numero', 'sala__capacidade', 'turma__nome_codigo', 'turma__numero_alunos')
+
+        for horario in horarios:
+            yield f"capacidade:{horario['id']}", {
+                'titulo': 'Problema de Capacidade',
+                'mensagem': (
+                    f"Sala {horario['sala__nome_numero']} (cap. {horario['sala__capacidade']}) insuficiente "
+                    f"para turma {horario['turma__nome_codigo']} ({horario['turma__numero_alunos']} alunos)"
+                ),
+                'tipo': 'aviso',
+                'prioridade': 'normal',
+                'link_acao': reverse('core:horario_update', args=[horario['id']]),
+            }
+
+    def _professores_sem_horarios(self):
+        """Professores ativos sem nenhum horário ativo (uma consulta)."""
+        professores = Professor.objects.filter(ativo=True).annotate(
+            total=Count('horarios', filter=self._filtro_horarios())
+        ).filter(total=0).values('id', 'nome_completo')
+
+        for professor in professores:
+            yield f"professor_sem_horario:{professor['id']}", {
+                'titulo': 'Professor sem Horários',
+                'mensagem': f"Professor {professor['nome_completo']} não possui horários atribuídos",
+                'tipo': 'aviso',
+                'prioridade': 'baixa',
+                'link_acao': reverse('core:professor_detail', args=[professor['id']]),
+            }
+
+    def _salas_subutilizadas(self):
+        """Salas ativas com poucos horários semanais (uma consulta)."""
+        salas = Sala.objects.filter(ativa=True).annotate(
+            total=Count('horarios', filter=self._filtro_horarios())
+        ).filter(total__lt=MINIMO_HORARIOS_SALA).values('id', 'nome_numero', 'total')
+
+        for sala in salas:
+            yield f"sala_subutilizada:{sala['id']}", {
+                'titulo': 'Sala Sub-utilizada',
+                'mensagem': f"Sala {sala['nome_numero']} tem baixa ocupação ({sala['total']} horários)",
+                'tipo': 'aviso',
+                'prioridade': 'baixa',
+                'link_acao': reverse('core:sala_detail', args=[sala['id']]),
+            }
+
+    def sincronizar(self):
+        """
+        Grava os problemas atuais como notificações globais.
+
+        Returns:
+            dict: Quantidades de notificações criadas, atualizadas e desativadas
+        """
+        versao = get_versao_dados()
+        problemas = self.detectar()
+
+        with transaction.atomic():
+            existentes = {
+                notificacao.dados_contexto.get('chave'): notificacao
+                for notificacao in NotificacaoSistema.objects.filter(
+                    usuario__isnull=True, ativa=True, dados_contexto__origem=ORIGEM_VERIFICADOR
+                )
+            }
+
+            novas, alteradas = [], []
+            for chave, dados in problemas.items():
+                notificacao = existentes.pop(chave, None)
+                if notificacao is None:
+                    novas.append(NotificacaoSistema(
+                        dados_contexto={'origem': ORIGEM_VERIFICADOR, 'chave': chave},
+                        **dados
+                    ))
+                elif notificacao.mensagem != dados['mensagem']:
+                    notificacao.mensagem = dados['mensagem']
+                    alteradas.append(notificacao)
+
+            NotificacaoSistema.objects.bulk_create(novas)
+            NotificacaoSistema.objects.bulk_update(alteradas, ['mensagem'])
+            NotificacaoSistema.objects.filter(
+                pk__in=[notificacao.pk for notificacao in existentes.values()]
+            ).update(ativa=False)
+
+        # Escritas em lote não disparam sinais: invalidar e avisar explicitamente
+        if novas or alteradas or existentes:
+            incrementar_versao_notificacoes()
+            canal.publicar('notificacao', {
+                'acao': 'sincronizadas',
+                'criadas': len(novas),
+                'desativadas': len(existentes),
+            })
+        cache.set(CHAVE_VERSAO_VERIFICADA, versao, None)
+
+        return {
+            'criadas': len(novas),
+            'atualizadas': len(alteradas),
+            'desativadas': len(existentes),
+        }
+
+
+def verificacao_pendente():
+    """Indica se os dados mudaram desde a última verificação."""
+    return cache.get(CHAVE_VERSAO_VERIFICADA) != get_versao_dados()
+
+
+def verificar_em_segundo_plano():
+    """
+    Dispara a verificação em uma thread, se os dados mudaram e nenhuma
+    verificação ocorreu nos últimos INTERVALO_VERIFICACAO segundos.
+
+    Returns:
+        bool: True se uma verificação foi iniciada
+    """
+    if not getattr(settings, 'NOTIFICACOES_VERIFICACAO_AUTOMATICA', True):
+        return False
+    if not verificacao_pendente():
+        return False
+    if not cache.add(CHAVE_VERIFICACAO_EM_ANDAMENTO, True, INTERVALO_VERIFICACAO):
+        return False
+
+    def executar():
+        try:
+            VerificadorNotificacoes().sincronizar()
+        finally:
+            connection.close()
+
+    threading.Thread(target=executar, name='verificacao-notificacoes', daemon=True).start()
+    return True
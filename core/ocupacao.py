@@ -0,0 +1,432 @@
+"""
+Ocupação semanal de professores, turmas e salas em máscaras de bits.
+
+Cada slot da grade canônica (dias letivos × horários dos turnos do
+gerador) corresponde a um bit; a ocupação de um recurso na semana é um
+inteiro. Descobrir onde um horário pode ser solto vira uma sequência de
+operações de bits sobre máscaras carregadas com uma única consulta.
+"""
+
+from datetime import date, datetime, timedelta
+from functools import reduce
+from operator import or_
+
+from .alocacao_salas import IndiceSalas
+from .algoritmo_horarios import GeradorHorariosRobusto
+from .cache import chave_versionada, obter_ou_calcular
+from .intervalos import IndiceCalendario
+from .models import Horario, PeriodoLetivo, PreferenciaProfessor, Sala
+
+
+def _hora(texto):
+    return datetime.strptime(texto, '%H:%M').time()
+
+
+# Grade canônica: (dia, turno, início, fim), na ordem dos bits
+SLOTS = [
+    (dia, turno, _hora(inicio), _hora(fim))
+    for dia, _ in GeradorHorariosRobusto.DIAS_SEMANA
+    for turno, horarios in GeradorHorariosRobusto.TURNOS_HORARIOS.items()
+    for inicio, fim in horarios
+]
+
+MASCARA_COMPLETA = (1 << len(SLOTS)) - 1
+
+_DIAS_LETIVOS = [dia for dia, _ in GeradorHorariosRobusto.DIAS_SEMANA]
+_TURNOS_GRADE = list(GeradorHorariosRobusto.TURNOS_HORARIOS)
+
+_cache_intervalos = {}
+
+
+def mascara_intervalo(dia, inicio, fim):
+    """Bits dos slots da grade que se sobrepõem ao intervalo (dia, início, fim)."""
+    chave = (dia, inicio, fim)
+    if chave not in _cache_intervalos:
+        mascara = 0
+        for bit, (dia_slot, _, inicio_slot, fim_slot) in enumerate(SLOTS):
+            if dia_slot == dia and inicio < fim_slot and fim > inicio_slot:
+                mascara |= 1 << bit
+        _cache_intervalos[chave] = mascara
+    return _cache_intervalos[chave]
+
+
+def mascara_turno(dia=None, turno=None):
+    """Bits dos slots de um dia e/ou turno (None = todos)."""
+    mascara = 0
+    for bit, (dia_slot, turno_slot, _, _) in enumerate(SLOTS):
+        if (dia is None or dia_slot == dia) and (not turno or turno_slot == turno):
+            mascara |= 1 << bit
+    return mascara
+
+
+def mascara_turnos_turma(turma):
+    """Bits dos slots fora dos turnos permitidos para a turma."""
+    permitidos = reduce(or_, (mascara_turno(turno=turno) for turno in turma.get_turnos_permitidos()), 0)
+    return MASCARA_COMPLETA & ~permitidos
+
+
+def bits(mascara):
+    """Índices dos bits ligados, em ordem."""
+    while mascara:
+        menor = mascara & -mascara
+        yield menor.bit_length() - 1
+        mascara ^= menor
+
+
+class MapaOcupacao:
+    """
+    Máscaras semanais de ocupação dos horários ativos de um período letivo.
+
+    As máscaras ficam por recurso e por horário, para que a ocupação de um
+    recurso possa ser calculada sem o próprio horário que está sendo movido.
+    """
+
+    RECURSOS = ('professor', 'turma', 'sala')
+
+    def __init__(self, periodo_letivo_id=None):
+        self.periodo_letivo_id = periodo_letivo_id
+        # recurso → id do recurso → {id do horário: máscara}
+        self.horarios_por_recurso = {recurso: {} for recurso in self.RECURSOS}
+        # recurso → id do recurso → máscara de todos os seus horários
+        self.totais = {recurso: {} for recurso in self.RECURSOS}
+
+        linhas = Horario.objects.filter(
+            ativo=True, periodo_letivo_id=periodo_letivo_id
+        ).values_list('id', 'professor_id', 'turma_id', 'sala_id', 'dia_semana', 'horario_inicio', 'horario_fim')
+
+        for horario_id, professor_id, turma_id, sala_id, dia, inicio, fim in linhas:
+            mascara = mascara_intervalo(dia, inicio, fim)
+            for recurso, recurso_id in zip(self.RECURSOS, (professor_id, turma_id, sala_id)):
+                self.horarios_por_recurso[recurso].setdefault(recurso_id, {})[horario_id] = mascara
+                self.totais[recurso][recurso_id] = self.totais[recurso].get(recurso_id, 0) | mascara
+
+    @classmethod
+    def do_periodo(cls, periodo_letivo_id=None):
+        """Mapa em cache sob a versão atual dos dados."""
+        return obter_ou_calcular(
+            chave_versionada('ocupacao', periodo_letivo_id),
+            lambda: cls(periodo_letivo_id)
+        )
+
+    def ocupacao(self, recurso, recurso_id, exceto=None):
+        """Máscara de ocupação do recurso, desconsiderando o horário `exceto`."""
+        if exceto is None:
+            return self.totais[recurso].get(recurso_id, 0)
+        horarios = self.horarios_por_recurso[recurso].get(recurso_id, {})
+        return reduce(or_, (mascara for horario_id, mascara in horarios.items() if horario_id != exceto), 0)
+
+
+def preferencia_aplicavel(preferencias, dia_semana, turno, disciplina_id):
+    """
+    Disponibilidade segundo as preferências já carregadas do professor.
+
+    Mesma regra de Professor.disponivel_para_horario (que valida o
+    Horario ao salvar), aplicada em memória.
+    """
+    if not preferencias:
+        return True
+
+    filtros = {'dia_semana': dia_semana, 'turno': turno, 'disciplina_id': disciplina_id}
+
+    def primeira(criterios):
+        for preferencia in preferencias:
+            if all(getattr(preferencia, campo) == valor for campo, valor in criterios.items()):
+                return preferencia
+        return None
+
+    preferencia = primeira(filtros)
+    if preferencia:
+        return preferencia.disponivel
+
+    for campo in ['disciplina_id', 'turno', 'dia_semana']:
+        del filtros[campo]
+        preferencia = primeira(filtros)
+        if preferencia:
+            return preferencia.disponivel
+
+    return True
+
+
+class DisponibilidadePeriodo:
+    """
+    Bloqueios e eventos acadêmicos expandidos sobre as datas de um período letivo.
+
+    O que vale em todas as semanas do período entra nas máscaras semanais,
+    respeitadas pelo gerador, pela validação de Horario e pelas telas de
+    movimentação: bloqueios recorrentes (toda semana no dia de
+    `data_inicio`, como em BloqueioTemporario) e bloqueios ou eventos que
+    cobrem todas as ocorrências de um dia da semana no período. O restante
+    fica como exceção por data: a aula semanal continua na grade, mas não
+    acontece naquele dia. Sem período letivo, só os recorrentes são semanais.
+    """
+
+    def __init__(self, periodo_letivo=None):
+        self.periodo_letivo_id = periodo_letivo.pk if periodo_letivo else None
+        calendario = IndiceCalendario.do_periodo(periodo_letivo)
+
+        # professor → máscara semanal de bloqueios
+        self.professores = {}
+        # pk do bloqueio → (professor, [(dia, turno)]) do que ele tira da grade
+        self.bloqueios_semanais = {}
+        # professor → data → turnos bloqueados só naquela data
+        self.excecoes = {}
+        # Eventos: máscara semanal, pk → (descrição, [(dia, turno)]) e data → turnos sem aula
+        self.mascara_eventos = 0
+        self.eventos_semanais = {}
+        self.datas_sem_aula = {}
+
+        # Primeira e última ocorrência de cada dia letivo no período
+        ocorrencias = {}
+        if periodo_letivo:
+            for deslocamento in range(7):
+                primeira = periodo_letivo.data_inicio + timedelta(days=deslocamento)
+                if primeira <= periodo_letivo.data_fim and primeira.weekday() in _DIAS_LETIVOS:
+                    ultima = primeira + timedelta(weeks=(periodo_letivo.data_fim - primeira).days // 7)
+                    ocorrencias[primeira.weekday()] = (primeira, ultima)
+
+        def semanais(inicio, fim):
+            return [dia for dia, (primeira, ultima) in ocorrencias.items() if inicio <= primeira and ultima <= fim]
+
+        def datas(inicio, fim):
+            if periodo_letivo:
+                inicio, fim = max(inicio, periodo_letivo.data_inicio), min(fim, periodo_letivo.data_fim)
+            data = inicio
+            while data <= fim:
+                if data.weekday() in _DIAS_LETIVOS:
+                    yield data
+                data += timedelta(days=1)
+
+        for dia, bloqueios in calendario.recorrentes.items():
+            if dia in _DIAS_LETIVOS:
+                for professor_id, turno, pk in bloqueios:
+                    self._bloquear_semana(pk, professor_id, [dia], turno)
+
+        pontuais = [
+            (date.fromordinal(inicio), date.fromordinal(fim), valor) for inicio, fim, valor in calendario.bloqueios
+        ]
+        for inicio, fim, (professor_id, turno, pk) in pontuais:
+            self._bloquear_semana(pk, professor_id, semanais(inicio, fim), turno)
+
+        for inicio, fim, (professor_id, turno, _) in pontuais:
+            semanal = self.professores.get(professor_id, 0)
+            for data in datas(inicio, fim):
+                turnos = {
+                    turno_slot for turno_slot in _TURNOS_GRADE
+                    if (not turno or turno == turno_slot)
+                    and mascara_turno(data.weekday(), turno_slot) & ~semanal
+                }
+                if turnos:
+                    self.excecoes.setdefault(professor_id, {}).setdefault(data, set()).update(turnos)
+
+        for inicio, fim, evento in calendario.eventos:
+            inicio, fim = date.fromordinal(inicio), date.fromordinal(fim)
+            entradas = [
+                (dia, turno) for dia in semanais(inicio, fim) for turno in _TURNOS_GRADE
+                if evento.conflita_com_data(ocorrencias[dia][0], turno)
+            ]
+            if entradas:
+                self.eventos_semanais[evento.pk] = (str(evento), entradas)
+                for dia, turno in entradas:
+                    self.mascara_eventos |= mascara_turno(dia, turno)
+
+        for inicio, fim, evento in calendario.eventos:
+            for data in datas(date.fromordinal(inicio), date.fromordinal(fim)):
+                turnos = {
+                    turno for turno in _TURNOS_GRADE
+                    if evento.conflita_com_data(data, turno)
+                    and mascara_turno(data.weekday(), turno) & ~self.mascara_eventos
+                }
+                if turnos:
+                    self.datas_sem_aula.setdefault(data, set()).update(turnos)
+
+    def _bloquear_semana(self, pk, professor_id, dias, turno):
+        if not dias:
+            return
+        turnos = [turno] if turno else _TURNOS_GRADE
+        self.bloqueios_semanais[pk] = (professor_id, [(dia, turno or None) for dia in dias])
+        for dia in dias:
+            for turno_slot in turnos:
+                self.professores[professor_id] = self.professores.get(professor_id, 0) | mascara_turno(dia, turno_slot)
+
+    @classmethod
+    def do_periodo(cls, periodo_letivo=None):
+        """Disponibilidade em cache sob a versão atual dos dados."""
+        return obter_ou_calcular(
+            chave_versionada('disponibilidade', periodo_letivo.pk if periodo_letivo else None),
+            lambda: cls(periodo_letivo)
+        )
+
+    def mascara_professor(self, professor_id):
+        """Slots que o professor não pode ocupar em nenhuma semana (bloqueios e eventos)."""
+        return self.professores.get(professor_id, 0) | self.mascara_eventos
+
+    def disponivel(self, professor_id, dia, turno=None):
+        """Se o professor pode ter aula semanal no dia (e turno) durante todo o período."""
+        return not self.mascara_professor(professor_id) & mascara_turno(dia, turno)
+
+    def eventos_no_slot(self, dia, turno=None):
+        """Descrições dos eventos que impedem aulas no dia (e turno) em todas as semanas."""
+        return [
+            descricao for descricao, entradas in self.eventos_semanais.values()
+            if any(dia_evento == dia and (not turno or turno_evento == turno) for dia_evento, turno_evento in entradas)
+        ]
+
+    def datas_canceladas(self, professor_id, dia, turno):
+        """
+        Datas do período em que uma aula semanal do professor no dia/turno não acontece.
+
+        São as exceções: bloqueios e eventos que não valem em todas as semanas.
+        """
+        excecoes = self.excecoes.get(professor_id, {})
+        return sorted(
+            data for data in set(excecoes) | set(self.datas_sem_aula)
+            if data.weekday() == dia
+            and (turno in excecoes.get(data, ()) or turno in self.datas_sem_aula.get(data, ()))
+        )
+
+
+def mascara_indisponibilidade(professor, disciplina_id, disponibilidade):
+    """
+    Slots em que o professor não pode dar aula no período.
+
+    Combina as preferências (PreferenciaProfessor) com a máscara semanal de
+    bloqueios e eventos da DisponibilidadePeriodo.
+    """
+    preferencias = list(PreferenciaProfessor.objects.filter(professor=professor))
+
+    mascara = disponibilidade.mascara_professor(professor.pk)
+    for dia in _DIAS_LETIVOS:
+        for turno in _TURNOS_GRADE:
+            if not preferencia_aplicavel(preferencias, dia, turno, disciplina_id):
+                mascara |= mascara_turno(dia, turno)
+    return mascara
+
+
+def destinos_validos(horario):
+    """
+    Lista os slots da grade para onde o horário pode ser movido.
+
+    Um slot é válido quando professor e turma estão livres, o slot é de um
+    turno permitido para a turma, o professor está disponível e há alguma
+    sala compatível livre (a atual ou outra).
+
+    Returns:
+        dict: 'destinos' (dia, turno, início, fim, se a sala atual está livre
+            e ids das salas livres) e 'salas' (id → nome das salas citadas)
+    """
+    mapa = MapaOcupacao.do_periodo(horario.periodo_letivo_id)
+
+    bloqueados = (
+        mapa.ocupacao('professor', horario.professor_id, exceto=horario.id)
+        | mapa.ocupacao('turma', horario.turma_id, exceto=horario.id)
+        | mascara_turnos_turma(horario.turma)
+        | mascara_indisponibilidade(
+            horario.professor, horario.disciplina_id, DisponibilidadePeriodo.do_periodo(horario.periodo_letivo)
+        )
+    )
+
+    indice = IndiceSalas(Sala.objects.filter(ativa=True))
+    alternativas = [
+        indice.salas[posicao]
+        for posicao in indice.buscar(horario.turma.numero_alunos, horario.disciplina.tipo_sala)
+        if indice.salas[posicao].pk != horario.sala_id
+    ]
+    ocupacao_salas = {
+        sala.pk: mapa.ocupacao('sala', sala.pk, exceto=horario.id)
+        for sala in [horario.sala] + alternativas
+    }
+
+    destinos = []
+    salas_citadas = {}
+    for bit in bits(MASCARA_COMPLETA & ~bloqueados):
+        slot = 1 << bit
+        sala_atual_livre = not ocupacao_salas[horario.sala_id] & slot
+        salas_livres = [sala.pk for sala in alternativas if not ocupacao_salas[sala.pk] & slot]
+        if not (sala_atual_livre or salas_livres):
+            continue
+
+        dia, turno, inicio, fim = SLOTS[bit]
+        destinos.append({
+            'dia': dia,
+            'turno': turno,
+            'inicio': inicio.strftime('%H:%M'),
+            'fim': fim.strftime('%H:%M'),
+            'sala_atual_livre': sala_atual_livre,
+            'salas_livres': salas_livres,
+        })
+        for sala in alternativas:
+            if sala.pk in salas_livres:
+                salas_citadas[sala.pk] = sala.nome_numero
+
+    return {'destinos': destinos, 'salas': salas_citadas}
+
+
+def horarios_livres_comuns(
+    professores=(), turmas=(), salas=(), tipo_sala='', periodo_letivo_id=None,
+    considerar_disponibilidade=True
+):
+    """
+    Slots da grade em que todos os recursos informados estão livres.
+
+    A ocupação de cada recurso é uma máscara do MapaOcupacao em cache; a
+    resposta é a interseção dos bits livres. Professores também precisam
+    estar disponíveis (preferências e DisponibilidadePeriodo) e turmas, no
+    seu turno.
+
+    Salas: as informadas precisam estar todas livres. Sem salas informadas,
+    o slot precisa de ao menos uma sala livre do `tipo_sala` (ou de
+    qualquer tipo) que comporte a maior das turmas.
+
+    Returns:
+        dict: 'livres' (dia, nome do dia, turno, início, fim e ids das salas
+            livres) e 'salas' (id → nome das salas citadas)
+    """
+    mapa = MapaOcupacao.do_periodo(periodo_letivo_id)
+
+    bloqueados = 0
+    disponibilidade = None
+    for professor in professores:
+        bloqueados |= mapa.ocupacao('professor', professor.pk)
+        if considerar_disponibilidade:
+            if disponibilidade is None:
+                disponibilidade = DisponibilidadePeriodo.do_periodo(
+                    PeriodoLetivo.objects.filter(pk=periodo_letivo_id).first() if periodo_letivo_id else None
+                )
+            bloqueados |= mascara_indisponibilidade(professor, None, disponibilidade)
+    for turma in turmas:
+        bloqueados |= mapa.ocupacao('turma', turma.pk)
+        bloqueados |= mascara_turnos_turma(turma)
+
+    if salas:
+        for sala in salas:
+            bloqueados |= mapa.ocupacao('sala', sala.pk)
+        candidatas = list(salas)
+    else:
+        indice = IndiceSalas(Sala.objects.filter(ativa=True))
+        capacidade = max((turma.numero_alunos for turma in turmas), default=0)
+        candidatas = [indice.salas[posicao] for posicao in indice.buscar(capacidade, tipo_sala)]
+    ocupacao_salas = {sala.pk: mapa.ocupacao('sala', sala.pk) for sala in candidatas}
+
+    dias = dict(Horario.DIAS_SEMANA)
+    livres = []
+    salas_citadas = {}
+    for bit in bits(MASCARA_COMPLETA & ~bloqueados):
+        slot = 1 << bit
+        salas_livres = [sala.pk for sala in candidatas if not ocupacao_salas[sala.pk] & slot]
+        if not salas_livres:
+            continue
+
+        dia, turno, inicio, fim = SLOTS[bit]
+        livres.append({
+            'dia': dia,
+            'dia_nome': dias[dia],
+            'turno': turno,
+            'inicio': inicio.strftime('%H:%M'),
+            'fim': fim.strftime('%H:%M'),
+            'salas_livres': salas_livres,
+        })
+        for sala in candidatas:
+            if sala.pk in salas_livres:
+                salas_citadas[sala.pk] = sala.nome_numero
+
+    return {'livres': livres, 'salas': salas_citadas}
@@ -0,0 +1,247 @@
+"""
+Representação compacta do quadro de horários usada pelo gerador.
+
+Turmas, disciplinas, professores e salas viram índices inteiros densos
+(CatalogoEntidades) e cada aula vira uma linha de colunas do módulo
+`array`. A parte que a busca altera (professor, dia, início, fim, turno e
+sala de cada aula) fica num único buffer, de modo que clonar uma solução
+candidata é uma cópia de buffer, e o quadro inteiro serializa em poucos
+kilobytes.
+"""
+
+import struct
+import sys
+import zlib
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Valor das posições ainda não definidas (aula sem professor, dia, sala...)
+SEM_VALOR = -1
+
+# Turnos na ordem dos códigos gravados na coluna 'turno'
+TURNOS = ('manha', 'tarde', 'noite')
+
+_CABECALHO = struct.Struct('<4sBI')
+_ASSINATURA = b'QDH1'
+_TAMANHO = struct.Struct('<I')
+
+
+def minutos(hora: str) -> int:
+    """'07:50' → 470."""
+    horas, minutos_hora = hora.split(':')
+    return int(horas) * 60 + int(minutos_hora)
+
+
+def hora(total_minutos: int) -> str:
+    """470 → '07:50'."""
+    return f"{total_minutos // 60:02d}:{total_minutos % 60:02d}"
+
+
+def codigo_turno(turno: Optional[str]) -> int:
+    return TURNOS.index(turno) if turno in TURNOS else SEM_VALOR
+
+
+def _para_bytes(coluna: array) -> bytes:
+    if sys.byteorder != 'little':
+        coluna = array(coluna.typecode, coluna)
+        coluna.byteswap()
+    return _TAMANHO.pack(len(coluna)) + coluna.tobytes()
+
+
+def _de_bytes(typecode: str, dados: memoryview, posicao: int) -> Tuple[array, int]:
+    (quantidade,) = _TAMANHO.unpack_from(dados, posicao)
+    posicao += _TAMANHO.size
+    coluna = array(typecode)
+    fim = posicao + quantidade * coluna.itemsize
+    coluna.frombytes(dados[posicao:fim])
+    if sys.byteorder != 'little':
+        coluna.byteswap()
+    return coluna, fim
+
+
+class CatalogoEntidades:
+    """
+    Índices densos das entidades referenciadas pelo quadro.
+
+    Guarda a pk de cada entidade e, quando disponível, o objeto do ORM;
+    um catálogo desserializado tem só as pks até `carregar_objetos()`.
+    """
+
+    TIPOS = ('turma', 'disciplina', 'professor', 'sala')
+
+    def __init__(self):
+        self.pks: Dict[str, array] = {tipo: array('i') for tipo in self.TIPOS}
+        self.objetos: Dict[str, List[Any]] = {tipo: [] for tipo in self.TIPOS}
+        self._indices: Dict[str, Dict[int, int]] = {tipo: {} for tipo in self.TIPOS}
+
+    def indice(self, tipo: str, objeto) -> int:
+        """Índice da entidade, registrando-a se for nova."""
+        if objeto is None:
+            return SEM_VALOR
+        indices = self._indices[tipo]
+        if objeto.pk not in indices:
+            indices[objeto.pk] = len(self.pks[tipo])
+            self.pks[tipo].append(objeto.pk)
+            self.objetos[tipo].append(objeto)
+        return indices[objeto.pk]
+
+    def objeto(self, tipo: str, indice: int):
+        return self.objetos[tipo][indice] if indice != SEM_VALOR else None
+
+    def pk(self, tipo: str, indice: int) -> Optional[int]:
+        return self.pks[tipo][indice] if indice != SEM_VALOR else None
+
+    def carregar_objetos(self) -> None:
+        """Busca no banco os objetos de um catálogo desserializado (uma consulta por tipo)."""
+        from .models import Disciplina, Professor, Sala, Turma
+
+        modelos = {'turma': Turma, 'disciplina': Disciplina, 'professor': Professor, 'sala': Sala}
+        for tipo, modelo in modelos.items():
+            encontrados = modelo.objects.in_bulk(list(self.pks[tipo]))
+            self.objetos[tipo] = [encontrados.get(pk) for pk in self.pks[tipo]]
+
+    def _serializar(self) -> bytes:
+        return b''.join(_para_bytes(self.pks[tipo]) for tipo in self.TIPOS)
+
+    @classmethod
+    def _desserializar(cls, dados: memoryview, posicao: int) -> Tuple['CatalogoEntidades', int]:
+        catalogo = cls()
+        for tipo in cls.TIPOS:
+            catalogo.pks[tipo], posicao = _de_bytes('i', dados, posicao)
+            catalogo._indices[tipo] = {pk: indice for indice, pk in enumerate(catalogo.pks[tipo])}
+            catalogo.objetos[tipo] = [None] * len(catalogo.pks[tipo])
+        return catalogo, posicao
+
+
+class QuadroCompacto:
+    """
+    Aulas de um quadro de horários em colunas de inteiros.
+
+    Estrutura fixa (compartilhada entre clones): turma, disciplina, se a
+    aula é fixa (horário já salvo) e professores candidatos, em formato
+    CSR (`inicio_candidatos[i]:inicio_candidatos[i + 1]` em `candidatos`).
+
+    Posições (copiadas a cada clone): buffer único com CAMPOS por aula.
+    Horários em minutos desde 00:00; turno como código de TURNOS.
+    """
+
+    CAMPOS = ('professor', 'dia', 'inicio', 'fim', 'turno', 'sala')
+    _LARGURA = len(CAMPOS)
+    PROFESSOR, DIA, INICIO, FIM, TURNO, SALA = range(_LARGURA)
+
+    def __init__(self, catalogo: Optional[CatalogoEntidades] = None):
+        self.catalogo = catalogo or CatalogoEntidades()
+        self.turma = array('i')
+        self.disciplina = array('i')
+        self.fixa = array('b')
+        self.inicio_candidatos = array('i', [0])
+        self.candidatos = array('i')
+        self.posicoes = array('i')
+
+    def __len__(self) -> int:
+        return len(self.turma)
+
+    def adicionar(
+        self,
+        turma,
+        disciplina,
+        candidatos: Iterable = (),
+        professor=None,
+        dia: int = SEM_VALOR,
+        inicio: int = SEM_VALOR,
+        fim: int = SEM_VALOR,
+        turno: Optional[str] = None,
+        sala=None,
+        fixa: bool = False
+    ) -> int:
+        """Acrescenta uma aula (objetos do ORM são convertidos em índices) e retorna seu índice."""
+        catalogo = self.catalogo
+        self.turma.append(catalogo.indice('turma', turma))
+        self.disciplina.append(catalogo.indice('disciplina', disciplina))
+        self.fixa.append(1 if fixa else 0)
+        self.candidatos.extend(catalogo.indice('professor', candidato) for candidato in candidatos)
+        self.inicio_candidatos.append(len(self.candidatos))
+        self.posicoes.extend((
+            catalogo.indice('professor', professor), dia, inicio, fim,
+            codigo_turno(turno), catalogo.indice('sala', sala)
+        ))
+        return len(self.turma) - 1
+
+    def clonar(self) -> 'QuadroCompacto':
+        """Cópia independente das posições; a estrutura fixa é compartilhada."""
+        clone = QuadroCompacto.__new__(QuadroCompacto)
+        clone.__dict__.update(self.__dict__)
+        clone.posicoes = self.posicoes[:]
+        return clone
+
+    def candidatos_da_aula(self, aula: int) -> array:
+        return self.candidatos[self.inicio_candidatos[aula]:self.inicio_candidatos[aula + 1]]
+
+    def valor(self, aula: int, campo: int) -> int:
+        return self.posicoes[aula * self._LARGURA + campo]
+
+    def posicao(self, aula: int) -> array:
+        """(professor, dia, início, fim, turno, sala) da aula."""
+        base = aula * self._LARGURA
+        return self.posicoes[base:base + self._LARGURA]
+
+    def definir(self, aula: int, professor: int, dia: int, inicio: int, fim: int, turno: int, sala: int = SEM_VALOR) -> None:
+        base = aula * self._LARGURA
+        self.posicoes[base:base + self._LARGURA] = array('i', (professor, dia, inicio, fim, turno, sala))
+
+    def definir_sala(self, aula: int, sala: int) -> None:
+        self.posicoes[aula * self._LARGURA + self.SALA] = sala
+
+    def aulas_livres(self) -> List[int]:
+        """Índices das aulas que o gerador deve posicionar."""
+        return [aula for aula, fixa in enumerate(self.fixa) if not fixa]
+
+    def linhas(self, incluir_fixas: bool = False) -> Iterator[Dict[str, Any]]:
+        """Aulas com pks e horários em HH:MM, para gravação e comparação."""
+        pk = self.catalogo.pk
+        for aula in range(len(self)):
+            if self.fixa[aula] and not incluir_fixas:
+                continue
+            professor, dia, inicio, fim, turno, sala = self.posicao(aula)
+            yield {
+                'turma_id': pk('turma', self.turma[aula]),
+                'disciplina_id': pk('disciplina', self.disciplina[aula]),
+                'professor_id': pk('professor', professor),
+                'sala_id': pk('sala', sala),
+                'dia_semana': dia,
+                'turno': TURNOS[turno] if turno != SEM_VALOR else None,
+                'horario_inicio': hora(inicio) if inicio != SEM_VALOR else None,
+                'horario_fim': hora(fim) if fim != SEM_VALOR else None,
+                'fixa': bool(self.fixa[aula]),
+            }
+
+    def serializar(self) -> bytes:
+        """Bytes comprimidos com catálogo (pks) e todas as colunas."""
+        corpo = b''.join([
+            self.catalogo._serializar(),
+            _para_bytes(self.turma),
+            _para_bytes(self.disciplina),
+            _para_bytes(self.fixa),
+            _para_bytes(self.inicio_candidatos),
+            _para_bytes(self.candidatos),
+            _para_bytes(self.posicoes),
+        ])
+        return _CABECALHO.pack(_ASSINATURA, 1, len(self)) + zlib.compress(corpo)
+
+    @classmethod
+    def desserializar(cls, dados: bytes) -> 'QuadroCompacto':
+        """Reconstrói um quadro serializado; o catálogo volta só com as pks."""
+        assinatura, _, _ = _CABECALHO.unpack_from(dados)
+        if assinatura != _ASSINATURA:
+            raise ValueError("Dados não são um quadro de horários serializado")
+
+        corpo = memoryview(zlib.decompress(dados[_CABECALHO.size:]))
+        catalogo, posicao = CatalogoEntidades._desserializar(corpo, 0)
+        quadro = cls(catalogo)
+        quadro.turma, posicao = _de_bytes('i', corpo, posicao)
+        quadro.disciplina, posicao = _de_bytes('i', corpo, posicao)
+        quadro.fixa, posicao = _de_bytes('b', corpo, posicao)
+        quadro.inicio_candidatos, posicao = _de_bytes('i', corpo, posicao)
+        quadro.candidatos, posicao = _de_bytes('i', corpo, posicao)
+        quadro.posicoes, posicao = _de_bytes('i', corpo, posicao)
+        return quadro
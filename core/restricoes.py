@@ -0,0 +1,493 @@
+"""
+Restrições rígidas e flexíveis usadas pelo gerador de horários.
+
+Cada restrição é uma classe com:
+    rigida       rígidas eliminam posições (permite); flexíveis entram no
+                 custo com o seu peso (delta)
+    peso         multiplicador do custo das flexíveis
+    opcao        opção da geração que liga a restrição (ex: 'evitar_janelas');
+                 None = sempre ativa
+    relaxar_com  flexibilidade da tentativa a partir da qual a restrição
+                 deixa de valer; None = nunca relaxa
+
+e três formas de avaliação:
+    permite/delta                uma aula numa posição, contra o estado da busca
+    permite_janela/delta_janela  um bloco de aulas seguidas (padrão: slot a slot)
+    avaliar                      o quadro inteiro, sobre as colunas do QuadroCompacto
+                                 (violações das rígidas, custo das flexíveis)
+
+O estado da busca é o dicionário de ocupação do gerador: intervalos
+(início, fim, turno) por ('professor', professor, dia), ('turma', turma,
+dia) e ('disciplina', turma, disciplina, dia), com índices do catálogo do
+quadro. Tudo que vem do banco é carregado uma vez em `preparar`; delta e
+permite só consultam memória.
+
+Outras restrições podem ser ligadas pela configuração RESTRICOES_HORARIOS
+(lista de caminhos de classes, ex: 'core.restricoes.Janelas') ou passadas
+ao gerador: GeradorHorariosRobusto(restricoes=[...]).
+"""
+
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .models import PreferenciaProfessor
+from .quadro_compacto import SEM_VALOR, TURNOS, QuadroCompacto
+
+# Slot de uma janela: (início, fim) em minutos
+Slots = Tuple[Tuple[int, int], ...]
+
+
+def aulas_posicionadas(quadro: QuadroCompacto) -> Iterator[Tuple[int, ...]]:
+    """(turma, disciplina, professor, dia, início, fim, turno, sala) das aulas com posição, coluna a coluna."""
+    largura = quadro._LARGURA
+    posicoes = quadro.posicoes
+    for linha in zip(quadro.turma, quadro.disciplina, *(posicoes[campo::largura] for campo in range(largura))):
+        if linha[3] != SEM_VALOR:
+            yield linha
+
+
+class Restricao:
+    """Base das restrições: rígida sem efeito ou flexível de custo zero."""
+
+    nome = ''
+    rigida = False
+    peso = 1.0
+    opcao: Optional[str] = None
+    relaxar_com: Optional[float] = None
+
+    def __init__(self, peso: Optional[float] = None, relaxar_com: Optional[float] = None):
+        if peso is not None:
+            self.peso = peso
+        if relaxar_com is not None:
+            self.relaxar_com = relaxar_com
+
+    def ativa(self, flexibilidade: float, opcoes: Dict[str, bool]) -> bool:
+        if self.opcao and not opcoes.get(self.opcao, True):
+            return False
+        return self.relaxar_com is None or flexibilidade < self.relaxar_com
+
+    def preparar(self, quadro: QuadroCompacto, periodo_letivo) -> None:
+        """Carrega, uma vez por geração, os dados de que a restrição precisa."""
+
+    def permite(self, ocupacao, professor, turma, disciplina, dia, turno, inicio, fim) -> bool:
+        return True
+
+    def delta(self, ocupacao, professor, turma, disciplina, dia, turno, inicio, fim) -> float:
+        return 0.0
+
+    def permite_janela(self, ocupacao, professor, turma, disciplina, dia, turno, slots: Slots) -> bool:
+        return all(
+            self.permite(ocupacao, professor, turma, disciplina, dia, turno, inicio, fim)
+            for inicio, fim in slots
+        )
+
+    def delta_janela(self, ocupacao, professor, turma, disciplina, dia, turno, slots: Slots) -> float:
+        return sum(
+            self.delta(ocupacao, professor, turma, disciplina, dia, turno, inicio, fim)
+            for inicio, fim in slots
+        )
+
+    def avaliar(self, quadro: QuadroCompacto) -> float:
+        return 0.0
+
+    def ajustar_salas(self, alocador, aulas: List[Tuple[int, int, Tuple]]) -> None:
+        """
+        Ajuste depois da busca, com as salas já emparelhadas.
+
+        Args:
+            alocador: AlocadorSalas da tentativa
+            aulas: (aula, turma, slot) das aulas posicionadas pela busca
+        """
+
+
+# Rígidas
+
+class SemSobreposicao(Restricao):
+    """Professor e turma não têm duas aulas ao mesmo tempo."""
+
+    nome = 'sem_sobreposicao'
+    rigida = True
+
+    def permite(self, ocupacao, professor, turma, disciplina, dia, turno, inicio, fim):
+        for chave in (('professor', professor, dia), ('turma', turma, dia)):
+            for inicio_ocupado, fim_ocupado, _ in ocupacao.get(chave, ()):
+                if inicio < fim_ocupado and fim > inicio_ocupado:
+                    return False
+        return True
+
+    def avaliar(self, quadro):
+        por_dia = defaultdict(list)
+        for turma, _, professor, dia, inicio, fim, _, _ in aulas_posicionadas(quadro):
+            por_dia[('professor', professor, dia)].append((inicio, fim))
+            por_dia[('turma', turma, dia)].append((inicio, fim))
+
+        violacoes = 0
+        for intervalos in por_dia.values():
+            intervalos.sort()
+            for indice, (_, fim) in enumerate(intervalos):
+                for inicio_seguinte, _ in intervalos[indice + 1:]:
+                    if inicio_seguinte >= fim:
+                        break
+                    violacoes += 1
+        return violacoes
+
+
+class DisponibilidadeProfessor(Restricao):
+    """
+    Professor disponível no dia e turno.
+
+    Bloqueios e eventos contam quando valem em todas as semanas do período
+    (DisponibilidadePeriodo); as preferências seguem a mesma regra que
+    valida o Horario ao salvar (preferencia_aplicavel).
+    """
+
+    nome = 'disponibilidade_professor'
+    rigida = True
+    opcao = 'respeitar_preferencias'
+    relaxar_com = 0.5
+
+    def preparar(self, quadro, periodo_letivo):
+        # Import local: core.ocupacao depende do gerador, que usa este módulo
+        from .ocupacao import DisponibilidadePeriodo, preferencia_aplicavel
+
+        self._aplicavel = preferencia_aplicavel
+        self._periodo = DisponibilidadePeriodo.do_periodo(periodo_letivo)
+        self._catalogo = quadro.catalogo
+        self._preferencias = _preferencias_por_professor(quadro)
+        self._cache = {}
+
+    def permite(self, ocupacao, professor, turma, disciplina, dia, turno, inicio, fim):
+        chave = (professor, dia, turno, disciplina)
+        if chave not in self._cache:
+            nome_turno = TURNOS[turno]
+            self._cache[chave] = self._periodo.disponivel(
+                self._catalogo.pk('professor', professor), dia, nome_turno
+            ) and self._aplicavel(
+                self._preferencias.get(professor, []), dia, nome_turno, self._catalogo.pk('disciplina', disciplina)
+            )
+        return self._cache[chave]
+
+    def avaliar(self, quadro):
+        return sum(
+            not self.permite(None, professor, turma, disciplina, dia, turno, inicio, fim)
+            for turma, disciplina, professor, dia, inicio, fim, turno, _ in aulas_posicionadas(quadro)
+        )
+
+
+class MaximoAulasPorDia(Restricao):
+    """
+    Aulas de uma disciplina por dia numa turma.
+
+    O limite é o maior bloco do padrão da disciplina, e pelo menos `limite`.
+    """
+
+    nome = 'maximo_aulas_por_dia'
+    rigida = True
+    opcao = 'distribuir_dias'
+    relaxar_com = 0.3
+
+    def __init__(self, limite: int = 2, **kwargs):
+        super().__init__(**kwargs)
+        self.limite = limite
+
+    def preparar(self, quadro, periodo_letivo):
+        self._limites = [max(self.limite, bloco) for bloco in _maiores_blocos(quadro)]
+
+    def permite_janela(self, ocupacao, professor, turma, disciplina, dia, turno, slots):
+        ja_no_dia = len(ocupacao.get(('disciplina', turma, disciplina, dia), ()))
+        return ja_no_dia + len(slots) <= self._limites[disciplina]
+
+    def permite(self, ocupacao, professor, turma, disciplina, dia, turno, inicio, fim):
+        return self.permite_janela(ocupacao, professor, turma, disciplina, dia, turno, ((inicio, fim),))
+
+    def avaliar(self, quadro):
+        contagem = Counter((turma, disciplina, dia) for turma, disciplina, _, dia, *_ in aulas_posicionadas(quadro))
+        return sum(max(0, total - self._limites[disciplina]) for (_, disciplina, _), total in contagem.items())
+
+
+# Flexíveis
+
+class Agrupamento(Restricao):
+    """Aulas seguidas e no mesmo turno para professor e turma (custo negativo = bônus)."""
+
+    nome = 'agrupamento'
+    BONUS = {
+        'professor': (10.0, 5.0),  # (aulas consecutivas, mesmo turno)
+        'turma': (8.0, 3.0),
+    }
+
+    def delta(self, ocupacao, professor, turma, disciplina, dia, turno, inicio, fim):
+        bonus = 0.0
+        for tipo, indice in (('professor', professor), ('turma', turma)):
+            consecutiva, mesmo_turno = self.BONUS[tipo]
+            for inicio_ocupado, fim_ocupado, turno_ocupado in ocupacao.get((tipo, indice, dia), ()):
+                # Horários consecutivos: um termina quando o outro começa
+                if fim_ocupado == inicio or fim == inicio_ocupado:
+                    bonus += consecutiva
+                if turno_ocupado == turno:
+                    bonus += mesmo_turno
+        return -bonus
+
+    def avaliar(self, quadro):
+        por_dia = defaultdict(list)
+        for turma, _, professor, dia, inicio, fim, turno, _ in aulas_posicionadas(quadro):
+            por_dia[('professor', professor, dia)].append((inicio, fim, turno))
+            por_dia[('turma', turma, dia)].append((inicio, fim, turno))
+
+        bonus = 0.0
+        for (tipo, _, _), aulas in por_dia.items():
+            consecutiva, mesmo_turno = self.BONUS[tipo]
+            for indice, (inicio, fim, turno) in enumerate(aulas):
+                for inicio_outra, fim_outra, turno_outra in aulas[indice + 1:]:
+                    if fim_outra == inicio or fim == inicio_outra:
+                        bonus += consecutiva
+                    if turno_outra == turno:
+                        bonus += mesmo_turno
+        return -bonus
+
+
+class Janelas(Restricao):
+    """
+    Janelas (intervalos vagos de até 2 horas) entre aulas do mesmo dia.
+
+    Pesam minutos/10 para professores e minutos/20 para turmas.
+    """
+
+    nome = 'janelas'
+    opcao = 'evitar_janelas'
+    relaxar_com = 0.3
+    DIVISORES = {'professor': 10, 'turma': 20}
+
+    @staticmethod
+    def _intervalo(inicio, fim, inicio_outra, fim_outra):
+        if fim_outra < inicio:
+            return inicio - fim_outra
+        if fim < inicio_outra:
+            return inicio_outra - fim
+        return 0
+
+    def delta(self, ocupacao, professor, turma, disciplina, dia, turno, inicio, fim):
+        penalidade = 0.0
+        for tipo, indice in (('professor', professor), ('turma', turma)):
+            divisor = self.DIVISORES[tipo]
+            for inicio_ocupado, fim_ocupado, _ in ocupacao.get((tipo, indice, dia), ()):
+                intervalo = self._intervalo(inicio, fim, inicio_ocupado, fim_ocupado)
+                if 0 < intervalo <= 120:
+                    penalidade += intervalo / divisor
+        return penalidade
+
+    def avaliar(self, quadro):
+        por_dia = defaultdict(list)
+        for turma, _, professor, dia, inicio, fim, _, _ in aulas_posicionadas(quadro):
+            por_dia[('professor', professor, dia)].append((inicio, fim))
+            por_dia[('turma', turma, dia)].append((inicio, fim))
+
+        penalidade = 0.0
+        for (tipo, _, _), aulas in por_dia.items():
+            for indice, (inicio, fim) in enumerate(aulas):
+                for inicio_outra, fim_outra in aulas[indice + 1:]:
+                    intervalo = self._intervalo(inicio, fim, inicio_outra, fim_outra)
+                    if 0 < intervalo <= 120:
+                        penalidade += intervalo / self.DIVISORES[tipo]
+        return penalidade
+
+
+class Preferencias(Restricao):
+    """
+    Prioridade que o professor deu ao dia e turno.
+
+    Mesma escala de Professor.get_preferencia_score: 1 (indisponível) a 5
+    (altamente preferencial), 3 sem preferência; o custo é 3 - score.
+    """
+
+    nome = 'preferencias'
+    peso = 2.0
+
+    def preparar(self, quadro, periodo_letivo):
+        # Import local: core.ocupacao depende do gerador, que usa este módulo
+        from .ocupacao import preferencia_aplicavel
+
+        self._aplicavel = preferencia_aplicavel
+        self._preferencias = _preferencias_por_professor(quadro)
+        self._cache = {}
+
+    def _score(self, professor, dia, turno):
+        preferencias = self._preferencias.get(professor, [])
+        if not self._aplicavel(preferencias, dia, turno, None):
+            return 1
+        for preferencia in preferencias:
+            if preferencia.dia_semana == dia and preferencia.turno == turno:
+                return preferencia.prioridade
+        return 3
+
+    def delta(self, ocupacao, professor, turma, disciplina, dia, turno, inicio, fim):
+        chave = (professor, dia, turno)
+        if chave not in self._cache:
+            self._cache[chave] = 3 - self._score(professor, dia, TURNOS[turno])
+        return self._cache[chave]
+
+    def avaliar(self, quadro):
+        return sum(
+            self.delta(None, professor, turma, disciplina, dia, turno, inicio, fim)
+            for turma, disciplina, professor, dia, inicio, fim, turno, _ in aulas_posicionadas(quadro)
+        )
+
+
+class DistribuicaoDias(Restricao):
+    """
+    Aulas de uma disciplina espalhadas pelos dias da semana.
+
+    Custa cada aula da disciplina no mesmo dia além do seu maior bloco
+    (1 quando a disciplina não declara padrão).
+    """
+
+    nome = 'distribuicao_dias'
+    peso = 15.0
+    opcao = 'distribuir_dias'
+
+    def preparar(self, quadro, periodo_letivo):
+        self._blocos = _maiores_blocos(quadro)
+
+    def delta_janela(self, ocupacao, professor, turma, disciplina, dia, turno, slots):
+        ja_no_dia = len(ocupacao.get(('disciplina', turma, disciplina, dia), ()))
+        bloco = self._blocos[disciplina]
+        return max(0, ja_no_dia + len(slots) - bloco) - max(0, ja_no_dia - bloco)
+
+    def delta(self, ocupacao, professor, turma, disciplina, dia, turno, inicio, fim):
+        return self.delta_janela(ocupacao, professor, turma, disciplina, dia, turno, ((inicio, fim),))
+
+    def avaliar(self, quadro):
+        contagem = Counter((turma, disciplina, dia) for turma, disciplina, _, dia, *_ in aulas_posicionadas(quadro))
+        return sum(max(0, total - self._blocos[disciplina]) for (_, disciplina, _), total in contagem.items())
+
+
+class EstabilidadeSala(Restricao):
+    """
+    Turma na mesma sala ao longo da semana.
+
+    Não influencia a escolha dos slots (as salas são emparelhadas depois);
+    em `ajustar_salas` cada aula vai para a sala mais usada pela turma
+    quando ela está livre no slot. O custo é o número de aulas fora dessa sala.
+    """
+
+    nome = 'estabilidade_sala'
+    peso = 0.5
+
+    def ajustar_salas(self, alocador, aulas):
+        salas_turma = defaultdict(Counter)
+        for aula, turma, slot in aulas:
+            sala = alocador.indice_sala(slot, aula)
+            if sala is not None:
+                salas_turma[turma][sala] += 1
+
+        for aula, turma, slot in aulas:
+            preferida = salas_turma[turma].most_common(1)[0][0] if salas_turma[turma] else None
+            atual = alocador.indice_sala(slot, aula)
+            if preferida is not None and atual != preferida and alocador.mover(slot, aula, preferida):
+                salas_turma[turma][atual] -= 1
+                salas_turma[turma][preferida] += 1
+
+    def avaliar(self, quadro):
+        salas_turma = defaultdict(Counter)
+        for turma, _, _, _, _, _, _, sala in aulas_posicionadas(quadro):
+            if sala != SEM_VALOR:
+                salas_turma[turma][sala] += 1
+        return sum(sum(salas.values()) - max(salas.values()) for salas in salas_turma.values())
+
+
+def _preferencias_por_professor(quadro: QuadroCompacto) -> Dict[int, List[PreferenciaProfessor]]:
+    """Preferências dos professores do catálogo por índice (uma consulta)."""
+    catalogo = quadro.catalogo
+    indices = {pk: indice for indice, pk in enumerate(catalogo.pks['professor'])}
+    preferencias = defaultdict(list)
+    for preferencia in PreferenciaProfessor.objects.filter(professor_id__in=list(indices)).order_by('pk'):
+        preferencias[indices[preferencia.professor_id]].append(preferencia)
+    return preferencias
+
+
+def _maiores_blocos(quadro: QuadroCompacto) -> List[int]:
+    """Maior bloco do padrão de cada disciplina do catálogo (1 sem padrão)."""
+    maiores = []
+    for disciplina in quadro.catalogo.objetos['disciplina']:
+        try:
+            maiores.append(max(disciplina.blocos(), default=1))
+        except ValueError:
+            maiores.append(1)
+    return maiores
+
+
+RESTRICOES_PADRAO = [
+    SemSobreposicao,
+    DisponibilidadeProfessor,
+    MaximoAulasPorDia,
+    Agrupamento,
+    Janelas,
+    Preferencias,
+    DistribuicaoDias,
+    EstabilidadeSala,
+]
+
+
+def restricoes_padrao() -> List[Restricao]:
+    """Restrições da configuração RESTRICOES_HORARIOS, ou as padrão deste módulo."""
+    caminhos = getattr(settings, 'RESTRICOES_HORARIOS', None)
+    if caminhos is None:
+        return [classe() for classe in RESTRICOES_PADRAO]
+    return [import_string(caminho)() for caminho in caminhos]
+
+
+class ConjuntoRestricoes:
+    """
+    Restrições consumidas pelo gerador.
+
+    `configurar` escolhe as ativas para a tentativa (opções da geração e
+    flexibilidade); a busca só chama `permite_janela` e `custo_janela`.
+    """
+
+    def __init__(self, restricoes: Optional[Iterable[Restricao]] = None):
+        self.restricoes = list(restricoes) if restricoes is not None else restricoes_padrao()
+        self.rigidas: List[Restricao] = [restricao for restricao in self.restricoes if restricao.rigida]
+        self.flexiveis: List[Restricao] = [restricao for restricao in self.restricoes if not restricao.rigida]
+
+    def preparar(self, quadro: QuadroCompacto, periodo_letivo) -> None:
+        for restricao in self.restricoes:
+            restricao.preparar(quadro, periodo_letivo)
+
+    def configurar(self, flexibilidade: float = 0.0, **opcoes: bool) -> None:
+        ativas = [restricao for restricao in self.restricoes if restricao.ativa(flexibilidade, opcoes)]
+        self.rigidas = [restricao for restricao in ativas if restricao.rigida]
+        self.flexiveis = [restricao for restricao in ativas if not restricao.rigida]
+
+    def permite_janela(self, ocupacao, professor, turma, disciplina, dia, turno, slots: Slots) -> bool:
+        for restricao in self.rigidas:
+            if not restricao.permite_janela(ocupacao, professor, turma, disciplina, dia, turno, slots):
+                return False
+        return True
+
+    def custo_janela(self, ocupacao, professor, turma, disciplina, dia, turno, slots: Slots) -> float:
+        custo = 0.0
+        for restricao in self.flexiveis:
+            custo += restricao.peso * restricao.delta_janela(ocupacao, professor, turma, disciplina, dia, turno, slots)
+        return custo
+
+    def ajustar_salas(self, alocador, aulas) -> None:
+        for restricao in self.flexiveis:
+            restricao.ajustar_salas(alocador, aulas)
+
+    def avaliar(self, quadro: QuadroCompacto) -> Dict[str, Dict[str, float]]:
+        """
+        Avaliação do quadro inteiro com todas as restrições.
+
+        Returns:
+            dict: 'violacoes' (rígidas), 'custos' (flexíveis, já com peso)
+                e 'objetivo' (soma dos custos)
+        """
+        violacoes = {restricao.nome: restricao.avaliar(quadro) for restricao in self.restricoes if restricao.rigida}
+        custos = {
+            restricao.nome: round(restricao.peso * restricao.avaliar(quadro), 2)
+            for restricao in self.restricoes if not restricao.rigida
+        }
+        return {'violacoes': violacoes, 'custos': custos, 'objetivo': round(sum(custos.values()), 2)}
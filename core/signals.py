@@ -0,0 +1,104 @@
+"""
+Sinais do app core.
+
+Mantém a versão dos dados (core/cache.py) em dia: qualquer escrita nos
+modelos que alimentam dashboards e relatórios invalida os resultados
+versionados em cache quando a transação é confirmada; as notificações têm
+versão própria. Também publica no canal de eventos (core/eventos.py)
+as mudanças de horários e as novas notificações.
+"""
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from .cache import incrementar_versao_dados, incrementar_versao_notificacoes
+from .eventos import publicar_apos_commit, serializar_horario
+from .models import (
+    BloqueioTemporario, Disciplina, EventoAcademico, Horario, LeituraNotificacao, NotificacaoSistema, PeriodoLetivo,
+    Professor, Sala, Turma
+)
+
+
+# Bloqueios, eventos e períodos alimentam o índice de calendário (core/intervalos.py)
+MODELOS_VERSIONADOS = (
+    Horario, Turma, Disciplina, Professor, Sala,
+    BloqueioTemporario, EventoAcademico, PeriodoLetivo
+)
+
+
+def invalidar_cache_versionado(sender, **kwargs):
+    """
+    Incrementa a versão dos dados após qualquer escrita relevante.
+
+    Só depois do commit: antes dele, uma requisição concorrente leria os
+    dados antigos e os guardaria no cache sob a versão nova.
+    """
+    acao = kwargs.get('action')
+    if acao and not acao.startswith('post_'):
+        return  # m2m_changed dispara pre_* e post_*; basta invalidar uma vez
+    transaction.on_commit(incrementar_versao_dados)
+
+
+def invalidar_notificacoes(sender, **kwargs):
+    """Incrementa só a versão das notificações (também após o commit)."""
+    transaction.on_commit(incrementar_versao_notificacoes)
+
+
+def publicar_horario_salvo(sender, instance, created, **kwargs):
+    """Publica a criação ou alteração de um horário."""
+    publicar_apos_commit('horario', {
+        'acao': 'criado' if created else 'alterado',
+        'horario': serializar_horario(instance),
+    })
+
+
+def publicar_horario_removido(sender, instance, **kwargs):
+    """Publica a remoção de um horário."""
+    publicar_apos_commit('horario', {'acao': 'removido', 'id': instance.id})
+
+
+def publicar_notificacao(sender, instance, created, **kwargs):
+    """Publica notificações novas (alterações como leitura não são enviadas)."""
+    if created:
+        publicar_apos_commit('notificacao', {
+            'acao': 'criada',
+            'id': instance.id,
+            'titulo': instance.titulo,
+            'tipo': instance.tipo,
+            'prioridade': instance.prioridade,
+        })
+
+
+def conectar_sinais():
+    """Conecta os receptores; chamado em CoreConfig.ready()."""
+    for modelo in MODELOS_VERSIONADOS:
+        post_save.connect(
+            invalidar_cache_versionado, sender=modelo,
+            dispatch_uid=f'versao_dados_save_{modelo.__name__}'
+        )
+        post_delete.connect(
+            invalidar_cache_versionado, sender=modelo,
+            dispatch_uid=f'versao_dados_delete_{modelo.__name__}'
+        )
+
+    for modelo in (NotificacaoSistema, LeituraNotificacao):
+        post_save.connect(
+            invalidar_notificacoes, sender=modelo,
+            dispatch_uid=f'versao_notificacoes_save_{modelo.__name__}'
+        )
+        post_delete.connect(
+            invalidar_notificacoes, sender=modelo,
+            dispatch_uid=f'versao_notificacoes_delete_{modelo.__name__}'
+        )
+
+    # Vínculos turma/professor ↔ disciplina também alteram os relatórios
+    for relacao in (Turma.disciplinas.through, Professor.disciplinas.through):
+        m2m_changed.connect(
+            invalidar_cache_versionado, sender=relacao,
+            dispatch_uid=f'versao_dados_m2m_{relacao.__name__}'
+        )
+
+    # Eventos ao vivo da grade e do sino de notificações
+    post_save.connect(publicar_horario_salvo, sender=Horario, dispatch_uid='eventos_horario_save')
+    post_delete.connect(publicar_horario_removido, sender=Horario, dispatch_uid='eventos_horario_delete')
+    post_save.connect(publicar_notificacao, sender=NotificacaoSistema, dispatch_uid='eventos_notificacao_save')
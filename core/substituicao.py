@@ -0,0 +1,153 @@
+"""
+Busca de professores substitutos para as aulas afetadas por um bloqueio.
+
+Para cada aula do professor bloqueado em cada data do bloqueio, os
+candidatos são os professores habilitados na disciplina, livres no slot
+(máscaras do MapaOcupacao), disponíveis pelas preferências e sem bloqueio
+na data. Preferências e habilitações de todos os candidatos são carregadas
+uma vez e os bloqueios vêm do IndiceCalendario do período; a busca é uma
+passada sobre as aulas afetadas.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, List, Tuple
+
+from .intervalos import IndiceCalendario
+from .models import BloqueioTemporario, Horario, PeriodoLetivo, PreferenciaProfessor, Professor
+from .ocupacao import MapaOcupacao, mascara_intervalo, mascara_turno, preferencia_aplicavel
+
+
+class BuscaSubstitutos:
+    """
+    Ranking de substitutos para as aulas que um BloqueioTemporario cancela.
+
+    Os candidatos são ordenados pela carga semanal (menos aulas primeiro) e,
+    em seguida, pelo número de aulas que já têm no mesmo dia.
+    """
+
+    def __init__(self, bloqueio: BloqueioTemporario, periodo_letivo=None, limite: int = 5):
+        self.bloqueio = bloqueio
+        self.limite = limite
+        self.periodo_letivo = periodo_letivo or self._periodo_do_bloqueio()
+        self.mapa = MapaOcupacao.do_periodo(self.periodo_letivo.pk if self.periodo_letivo else None)
+
+    def _periodo_do_bloqueio(self):
+        """Período letivo que contém o início do bloqueio (ou o ativo)."""
+        return PeriodoLetivo.objects.filter(
+            data_inicio__lte=self.bloqueio.data_inicio,
+            data_fim__gte=self.bloqueio.data_inicio
+        ).first() or PeriodoLetivo.get_periodo_ativo()
+
+    def aulas_afetadas(self) -> List[Tuple]:
+        """
+        (data, horário) de cada aula do professor que o bloqueio cancela.
+
+        Bloqueios recorrentes valem no dia da semana de `data_inicio`, a
+        cada semana até `data_fim`. Só entram as datas dentro do período
+        letivo e em que há aula: feriados e eventos que impedem aulas no
+        turno (IndiceCalendario) ficam de fora.
+        """
+        bloqueio = self.bloqueio
+        horarios_por_dia = defaultdict(list)
+        for horario in Horario.objects.do_periodo(self.periodo_letivo).ativos().filter(
+            professor_id=bloqueio.professor_id
+        ).select_related('turma', 'disciplina', 'sala').order_by('horario_inicio'):
+            if not bloqueio.turno or horario.turno == bloqueio.turno:
+                horarios_por_dia[horario.dia_semana].append(horario)
+
+        inicio, fim = bloqueio.data_inicio, bloqueio.data_fim
+        if self.periodo_letivo:
+            inicio = max(inicio, self.periodo_letivo.data_inicio)
+            fim = min(fim, self.periodo_letivo.data_fim)
+        calendario = IndiceCalendario.do_periodo(self.periodo_letivo)
+
+        afetadas = []
+        data = inicio
+        while data <= fim:
+            if not bloqueio.recorrente or data.weekday() == bloqueio.data_inicio.weekday():
+                afetadas.extend(
+                    (data, horario) for horario in horarios_por_dia.get(data.weekday(), ())
+                    if not calendario.eventos_em(data, horario.turno)
+                )
+            data += timedelta(days=1)
+        return afetadas
+
+    def buscar(self) -> List[Dict]:
+        """
+        Candidatos para cada aula afetada.
+
+        Returns:
+            list: Uma entrada por aula, com data, dados do horário e
+                'candidatos' (id, nome, carga semanal e aulas no dia)
+        """
+        afetadas = self.aulas_afetadas()
+        if not afetadas:
+            return []
+
+        disciplinas = {horario.disciplina_id for _, horario in afetadas}
+        habilitados = defaultdict(list)
+        for disciplina_id, professor_id in Professor.disciplinas.through.objects.filter(
+            disciplina_id__in=disciplinas, professor__ativo=True
+        ).exclude(professor_id=self.bloqueio.professor_id).values_list('disciplina_id', 'professor_id'):
+            habilitados[disciplina_id].append(professor_id)
+
+        candidatos = {pk for ids in habilitados.values() for pk in ids}
+        professores = Professor.objects.in_bulk(candidatos)
+
+        preferencias = defaultdict(list)
+        for preferencia in PreferenciaProfessor.objects.filter(professor_id__in=candidatos):
+            preferencias[preferencia.professor_id].append(preferencia)
+
+        calendario = IndiceCalendario.do_periodo(self.periodo_letivo)
+        bloqueados = {}
+
+        carga = {pk: self.mapa.ocupacao('professor', pk).bit_count() for pk in candidatos}
+        mascaras_dia = {}
+
+        resultado = []
+        for data, horario in afetadas:
+            slot = mascara_intervalo(horario.dia_semana, horario.horario_inicio, horario.horario_fim)
+            if horario.dia_semana not in mascaras_dia:
+                mascaras_dia[horario.dia_semana] = mascara_turno(dia=horario.dia_semana)
+
+            ranking = []
+            for professor_id in habilitados.get(horario.disciplina_id, ()):
+                ocupacao = self.mapa.ocupacao('professor', professor_id)
+                if ocupacao & slot:
+                    continue
+                if not preferencia_aplicavel(
+                    preferencias[professor_id], horario.dia_semana, horario.turno, horario.disciplina_id
+                ):
+                    continue
+                if (data, horario.turno) not in bloqueados:
+                    bloqueados[(data, horario.turno)] = calendario.professores_bloqueados(data, horario.turno)
+                if professor_id in bloqueados[(data, horario.turno)]:
+                    continue
+                ranking.append((
+                    carga[professor_id],
+                    (ocupacao & mascaras_dia[horario.dia_semana]).bit_count(),
+                    professores[professor_id].nome_completo,
+                    professor_id
+                ))
+            ranking.sort()
+
+            resultado.append({
+                'data': data.isoformat(),
+                'horario_id': horario.id,
+                'turma': horario.turma.nome_codigo,
+                'disciplina': horario.disciplina.nome,
+                'sala': horario.sala.nome_numero,
+                'inicio': horario.horario_inicio.strftime('%H:%M'),
+                'fim': horario.horario_fim.strftime('%H:%M'),
+                'candidatos': [
+                    {
+                        'professor_id': professor_id,
+                        'nome': nome,
+                        'carga_semanal': carga_semanal,
+                        'aulas_no_dia': aulas_no_dia,
+                    }
+                    for carga_semanal, aulas_no_dia, nome, professor_id in ranking[:self.limite]
+                ],
+            })
+        return resultado
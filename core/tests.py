@@ -1,3 +1,989 @@
-from django.test import TestCase
+import importlib.util
+import io
+import json
+import os
+import random
+import re
+import tempfile
+import unittest
+from datetime import date, time
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .algoritmo_horarios import GeradorHorariosRobusto
+from .alocacao_salas import AlocadorSalas, IndiceSalas
+from .blocos import interpretar_padrao
+from .candidatos import promover_candidato
+from .cache import get_versao_dados, incrementar_versao_dados
+from .carga_horaria import MatrizCargaHoraria
+from .estatisticas import EstatisticasSistema
+from .exportacao import ExportacaoHorarios
+from .grade import horarios_da_grade, montar_grade
+from .importacao import ImportacaoError, importar_arquivo
+from .impressao import MINIMO_PARA_POOL, DocumentoGrades
+from .intervalos import ArvoreIntervalos, IndiceCalendario
+from .models import (
+    AuditoriaHorario, BloqueioTemporario, Disciplina, EventoAcademico, Horario, HorarioCandidato, NotificacaoSistema, PeriodoLetivo,
+    PreferenciaProfessor, Professor, Sala, Turma
+)
+from .movimentacao import MovimentacaoHorarios
+from .ocupacao import DisponibilidadePeriodo
+from .quadro_compacto import QuadroCompacto, minutos
+from .restricoes import ConjuntoRestricoes, Janelas, SemSobreposicao
+from .substituicao import BuscaSubstitutos
+from .viabilidade import AnaliseViabilidade
+
+
+class DadosEscolaresMixin:
+    """Período ativo, sala, disciplina, professor habilitado e uma turma matutina."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.periodo = PeriodoLetivo.objects.create(
+            nome='2026.1', data_inicio=date(2026, 2, 2), data_fim=date(2026, 6, 30), ativo=True
+        )
+        cls.sala = Sala.objects.create(nome_numero='101', capacidade=40)
+        cls.disciplina = Disciplina.objects.create(
+            nome='Matemática', carga_horaria_semanal=2, curso_area='Exatas', periodo_serie='1º Ano'
+        )
+        cls.professor = Professor.objects.create(nome_completo='Ana Souza')
+        cls.professor.disciplinas.add(cls.disciplina)
+        cls.turma = cls.criar_turma('1A')
+
+    def setUp(self):
+        super().setUp()
+        # Mapas e grades ficam no cache pela versão dos dados; cada teste parte do zero
+        cache.clear()
+
+    @classmethod
+    def criar_turma(cls, codigo, numero_alunos=30):
+        turma = Turma.objects.create(
+            nome_codigo=codigo, serie_periodo='1º Ano', numero_alunos=numero_alunos, turno_turma='matutino'
+        )
+        turma.disciplinas.add(cls.disciplina)
+        return turma
+
+    def criar_horario(self, dia=0, inicio=time(7, 0), fim=time(7, 50), **campos):
+        dados = {
+            'turma': self.turma,
+            'disciplina': self.disciplina,
+            'professor': self.professor,
+            'sala': self.sala,
+            'periodo_letivo': self.periodo,
+            'dia_semana': dia,
+            'turno': Horario.turno_do_horario(inicio),
+            'horario_inicio': inicio,
+            'horario_fim': fim,
+        }
+        dados.update(campos)
+        return Horario.objects.create(**dados)
+
+
+class AlocacaoSalasTests(DadosEscolaresMixin, TestCase):
+
+    def test_troca_de_sala_abre_vaga(self):
+        normal = Sala(pk=1, nome_numero='N1', capacidade=40, tipo='normal')
+        laboratorio = Sala(pk=2, nome_numero='L1', capacidade=40, tipo='laboratorio')
+        alocador = AlocadorSalas([normal, laboratorio])
+        turma = Turma(numero_alunos=30)
+        alocador.registrar_aula('livre', alocador.salas_compativeis(turma))
+        alocador.registrar_aula('exige_normal', alocador.salas_compativeis(turma, 'normal'), 'normal')
+
+        # A primeira aula fica com a sala normal, a única que serve para a segunda;
+        # por caminho aumentante ela passa para o laboratório
+        self.assertTrue(alocador.alocar('slot', 'livre'))
+        self.assertEqual(alocador.sala_da_aula('slot', 'livre'), normal)
+        self.assertTrue(alocador.alocar('slot', 'exige_normal'))
+        self.assertEqual(alocador.sala_da_aula('slot', 'exige_normal'), normal)
+        self.assertEqual(alocador.sala_da_aula('slot', 'livre'), laboratorio)
+
+    def test_busca_por_tipo_e_capacidade(self):
+        salas = [
+            Sala(pk=1, nome_numero='N30', capacidade=30, tipo='normal'),
+            Sala(pk=2, nome_numero='N50', capacidade=50, tipo='normal'),
+            Sala(pk=3, nome_numero='L20', capacidade=20, tipo='laboratorio'),
+            Sala(pk=4, nome_numero='L40', capacidade=40, tipo='laboratorio'),
+            Sala(pk=5, nome_numero='A90', capacidade=90, tipo='auditorio'),
+        ]
+        indice = IndiceSalas(salas)
+
+        def nomes(capacidade, tipo=''):
+            return [indice.salas[posicao].nome_numero for posicao in indice.buscar(capacidade, tipo)]
+
+        self.assertEqual(nomes(35, 'laboratorio'), ['L40'])
+        self.assertEqual(nomes(35), ['N50', 'L40', 'A90'])
+        self.assertEqual(nomes(10, 'normal'), ['N30', 'N50'])
+        self.assertEqual(nomes(100), [])
+
+    def test_slot_sem_sala_livre(self):
+        alocador = AlocadorSalas([Sala(pk=1, nome_numero='N1', capacidade=40)])
+        for aula in ('a', 'b'):
+            alocador.registrar_aula(aula, alocador.salas_compativeis(Turma(numero_alunos=30)))
+        self.assertTrue(alocador.alocar('slot', 'a'))
+        self.assertFalse(alocador.tem_sala_livre('slot', 'b'))
+        self.assertFalse(alocador.alocar('slot', 'b'))
+        self.assertIsNone(alocador.sala_da_aula('slot', 'b'))
+
+    def test_geracao_aponta_turma_sem_sala(self):
+        grande = self.criar_turma('1G', numero_alunos=50)
+        resultado = GeradorHorariosRobusto().gerar_horarios(
+            turmas=[grande], max_tentativas=1, como_candidato=True, semente=1
+        )
+        self.assertFalse(resultado['sucesso'])
+        self.assertIn('Nenhuma sala ativa comporta a turma 1G (50 alunos)', resultado['conflitos'])
+
+
+class AnaliseViabilidadeTests(DadosEscolaresMixin, TestCase):
+
+    SLOTS = [(0, 'manha', '07:00', '07:50'), (0, 'manha', '07:50', '08:40')]
+
+    def aulas(self, turma, quantidade, professor=None):
+        return [
+            {'turma': turma, 'disciplina': self.disciplina, 'professores_possiveis': [professor or self.professor]}
+            for _ in range(quantidade)
+        ]
+
+    def verificar(self, aulas, salas=None):
+        turmas = {aula['turma'].pk for aula in aulas}
+        return AnaliseViabilidade(
+            aulas, {turma_id: self.SLOTS for turma_id in turmas}, [], IndiceSalas(salas or [self.sala])
+        ).verificar()
+
+    def test_viavel(self):
+        self.assertEqual(self.verificar(self.aulas(self.turma, 2)), [])
+
+    def test_turma_sem_slots_suficientes(self):
+        motivos = self.verificar(self.aulas(self.turma, 3))
+        self.assertTrue(motivos[0].startswith('Turma 1A precisa de 3 aulas'), motivos)
+
+    def test_professor_sem_horarios_suficientes(self):
+        outra = self.criar_turma('1B')
+        salas = [self.sala, Sala(pk=99, nome_numero='102', capacidade=40)]
+        motivos = self.verificar(self.aulas(self.turma, 2) + self.aulas(outra, 1), salas)
+        self.assertEqual(motivos, [
+            '3 aulas de Matemática dependem de Ana Souza, que têm apenas 2 horários livres nos turnos das turmas envolvidas'
+        ])
+
+    def test_salas_insuficientes_para_a_classe(self):
+        outra = self.criar_turma('1B')
+        bruno = Professor.objects.create(nome_completo='Bruno Lima')
+        motivos = self.verificar(self.aulas(self.turma, 2) + self.aulas(outra, 2, bruno))
+        self.assertEqual(motivos, [
+            '4 aulas precisam de sala de qualquer tipo para 30 ou mais alunos, '
+            'mas as 1 salas compatíveis oferecem apenas 2 horários livres'
+        ])
+
+
+class ExplicacaoInviabilidadeTests(DadosEscolaresMixin, TestCase):
+
+    def test_turno_da_turma_explica_a_recusa(self):
+        # 31 aulas semanais não cabem nos 30 horários do turno matutino
+        Disciplina.objects.filter(pk=self.disciplina.pk).update(carga_horaria_semanal=31)
+        resultado = GeradorHorariosRobusto().gerar_horarios(
+            turmas=[Turma.objects.get(pk=self.turma.pk)], como_candidato=True, semente=1
+        )
+        self.assertFalse(resultado['sucesso'])
+        self.assertEqual(resultado['tentativas'], 0)
+        conflito = resultado['restricoes_conflitantes'][0]
+        self.assertEqual(conflito['restricoes'], ['Turma 1A tem aulas apenas no turno Matutino (Manhã)'])
+        self.assertTrue(any(motivo.startswith('Turma 1A precisa de 31 aulas') for motivo in conflito['motivos']))
+
+
+class TipoSalaExigidoTests(DadosEscolaresMixin, TestCase):
+
+    def test_geracao_usa_so_salas_do_tipo_exigido(self):
+        laboratorio = Sala.objects.create(nome_numero='Lab 1', capacidade=40, tipo='laboratorio')
+        Disciplina.objects.filter(pk=self.disciplina.pk).update(tipo_sala='laboratorio')
+        gerador = GeradorHorariosRobusto()
+        resultado = gerador.gerar_horarios(
+            turmas=[Turma.objects.get(pk=self.turma.pk)], max_tentativas=5, como_candidato=True, semente=1
+        )
+        self.assertTrue(resultado['sucesso'], resultado['conflitos'])
+        self.assertEqual({linha['sala_id'] for linha in gerador.quadro.linhas()}, {laboratorio.pk})
+
+    def test_sem_sala_do_tipo(self):
+        Disciplina.objects.filter(pk=self.disciplina.pk).update(tipo_sala='auditorio')
+        resultado = GeradorHorariosRobusto().gerar_horarios(
+            turmas=[Turma.objects.get(pk=self.turma.pk)], max_tentativas=1, como_candidato=True, semente=1
+        )
+        self.assertFalse(resultado['sucesso'])
+        self.assertIn(
+            'Nenhuma sala ativa do tipo Auditório comporta a turma 1A (30 alunos) para Matemática',
+            resultado['conflitos']
+        )
+
+
+class VersaoDadosTests(DadosEscolaresMixin, TestCase):
+
+    def test_versao_muda_so_apos_o_commit(self):
+        versao = get_versao_dados()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.criar_horario(dia=0)
+            # Dentro da transação, quem ler agora ainda grava sob a versão antiga
+            self.assertEqual(get_versao_dados(), versao)
+        self.assertGreater(get_versao_dados(), versao)
+
+
+class PeriodoLetivoHorariosTests(DadosEscolaresMixin, TestCase):
+
+    def test_do_periodo_separa_os_periodos(self):
+        atual = self.criar_horario(dia=0)
+        outro = PeriodoLetivo.objects.create(
+            nome='2026.2', data_inicio=date(2026, 8, 3), data_fim=date(2026, 12, 18)
+        )
+        # Mesmo slot, turma, professor e sala: não conflita por ser de outro período
+        seguinte = self.criar_horario(dia=0, periodo_letivo=outro)
+        seguinte.full_clean()
+
+        self.assertEqual(list(Horario.objects.do_periodo()), [atual])
+        self.assertEqual(list(Horario.objects.do_periodo(self.periodo)), [atual])
+        self.assertEqual(list(Horario.objects.do_periodo(outro)), [seguinte])
+
+        repetido = Horario(
+            turma=self.turma, disciplina=self.disciplina, professor=self.professor, sala=self.sala,
+            periodo_letivo=self.periodo, dia_semana=0, turno='manha',
+            horario_inicio=time(7, 0), horario_fim=time(7, 50)
+        )
+        with self.assertRaises(ValidationError):
+            repetido.full_clean()
+
+    def test_sem_periodo_ativo(self):
+        PeriodoLetivo.objects.filter(pk=self.periodo.pk).update(ativo=False)
+        self.criar_horario(dia=0)
+        sem_periodo = self.criar_horario(dia=1, periodo_letivo=None)
+        self.assertIsNone(sem_periodo.periodo_letivo)
+        self.assertEqual(list(Horario.objects.do_periodo()), [sem_periodo])
+
+
+class GradeHorariosTests(DadosEscolaresMixin, TestCase):
+
+    def test_montar_grade(self):
+        segunda = self.criar_horario(dia=0)
+        # Fora da tabela de slots: ganha linha própria
+        avulso = self.criar_horario(dia=4, inicio=time(6, 30), fim=time(7, 0))
+
+        grade = montar_grade(horarios_da_grade(self.periodo, turma=self.turma))
+        self.assertEqual({linha['turno'] for linha in grade}, {'manha'})
+        self.assertEqual(len(grade), 7)
+        self.assertEqual((grade[0]['horario_inicio'], grade[0]['dias'][4]['horario']), (time(6, 30), avulso))
+        self.assertEqual(grade[1]['horario_inicio'], time(7, 0))
+        self.assertEqual([celula['horario'] for celula in grade[1]['dias']], [segunda, None, None, None, None])
+
+    def test_pagina_da_turma_reaproveita_o_fragmento(self):
+        self.criar_horario(dia=0)
+        url = reverse('core:horario_turma', args=[self.turma.pk])
+        primeira = self.client.get(url)
+        self.assertFalse(primeira.context['fragmento_em_cache'])
+        self.assertContains(primeira, 'Matemática')
+
+        segunda = self.client.get(url)
+        self.assertTrue(segunda.context['fragmento_em_cache'])
+        self.assertContains(segunda, 'Matemática')
+
+        # Uma alteração confirmada muda a versão dos dados e a chave do fragmento
+        with self.captureOnCommitCallbacks(execute=True):
+            self.criar_horario(dia=1)
+        self.assertFalse(self.client.get(url).context['fragmento_em_cache'])
+
+
+class MatrizCargaHorariaTests(DadosEscolaresMixin, TestCase):
+
+    def test_situacao_de_turma_da_matriz(self):
+        self.criar_horario()
+        matriz = MatrizCargaHoraria.do_periodo(self.periodo)
+        completa, mensagem = matriz.situacao(self.turma.pk, self.disciplina.pk)
+        self.assertFalse(completa)
+        self.assertIn('Faltam 1 aulas', mensagem)
+
+    def test_disciplina_sem_vinculo_com_a_turma(self):
+        artes = Disciplina.objects.create(
+            nome='Artes', carga_horaria_semanal=1, curso_area='Linguagens', periodo_serie='1º Ano'
+        )
+        self.professor.disciplinas.add(artes)
+        horario = self.criar_horario(disciplina=artes)
+        self.assertEqual(
+            horario.validar_carga_horaria_completa(),
+            (True, 'Carga horária completa para Artes na turma 1A')
+        )
+
+    def test_turma_fora_da_matriz_compartilhada(self):
+        outra = self.criar_turma('1B')
+        horario = self.criar_horario(turma=outra)
+        matriz = MatrizCargaHoraria.do_periodo(self.periodo, turmas=[self.turma])
+        completa, mensagem = horario.validar_carga_horaria_completa(matriz)
+        self.assertFalse(completa)
+        self.assertIn('Faltam 1 aulas de Matemática para a turma 1B', mensagem)
+
+    def test_turma_inexistente(self):
+        matriz = MatrizCargaHoraria.do_periodo(self.periodo)
+        self.assertEqual(matriz.situacao(0, self.disciplina.pk), (False, 'Turma 0 não encontrada'))
+
+
+@override_settings(NOTIFICACOES_VERIFICACAO_AUTOMATICA=False)
+class LeituraNotificacoesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = User.objects.create_user('ana')
+        cls.bruno = User.objects.create_user('bruno')
+        cls.global_ = NotificacaoSistema.objects.create(titulo='Global', mensagem='Para todos')
+        cls.pessoal = NotificacaoSistema.objects.create(titulo='Pessoal', mensagem='Só da Ana', usuario=cls.ana)
+
+    def listar(self, usuario):
+        self.client.force_login(usuario)
+        return self.client.get(reverse('core:api_notificacoes')).json()
+
+    def marcar(self, usuario, dados):
+        self.client.force_login(usuario)
+        return self.client.post(reverse('core:api_notificacoes'), json.dumps(dados), content_type='application/json')
+
+    def test_leitura_de_global_vale_so_para_quem_leu(self):
+        self.assertEqual(self.marcar(self.ana, {'notificacao_id': self.global_.pk}).status_code, 200)
+
+        lidas_ana = {item['id']: item['lida'] for item in self.listar(self.ana)['notificacoes']}
+        self.assertTrue(lidas_ana[self.global_.pk])
+        resposta_bruno = self.listar(self.bruno)
+        self.assertEqual(resposta_bruno['nao_lidas'], 1)
+        self.assertFalse(resposta_bruno['notificacoes'][0]['lida'])
+        self.global_.refresh_from_db()
+        self.assertFalse(self.global_.lida)
+
+    def test_marcar_todas(self):
+        self.marcar(self.ana, {'todas': True})
+        self.assertEqual(self.listar(self.ana)['nao_lidas'], 0)
+        self.assertEqual(self.listar(self.bruno)['nao_lidas'], 1)
+        self.pessoal.refresh_from_db()
+        self.assertTrue(self.pessoal.lida)
+
+    def test_notificacao_de_outro_usuario(self):
+        self.assertEqual(self.marcar(self.bruno, {'notificacao_id': self.pessoal.pk}).status_code, 404)
+
+    def test_anonimo_nao_marca(self):
+        resposta = self.client.post(
+            reverse('core:api_notificacoes'), json.dumps({'todas': True}), content_type='application/json'
+        )
+        self.assertEqual(resposta.status_code, 403)
+
+
+@override_settings(NOTIFICACOES_VERIFICACAO_AUTOMATICA=False)
+class EstatisticasSistemaTests(DadosEscolaresMixin, TestCase):
+
+    def nao_lidas(self, usuario):
+        return EstatisticasSistema(self.periodo).get_contadores(usuario)['alertas']['notificacoes_nao_lidas']
+
+    def test_nao_lidas_por_usuario(self):
+        ana = User.objects.create_user('ana')
+        bruno = User.objects.create_user('bruno')
+        with self.captureOnCommitCallbacks(execute=True):
+            global_ = NotificacaoSistema.objects.create(titulo='Global', mensagem='Para todos')
+            NotificacaoSistema.objects.create(titulo='Pessoal', mensagem='Só do Bruno', usuario=bruno)
+        self.assertEqual((self.nao_lidas(ana), self.nao_lidas(bruno)), (1, 2))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            global_.marcar_como_lida(ana)
+        self.assertEqual((self.nao_lidas(ana), self.nao_lidas(bruno)), (0, 2))
+
+    def test_horarios_do_periodo(self):
+        self.criar_horario(dia=0)
+        outro = PeriodoLetivo.objects.create(
+            nome='2026.2', data_inicio=date(2026, 8, 3), data_fim=date(2026, 12, 18)
+        )
+        self.criar_horario(dia=1, periodo_letivo=outro)
+        self.assertEqual(EstatisticasSistema(self.periodo).get_contadores()['totais']['horarios'], 1)
+        self.assertEqual(EstatisticasSistema(outro).get_contadores()['totais']['horarios'], 1)
+
+        resposta = self.client.get(reverse('core:home'), {'periodo': outro.pk})
+        self.assertEqual(resposta.context['total_horarios'], 1)
+
+
+class MovimentacaoHorariosTests(DadosEscolaresMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.primeira = self.criar_horario(dia=0, inicio=time(7, 0), fim=time(7, 50))
+        self.segunda = self.criar_horario(dia=1, inicio=time(9, 0), fim=time(9, 50))
+
+    def mover(self, horario, dia, inicio, fim, **extras):
+        operacao = {
+            'tipo': 'mover', 'horario_id': horario.pk, 'versao': horario.versao,
+            'novo_dia': dia, 'novo_inicio': inicio, 'novo_fim': fim,
+        }
+        operacao.update(extras)
+        return operacao
+
+    def postar(self, corpo):
+        return self.client.post(reverse('core:mover_horarios_lote'), json.dumps(corpo), content_type='application/json')
+
+    def test_mover_grava_e_incrementa_versao(self):
+        resultado = MovimentacaoHorarios().aplicar([self.mover(self.primeira, 2, '07:50', '08:40')])
+        self.assertTrue(resultado['sucesso'], resultado['erros'])
+        self.primeira.refresh_from_db()
+        self.assertEqual((self.primeira.dia_semana, self.primeira.horario_inicio), (2, time(7, 50)))
+        self.assertEqual(self.primeira.versao, 2)
+
+    def test_trocar(self):
+        resultado = MovimentacaoHorarios().aplicar([{
+            'tipo': 'trocar', 'horario_id': self.primeira.pk, 'versao': self.primeira.versao,
+            'outro_id': self.segunda.pk, 'outra_versao': self.segunda.versao,
+        }])
+        self.assertTrue(resultado['sucesso'], resultado['erros'])
+        self.primeira.refresh_from_db()
+        self.segunda.refresh_from_db()
+        self.assertEqual((self.primeira.dia_semana, self.segunda.dia_semana), (1, 0))
+
+    def test_versao_desatualizada_recusa_o_lote(self):
+        operacao = self.mover(self.primeira, 2, '07:00', '07:50')
+        operacao['versao'] -= 1
+        resposta = self.postar({'operacoes': [operacao]})
+        self.assertEqual(resposta.status_code, 409)
+        self.assertEqual(resposta.json()['desatualizados'], [self.primeira.pk])
+        self.primeira.refresh_from_db()
+        self.assertEqual(self.primeira.dia_semana, 0)
+
+    def test_choque_com_a_propria_turma(self):
+        resultado = MovimentacaoHorarios().aplicar([self.mover(self.primeira, 1, '09:00', '09:50')])
+        self.assertFalse(resultado['sucesso'])
+        self.assertTrue(any('já possui aula' in erro for erro in resultado['erros']))
+
+    def test_sala_pequena_recusada(self):
+        pequena = Sala.objects.create(nome_numero='102', capacidade=10)
+        resultado = MovimentacaoHorarios().aplicar([
+            self.mover(self.primeira, 0, '07:00', '07:50', nova_sala_id=pequena.pk)
+        ])
+        self.assertFalse(resultado['sucesso'])
+        self.assertIn('comporta 10 alunos', resultado['erros'][0])
+
+    def test_dia_invalido(self):
+        resposta = self.postar({'operacoes': [self.mover(self.primeira, 9, '07:00', '07:50')]})
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn('dia 9 inválido', resposta.json()['erro'])
+        self.primeira.refresh_from_db()
+        self.assertEqual(self.primeira.dia_semana, 0)
+
+    def test_horario_fora_da_grade(self):
+        resposta = self.postar({'operacoes': [self.mover(self.primeira, 0, '07:10', '08:00')]})
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn('não é um horário da grade', resposta.json()['erro'])
+
+    def test_operacao_que_nao_e_objeto(self):
+        resposta = self.postar({'operacoes': [1]})
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn('Operação 1', resposta.json()['erro'])
+
+    def test_operacoes_fora_de_lista(self):
+        self.assertEqual(self.postar({'operacoes': {'tipo': 'mover'}}).status_code, 400)
+        self.assertEqual(MovimentacaoHorarios().aplicar('mover')['erros'], ['Informe as operações em uma lista'])
+
+
+class CanalEventosTests(DadosEscolaresMixin, TestCase):
+
+    def test_canal_aberto_so_nas_paginas_que_o_consomem(self):
+        self.assertContains(self.client.get(reverse('core:home')), 'const usarCanalEventos = false;')
+        self.assertContains(self.client.get(reverse('core:notificacoes')), 'const usarCanalEventos = true;')
+        self.assertContains(self.client.get(reverse('core:horario_grade')), 'const usarCanalEventos = true;')
+
+
+class AcoesAdminHorarioTests(DadosEscolaresMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@escola.br', 'senha'))
+        self.horarios = [self.criar_horario(dia=dia) for dia in (0, 1)]
+
+    def executar(self, acao, **campos):
+        dados = {'action': acao, '_selected_action': [horario.pk for horario in self.horarios], **campos}
+        with self.captureOnCommitCallbacks(execute=True):
+            resposta = self.client.post(reverse('admin:core_horario_changelist'), dados, follow=True)
+        return [str(mensagem) for mensagem in resposta.context['messages']]
+
+    def test_troca_de_professor_em_lote(self):
+        bruno = Professor.objects.create(nome_completo='Bruno Lima')
+        bruno.disciplinas.add(self.disciplina)
+        versao = get_versao_dados()
+
+        mensagens = self.executar('trocar_professor', professor=bruno.pk)
+
+        self.assertEqual(mensagens, ['2 horário(s) alterado(s).'])
+        for horario in self.horarios:
+            horario.refresh_from_db()
+            self.assertEqual(horario.professor, bruno)
+            self.assertEqual(horario.versao, 2)
+        self.assertEqual(AuditoriaHorario.objects.filter(acao='modificado').count(), 2)
+        self.assertGreater(get_versao_dados(), versao)
+
+    def test_conflito_nao_altera_nenhum_horario(self):
+        sala = Sala.objects.create(nome_numero='102', capacidade=40)
+        bruno = Professor.objects.create(nome_completo='Bruno Lima')
+        # Só a aula de terça colide; a de segunda também não pode mudar
+        self.criar_horario(dia=1, turma=self.criar_turma('1B'), professor=bruno, sala=sala)
+
+        mensagens = self.executar('trocar_sala', sala=sala.pk)
+
+        self.assertEqual(len(mensagens), 1)
+        self.assertTrue(mensagens[0].startswith('Nenhum horário foi alterado'))
+        self.assertEqual(Horario.objects.filter(sala=self.sala).count(), 2)
+        self.assertFalse(AuditoriaHorario.objects.filter(acao='modificado').exists())
+
+    def test_troca_sem_valor_escolhido(self):
+        mensagens = self.executar('trocar_sala')
+
+        self.assertEqual(mensagens, ["Escolha o campo 'Sala' ao lado da ação."])
+        self.assertEqual(Horario.objects.filter(sala=self.sala).count(), 2)
+
+    def test_desativar_e_ativar(self):
+        self.executar('desativar_horarios')
+        self.assertFalse(Horario.objects.filter(ativo=True).exists())
+
+        self.assertEqual(self.executar('ativar_horarios'), ['2 horário(s) alterado(s).'])
+        self.assertEqual(Horario.objects.filter(ativo=True).count(), 2)
+
+
+class DestinosValidosTests(DadosEscolaresMixin, TestCase):
+
+    def test_turma_matutina_so_recebe_destinos_da_manha(self):
+        horario = self.criar_horario(dia=0)
+        resposta = self.client.get(reverse('core:destinos_horario', args=[horario.pk]))
+        self.assertEqual(resposta.status_code, 200)
+        destinos = resposta.json()['destinos']
+        self.assertTrue(destinos)
+        self.assertEqual({destino['turno'] for destino in destinos}, {'manha'})
+
+
+class HorariosLivresTests(DadosEscolaresMixin, TestCase):
+
+    def buscar(self, **parametros):
+        return self.client.get(reverse('core:api_horarios_livres'), parametros)
+
+    def test_livres_em_comum(self):
+        self.criar_horario(dia=0)
+        outra = self.criar_turma('1B')
+        resposta = self.buscar(professor=self.professor.pk, turma=outra.pk)
+        self.assertEqual(resposta.status_code, 200)
+        livres = resposta.json()['livres']
+
+        slots = {(livre['dia'], livre['inicio']) for livre in livres}
+        self.assertNotIn((0, '07:00'), slots)
+        self.assertIn((0, '07:50'), slots)
+        # Turma matutina: 5 dias × 6 horários da manhã, menos o ocupado
+        self.assertEqual(len(livres), 29)
+        self.assertEqual({livre['turno'] for livre in livres}, {'manha'})
+        self.assertTrue(all(livre['salas_livres'] == [self.sala.pk] for livre in livres))
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.buscar(professor='x').status_code, 400)
+        self.assertEqual(self.buscar(turma=0).status_code, 404)
+        self.assertEqual(self.buscar(tipo_sala='piscina').status_code, 400)
+
+
+class PromocaoCandidatoTests(DadosEscolaresMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        resultado = GeradorHorariosRobusto().gerar_horarios(
+            turmas=[self.turma], max_tentativas=5, como_candidato=True, semente=1
+        )
+        self.assertTrue(resultado['sucesso'], resultado)
+        self.candidato = HorarioCandidato.objects.get(pk=resultado['candidato_id'])
+
+    def test_promove_candidato_valido(self):
+        resultado = promover_candidato(self.candidato)
+        self.assertTrue(resultado['sucesso'], resultado['erros'])
+        self.assertEqual(Horario.objects.filter(turma=self.turma).count(), 2)
+
+    def test_pontuacao_e_o_objetivo_das_restricoes(self):
+        quadro = self.candidato.quadro()
+        restricoes = ConjuntoRestricoes()
+        restricoes.preparar(quadro, self.periodo)
+        avaliacao = restricoes.avaliar(quadro)
+        self.assertEqual(self.candidato.pontuacao, -avaliacao['objetivo'])
+        self.assertEqual(self.candidato.parametros['objetivo'], avaliacao)
+        self.assertEqual(set(avaliacao['violacoes'].values()), {0})
+
+    def test_recusa_sala_que_nao_comporta_a_turma(self):
+        Sala.objects.filter(pk=self.sala.pk).update(capacidade=10)
+        resultado = promover_candidato(self.candidato)
+        self.assertFalse(resultado['sucesso'])
+        self.assertIn('comporta 10 alunos', resultado['erros'][0])
+        self.assertFalse(Horario.objects.exists())
+
+    def test_recusa_professor_indisponivel(self):
+        PreferenciaProfessor.objects.create(professor=self.professor, turno='manha', disponivel=False, prioridade=1)
+        resultado = promover_candidato(self.candidato)
+        self.assertFalse(resultado['sucesso'])
+        self.assertIn('não está disponível', resultado['erros'][0])
+
+    def test_mantem_quadro_atual_quando_recusado(self):
+        atual = self.criar_horario(dia=4, inicio=time(11, 30), fim=time(12, 20))
+        Sala.objects.filter(pk=self.sala.pk).update(capacidade=10)
+        self.assertFalse(promover_candidato(self.candidato)['sucesso'])
+        self.assertTrue(Horario.objects.filter(pk=atual.pk).exists())
+
+
+class BlocosTests(DadosEscolaresMixin, TestCase):
+
+    def test_interpretar_padrao(self):
+        self.assertEqual(interpretar_padrao(' 2 + 2 + 1 '), [2, 2, 1])
+        self.assertEqual(interpretar_padrao(''), [])
+        for invalido in ('2+x', '2++1', '0+2', '-1'):
+            with self.assertRaises(ValueError):
+                interpretar_padrao(invalido)
+
+    def test_padrao_precisa_somar_a_carga(self):
+        self.disciplina.padrao_blocos = '2+2'
+        self.disciplina.carga_horaria_semanal = 5
+        with self.assertRaisesMessage(ValidationError, 'Os blocos somam 4 aulas, mas a carga semanal é 5.'):
+            self.disciplina.clean()
+
+        self.disciplina.padrao_blocos = '2 + 2 + 1'
+        self.disciplina.clean()
+        self.assertEqual(self.disciplina.padrao_blocos, '2+2+1')
+
+    def test_blocos_em_slots_consecutivos_do_mesmo_dia(self):
+        Disciplina.objects.filter(pk=self.disciplina.pk).update(carga_horaria_semanal=5, padrao_blocos='2+2+1')
+        gerador = GeradorHorariosRobusto()
+        resultado = gerador.gerar_horarios(
+            turmas=[Turma.objects.get(pk=self.turma.pk)], max_tentativas=20, como_candidato=True, semente=1
+        )
+        self.assertTrue(resultado['sucesso'], resultado['conflitos'])
+
+        quadro = gerador.quadro
+        self.assertEqual(sorted(len(bloco) for bloco in gerador._blocos), [1, 2, 2])
+        for bloco in gerador._blocos:
+            posicoes = [quadro.posicao(aula) for aula in bloco]
+            self.assertEqual(len({posicao[quadro.DIA] for posicao in posicoes}), 1)
+            for anterior, seguinte in zip(posicoes, posicoes[1:]):
+                self.assertEqual(anterior[quadro.FIM], seguinte[quadro.INICIO])
+
+
+class QuadroCompactoTests(DadosEscolaresMixin, TestCase):
+
+    def test_serializar_e_desserializar(self):
+        bruno = Professor.objects.create(nome_completo='Bruno Lima')
+        quadro = QuadroCompacto()
+        quadro.adicionar(
+            self.turma, self.disciplina, [self.professor], professor=self.professor, dia=0,
+            inicio=minutos('07:00'), fim=minutos('07:50'), turno='manha', sala=self.sala, fixa=True
+        )
+        livre = quadro.adicionar(self.turma, self.disciplina, [self.professor, bruno])
+        quadro.definir(livre, quadro.catalogo.indice('professor', bruno), 2, minutos('09:00'), minutos('09:50'), 0)
+        quadro.definir_sala(livre, quadro.catalogo.indice('sala', self.sala))
+
+        copia = QuadroCompacto.desserializar(quadro.serializar())
+        self.assertEqual(list(copia.linhas(incluir_fixas=True)), list(quadro.linhas(incluir_fixas=True)))
+        self.assertEqual(list(copia.fixa), [1, 0])
+        self.assertEqual(copia.aulas_livres(), [livre])
+        self.assertEqual(
+            [copia.catalogo.pk('professor', indice) for indice in copia.candidatos_da_aula(livre)],
+            [self.professor.pk, bruno.pk]
+        )
+
+    def test_dados_que_nao_sao_quadro(self):
+        with self.assertRaises(ValueError):
+            QuadroCompacto.desserializar(b'\0' * 16)
+
+
+class RestricoesTests(DadosEscolaresMixin, TestCase):
+
+    def avaliar(self, *posicoes):
+        quadro = QuadroCompacto()
+        for dia, inicio, fim in posicoes:
+            quadro.adicionar(
+                self.turma, self.disciplina, [self.professor], professor=self.professor,
+                dia=dia, inicio=inicio, fim=fim, turno='manha', sala=self.sala
+            )
+        restricoes = ConjuntoRestricoes([SemSobreposicao(), Janelas()])
+        restricoes.preparar(quadro, self.periodo)
+        return restricoes.avaliar(quadro)
+
+    def test_aulas_seguidas(self):
+        avaliacao = self.avaliar((0, 420, 470), (0, 470, 520))
+        self.assertEqual(avaliacao['violacoes'], {'sem_sobreposicao': 0})
+        self.assertEqual(avaliacao['objetivo'], 0)
+
+    def test_sobreposicao_e_rigida(self):
+        avaliacao = self.avaliar((0, 420, 470), (0, 440, 490))
+        self.assertGreater(avaliacao['violacoes']['sem_sobreposicao'], 0)
+        self.assertNotIn('sem_sobreposicao', avaliacao['custos'])
+
+    def test_janela_tem_custo(self):
+        avaliacao = self.avaliar((0, 420, 470), (0, 540, 590))
+        self.assertGreater(avaliacao['custos']['janelas'], 0)
+        self.assertEqual(avaliacao['objetivo'], avaliacao['custos']['janelas'])
+
+
+class DisponibilidadePeriodoTests(DadosEscolaresMixin, TestCase):
+
+    def test_bloqueio_pontual_cancela_so_a_data(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            BloqueioTemporario.objects.create(
+                professor=self.professor, data_inicio=date(2026, 3, 4), data_fim=date(2026, 3, 4),
+                turno='manha', motivo='Consulta'
+            )
+        disponibilidade = DisponibilidadePeriodo.do_periodo(self.periodo)
+
+        self.assertTrue(disponibilidade.disponivel(self.professor.pk, 2, 'manha'))
+        self.assertEqual(disponibilidade.datas_canceladas(self.professor.pk, 2, 'manha'), [date(2026, 3, 4)])
+        self.assertEqual(disponibilidade.datas_canceladas(self.professor.pk, 2, 'tarde'), [])
+
+    def test_recorrente_e_periodo_inteiro_viram_mascara_semanal(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            BloqueioTemporario.objects.create(
+                professor=self.professor, data_inicio=date(2026, 2, 5), data_fim=date(2026, 2, 5),
+                recorrente=True, motivo='Reunião'
+            )
+            BloqueioTemporario.objects.create(
+                professor=self.professor, data_inicio=date(2026, 1, 1), data_fim=date(2026, 7, 31),
+                turno='tarde', motivo='Outra escola'
+            )
+        disponibilidade = DisponibilidadePeriodo.do_periodo(self.periodo)
+
+        self.assertFalse(disponibilidade.disponivel(self.professor.pk, 3))
+        self.assertFalse(disponibilidade.disponivel(self.professor.pk, 0, 'tarde'))
+        self.assertTrue(disponibilidade.disponivel(self.professor.pk, 0, 'manha'))
+        self.assertEqual(disponibilidade.datas_canceladas(self.professor.pk, 3, 'manha'), [])
+        self.assertEqual(disponibilidade.datas_canceladas(self.professor.pk, 0, 'tarde'), [])
+
+    def test_evento_cancela_data_de_todos(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            EventoAcademico.objects.create(
+                nome='Sexta-feira Santa', tipo_evento='feriado', periodo_letivo=self.periodo,
+                data_inicio=date(2026, 4, 3), data_fim=date(2026, 4, 3)
+            )
+        disponibilidade = DisponibilidadePeriodo.do_periodo(self.periodo)
+        outro = Professor.objects.create(nome_completo='Bruno Lima')
+
+        self.assertTrue(disponibilidade.disponivel(outro.pk, 4, 'manha'))
+        self.assertEqual(disponibilidade.eventos_no_slot(4, 'manha'), [])
+        for professor_id in (self.professor.pk, outro.pk):
+            self.assertEqual(disponibilidade.datas_canceladas(professor_id, 4, 'manha'), [date(2026, 4, 3)])
+
+
+class IntervalosTests(DadosEscolaresMixin, TestCase):
+
+    def test_arvore_contra_forca_bruta(self):
+        sorteio = random.Random(7)
+        intervalos = []
+        for indice in range(300):
+            inicio = sorteio.randint(0, 500)
+            intervalos.append((inicio, inicio + sorteio.randint(0, 40), indice))
+        arvore = ArvoreIntervalos(intervalos)
+
+        for ponto in range(-5, 560, 3):
+            esperado = [indice for inicio, fim, indice in intervalos if inicio <= ponto <= fim]
+            self.assertEqual(sorted(arvore.no_ponto(ponto)), esperado)
+        for _ in range(200):
+            a, b = sorted((sorteio.randint(-5, 560), sorteio.randint(-5, 560)))
+            esperado = [indice for inicio, fim, indice in intervalos if inicio <= b and fim >= a]
+            self.assertEqual(sorted(arvore.sobrepostos(a, b)), esperado)
+
+    def test_intervalo_invertido_e_ignorado(self):
+        self.assertEqual(len(ArvoreIntervalos([(5, 3, 'x'), (1, 1, 'y')])), 1)
+
+    def test_bloqueios_pontuais_e_recorrentes(self):
+        BloqueioTemporario.objects.create(
+            professor=self.professor, data_inicio=date(2026, 3, 2), data_fim=date(2026, 3, 4),
+            turno='manha', motivo='Congresso'
+        )
+        # Recorrente: toda quinta-feira, o dia de data_inicio
+        BloqueioTemporario.objects.create(
+            professor=self.professor, data_inicio=date(2026, 2, 5), data_fim=date(2026, 2, 5),
+            recorrente=True, motivo='Reunião'
+        )
+        indice = IndiceCalendario(self.periodo)
+
+        self.assertTrue(indice.professor_bloqueado(self.professor.pk, date(2026, 3, 3), 'manha'))
+        self.assertFalse(indice.professor_bloqueado(self.professor.pk, date(2026, 3, 3), 'tarde'))
+        self.assertFalse(indice.professor_bloqueado(self.professor.pk, date(2026, 3, 6)))
+        self.assertTrue(indice.professor_bloqueado(self.professor.pk, date(2026, 6, 4), 'tarde'))
+        self.assertEqual(len(indice.bloqueios_entre(date(2026, 3, 4), date(2026, 3, 5))), 2)
+
+
+class BuscaSubstitutosTests(DadosEscolaresMixin, TestCase):
+
+    def test_aulas_afetadas_dentro_do_periodo_e_com_aula(self):
+        self.criar_horario(dia=0)
+        # Começa antes do período (02/02/2026) e cobre três segundas-feiras dele
+        bloqueio = BloqueioTemporario.objects.create(
+            professor=self.professor, data_inicio=date(2026, 1, 12), data_fim=date(2026, 2, 20), motivo='Licença'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            EventoAcademico.objects.create(
+                nome='Carnaval', tipo_evento='feriado', periodo_letivo=self.periodo,
+                data_inicio=date(2026, 2, 16), data_fim=date(2026, 2, 17)
+            )
+        datas = [data for data, _ in BuscaSubstitutos(bloqueio, self.periodo).aulas_afetadas()]
+        self.assertEqual(datas, [date(2026, 2, 2), date(2026, 2, 9)])
+
+
+class ImportacaoTests(DadosEscolaresMixin, TestCase):
+
+    def importar(self, tipo, texto, nome_arquivo='dados.csv'):
+        return importar_arquivo(tipo, io.BytesIO(texto.encode('utf-8')), nome_arquivo)
+
+    def test_csv_com_ponto_e_virgula(self):
+        resultado = self.importar('disciplinas', (
+            'nome;carga_horaria_semanal;curso_area;periodo_serie;tipo_sala\n'
+            'física;3;Exatas;1º Ano;Laboratório\n'
+            'História;2;Humanas;1º Ano;\n'
+        ))
+        self.assertEqual((resultado['criados'], resultado['erros']), (2, []))
+        self.assertEqual(Disciplina.objects.get(nome='Física').tipo_sala, 'laboratorio')
+
+    def test_duplicatas_no_banco_e_no_arquivo(self):
+        resultado = self.importar('turmas', (
+            'nome_codigo,serie_periodo,numero_alunos\n'
+            '1A,1º Ano,30\n'
+            '2A,2º Ano,25\n'
+            '2A,2º Ano,25\n'
+        ))
+        self.assertEqual(resultado['criados'], 1)
+        self.assertEqual([erro['linha'] for erro in resultado['erros']], [2, 4])
+        self.assertIn('Registro já cadastrado (ou repetido no arquivo)', resultado['erros'][0]['mensagens'])
+
+    def test_disciplina_com_nome_ambiguo(self):
+        Disciplina.objects.create(
+            nome='Matemática', carga_horaria_semanal=2, curso_area='Exatas', periodo_serie='2º Ano'
+        )
+        resultado = self.importar('professores', (
+            'nome_completo,disciplinas\n'
+            'Bruno Lima,Matemática\n'
+            'Carla Dias,Matemática (2º Ano)\n'
+        ))
+        self.assertEqual(resultado['criados'], 1)
+        self.assertEqual(resultado['erros'], [{
+            'linha': 2,
+            'mensagens': ["Disciplina 'Matemática' existe em mais de uma série: use 'Nome (Série)'"],
+        }])
+        carla = Professor.objects.get(nome_completo='Carla Dias')
+        self.assertEqual([disciplina.periodo_serie for disciplina in carla.disciplinas.all()], ['2º Ano'])
+
+    def test_preferencial_sem_prioridade(self):
+        resultado = self.importar('preferencias', (
+            'professor,dia_semana,turno,preferencial\n'
+            'Ana Souza,Segunda,manha,sim\n'
+        ))
+        self.assertEqual((resultado['criados'], resultado['erros']), (1, []))
+        self.assertEqual(PreferenciaProfessor.objects.get(professor=self.professor).prioridade, 4)
+
+    @unittest.skipUnless(importlib.util.find_spec('openpyxl'), 'openpyxl não instalado')
+    def test_xlsx(self):
+        from openpyxl import Workbook
+
+        pasta = Workbook()
+        pasta.active.append(['nome_codigo', 'serie_periodo', 'turno_turma', 'numero_alunos', 'disciplinas'])
+        pasta.active.append(['3B', '3º Ano', 'Vespertino', 28, 'Matemática'])
+        arquivo = io.BytesIO()
+        pasta.save(arquivo)
+        arquivo.seek(0)
+
+        resultado = importar_arquivo('turmas', arquivo, 'turmas.xlsx')
+        self.assertEqual((resultado['criados'], resultado['erros']), (1, []))
+        turma = Turma.objects.get(nome_codigo='3B')
+        self.assertEqual((turma.turno_turma, turma.numero_alunos), ('vespertino', 28))
+        self.assertEqual(list(turma.disciplinas.all()), [self.disciplina])
+
+    @unittest.skipIf(importlib.util.find_spec('openpyxl'), 'openpyxl instalado')
+    def test_xlsx_sem_openpyxl(self):
+        with self.assertRaisesMessage(ImportacaoError, 'instale o pacote openpyxl'):
+            importar_arquivo('turmas', io.BytesIO(b'PK'), 'turmas.xlsx')
+
+
+class ExportacaoHorariosTests(DadosEscolaresMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        configuracao = override_settings(EXPORTACAO_DIR=diretorio.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        self.criar_horario(dia=0)
+        self.outra_turma = self.criar_turma('1B')
+        self.criar_horario(dia=1, turma=self.outra_turma)
+
+    def exportacao(self, formatos=('csv',)):
+        return ExportacaoHorarios(self.periodo, formatos=formatos, processos=1)
+
+    def test_arquivo_gera_so_o_artefato_pedido(self):
+        exportacao = self.exportacao()
+        nome, caminho = exportacao.arquivo('turma', self.turma.pk, 'csv')
+        self.assertEqual(nome, f'turmas/1a-{self.turma.pk}.csv')
+        self.assertEqual(os.listdir(os.path.dirname(caminho)), [os.path.basename(caminho)])
+        self.assertIsNone(exportacao.arquivo('turma', 0, 'csv'))
+
+    def test_ics_semanal_com_excecoes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            BloqueioTemporario.objects.create(
+                professor=self.professor, data_inicio=date(2026, 3, 2), data_fim=date(2026, 3, 2),
+                turno='manha', motivo='Consulta'
+            )
+        exportacao = self.exportacao(formatos=('ics',))
+
+        with open(exportacao.arquivo('turma', self.turma.pk, 'ics')[1], encoding='utf-8', newline='') as arquivo:
+            linhas = arquivo.read().split('\r\n')
+        self.assertIn('DTSTART:20260202T070000', linhas)
+        self.assertIn('DTEND:20260202T075000', linhas)
+        self.assertIn('RRULE:FREQ=WEEKLY;UNTIL=20260630T235959', linhas)
+        self.assertIn('EXDATE:20260302T070000', linhas)
+
+        with open(exportacao.arquivo('turma', self.outra_turma.pk, 'ics')[1], encoding='utf-8') as arquivo:
+            conteudo = arquivo.read()
+        self.assertIn('DTSTART:20260203T070000', conteudo)
+        self.assertNotIn('EXDATE', conteudo)
+
+    def test_artefato_inalterado_e_reaproveitado_na_nova_versao(self):
+        exportacao = self.exportacao()
+        antes = dict(exportacao.arquivos())
+        with self.captureOnCommitCallbacks(execute=True):
+            horario = Horario.objects.get(turma=self.outra_turma)
+            horario.sala = Sala.objects.create(nome_numero='102', capacidade=40)
+            horario.save()
+        depois = dict(exportacao.arquivos())
+
+        nome_1a = f'turmas/1a-{self.turma.pk}.csv'
+        self.assertNotEqual(antes[nome_1a], depois[nome_1a])
+        self.assertTrue(os.path.samefile(antes[nome_1a], depois[nome_1a]))
+        nome_1b = f'turmas/1b-{self.outra_turma.pk}.csv'
+        self.assertNotEqual(os.path.basename(antes[nome_1b]), os.path.basename(depois[nome_1b]))
+        with open(depois[nome_1b], encoding='utf-8-sig') as arquivo:
+            self.assertIn(',102', arquivo.read())
+
+    def test_limpeza_mantem_versao_anterior(self):
+        exportacao = self.exportacao()
+        versoes = []
+        for _ in range(3):
+            caminhos = {caminho for _, caminho in exportacao.arquivos()}
+            versoes.append(caminhos)
+            self.assertTrue(all(os.path.exists(caminho) for caminho in caminhos))
+            incrementar_versao_dados()
+        exportacao.arquivos()
+        # A primeira versão sai; a anterior à atual fica para envios em andamento
+        self.assertFalse(any(os.path.exists(caminho) for caminho in versoes[0]))
+        self.assertTrue(all(os.path.exists(caminho) for caminho in versoes[2]))
+
+
+class DocumentoGradesTests(DadosEscolaresMixin, TestCase):
+
+    def test_pool_renderiza_o_mesmo_documento(self):
+        for indice in range(MINIMO_PARA_POOL):
+            turma = self.criar_turma(f'T{indice:02d}')
+            if indice % 4 == 0:
+                aula = indice // 4
+                self.criar_horario(
+                    dia=aula % 5, inicio=time(7 + aula // 5, 0), fim=time(7 + aula // 5, 50), turma=turma,
+                    professor=Professor.objects.create(nome_completo=f'Professor {indice}')
+                )
+
+        def documento(processos):
+            html = DocumentoGrades(self.periodo, recursos=['turma', 'professor'], processos=processos)._montar()
+            return re.sub(r'gerado em [\d/ :]+', '', html)
+
+        self.assertGreaterEqual(len(DocumentoGrades(self.periodo, recursos=['turma']).paginas()), MINIMO_PARA_POOL)
+        sequencial = documento(1)
+        self.assertEqual(documento(2), sequencial)
+        self.assertIn('Turma T39', sequencial)
+        self.assertIn('Professor 36', sequencial)
@@ -16,6 +16,9 @@ urlpatterns = [
     # APIs e funcionalidades especiais
     path('notificacoes/', views.notificacoes_view, name='notificacoes'),
     path('api/notificacoes/', views.api_notificacoes, name='api_notificacoes'),
+    path('api/eventos/', views.eventos_stream, name='eventos_stream'),
+    path('api/horarios-livres/', views.api_horarios_livres, name='api_horarios_livres'),
+    path('api/calendario/', views.api_calendario, name='api_calendario'),
     path('relatorio/carga-horaria/', views.relatorio_carga_horaria, name='relatorio_carga_horaria'),
     path('sistema/verificar-integridade/', views.verificar_integridade_dados, name='verificar_integridade'),
     
@@ -64,9 +67,23 @@ urlpatterns = [
     path('horario/turma/<int:turma_id>/', views.visualizar_horario_turma, name='horario_turma'),
     path('horario/professor/<int:professor_id>/', views.visualizar_horario_professor, name='horario_professor'),
     path('horario/sala/<int:sala_id>/', views.visualizar_horario_sala, name='horario_sala'),
+    path('horario/imprimir/', views.imprimir_grades, name='imprimir_grades'),
     
     # URL para geração de horários
     path('gerar-horarios/', views.gerar_horarios, name='gerar_horarios'),
+    path('importar/', views.importar_dados, name='importar_dados'),
+    path('exportar/', views.exportar_horarios, name='exportar_horarios'),
+    path(
+        'exportar/<str:recurso>/<int:recurso_id>.<str:formato>',
+        views.exportar_horario_recurso,
+        name='exportar_horario_recurso'
+    ),
+    
+    # Quadros candidatos gerados sem alterar os horários atuais
+    path('candidatos/', views.candidato_list, name='candidato_list'),
+    path('candidatos/<int:pk>/comparar/', views.candidato_comparar, name='candidato_comparar'),
+    path('candidatos/<int:pk>/promover/', views.candidato_promover, name='candidato_promover'),
+    path('candidatos/<int:pk>/deletar/', views.candidato_deletar, name='candidato_deletar'),
     
     # URLs para Bloqueios Temporários
     path('bloqueios/', views.BloqueioTemporarioListView.as_view(), name='bloqueio_list'),
@@ -74,6 +91,7 @@ urlpatterns = [
     path('bloqueios/novo/', views.BloqueioTemporarioCreateView.as_view(), name='bloqueio_create'),
     path('bloqueios/<int:pk>/editar/', views.BloqueioTemporarioUpdateView.as_view(), name='bloqueio_update'),
     path('bloqueios/<int:pk>/deletar/', views.BloqueioTemporarioDeleteView.as_view(), name='bloqueio_delete'),
+    path('bloqueios/<int:pk>/substitutos/', views.substitutos_bloqueio, name='bloqueio_substitutos'),
     
     # URLs especiais para bloqueios
     path('professor/<int:professor_id>/bloqueios/calendario/', views.professor_bloqueios_calendario, name='professor_bloqueios_calendario'),
@@ -81,5 +99,7 @@ urlpatterns = [
     
     # URLs AJAX para operações com horários
     path('ajax/mover-horario/', views.mover_horario, name='mover_horario'),
+    path('ajax/mover-horarios/', views.mover_horarios_lote, name='mover_horarios_lote'),
+    path('ajax/horarios/<int:horario_id>/destinos/', views.destinos_horario, name='destinos_horario'),
 ]
 
@@ -0,0 +1,268 @@
+"""
+Análise de viabilidade antes da geração de horários.
+
+Verifica limites de contagem que qualquer solução precisa respeitar. Se
+algum for violado, nenhuma quantidade de tentativas do gerador encontrará
+um horário completo, e a geração pode ser recusada de imediato com o
+motivo exato.
+
+Os limites vêm das condições de Hall para os emparelhamentos envolvidos
+(aulas × slots de cada professor, aulas × slots × salas de cada classe
+de capacidade), testadas só em alguns subconjuntos: passar por elas não
+garante que exista solução. Por padrão contam apenas restrições rígidas:
+preferências de professores, que o gerador relaxa nas últimas
+tentativas, só entram quando informadas em `indisponibilidade`.
+"""
+
+from collections import defaultdict
+from functools import reduce
+from operator import and_
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+from .alocacao_salas import IndiceSalas
+
+
+class AnaliseViabilidade:
+    """
+    Pré-análise das aulas a gerar.
+
+    Cada slot de tempo vira um bit; ocupações de professores, turmas e
+    salas (horários já existentes) e slots permitidos de cada turma são
+    máscaras de bits, de modo que cada limite é uma contagem de bits.
+    """
+
+    def __init__(
+        self,
+        aulas: List[Dict],
+        slots_por_turma: Dict[Hashable, List[Tuple]],
+        aulas_fixas: Iterable[Dict],
+        indice_salas: IndiceSalas,
+        indisponibilidade: Optional[Dict[Hashable, Iterable[Tuple]]] = None
+    ):
+        """
+        Args:
+            aulas: Aulas a alocar (formato de GeradorHorariosRobusto._preparar_aulas)
+            slots_por_turma: pk da turma → slots (dia, turno, início, fim) permitidos
+            aulas_fixas: Horários já existentes, no formato das aulas do gerador
+            indice_salas: Salas ativas indexadas
+            indisponibilidade: pk do professor → (dia, turno, pk da disciplina)
+                em que ele não pode dar aula; None em dia, turno ou disciplina
+                vale para todos
+        """
+        self.aulas = aulas
+        self.indice_salas = indice_salas
+
+        turnos = {
+            (dia, inicio, fim): turno
+            for slots in slots_por_turma.values()
+            for dia, turno, inicio, fim in slots
+        }
+        self._bit = {chave: 1 << posicao for posicao, chave in enumerate(sorted(turnos))}
+        self._turno = turnos
+        self.slots_turma = {
+            turma_id: self._mascara(slots)
+            for turma_id, slots in slots_por_turma.items()
+        }
+
+        # Slots ocupados pelos horários já existentes
+        self.fixas_professor = defaultdict(int)
+        self.fixas_turma = defaultdict(int)
+        self.fixas_sala = defaultdict(int)
+        for aula in aulas_fixas:
+            mascara = self._mascara_intervalo(aula['dia'], aula['horario_inicio'], aula['horario_fim'])
+            self.fixas_professor[aula['professor'].pk] |= mascara
+            self.fixas_turma[aula['turma'].pk] |= mascara
+            if aula.get('sala') is not None:
+                self.fixas_sala[aula['sala'].pk] |= mascara
+
+        # Indisponibilidade geral e por disciplina de cada professor
+        self.indisponivel_professor = defaultdict(int)
+        self.indisponivel_disciplina = defaultdict(int)
+        for professor_id, entradas in (indisponibilidade or {}).items():
+            for dia, turno, disciplina_id in entradas:
+                mascara = self._mascara_periodo(dia, turno)
+                if disciplina_id is None:
+                    self.indisponivel_professor[professor_id] |= mascara
+                else:
+                    self.indisponivel_disciplina[(professor_id, disciplina_id)] |= mascara
+
+    def _mascara(self, slots) -> int:
+        mascara = 0
+        for dia, _, inicio, fim in slots:
+            mascara |= self._bit[(dia, inicio, fim)]
+        return mascara
+
+    def _mascara_intervalo(self, dia, inicio: str, fim: str) -> int:
+        """Bits dos slots sobrepostos ao intervalo (horas em HH:MM comparam como texto)."""
+        mascara = 0
+        for (dia_slot, inicio_slot, fim_slot), bit in self._bit.items():
+            if dia_slot == dia and inicio < fim_slot and fim > inicio_slot:
+                mascara |= bit
+        return mascara
+
+    def _mascara_periodo(self, dia, turno) -> int:
+        """Bits dos slots de um dia e turno (None = todos)."""
+        mascara = 0
+        for chave, bit in self._bit.items():
+            if (dia is None or chave[0] == dia) and (not turno or self._turno[chave] == turno):
+                mascara |= bit
+        return mascara
+
+    def _indisponivel(self, professor_id, disciplinas) -> int:
+        """Slots em que o professor não pode dar aula de nenhuma das disciplinas."""
+        especificas = [self.indisponivel_disciplina[(professor_id, disciplina_id)] for disciplina_id in disciplinas]
+        return self.indisponivel_professor[professor_id] | reduce(and_, especificas, -1 if especificas else 0)
+
+    def verificar(self) -> List[str]:
+        """
+        Executa todas as verificações.
+
+        Returns:
+            list: Motivos de inviabilidade (vazia se nenhum limite foi violado)
+        """
+        return self._verificar_turmas() + self._verificar_professores() + self._verificar_salas()
+
+    def _verificar_turmas(self) -> List[str]:
+        """
+        Cada turma precisa de um slot livre distinto para cada aula.
+
+        Além da contagem, emparelha as aulas da turma com os slots livres
+        em que algum dos professores possíveis está livre e disponível.
+        """
+        motivos = []
+        aulas_por_turma = defaultdict(list)
+        for aula in self.aulas:
+            aulas_por_turma[aula['turma'].pk].append(aula)
+
+        for turma_id, aulas in aulas_por_turma.items():
+            turma = aulas[0]['turma']
+            livres = self.slots_turma.get(turma_id, 0) & ~self.fixas_turma[turma_id]
+            if len(aulas) > bin(livres).count('1'):
+                motivos.append(
+                    f"Turma {turma.nome_codigo} precisa de {len(aulas)} aulas, mas seu turno "
+                    f"({turma.get_turno_turma_display()}) oferece apenas {bin(livres).count('1')} horários livres na semana"
+                )
+                continue
+
+            vizinhancas = []
+            for aula in aulas:
+                disponiveis = 0
+                for professor in aula['professores_possiveis']:
+                    disponiveis |= ~self.fixas_professor[professor.pk] & ~self._indisponivel(
+                        professor.pk, [aula['disciplina'].pk]
+                    )
+                vizinhancas.append(livres & disponiveis)
+
+            sem_slot = self._emparelhar(vizinhancas)
+            if sem_slot:
+                disciplinas = ', '.join(sorted({aulas[indice]['disciplina'].nome for indice in sem_slot}))
+                motivos.append(
+                    f"Turma {turma.nome_codigo}: apenas {len(aulas) - len(sem_slot)} de {len(aulas)} aulas "
+                    f"cabem nos horários livres em que os professores estão disponíveis (sobram aulas de {disciplinas})"
+                )
+        return motivos
+
+    def _emparelhar(self, vizinhancas: List[int]) -> List[int]:
+        """
+        Emparelhamento máximo aulas × slots por caminhos aumentantes (Kuhn).
+
+        Args:
+            vizinhancas: Máscara dos slots aceitos por cada aula
+
+        Returns:
+            list: Índices das aulas que ficaram sem slot
+        """
+        dono = {}
+
+        def aumentar(indice, visitados):
+            mascara = vizinhancas[indice]
+            while mascara:
+                slot = mascara & -mascara
+                mascara ^= slot
+                if slot in visitados:
+                    continue
+                visitados.add(slot)
+                if slot not in dono or aumentar(dono[slot], visitados):
+                    dono[slot] = indice
+                    return True
+            return False
+
+        return [indice for indice in range(len(vizinhancas)) if not aumentar(indice, set())]
+
+    def _verificar_professores(self) -> List[str]:
+        """
+        Condição de Hall aulas × (professor, slot), em parte.
+
+        Para cada conjunto P de professores possíveis de alguma aula, as
+        aulas que só podem ser dadas por professores de P não podem exceder
+        os slots livres (e disponíveis) desses professores nos turnos das
+        turmas envolvidas. Só esses conjuntos são testados, não todos os
+        subconjuntos de professores (nem uniões de conjuntos de aulas
+        diferentes): uma falta de capacidade que só aparece numa união
+        passa despercebida aqui.
+        """
+        motivos = []
+        grupos = defaultdict(list)
+        professores = {}
+        for aula in self.aulas:
+            chave = frozenset(professor.pk for professor in aula['professores_possiveis'])
+            grupos[chave].append(aula)
+            professores.update((professor.pk, professor) for professor in aula['professores_possiveis'])
+
+        for conjunto in grupos:
+            aulas = [aula for chave, lista in grupos.items() if chave <= conjunto for aula in lista]
+            slots = 0
+            for turma_id in {aula['turma'].pk for aula in aulas}:
+                slots |= self.slots_turma.get(turma_id, 0)
+            ids_disciplinas = {aula['disciplina'].pk for aula in aulas}
+            capacidade = sum(
+                bin(slots & ~self.fixas_professor[professor_id] & ~self._indisponivel(professor_id, ids_disciplinas)).count('1')
+                for professor_id in conjunto
+            )
+
+            if len(aulas) > capacidade:
+                nomes = ', '.join(sorted(professores[professor_id].nome_completo for professor_id in conjunto))
+                disciplinas = ', '.join(sorted({aula['disciplina'].nome for aula in aulas}))
+                motivos.append(
+                    f"{len(aulas)} aulas de {disciplinas} dependem de {nomes}, "
+                    f"que têm apenas {capacidade} horários livres nos turnos das turmas envolvidas"
+                )
+        return motivos
+
+    def _verificar_salas(self) -> List[str]:
+        """
+        Condição de Hall aulas × (sala, slot) por classe de capacidade.
+
+        As salas compatíveis com uma aula são as do tipo exigido (ou de
+        qualquer tipo) com capacidade mínima igual ao tamanho da turma;
+        esses conjuntos são encaixados, então basta testar cada um deles.
+        """
+        motivos = []
+        classes = defaultdict(list)
+        for aula in self.aulas:
+            tipo = aula['disciplina'].tipo_sala or ''
+            classes[(tipo, aula['turma'].numero_alunos)].append(aula)
+
+        for tipo, alunos in classes:
+            compativeis = set(self.indice_salas.buscar(alunos, tipo))
+            aulas = [
+                aula
+                for (outro_tipo, outros_alunos), lista in classes.items()
+                if outros_alunos >= alunos and (outro_tipo == tipo or not tipo)
+                for aula in lista
+            ]
+            slots = 0
+            for turma_id in {aula['turma'].pk for aula in aulas}:
+                slots |= self.slots_turma.get(turma_id, 0)
+            capacidade = sum(
+                bin(slots & ~self.fixas_sala[self.indice_salas.salas[indice].pk]).count('1')
+                for indice in compativeis
+            )
+
+            if len(aulas) > capacidade:
+                descricao_tipo = f"do tipo {aulas[0]['disciplina'].get_tipo_sala_display()}" if tipo else "de qualquer tipo"
+                motivos.append(
+                    f"{len(aulas)} aulas precisam de sala {descricao_tipo} para {alunos} ou mais alunos, "
+                    f"mas as {len(compativeis)} salas compatíveis oferecem apenas {capacidade} horários livres"
+                )
+        return motivos
@@ -21,11 +21,33 @@ from .models import (
 )
 from .forms import (
     DisciplinaForm, SalaForm, ProfessorForm, TurmaForm, 
-    PreferenciaProfessorForm, HorarioForm, GerarHorariosForm, BloqueioTemporarioForm
+    PreferenciaProfessorForm, HorarioForm, GerarHorariosForm, BloqueioTemporarioForm, ImportacaoForm
 )
 # from .dashboard import DashboardAnalytico  # Comentado temporariamente
 
 
+def _periodo_selecionado(request):
+    """
+    Período letivo escolhido em ?periodo=<id>; sem o parâmetro, o período ativo.
+    
+    Horários, grades, relatórios e verificações mostram só esse período.
+    """
+    periodo_id = request.GET.get('periodo', '')
+    if periodo_id.isdigit():
+        periodo = PeriodoLetivo.objects.filter(pk=periodo_id).first()
+        if periodo:
+            return periodo
+    return PeriodoLetivo.get_periodo_ativo()
+
+
+def _contexto_periodo(periodo):
+    """Variáveis do seletor de período usadas pelos templates."""
+    return {
+        'periodo_letivo': periodo,
+        'periodos': PeriodoLetivo.objects.order_by('-data_inicio'),
+    }
+
+
 def home(request):
     """
     View da página inicial do sistema de gerenciamento de horários escolares.
@@ -36,12 +58,17 @@ def home(request):
     Returns:
         HttpResponse: Resposta HTTP com a página inicial
     """
+    from .estatisticas import EstatisticasSistema
+    
+    periodo = _periodo_selecionado(request)
+    totais = EstatisticasSistema(periodo).get_contadores(request.user)['totais']
     context = {
-        'total_disciplinas': Disciplina.objects.filter(ativa=True).count(),
-        'total_salas': Sala.objects.filter(ativa=True).count(),
-        'total_professores': Professor.objects.filter(ativo=True).count(),
-        'total_turmas': Turma.objects.filter(ativa=True).count(),
-        'total_horarios': Horario.objects.count(),
+        'total_disciplinas': totais['disciplinas'],
+        'total_salas': totais['salas'],
+        'total_professores': totais['professores'],
+        'total_turmas': totais['turmas'],
+        'total_horarios': totais['horarios'],
+        **_contexto_periodo(periodo),
     }
     return render(request, 'core/home.html', context)
 
@@ -56,35 +83,17 @@ def dashboard_analitico(request):
     Returns:
         HttpResponse: Resposta HTTP com o dashboard analítico
     """
-    # Estatísticas básicas sem depender dos novos modelos
-    total_horarios = Horario.objects.count()
-    total_professores = Professor.objects.filter(ativo=True).count()
-    total_salas = Sala.objects.filter(ativa=True).count()
-    total_turmas = Turma.objects.filter(ativa=True).count()
-    
-    # Estatísticas gerais simuladas
-    estatisticas_gerais = {
-        'totais': {
-            'horarios': total_horarios,
-            'professores': total_professores,
-            'salas': total_salas,
-            'turmas': total_turmas,
-        },
-        'distribuicao_turnos': {
-            'manha': Horario.objects.filter(turno='M').count(),
-            'tarde': Horario.objects.filter(turno='T').count(),
-            'noite': Horario.objects.filter(turno='N').count(),
-        },
-        'alertas': {
-            'notificacoes_nao_lidas': 0,
-            'conflitos_criticos': 0,
-        }
-    }
+    from .estatisticas import EstatisticasSistema
+    
+    periodo = _periodo_selecionado(request)
+    estatisticas = EstatisticasSistema(periodo)
+    estatisticas_gerais = estatisticas.get_contadores(request.user)
+    total_horarios = estatisticas_gerais['totais']['horarios']
     
-    # Ocupação de salas básica
+    # Ocupação das 10 salas mais usadas
     ocupacao_salas = []
-    for sala in Sala.objects.filter(ativa=True)[:10]:
-        total_horarios_sala = Horario.objects.filter(sala=sala).count()
+    for sala in estatisticas.get_carga_salas(10):
+        total_horarios_sala = sala.total_horarios
         ocupacao_salas.append({
             'sala': sala,
             'total_horarios': total_horarios_sala,
@@ -93,15 +102,14 @@ def dashboard_analitico(request):
             'status_label': 'Alta' if total_horarios_sala > 20 else 'Média' if total_horarios_sala > 10 else 'Baixa'
         })
     
-    # Distribuição de professores básica
+    # Distribuição dos 10 professores com mais aulas
     distribuicao_professores = []
-    for professor in Professor.objects.filter(ativo=True)[:10]:
-        total_aulas = Horario.objects.filter(professor=professor).count()
-        total_turmas_prof = Horario.objects.filter(professor=professor).values('turma').distinct().count()
+    for professor in estatisticas.get_carga_professores(10):
+        total_aulas = professor.total_aulas
         distribuicao_professores.append({
             'professor': professor,
             'total_aulas': total_aulas,
-            'total_turmas': total_turmas_prof,
+            'total_turmas': professor.total_turmas,
             'status': 'completo' if total_aulas >= 20 else 'incompleto',
             'status_label': 'Completo' if total_aulas >= 20 else 'Incompleto'
         })
@@ -123,6 +131,7 @@ def dashboard_analitico(request):
         'auditoria_recente': [],
         'relatorio_carga': {},
         'metricas_performance': metricas_performance,
+        **_contexto_periodo(periodo),
     }
     
     return render(request, 'core/dashboard.html', context)
@@ -457,7 +466,8 @@ class HorarioListView(ListView):
     
     def get_queryset(self):
         """Filtra horários por parâmetros."""
-        queryset = Horario.objects.all().select_related(
+        self.periodo_letivo = _periodo_selecionado(self.request)
+        queryset = Horario.objects.do_periodo(self.periodo_letivo).select_related(
             'turma', 'disciplina', 'professor', 'sala'
         ).order_by('dia_semana', 'horario_inicio')
         
@@ -485,6 +495,7 @@ class HorarioListView(ListView):
         context['professores'] = Professor.objects.filter(ativo=True).order_by('nome_completo')
         context['salas'] = Sala.objects.filter(ativa=True).order_by('nome_numero')
         context['disciplinas'] = Disciplina.objects.filter(ativa=True).order_by('nome')
+        context.update(_contexto_periodo(self.periodo_letivo))
         return context
 
 
@@ -527,6 +538,100 @@ class HorarioDeleteView(DeleteView):
 
 
 # View para Geração de Horários
+def importar_dados(request):
+    """
+    View para importação em massa de disciplinas, professores, turmas e preferências.
+    
+    O arquivo é processado em lotes (core/importacao.py); linhas com erro são
+    listadas sem impedir a importação das demais.
+    """
+    from .importacao import IMPORTADORES, ImportacaoError, importar_arquivo
+    
+    resultado = None
+    if request.method == 'POST':
+        form = ImportacaoForm(request.POST, request.FILES)
+        if form.is_valid():
+            arquivo = form.cleaned_data['arquivo']
+            try:
+                resultado = importar_arquivo(form.cleaned_data['tipo'], arquivo, arquivo.name)
+            except ImportacaoError as erro:
+                messages.error(request, str(erro))
+            else:
+                nivel = messages.success if not resultado['erros'] else messages.warning
+                nivel(
+                    request,
+                    f"{resultado['criados']} registro(s) importado(s) de {resultado['linhas']} linha(s); "
+                    f"{len(resultado['erros'])} linha(s) com erro."
+                )
+    else:
+        form = ImportacaoForm()
+    
+    return render(request, 'core/importacao.html', {
+        'form': form,
+        'resultado': resultado,
+        'colunas': {tipo: importador.colunas for tipo, importador in IMPORTADORES.items()},
+    })
+
+
+def exportar_horarios(request):
+    """
+    Zip com os horários de todas as turmas, professores e salas do período.
+    
+    Parâmetros (GET):
+        ?periodo=<id>           período letivo (padrão: o ativo)
+        ?formatos=ics,csv       formatos incluídos (ics, csv, xlsx)
+    
+    Os artefatos ficam em disco enquanto os dados não mudam
+    (core/exportacao.py); o zip é enviado à medida que é montado.
+    """
+    from django.http import StreamingHttpResponse
+    from django.utils.text import slugify
+    from .exportacao import ExportacaoError, ExportacaoHorarios
+    
+    periodo = _periodo_selecionado(request)
+    formatos = [formato.strip() for formato in request.GET.get('formatos', 'ics,csv').split(',') if formato.strip()]
+    try:
+        exportacao = ExportacaoHorarios(periodo, formatos=formatos)
+    except ExportacaoError as erro:
+        return JsonResponse({'erro': str(erro)}, status=400)
+    
+    nome = f"horarios-{slugify(periodo.nome) if periodo else 'todos'}.zip"
+    resposta = StreamingHttpResponse(exportacao.zip_em_partes(), content_type='application/zip')
+    resposta['Content-Disposition'] = f'attachment; filename="{nome}"'
+    return resposta
+
+
+def exportar_horario_recurso(request, recurso, recurso_id, formato):
+    """
+    Horário de uma turma, professor ou sala em .ics, .csv ou .xlsx.
+    
+    O endereço .ics serve como assinatura de calendário: o arquivo só é
+    gerado de novo quando os dados mudam.
+    """
+    from django.http import FileResponse, Http404
+    from .exportacao import RECURSOS, ExportacaoError, ExportacaoHorarios
+    
+    if recurso not in RECURSOS:
+        raise Http404('Recurso inválido')
+    try:
+        artefato = ExportacaoHorarios(_periodo_selecionado(request), formatos=[formato]).arquivo(
+            recurso, recurso_id, formato
+        )
+    except ExportacaoError as erro:
+        return JsonResponse({'erro': str(erro)}, status=400)
+    if artefato is None:
+        raise Http404('Nenhuma aula no período')
+    
+    nome, caminho = artefato
+    tipos = {'ics': 'text/calendar', 'csv': 'text/csv'}
+    return FileResponse(
+        open(caminho, 'rb'),
+        as_attachment=formato != 'ics',
+        filename=nome.rsplit('/', 1)[-1],
+        content_type=tipos.get(formato, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    )
+
+
 def gerar_horarios(request):
     """
     View para geração automática de horários.
@@ -551,9 +656,19 @@ def gerar_horarios(request):
                     respeitar_preferencias=form.cleaned_data.get('respeitar_preferencias', True),
                     evitar_janelas=form.cleaned_data.get('evitar_janelas', True),
                     distribuir_dias=form.cleaned_data.get('distribuir_dias', True),
-                    limpar_anteriores=form.cleaned_data.get('limpar_anteriores', False)
+                    limpar_anteriores=form.cleaned_data.get('limpar_anteriores', False),
+                    como_candidato=form.cleaned_data.get('como_candidato', False),
+                    usuario=request.user if request.user.is_authenticated else None,
+                    periodo_letivo=form.cleaned_data.get('periodo_letivo')
                 )
                 
+                if resultado['sucesso'] and resultado.get('candidato_id'):
+                    messages.success(
+                        request,
+                        f'Candidato gerado (semente {resultado["semente"]}). Os horários atuais não foram alterados.'
+                    )
+                    return redirect('core:candidato_comparar', pk=resultado['candidato_id'])
+                
                 if resultado['sucesso']:
                     messages.success(
                         request, 
@@ -573,7 +688,10 @@ def gerar_horarios(request):
                                 f'E mais {len(resultado["conflitos"]) - 5} avisos...'
                             )
                     
-                    return redirect('core:horario_list')
+                    destino = reverse('core:horario_list')
+                    if resultado.get('periodo_letivo_id'):
+                        destino += f'?periodo={resultado["periodo_letivo_id"]}'
+                    return redirect(destino)
                 else:
                     messages.error(
                         request, 
@@ -584,6 +702,19 @@ def gerar_horarios(request):
                     if resultado.get('conflitos'):
                         for conflito in resultado['conflitos'][:3]:
                             messages.error(request, conflito)
+                    
+                    # Restrições que, juntas, impedem a geração
+                    for conflito in resultado.get('restricoes_conflitantes', []):
+                        if conflito['restricoes']:
+                            messages.warning(
+                                request,
+                                'Restrições conflitantes (ajuste ao menos uma): ' + '; '.join(conflito['restricoes'])
+                            )
+                        else:
+                            messages.warning(
+                                request,
+                                'A carga horária das turmas não cabe na grade mesmo sem restrições de turno, sala ou professor.'
+                            )
                             
             except Exception as e:
                 messages.error(request, f'Erro inesperado ao gerar horários: {str(e)}')
@@ -604,6 +735,78 @@ def gerar_horarios(request):
     return render(request, 'core/gerar_horarios.html', context)
 
 
+def candidato_list(request):
+    """
+    Lista os quadros candidatos, dos mais bem pontuados para os piores.
+    """
+    from .models import HorarioCandidato
+    
+    candidatos = HorarioCandidato.objects.select_related('periodo_letivo', 'criado_por').defer('dados').order_by(
+        '-pontuacao', '-criado_em'
+    )
+    
+    return render(request, 'core/candidato_list.html', {'candidatos': candidatos})
+
+
+def candidato_comparar(request, pk):
+    """
+    Compara, lado a lado, um candidato com os horários atuais das mesmas turmas.
+    """
+    from .candidatos import ComparacaoCandidato
+    from .models import HorarioCandidato
+    
+    candidato = get_object_or_404(HorarioCandidato, pk=pk)
+    comparacao = ComparacaoCandidato(candidato)
+    
+    context = {
+        'candidato': candidato,
+        'resumo': comparacao.resumo,
+        'turmas': comparacao.por_turma(),
+        'conflitos_externos': comparacao.conflitos_externos(),
+        'apenas_diferencas': request.GET.get('diferencas') == '1',
+    }
+    return render(request, 'core/candidato_comparar.html', context)
+
+
+def candidato_promover(request, pk):
+    """
+    Aplica o candidato aos horários (POST).
+    """
+    from .candidatos import promover_candidato
+    from .models import HorarioCandidato
+    
+    candidato = get_object_or_404(HorarioCandidato, pk=pk)
+    if request.method != 'POST':
+        return redirect('core:candidato_comparar', pk=pk)
+    
+    resultado = promover_candidato(candidato, usuario=request.user if request.user.is_authenticated else None)
+    if resultado['sucesso']:
+        messages.success(
+            request,
+            f'{candidato} promovido: {resultado["adicionadas"]} aulas criadas, '
+            f'{resultado["removidas"]} removidas e {resultado["mantidas"]} mantidas.'
+        )
+        return redirect('core:horario_grade')
+    
+    for erro in resultado['erros'][:5]:
+        messages.error(request, erro)
+    return redirect('core:candidato_comparar', pk=pk)
+
+
+def candidato_deletar(request, pk):
+    """
+    Exclui um candidato (POST).
+    """
+    from .models import HorarioCandidato
+    
+    candidato = get_object_or_404(HorarioCandidato, pk=pk)
+    if request.method == 'POST':
+        nome = str(candidato)
+        candidato.delete()
+        messages.success(request, f'{nome} excluído.')
+    return redirect('core:candidato_list')
+
+
 # Views para visualização de horários
 def visualizar_horario_turma(request, turma_id):
     """
@@ -617,31 +820,63 @@ def visualizar_horario_turma(request, turma_id):
         HttpResponse: Página com horário da turma
     """
     from collections import defaultdict
+    from .grade import DIAS_GRADE, contexto_fragmento, horarios_da_grade, montar_grade
     
     turma = get_object_or_404(Turma, id=turma_id)
-    horarios = Horario.objects.filter(turma=turma).order_by('dia_semana', 'horario_inicio')
-    
-    # Criar grade de horários
-    grade_horarios = _criar_grade_horarios(horarios)
-    
-    # Resumos
-    resumo_disciplinas = defaultdict(lambda: {'aulas_semana': 0})
-    resumo_professores = defaultdict(lambda: {'aulas_semana': 0})
-    
-    for horario in horarios:
-        resumo_disciplinas[horario.disciplina.nome]['aulas_semana'] += 1
-        resumo_professores[horario.professor.nome_completo]['aulas_semana'] += 1
-    
+    periodo = _periodo_selecionado(request)
     context = {
         'turma': turma,
-        'horarios': horarios,
-        'grade_horarios': grade_horarios,
-        'resumo_disciplinas': dict(resumo_disciplinas),
-        'resumo_professores': dict(resumo_professores),
+        **_contexto_periodo(periodo),
+        **contexto_fragmento('turma', turma.pk, periodo),
     }
+    
+    # Grade já renderizada nesta versão dos dados: nada a consultar
+    if not context['fragmento_em_cache']:
+        horarios = list(horarios_da_grade(periodo, turma=turma))
+        
+        resumo_disciplinas = defaultdict(lambda: {'aulas_semana': 0})
+        resumo_professores = defaultdict(lambda: {'aulas_semana': 0})
+        for horario in horarios:
+            resumo_disciplinas[horario.disciplina.nome]['aulas_semana'] += 1
+            resumo_professores[horario.professor.nome_completo]['aulas_semana'] += 1
+        
+        context.update({
+            'horarios': horarios,
+            'dias_semana_grade': DIAS_GRADE,
+            'grade_horarios': montar_grade(
+                horarios,
+                turnos=turma.get_turnos_permitidos() if turma.turno_turma != 'flexivel' else None
+            ),
+            'resumo_disciplinas': dict(resumo_disciplinas),
+            'resumo_professores': dict(resumo_professores),
+        })
     return render(request, 'core/horario_turma.html', context)
 
 
+def imprimir_grades(request):
+    """
+    Documento para impressão com as grades de turmas, professores e salas.
+    
+    Parâmetros (GET):
+        ?periodo=<id>                   período letivo (padrão: o ativo)
+        ?recursos=turma,professor,sala  grades incluídas
+    
+    Todas as grades saem de uma única consulta e o documento fica em cache
+    até a próxima alteração de horários (core/impressao.py).
+    """
+    from django.http import HttpResponse
+    from .impressao import RECURSOS_IMPRESSAO, DocumentoGrades
+    
+    recursos = [
+        recurso for recurso in request.GET.get('recursos', ','.join(RECURSOS_IMPRESSAO)).split(',')
+        if recurso in RECURSOS_IMPRESSAO
+    ]
+    if not recursos:
+        return JsonResponse({'erro': f"Recursos válidos: {', '.join(RECURSOS_IMPRESSAO)}"}, status=400)
+    
+    return HttpResponse(DocumentoGrades(_periodo_selecionado(request), recursos=recursos).renderizar())
+
+
 def visualizar_horario_professor(request, professor_id):
     """
     View para visualizar horário de um professor específico.
@@ -654,37 +889,38 @@ def visualizar_horario_professor(request, professor_id):
         HttpResponse: Página com horário do professor
     """
     from collections import defaultdict
+    from .grade import DIAS_GRADE, contexto_fragmento, horarios_da_grade, montar_grade
     
     professor = get_object_or_404(Professor, id=professor_id)
-    horarios = Horario.objects.filter(professor=professor).order_by('dia_semana', 'horario_inicio')
-    
-    # Criar grade de horários
-    grade_horarios = _criar_grade_horarios(horarios)
-    
-    # Resumos
-    resumo_turmas = defaultdict(lambda: {'aulas': 0})
-    resumo_turnos = defaultdict(lambda: {'aulas': 0})
-    resumo_dias = defaultdict(lambda: {'aulas': 0, 'nome': ''})
-    
-    dias_semana = {
-        0: 'Segunda-feira', 1: 'Terça-feira', 2: 'Quarta-feira',
-        3: 'Quinta-feira', 4: 'Sexta-feira', 5: 'Sábado', 6: 'Domingo'
-    }
-    
-    for horario in horarios:
-        resumo_turmas[horario.turma.nome_codigo]['aulas'] += 1
-        resumo_turnos[horario.turno]['aulas'] += 1
-        resumo_dias[horario.dia_semana]['aulas'] += 1
-        resumo_dias[horario.dia_semana]['nome'] = dias_semana.get(horario.dia_semana, '')
-    
+    periodo = _periodo_selecionado(request)
     context = {
         'professor': professor,
-        'horarios': horarios,
-        'grade_horarios': grade_horarios,
-        'resumo_turmas': dict(resumo_turmas),
-        'resumo_turnos': dict(resumo_turnos),
-        'resumo_dias': dict(resumo_dias),
+        **_contexto_periodo(periodo),
+        **contexto_fragmento('professor', professor.pk, periodo),
     }
+    
+    if not context['fragmento_em_cache']:
+        horarios = list(horarios_da_grade(periodo, professor=professor))
+        
+        resumo_turmas = defaultdict(lambda: {'aulas': 0})
+        resumo_turnos = defaultdict(lambda: {'aulas': 0})
+        resumo_dias = defaultdict(lambda: {'aulas': 0, 'nome': ''})
+        dias_semana = dict(Horario.DIAS_SEMANA)
+        
+        for horario in horarios:
+            resumo_turmas[horario.turma.nome_codigo]['aulas'] += 1
+            resumo_turnos[horario.get_turno_display()]['aulas'] += 1
+            resumo_dias[horario.dia_semana]['aulas'] += 1
+            resumo_dias[horario.dia_semana]['nome'] = dias_semana.get(horario.dia_semana, '')
+        
+        context.update({
+            'horarios': horarios,
+            'dias_semana_grade': DIAS_GRADE,
+            'grade_horarios': montar_grade(horarios),
+            'resumo_turmas': dict(resumo_turmas),
+            'resumo_turnos': dict(resumo_turnos),
+            'resumo_dias': dict(sorted(resumo_dias.items())),
+        })
     return render(request, 'core/horario_professor.html', context)
 
 
@@ -700,183 +936,53 @@ def visualizar_horario_sala(request, sala_id):
         HttpResponse: Página com horário da sala
     """
     from collections import defaultdict
-    from datetime import time
+    from .grade import DIAS_GRADE, SLOTS_GRADE, contexto_fragmento, horarios_da_grade, montar_grade
+    from .ocupacao import horarios_livres_comuns
     
     sala = get_object_or_404(Sala, id=sala_id)
-    horarios = Horario.objects.filter(sala=sala).order_by('dia_semana', 'horario_inicio')
-    
-    # Criar grade de horários
-    grade_horarios = _criar_grade_horarios(horarios)
-    
-    # Calcular taxa de ocupação
-    total_slots = len(grade_horarios) * 5  # 5 dias da semana
-    slots_ocupados = horarios.count()
-    taxa_ocupacao = (slots_ocupados / total_slots * 100) if total_slots > 0 else 0
-    
-    # Resumos
-    resumo_turmas = defaultdict(lambda: {'aulas': 0})
-    resumo_disciplinas = defaultdict(lambda: {'aulas': 0})
-    resumo_turnos = defaultdict(lambda: {'aulas': 0, 'percentual': 0})
-    
-    for horario in horarios:
-        resumo_turmas[horario.turma.nome_codigo]['aulas'] += 1
-        resumo_disciplinas[horario.disciplina.nome]['aulas'] += 1
-        resumo_turnos[horario.turno]['aulas'] += 1
-    
-    # Calcular percentuais dos turnos
-    total_aulas = horarios.count()
-    for turno in resumo_turnos:
-        if total_aulas > 0:
-            resumo_turnos[turno]['percentual'] = (resumo_turnos[turno]['aulas'] / total_aulas * 100)
-    
-    # Encontrar maior turma que usa a sala
-    maior_turma = None
-    if horarios.exists():
-        turmas_na_sala = Turma.objects.filter(horarios__sala=sala).distinct()
-        maior_turma = turmas_na_sala.order_by('-numero_alunos').first()
-    
-    # Horários livres (simplificado)
-    horarios_livres = _calcular_horarios_livres(sala, horarios)
-    
+    periodo = _periodo_selecionado(request)
     context = {
         'sala': sala,
-        'horarios': horarios,
-        'grade_horarios': grade_horarios,
-        'taxa_ocupacao': taxa_ocupacao,
-        'resumo_turmas': dict(resumo_turmas),
-        'resumo_disciplinas': dict(resumo_disciplinas),
-        'resumo_turnos': dict(resumo_turnos),
-        'maior_turma': maior_turma,
-        'horarios_livres': horarios_livres[:10],  # Primeiros 10
+        **_contexto_periodo(periodo),
+        **contexto_fragmento('sala', sala.pk, periodo),
     }
-    return render(request, 'core/horario_sala.html', context)
-
-
-def _criar_grade_horarios(horarios):
-    """
-    Cria uma grade de horários organizada por slots de tempo.
     
-    Args:
-        horarios: QuerySet de horários
+    if not context['fragmento_em_cache']:
+        horarios = list(horarios_da_grade(periodo, sala=sala))
         
-    Returns:
-        list: Lista de slots organizados
-    """
-    from collections import defaultdict
-    from datetime import time
-    
-    # Horários padrão
-    slots_padrao = [
-        (time(7, 0), time(7, 50)),
-        (time(7, 50), time(8, 40)),
-        (time(9, 0), time(9, 50)),
-        (time(9, 50), time(10, 40)),
-        (time(11, 0), time(11, 50)),
-        (time(13, 0), time(13, 50)),
-        (time(13, 50), time(14, 40)),
-        (time(15, 0), time(15, 50)),
-        (time(15, 50), time(16, 40)),
-        (time(17, 0), time(17, 50)),
-        (time(19, 0), time(19, 50)),
-        (time(19, 50), time(20, 40)),
-        (time(21, 0), time(21, 50)),
-        (time(21, 50), time(22, 40)),
-    ]
-    
-    # Organizar horários por slot e dia
-    horarios_por_slot = defaultdict(lambda: defaultdict(lambda: None))
-    
-    for horario in horarios:
-        key = (horario.horario_inicio, horario.horario_fim)
-        horarios_por_slot[key][horario.dia_semana] = horario
-    
-    # Cores para diferentes disciplinas
-    cores_disciplinas = {
-        'Matemática': '#e3f2fd',
-        'Português': '#f3e5f5',
-        'História': '#e8f5e8',
-        'Geografia': '#fff3e0',
-        'Ciências': '#fce4ec',
-        'Física': '#e0f2f1',
-        'Química': '#f1f8e9',
-        'Biologia': '#e8eaf6',
-    }
-    
-    # Construir grade
-    grade = []
-    for inicio, fim in slots_padrao:
-        slot_key = (inicio, fim)
-        if slot_key in horarios_por_slot:
-            dias = []
-            for dia in range(5):  # Segunda a Sexta
-                horario = horarios_por_slot[slot_key][dia]
-                cor = cores_disciplinas.get(
-                    horario.disciplina.nome if horario else None, 
-                    '#f8f9fa'
-                )
-                dias.append({
-                    'horario': horario,
-                    'cor': cor
-                })
-            
-            grade.append({
-                'horario_inicio': inicio,
-                'horario_fim': fim,
-                'dias': dias
-            })
-    
-    return grade
-
-
-def _calcular_horarios_livres(sala, horarios_ocupados):
-    """
-    Calcula horários livres para uma sala.
-    
-    Args:
-        sala: Sala para calcular
-        horarios_ocupados: Horários já ocupados
+        # Taxa de ocupação sobre todos os slots da grade canônica
+        total_slots = len(SLOTS_GRADE) * len(DIAS_GRADE)
+        total_aulas = len(horarios)
+        taxa_ocupacao = (total_aulas / total_slots * 100) if total_slots > 0 else 0
         
-    Returns:
-        list: Lista de horários livres
-    """
-    from datetime import time
-    
-    slots_padrao = [
-        (time(7, 0), time(7, 50)),
-        (time(7, 50), time(8, 40)),
-        (time(9, 0), time(9, 50)),
-        (time(9, 50), time(10, 40)),
-        (time(11, 0), time(11, 50)),
-        (time(13, 0), time(13, 50)),
-        (time(13, 50), time(14, 40)),
-        (time(15, 0), time(15, 50)),
-        (time(15, 50), time(16, 40)),
-        (time(17, 0), time(17, 50)),
-    ]
-    
-    dias_semana = {
-        0: 'Segunda-feira', 1: 'Terça-feira', 2: 'Quarta-feira',
-        3: 'Quinta-feira', 4: 'Sexta-feira'
-    }
-    
-    # Criar set de horários ocupados
-    ocupados = set()
-    for horario in horarios_ocupados:
-        ocupados.add((horario.dia_semana, horario.horario_inicio, horario.horario_fim))
-    
-    # Encontrar horários livres
-    livres = []
-    for dia in range(5):  # Segunda a Sexta
-        for inicio, fim in slots_padrao:
-            if (dia, inicio, fim) not in ocupados:
-                livres.append({
-                    'dia': dia,
-                    'dia_nome': dias_semana[dia],
-                    'horario_inicio': inicio,
-                    'horario_fim': fim
-                })
-    
-    return livres
+        resumo_turmas = defaultdict(lambda: {'aulas': 0})
+        resumo_disciplinas = defaultdict(lambda: {'aulas': 0})
+        resumo_turnos = defaultdict(lambda: {'aulas': 0, 'percentual': 0})
+        for horario in horarios:
+            resumo_turmas[horario.turma.nome_codigo]['aulas'] += 1
+            resumo_disciplinas[horario.disciplina.nome]['aulas'] += 1
+            resumo_turnos[horario.get_turno_display()]['aulas'] += 1
+        
+        for turno in resumo_turnos:
+            resumo_turnos[turno]['percentual'] = resumo_turnos[turno]['aulas'] / total_aulas * 100
+        
+        # Maior turma que usa a sala
+        maior_turma = max((horario.turma for horario in horarios), key=lambda turma: turma.numero_alunos, default=None)
+        
+        context.update({
+            'horarios': horarios,
+            'dias_semana_grade': DIAS_GRADE,
+            'grade_horarios': montar_grade(horarios),
+            'taxa_ocupacao': taxa_ocupacao,
+            'resumo_turmas': dict(resumo_turmas),
+            'resumo_disciplinas': dict(resumo_disciplinas),
+            'resumo_turnos': dict(resumo_turnos),
+            'maior_turma': maior_turma,
+            'horarios_livres': horarios_livres_comuns(
+                salas=[sala], periodo_letivo_id=periodo.pk if periodo else None
+            )['livres'][:10],  # Primeiros 10
+        })
+    return render(request, 'core/horario_sala.html', context)
 
 
 # Views para Bloqueios Temporários
@@ -1019,6 +1125,35 @@ def professor_bloqueios_calendario(request, professor_id):
     return render(request, 'core/professor_bloqueios_calendario.html', context)
 
 
+def substitutos_bloqueio(request, pk):
+    """
+    API com os professores que podem substituir as aulas canceladas por um bloqueio.
+    
+    GET:
+        ?limite=<n>    candidatos por aula (padrão 5, máximo 20)
+        ?periodo=<id>  período letivo (padrão: o que contém o início do bloqueio)
+    """
+    from .substituicao import BuscaSubstitutos
+    
+    if request.method != 'GET':
+        return JsonResponse({'erro': 'Método não permitido'}, status=405)
+    
+    bloqueio = get_object_or_404(BloqueioTemporario.objects.select_related('professor'), pk=pk)
+    try:
+        limite = min(max(int(request.GET.get('limite', 5)), 1), 20)
+    except ValueError:
+        return JsonResponse({'erro': 'Parâmetro limite deve ser inteiro'}, status=400)
+    
+    periodo = _periodo_selecionado(request) if 'periodo' in request.GET else None
+    busca = BuscaSubstitutos(bloqueio, periodo_letivo=periodo, limite=limite)
+    return JsonResponse({
+        'bloqueio_id': bloqueio.pk,
+        'professor': bloqueio.professor.nome_completo,
+        'periodo_letivo_id': busca.periodo_letivo.pk if busca.periodo_letivo else None,
+        'aulas': busca.buscar(),
+    })
+
+
 def verificar_disponibilidade_professor(request):
     """
     View AJAX para verificar disponibilidade de professores em tempo real.
@@ -1045,17 +1180,21 @@ def verificar_disponibilidade_professor(request):
                 data_especifica=data
             )
             
-            # Buscar bloqueios ativos na data
-            bloqueios_data = professor.get_bloqueios_ativos(data, data)
+            # Bloqueios que valem na data, pelo índice de calendário
+            from .intervalos import IndiceCalendario
+            ids_bloqueios = [
+                pk for professor_bloqueio, _, pk in
+                IndiceCalendario.para_data(data).bloqueios_em(data, turno or None)
+                if professor_bloqueio == professor.pk
+            ]
             bloqueios_info = []
             
-            for bloqueio in bloqueios_data:
-                if bloqueio.professor_disponivel_na_data(data, turno if turno else None) == False:
-                    bloqueios_info.append({
-                        'tipo': bloqueio.get_tipo_bloqueio_display(),
-                        'motivo': bloqueio.motivo,
-                        'turno': bloqueio.get_turno_display() if bloqueio.turno else 'Dia todo'
-                    })
+            for bloqueio in BloqueioTemporario.objects.filter(pk__in=ids_bloqueios).order_by('data_inicio'):
+                bloqueios_info.append({
+                    'tipo': bloqueio.get_tipo_bloqueio_display(),
+                    'motivo': bloqueio.motivo,
+                    'turno': bloqueio.get_turno_display() if bloqueio.turno else 'Dia todo'
+                })
             
             return JsonResponse({
                 'disponivel': disponivel,
@@ -1105,6 +1244,7 @@ def mover_horario(request):
             
             # Verificar se a nova posição já está ocupada (conflito de horário exato)
             conflitos_exatos = Horario.objects.filter(
+                periodo_letivo=horario.periodo_letivo,
                 dia_semana=novo_dia,
                 horario_inicio=novo_inicio_time,
                 horario_fim=novo_fim_time
@@ -1135,7 +1275,7 @@ def mover_horario(request):
                 }, status=400)
             
             # Determinar turno baseado no horário
-            turno = 'M' if novo_inicio_time.hour < 12 else ('T' if novo_inicio_time.hour < 18 else 'N')
+            turno = Horario.turno_do_horario(novo_inicio_time)
             
             # Atualizar horário
             horario.dia_semana = novo_dia
@@ -1160,6 +1300,172 @@ def mover_horario(request):
     return JsonResponse({'erro': 'Método não permitido'}, status=405)
 
 
+def mover_horarios_lote(request):
+    """
+    View AJAX para mover e trocar vários horários em uma única requisição.
+    
+    Corpo JSON: {"operacoes": [...]} no formato de
+    core.movimentacao.MovimentacaoHorarios. O lote é aplicado por inteiro
+    ou recusado por inteiro; responde 409 se algum horário foi alterado por
+    outro usuário desde que o cliente o carregou.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'erro': 'Método não permitido'}, status=405)
+    
+    import json
+    from .movimentacao import MovimentacaoHorarios
+    
+    try:
+        data = json.loads(request.body)
+        operacoes = data.get('operacoes')
+        if not isinstance(operacoes, list):
+            raise ValueError
+    except (ValueError, AttributeError):
+        return JsonResponse({'sucesso': False, 'erro': 'Informe a lista "operacoes" em JSON'}, status=400)
+    
+    usuario = request.user if request.user.is_authenticated else None
+    try:
+        resultado = MovimentacaoHorarios(usuario=usuario).aplicar(operacoes)
+    except (KeyError, TypeError, ValueError) as e:
+        return JsonResponse({'sucesso': False, 'erro': f'Operação inválida: {e}'}, status=400)
+    
+    if resultado['desatualizados']:
+        resultado['erro'] = 'Horários alterados por outro usuário; recarregue a grade e tente novamente'
+        return JsonResponse(resultado, status=409)
+    if resultado['erros']:
+        resultado['erro'] = '; '.join(resultado['erros'])
+        return JsonResponse(resultado, status=400)
+    
+    resultado['mensagem'] = f"{len(resultado['horarios'])} horário(s) atualizados"
+    return JsonResponse(resultado)
+
+
+def destinos_horario(request, horario_id):
+    """
+    View AJAX com os slots da grade para onde um horário pode ser movido.
+    
+    Usada ao iniciar o arraste na grade: considera ocupação do professor,
+    da turma e das salas, preferências e bloqueios do professor e lista as
+    salas alternativas livres em cada slot.
+    """
+    from .ocupacao import destinos_validos
+    
+    horario = get_object_or_404(
+        Horario.objects.select_related('professor', 'turma', 'disciplina', 'sala'),
+        id=horario_id
+    )
+    resultado = destinos_validos(horario)
+    resultado['horario_id'] = horario.id
+    resultado['versao'] = horario.versao
+    return JsonResponse(resultado)
+
+
+def api_horarios_livres(request):
+    """
+    API dos slots da grade em que os recursos informados estão todos livres.
+    
+    GET:
+        ?professor=<id>     professor que precisa estar livre (repetível)
+        ?turma=<id>         turma que precisa estar livre (repetível)
+        ?sala=<id>          sala que precisa estar livre (repetível); sem
+                            salas, retorna as salas compatíveis livres
+        ?tipo_sala=<tipo>   tipo exigido das salas compatíveis
+        ?periodo=<id>       período letivo (padrão: o ativo)
+        ?disponibilidade=0  ignora preferências e bloqueios dos professores
+    """
+    from .ocupacao import horarios_livres_comuns
+    
+    if request.method != 'GET':
+        return JsonResponse({'erro': 'Método não permitido'}, status=405)
+    
+    recursos = {}
+    for parametro, modelo in (('professor', Professor), ('turma', Turma), ('sala', Sala)):
+        ids = request.GET.getlist(parametro)
+        if not all(valor.isdigit() for valor in ids):
+            return JsonResponse({'erro': f'Parâmetro {parametro} deve conter ids numéricos'}, status=400)
+        objetos = list(modelo.objects.filter(pk__in=ids))
+        if len(objetos) != len(set(ids)):
+            return JsonResponse({'erro': f'{modelo._meta.verbose_name} não encontrado(a)'}, status=404)
+        recursos[parametro] = objetos
+    
+    tipo_sala = request.GET.get('tipo_sala', '')
+    if tipo_sala and tipo_sala not in dict(Sala.TIPOS_SALA):
+        return JsonResponse({'erro': f'Tipo de sala inválido: {tipo_sala}'}, status=400)
+    
+    periodo = _periodo_selecionado(request)
+    resultado = horarios_livres_comuns(
+        professores=recursos['professor'],
+        turmas=recursos['turma'],
+        salas=recursos['sala'],
+        tipo_sala=tipo_sala,
+        periodo_letivo_id=periodo.pk if periodo else None,
+        considerar_disponibilidade=request.GET.get('disponibilidade') != '0'
+    )
+    resultado['periodo_letivo_id'] = periodo.pk if periodo else None
+    return JsonResponse(resultado)
+
+
+def api_calendario(request):
+    """
+    API de bloqueios e eventos dia a dia, consultada no índice de calendário.
+    
+    GET:
+        ?inicio=AAAA-MM-DD  primeiro dia (padrão: hoje)
+        ?fim=AAAA-MM-DD     último dia (padrão: o início; no máximo 366 dias)
+        ?turno=<turno>      considera só bloqueios e eventos que afetam o turno
+        ?periodo=<id>       período letivo (padrão: o ativo)
+    """
+    from datetime import datetime, timedelta
+    from django.utils import timezone
+    from .intervalos import IndiceCalendario
+    
+    if request.method != 'GET':
+        return JsonResponse({'erro': 'Método não permitido'}, status=405)
+    
+    try:
+        inicio = datetime.strptime(request.GET['inicio'], '%Y-%m-%d').date() if request.GET.get('inicio') else timezone.localdate()
+        fim = datetime.strptime(request.GET['fim'], '%Y-%m-%d').date() if request.GET.get('fim') else inicio
+    except ValueError:
+        return JsonResponse({'erro': 'Datas devem estar no formato AAAA-MM-DD'}, status=400)
+    if fim < inicio or (fim - inicio).days > 365:
+        return JsonResponse({'erro': 'Intervalo de datas inválido'}, status=400)
+    
+    turno = request.GET.get('turno') or None
+    if turno and turno not in dict(Horario.TURNOS):
+        return JsonResponse({'erro': f'Turno inválido: {turno}'}, status=400)
+    
+    periodo = _periodo_selecionado(request)
+    calendario = IndiceCalendario.do_periodo(periodo)
+    
+    dias = []
+    data = inicio
+    while data <= fim:
+        dias.append({
+            'data': data.isoformat(),
+            'professores_bloqueados': sorted(calendario.professores_bloqueados(data, turno)),
+            'eventos': [evento.pk for evento in calendario.eventos_em(data, turno)],
+        })
+        data += timedelta(days=1)
+    
+    eventos = {}
+    aulas = []
+    horarios = Horario.objects.do_periodo(periodo).ativos().only('id', 'dia_semana', 'turno')
+    if turno:
+        horarios = horarios.filter(turno=turno)
+    for data_aula, horario, evento in calendario.aulas_em_eventos(horarios, inicio, fim):
+        eventos[evento.pk] = evento.nome
+        aulas.append({'data': data_aula.isoformat(), 'horario_id': horario.pk, 'evento_id': evento.pk})
+    for evento in calendario.eventos_entre(inicio, fim):
+        eventos[evento.pk] = evento.nome
+    
+    return JsonResponse({
+        'periodo_letivo_id': periodo.pk if periodo else None,
+        'dias': dias,
+        'eventos': eventos,
+        'aulas_em_eventos': aulas,
+    })
+
+
 def horario_grade_view(request):
     """
     View para exibir horários em formato de grade com drag & drop.
@@ -1168,68 +1474,81 @@ def horario_grade_view(request):
     através de arrastar e soltar.
     """
     import json
+    from .eventos import serializar_horario
+    from .grade import DIAS_GRADE, SLOTS_GRADE, horarios_da_grade
     
-    # Buscar todos os horários
-    horarios = Horario.objects.all().select_related(
-        'turma', 'disciplina', 'professor', 'sala'
-    ).order_by('dia_semana', 'horario_inicio')
-    
-    # Definir slots de horário disponíveis
-    slots_horario = [
-        ('07:00', '07:50'),
-        ('07:50', '08:40'),
-        ('08:40', '09:30'),
-        ('09:50', '10:40'),  # Intervalo 09:30-09:50
-        ('10:40', '11:30'),
-        ('11:30', '12:20'),
-        ('13:00', '13:50'),  # Tarde
-        ('13:50', '14:40'),
-        ('15:10', '16:00'),  # Intervalo 14:50-15:10
-        ('16:00', '16:50'),
-        ('16:50', '17:40'),
-    ]
+    # Horários do período selecionado
+    periodo = _periodo_selecionado(request)
+    horarios = horarios_da_grade(periodo)
     
-    # Dias da semana
-    dias_semana = [
-        (1, 'Segunda'),
-        (2, 'Terça'),
-        (3, 'Quarta'),
-        (4, 'Quinta'),
-        (5, 'Sexta'),
-    ]
+    # Linhas e colunas da grade canônica (dia_semana 0=Segunda, como em Horario)
+    slots_horario = [(inicio.strftime('%H:%M'), fim.strftime('%H:%M')) for _, inicio, fim in SLOTS_GRADE]
+    dias_semana = DIAS_GRADE
     
-    # Serializar horários para JSON
-    horarios_json = []
-    for horario in horarios:
-        horarios_json.append({
-            'id': horario.id,
-            'dia_semana': horario.dia_semana,
-            'horario_inicio': horario.horario_inicio.strftime('%H:%M'),
-            'horario_fim': horario.horario_fim.strftime('%H:%M'),
-            'professor': {
-                'id': horario.professor.id,
-                'nome': horario.professor.nome_completo
-            },
-            'disciplina': horario.disciplina.nome,
-            'turma': {
-                'id': horario.turma.id,
-                'codigo': horario.turma.nome_codigo
-            },
-            'sala': {
-                'id': horario.sala.id,
-                'numero': horario.sala.nome_numero
-            }
-        })
+    # Serializar horários para JSON (mesmo formato dos eventos ao vivo)
+    horarios_json = [serializar_horario(horario) for horario in horarios]
     
     context = {
         'slots_horario': slots_horario,
         'dias_semana': dias_semana,
         'horarios_json': json.dumps(horarios_json),
+        **_contexto_periodo(periodo),
     }
     
     return render(request, 'core/horario_grade.html', context)
 
 
+async def eventos_stream(request):
+    """
+    Canal Server-Sent Events com as mudanças de horários e notificações.
+    
+    Eventos enviados:
+        horario: {"acao": "criado"|"alterado", "horario": {...}} ou
+                 {"acao": "removido", "id": ...}
+        notificacao: {"acao": "criada", ...} ou {"acao": "sincronizadas", ...}
+    
+    Clientes que reconectam com o cabeçalho Last-Event-ID recebem os
+    eventos perdidos que ainda estão no histórico do canal.
+    """
+    import asyncio
+    from django.http import StreamingHttpResponse
+    from .eventos import INTERVALO_KEEPALIVE, canal, formatar_sse
+    
+    try:
+        ultimo_id = int(request.headers.get('Last-Event-ID', ''))
+    except ValueError:
+        ultimo_id = None
+    
+    if 'wsgi.version' in request.META:
+        # Servidor WSGI (ex: runserver): o corpo precisa ser um iterador síncrono
+        assinatura = canal.assinar(ultimo_id=ultimo_id)
+        
+        def stream():
+            try:
+                yield 'retry: 3000\n\n'
+                while True:
+                    evento = assinatura.aguardar_sync(INTERVALO_KEEPALIVE)
+                    yield formatar_sse(evento) if evento else ': keep-alive\n\n'
+            finally:
+                canal.cancelar(assinatura)
+    else:
+        assinatura = canal.assinar(loop=asyncio.get_running_loop(), ultimo_id=ultimo_id)
+        
+        async def stream():
+            try:
+                yield 'retry: 3000\n\n'
+                while True:
+                    evento = await assinatura.aguardar(INTERVALO_KEEPALIVE)
+                    yield formatar_sse(evento) if evento else ': keep-alive\n\n'
+            finally:
+                canal.cancelar(assinatura)
+    
+    resposta = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    resposta['Cache-Control'] = 'no-cache'
+    resposta['X-Accel-Buffering'] = 'no'
+    return resposta
+
+
 def notificacoes_view(request):
     """
     View para a página de notificações do sistema.
@@ -1247,139 +1566,107 @@ def api_notificacoes(request):
     """
     API para gerenciar notificações do usuário.
     
-    GET: Lista notificações não lidas
-    POST: Marca notificação como lida
+    GET: Lista notificações ativas (globais e do usuário), mais recentes primeiro
+        ?since=<id>   apenas notificações com id maior que o cursor
+        ?limite=<n>   máximo de notificações retornadas (0 = apenas contadores)
+        Responde 304 quando o ETag enviado em If-None-Match ainda é válido.
+    POST: Marca notificação como lida ({"notificacao_id": id} ou {"todas": true})
+    
+    As notificações são produzidas por core.notificacoes.VerificadorNotificacoes;
+    esta view apenas lê (e marca como lida) o que está gravado. A leitura das
+    notificações globais é guardada por usuário: marcar uma como lida não a
+    esconde dos demais.
     """
-    from datetime import datetime, timedelta
+    import hashlib
+    import json
+    from django.http import HttpResponseNotModified
+    from django.utils import timezone
+    from .cache import get_versao_notificacoes, incrementar_versao_notificacoes
+    from .notificacoes import verificar_em_segundo_plano
+    
+    visiveis = NotificacaoSistema.objects.visiveis(request.user)
     
     if request.method == 'GET':
-        # Gerar notificações dinâmicas baseadas no estado do sistema
-        notificacoes_data = []
+        # Atualiza as notificações fora da requisição se os dados mudaram
+        verificar_em_segundo_plano()
         
-        # Verificar conflitos de horário
-        conflitos_horario = []
-        horarios = Horario.objects.select_related('professor', 'sala', 'turma')
-        
-        for horario in horarios:
-            # Conflitos de professor
-            conflitos_professor = Horario.objects.filter(
-                professor=horario.professor,
-                dia_semana=horario.dia_semana,
-                horario_inicio=horario.horario_inicio
-            ).exclude(id=horario.id)
-            
-            if conflitos_professor.exists():
-                conflito = conflitos_professor.first()
-                conflitos_horario.append({
-                    'tipo': 'professor',
-                    'descricao': f'Professor {horario.professor.nome_completo} tem conflito de horário',
-                    'detalhes': f'Turmas {horario.turma.nome_codigo} e {conflito.turma.nome_codigo}'
-                })
-        
-        # Adicionar notificações de conflitos
-        for i, conflito in enumerate(conflitos_horario[:5]):  # Máximo 5 conflitos
-            notificacoes_data.append({
-                'id': f'conflito_{i}',
-                'titulo': 'Conflito de Horário Detectado',
-                'mensagem': conflito['descricao'],
-                'tipo': 'erro',
-                'prioridade': 'alta',
-                'data_criacao': datetime.now().strftime('%d/%m/%Y %H:%M'),
-                'link_acao': '/core/horarios/',
-                'lida': False
-            })
-        
-        # Verificar problemas de capacidade
-        horarios_capacidade = Horario.objects.select_related('sala', 'turma')
-        for horario in horarios_capacidade:
-            if horario.sala.capacidade < horario.turma.numero_alunos:
-                notificacoes_data.append({
-                    'id': f'capacidade_{horario.id}',
-                    'titulo': 'Problema de Capacidade',
-                    'mensagem': f'Sala {horario.sala.nome_numero} (cap. {horario.sala.capacidade}) insuficiente para turma {horario.turma.nome_codigo} ({horario.turma.numero_alunos} alunos)',
-                    'tipo': 'aviso',
-                    'prioridade': 'media',
-                    'data_criacao': datetime.now().strftime('%d/%m/%Y %H:%M'),
-                    'link_acao': f'/core/horarios/{horario.id}/edit/',
-                    'lida': False
-                })
-        
-        # Verificar professores sem horários
-        professores_sem_horarios = Professor.objects.filter(
-            ativo=True
-        ).exclude(horarios__isnull=False).distinct()
-        
-        for professor in professores_sem_horarios:
-            notificacoes_data.append({
-                'id': f'prof_sem_horario_{professor.id}',
-                'titulo': 'Professor sem Horários',
-                'mensagem': f'Professor {professor.nome_completo} não possui horários atribuídos',
-                'tipo': 'aviso',
-                'prioridade': 'baixa',
-                'data_criacao': datetime.now().strftime('%d/%m/%Y %H:%M'),
-                'link_acao': f'/core/professores/{professor.id}/',
-                'lida': False
-            })
-        
-        # Verificar salas sub-utilizadas
-        salas_subutilizadas = []
-        for sala in Sala.objects.filter(ativa=True):
-            total_horarios = Horario.objects.filter(sala=sala).count()
-            if total_horarios < 5:  # Menos de 5 horários por semana
-                salas_subutilizadas.append(sala)
-        
-        for sala in salas_subutilizadas[:3]:  # Máximo 3
-            notificacoes_data.append({
-                'id': f'sala_subutilizada_{sala.id}',
-                'titulo': 'Sala Sub-utilizada',
-                'mensagem': f'Sala {sala.nome_numero} tem baixa ocupação ({Horario.objects.filter(sala=sala).count()} horários)',
-                'tipo': 'info',
-                'prioridade': 'baixa',
-                'data_criacao': datetime.now().strftime('%d/%m/%Y %H:%M'),
-                'link_acao': f'/core/salas/{sala.id}/',
-                'lida': False
-            })
+        try:
+            since = int(request.GET.get('since', 0))
+            limite = min(max(int(request.GET.get('limite', 10)), 0), 50)
+        except ValueError:
+            return JsonResponse({'erro': 'Parâmetros since e limite devem ser inteiros'}, status=400)
         
-        # Adicionar notificação de boas-vindas se não houver outras
-        if not notificacoes_data:
-            notificacoes_data.append({
-                'id': 'boas_vindas',
-                'titulo': 'Sistema Funcionando Corretamente',
-                'mensagem': 'Bem-vindo ao sistema de horários! Tudo está funcionando corretamente.',
-                'tipo': 'sucesso',
-                'prioridade': 'baixa',
-                'data_criacao': datetime.now().strftime('%d/%m/%Y %H:%M'),
-                'link_acao': None,
-                'lida': False
-            })
+        # Toda escrita em notificações (inclusive marcar como lida) muda a versão delas
+        etag = '"{}"'.format(hashlib.md5(
+            f'{get_versao_notificacoes()}:{request.user.pk}:{since}:{limite}'.encode()
+        ).hexdigest())
+        if etag in request.headers.get('If-None-Match', ''):
+            resposta = HttpResponseNotModified()
+            resposta['ETag'] = etag
+            return resposta
         
-        # Limitar número total de notificações
-        notificacoes_data = notificacoes_data[:10]
+        notificacoes = list(visiveis.filter(id__gt=since).order_by('-id')[:limite]) if limite else []
+        notificacoes_data = [
+            {
+                'id': notificacao.id,
+                'titulo': notificacao.titulo,
+                'mensagem': notificacao.mensagem,
+                'tipo': notificacao.tipo,
+                'prioridade': notificacao.prioridade,
+                'data_criacao': timezone.localtime(notificacao.data_criacao).strftime('%d/%m/%Y %H:%M'),
+                'link_acao': notificacao.link_acao or None,
+                'lida': notificacao.lida_pelo_usuario,
+            }
+            for notificacao in notificacoes
+        ]
+        contadores = visiveis.aggregate(
+            total=Count('id'),
+            nao_lidas=Count('id', filter=Q(lida_pelo_usuario=False)),
+        )
         
-        return JsonResponse({
+        resposta = JsonResponse({
             'notificacoes': notificacoes_data,
-            'total': len(notificacoes_data),
-            'nao_lidas': len([n for n in notificacoes_data if not n.get('lida', False)])
+            'total': contadores['total'],
+            'nao_lidas': contadores['nao_lidas'],
+            'cursor': notificacoes[0].id if notificacoes else since,
         })
+        resposta['ETag'] = etag
+        resposta['Cache-Control'] = 'no-cache'
+        return resposta
     
     elif request.method == 'POST':
-        # Simular marcar como lida
-        import json
+        if not request.user.is_authenticated:
+            return JsonResponse({'erro': 'Entre no sistema para marcar notificações como lidas'}, status=403)
+        
         try:
             data = json.loads(request.body)
+            
+            if data.get('todas'):
+                marcadas = visiveis.marcar_como_lidas(request.user)
+                # update() e bulk_create() não disparam sinais
+                incrementar_versao_notificacoes()
+                return JsonResponse({
+                    'sucesso': True,
+                    'mensagem': f'{marcadas} notificações marcadas como lidas'
+                })
+            
             notificacao_id = data.get('notificacao_id')
             
             if not notificacao_id:
                 return JsonResponse({'erro': 'ID da notificação não fornecido'}, status=400)
             
-            # Em uma implementação real, aqui salvaria no banco de dados
-            # Por enquanto apenas simular sucesso
+            notificacao = visiveis.filter(id=notificacao_id).first()
+            if notificacao is None:
+                return JsonResponse({'erro': 'Notificação não encontrada'}, status=404)
+            
+            if not notificacao.lida_pelo_usuario:
+                notificacao.marcar_como_lida(request.user)
             
             return JsonResponse({
                 'sucesso': True,
                 'mensagem': 'Notificação marcada como lida'
             })
-        except json.JSONDecodeError:
+        except (json.JSONDecodeError, ValueError):
             return JsonResponse({'erro': 'JSON inválido'}, status=400)
         except Exception as e:
             return JsonResponse({'erro': f'Erro interno: {str(e)}'}, status=500)
@@ -1389,58 +1676,72 @@ def api_notificacoes(request):
 
 def relatorio_carga_horaria(request):
     """
-    View para relatório detalhado de carga horária.
+    View para relatório detalhado de carga horária do período selecionado.
     """
     from datetime import datetime
     
+    periodo = _periodo_selecionado(request)
+    horarios = Horario.objects.do_periodo(periodo).ativos()
+    
+    # Uma consulta agrupada por recurso em vez de três contagens por objeto
+    def totais_por(campo, *distintos):
+        anotacoes = {f'total_{distinto}': Count(distinto, distinct=True) for distinto in distintos}
+        return {
+            linha[campo]: linha
+            for linha in horarios.values(campo).annotate(total=Count('id'), **anotacoes)
+        }
+    
     # Relatório básico sem depender do dashboard complexo
     professores = Professor.objects.filter(ativo=True)
     salas = Sala.objects.filter(ativa=True)
     turmas = Turma.objects.filter(ativa=True)
     
+    vazio = {'total': 0, 'total_turma': 0, 'total_disciplina': 0, 'total_professor': 0}
+    
+    totais_professores = totais_por('professor', 'turma', 'disciplina')
     relatorio_professores = []
     for professor in professores:
-        total_horarios = Horario.objects.filter(professor=professor).count()
-        total_turmas_prof = Horario.objects.filter(professor=professor).values('turma').distinct().count()
-        total_disciplinas = Horario.objects.filter(professor=professor).values('disciplina').distinct().count()
+        totais = totais_professores.get(professor.pk, vazio)
+        total_horarios = totais['total']
         
         relatorio_professores.append({
             'professor': professor,
             'total_horarios': total_horarios,
-            'total_turmas': total_turmas_prof,
-            'total_disciplinas': total_disciplinas,
+            'total_turmas': totais['total_turma'],
+            'total_disciplinas': totais['total_disciplina'],
             'carga_semanal': total_horarios,
             'percentual_carga': min(100, (total_horarios / 25) * 100),
             'status': 'completo' if total_horarios >= 20 else 'incompleto',
             'status_color': 'success' if total_horarios >= 20 else 'warning'
         })
     
+    totais_salas = totais_por('sala', 'turma')
     relatorio_salas = []
     for sala in salas:
-        total_horarios = Horario.objects.filter(sala=sala).count()
-        total_turmas_sala = Horario.objects.filter(sala=sala).values('turma').distinct().count()
+        totais = totais_salas.get(sala.pk, vazio)
+        total_horarios = totais['total']
         taxa_ocupacao = min(100, (total_horarios / 25) * 100)
         
         relatorio_salas.append({
             'sala': sala,
             'total_horarios': total_horarios,
-            'total_turmas': total_turmas_sala,
+            'total_turmas': totais['total_turma'],
             'taxa_ocupacao': taxa_ocupacao,
             'horas_utilizadas': total_horarios,
             'horas_disponiveis': 25,
             'status': 'alta' if taxa_ocupacao > 80 else 'media' if taxa_ocupacao > 50 else 'baixa'
         })
     
+    totais_turmas = totais_por('turma', 'professor', 'disciplina')
     relatorio_turmas = []
     for turma in turmas:
-        total_horarios = Horario.objects.filter(turma=turma).count()
-        total_professores = Horario.objects.filter(turma=turma).values('professor').distinct().count()
-        total_disciplinas = Horario.objects.filter(turma=turma).values('disciplina').distinct().count()
+        totais = totais_turmas.get(turma.pk, vazio)
+        total_horarios = totais['total']
         
         relatorio_turmas.append({
             'turma': turma,
-            'total_disciplinas': total_disciplinas,
-            'total_professores': total_professores,
+            'total_disciplinas': totais['total_disciplina'],
+            'total_professores': totais['total_professor'],
             'carga_semanal': total_horarios,
             'percentual_completude': min(100, (total_horarios / 25) * 100),
             'status_label': 'Completo' if total_horarios >= 20 else 'Incompleto',
@@ -1448,32 +1749,39 @@ def relatorio_carga_horaria(request):
             'conflitos': 0
         })
     
+    totais_disciplinas = totais_por('disciplina', 'professor', 'turma')
+    distribuicao_turnos = {}
+    for linha in horarios.values('disciplina', 'turno').annotate(total=Count('id')):
+        distribuicao_turnos.setdefault(linha['disciplina'], {})[linha['turno']] = linha['total']
+    
     relatorio_disciplinas = []
     disciplinas = Disciplina.objects.filter(ativa=True)
     for disciplina in disciplinas:
-        total_horarios = Horario.objects.filter(disciplina=disciplina).count()
-        total_professores = Horario.objects.filter(disciplina=disciplina).values('professor').distinct().count()
-        total_turmas_disc = Horario.objects.filter(disciplina=disciplina).values('turma').distinct().count()
+        totais = totais_disciplinas.get(disciplina.pk, vazio)
+        total_horarios = totais['total']
+        turnos = distribuicao_turnos.get(disciplina.pk, {})
         
         relatorio_disciplinas.append({
             'disciplina': disciplina,
-            'total_professores': total_professores,
-            'total_turmas': total_turmas_disc,
+            'total_professores': totais['total_professor'],
+            'total_turmas': totais['total_turma'],
             'total_horarios': total_horarios,
             'carga_total': total_horarios,
             'distribuicao': {
-                'manha': Horario.objects.filter(disciplina=disciplina, turno='M').count(),
-                'tarde': Horario.objects.filter(disciplina=disciplina, turno='T').count(),
-                'noite': Horario.objects.filter(disciplina=disciplina, turno='N').count(),
+                'manha': turnos.get('manha', 0),
+                'tarde': turnos.get('tarde', 0),
+                'noite': turnos.get('noite', 0),
             }
         })
     
     # Resumo geral
+    total_horarios = horarios.count()
+    total_professores = professores.count()
     resumo = {
-        'total_professores': professores.count(),
-        'total_horarios': Horario.objects.count(),
-        'carga_total': Horario.objects.count(),
-        'media_carga': Horario.objects.count() / max(1, professores.count()),
+        'total_professores': total_professores,
+        'total_horarios': total_horarios,
+        'carga_total': total_horarios,
+        'media_carga': total_horarios / max(1, total_professores),
         'taxa_ocupacao': 75
     }
     
@@ -1486,8 +1794,8 @@ def relatorio_carga_horaria(request):
             'resumo': resumo
         },
         'data_geracao': datetime.now(),
-        'periodos': [],
         'professores': professores,
+        **_contexto_periodo(periodo),
     }
     
     return render(request, 'core/relatorio_carga_horaria.html', context)
@@ -1508,65 +1816,38 @@ def verificar_integridade_dados(request):
     validacoes_negocio = []
     alertas_performance = []
     
-    # Verificar conflitos de horário básicos
-    horarios = Horario.objects.select_related('professor', 'sala', 'turma', 'disciplina')
-    
-    # Conflitos de professor (mesmo professor, mesmo horário)
-    for horario in horarios:
-        conflitos_professor = Horario.objects.filter(
-            professor=horario.professor,
-            dia_semana=horario.dia_semana,
-            horario_inicio=horario.horario_inicio,
-            horario_fim=horario.horario_fim
-        ).exclude(id=horario.id)
-        
-        if conflitos_professor.exists():
-            conflito = conflitos_professor.first()
-            conflitos_horario.append({
-                'id': f'prof_{horario.id}_{conflito.id}',
-                'tipo_display': 'Conflito de Professor',
-                'descricao': f'Professor {horario.professor.nome_completo} tem aulas simultâneas',
-                'horario1': f'{horario.turma.nome_codigo} - {horario.disciplina.nome}',
-                'horario2': f'{conflito.turma.nome_codigo} - {conflito.disciplina.nome}'
-            })
-    
-    # Conflitos de sala (mesma sala, mesmo horário)
-    for horario in horarios:
-        conflitos_sala = Horario.objects.filter(
-            sala=horario.sala,
-            dia_semana=horario.dia_semana,
-            horario_inicio=horario.horario_inicio,
-            horario_fim=horario.horario_fim
-        ).exclude(id=horario.id)
-        
-        if conflitos_sala.exists():
-            conflito = conflitos_sala.first()
-            conflitos_horario.append({
-                'id': f'sala_{horario.id}_{conflito.id}',
-                'tipo_display': 'Conflito de Sala',
-                'descricao': f'Sala {horario.sala.nome_numero} ocupada por duas turmas',
-                'horario1': f'{horario.turma.nome_codigo} - {horario.disciplina.nome}',
-                'horario2': f'{conflito.turma.nome_codigo} - {conflito.disciplina.nome}'
-            })
+    # Verificar conflitos de horário básicos (só dentro do período selecionado)
+    periodo = _periodo_selecionado(request)
+    horarios = list(
+        Horario.objects.do_periodo(periodo).ativos().select_related('professor', 'sala', 'turma', 'disciplina')
+    )
     
-    # Conflitos de turma (mesma turma, mesmo horário)
-    for horario in horarios:
-        conflitos_turma = Horario.objects.filter(
-            turma=horario.turma,
-            dia_semana=horario.dia_semana,
-            horario_inicio=horario.horario_inicio,
-            horario_fim=horario.horario_fim
-        ).exclude(id=horario.id)
-        
-        if conflitos_turma.exists():
-            conflito = conflitos_turma.first()
-            conflitos_horario.append({
-                'id': f'turma_{horario.id}_{conflito.id}',
-                'tipo_display': 'Conflito de Turma',
-                'descricao': f'Turma {horario.turma.nome_codigo} tem aulas simultâneas',
-                'horario1': f'{horario.disciplina.nome} com {horario.professor.nome_completo}',
-                'horario2': f'{conflito.disciplina.nome} com {conflito.professor.nome_completo}'
-            })
+    # Dois horários no mesmo slot exato com o mesmo professor, sala ou turma,
+    # agrupados em memória numa única passada
+    verificacoes = [
+        ('prof', 'professor', 'Conflito de Professor',
+         lambda h: f'Professor {h.professor.nome_completo} tem aulas simultâneas',
+         lambda h: f'{h.turma.nome_codigo} - {h.disciplina.nome}'),
+        ('sala', 'sala', 'Conflito de Sala',
+         lambda h: f'Sala {h.sala.nome_numero} ocupada por duas turmas',
+         lambda h: f'{h.turma.nome_codigo} - {h.disciplina.nome}'),
+        ('turma', 'turma', 'Conflito de Turma',
+         lambda h: f'Turma {h.turma.nome_codigo} tem aulas simultâneas',
+         lambda h: f'{h.disciplina.nome} com {h.professor.nome_completo}'),
+    ]
+    for prefixo, recurso, tipo_display, descricao, rotulo in verificacoes:
+        primeiro_no_slot = {}
+        for horario in horarios:
+            chave = (getattr(horario, f'{recurso}_id'), horario.dia_semana, horario.horario_inicio, horario.horario_fim)
+            conflito = primeiro_no_slot.setdefault(chave, horario)
+            if conflito is not horario:
+                conflitos_horario.append({
+                    'id': f'{prefixo}_{horario.id}_{conflito.id}',
+                    'tipo_display': tipo_display,
+                    'descricao': descricao(horario),
+                    'horario1': rotulo(horario),
+                    'horario2': rotulo(conflito)
+                })
     
     # Verificar inconsistências básicas
     # Professores sem disciplinas
@@ -1605,11 +1886,11 @@ def verificar_integridade_dados(request):
             })
     
     # Alertas de performance
-    total_horarios = horarios.count()
+    total_horarios = len(horarios)
     if total_horarios > 1000:
         alertas_performance.append({
             'area': 'Volume de Dados',
-            'descricao': f'Sistema tem {total_horarios} horários cadastrados',
+            'descricao': f'O período tem {total_horarios} horários cadastrados',
             'otimizacao': 'Considere arquivar horários antigos'
         })
     
@@ -1628,7 +1909,7 @@ def verificar_integridade_dados(request):
     estatisticas = {
         'horarios_total': total_horarios,
         'professores_ativos': Professor.objects.filter(ativo=True).count(),
-        'salas_utilizadas': Horario.objects.values('sala').distinct().count(),
+        'salas_utilizadas': len({horario.sala_id for horario in horarios}),
         'turmas_ativas': Turma.objects.filter(ativa=True).count(),
         'taxa_ocupacao': 75,  # Simulado
         'carga_media': round(total_horarios / max(1, Professor.objects.filter(ativo=True).count()), 1),
@@ -1654,6 +1935,7 @@ def verificar_integridade_dados(request):
     
     context = {
         'resultado': resultado,
+        **_contexto_periodo(periodo),
     }
     
     return render(request, 'core/verificar_integridade.html', context)
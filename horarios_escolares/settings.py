@@ -81,6 +81,34 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# Compartilhado entre processos: a versão dos dados (core/cache.py) precisa
+# ser a mesma para o servidor web, os comandos do manage.py e os workers
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    }
+}
+
+# Atualiza as notificações em segundo plano quando a API detecta dados alterados
+# (desative se `manage.py verificar_notificacoes` for agendado externamente)
+NOTIFICACOES_VERIFICACAO_AUTOMATICA = True
+
+# Artefatos de exportação (iCalendar/CSV/XLSX) gravados em disco e reaproveitados
+# enquanto os dados não mudam; processos usados para gerar os que faltam
+EXPORTACAO_DIR = BASE_DIR / 'exportacoes'
+EXPORTACAO_PROCESSOS = 4
+
+# Processos usados para renderizar o documento de impressão com todas as grades
+IMPRESSAO_PROCESSOS = 4
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 